@@ -18,7 +18,7 @@ else:
 
 # Import your models here
 from app.deps import Base
-from app.storage.models import ScanJob, Subdomain, Screenshot, WafDetection, LeakDetection, Technology
+from app.storage.models import ScanJob, Subdomain, Screenshot, WafDetection, LeakDetection, Technology, StageRun
 from app.auth.models import User
 
 # this is the Alembic Config object, which provides
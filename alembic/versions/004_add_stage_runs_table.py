@@ -0,0 +1,50 @@
+"""add stage_runs table for per-tool telemetry
+
+Revision ID: 004_add_stage_runs
+Revises: 003_increase_url_lengths
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004_add_stage_runs'
+down_revision = '003_increase_url_lengths'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Create stage_runs table (one row per tool invocation)"""
+    op.create_table(
+        'stage_runs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('scan_job_id', sa.Integer(), nullable=False),
+        sa.Column('stage', sa.String(length=32), nullable=False),
+        sa.Column('tool', sa.String(length=64), nullable=False),
+        sa.Column('command', sa.Text(), nullable=True),
+        sa.Column('exit_code', sa.Integer(), nullable=True),
+        sa.Column('timed_out', sa.Boolean(), nullable=True),
+        sa.Column('wall_time', sa.Float(), nullable=True),
+        sa.Column('user_cpu', sa.Float(), nullable=True),
+        sa.Column('sys_cpu', sa.Float(), nullable=True),
+        sa.Column('max_rss_kb', sa.BigInteger(), nullable=True),
+        sa.Column('bytes_in', sa.BigInteger(), nullable=True),
+        sa.Column('bytes_out', sa.BigInteger(), nullable=True),
+        sa.Column('lines_in', sa.Integer(), nullable=True),
+        sa.Column('lines_out', sa.Integer(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['scan_job_id'], ['scan_jobs.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_stage_runs_id', 'stage_runs', ['id'], unique=False)
+    op.create_index('ix_stage_runs_scan_job_id', 'stage_runs', ['scan_job_id'], unique=False)
+
+
+def downgrade():
+    """Drop stage_runs table"""
+    op.drop_index('ix_stage_runs_scan_job_id', table_name='stage_runs')
+    op.drop_index('ix_stage_runs_id', table_name='stage_runs')
+    op.drop_table('stage_runs')
@@ -0,0 +1,29 @@
+"""add body_hash and cluster_id to subdomains for response clustering
+
+Revision ID: 005_add_subdomain_clusters
+Revises: 004_add_stage_runs
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005_add_subdomain_clusters'
+down_revision = '004_add_stage_runs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Add response body hash and cluster id columns"""
+    op.add_column('subdomains', sa.Column('body_hash', sa.String(length=64), nullable=True))
+    op.add_column('subdomains', sa.Column('cluster_id', sa.String(length=16), nullable=True))
+    op.create_index('ix_subdomains_cluster_id', 'subdomains', ['cluster_id'], unique=False)
+
+
+def downgrade():
+    """Drop response clustering columns"""
+    op.drop_index('ix_subdomains_cluster_id', table_name='subdomains')
+    op.drop_column('subdomains', 'cluster_id')
+    op.drop_column('subdomains', 'body_hash')
@@ -0,0 +1,27 @@
+"""add perceptual hash to screenshots
+
+Revision ID: 006_add_screenshot_phash
+Revises: 005_add_subdomain_clusters
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006_add_screenshot_phash'
+down_revision = '005_add_subdomain_clusters'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Add dHash column for near-duplicate grouping"""
+    op.add_column('screenshots', sa.Column('phash', sa.String(length=16), nullable=True))
+    op.create_index('ix_screenshots_phash', 'screenshots', ['phash'], unique=False)
+
+
+def downgrade():
+    """Drop dHash column"""
+    op.drop_index('ix_screenshots_phash', table_name='screenshots')
+    op.drop_column('screenshots', 'phash')
@@ -0,0 +1,49 @@
+"""add scan owners and the held_scans holding table
+
+Revision ID: 007_add_admission_control
+Revises: 006_add_screenshot_phash
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007_add_admission_control'
+down_revision = '006_add_screenshot_phash'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Add scan_jobs.owner_id and create held_scans"""
+    with op.batch_alter_table('scan_jobs') as batch_op:
+        batch_op.add_column(sa.Column('owner_id', sa.Integer(), nullable=True))
+        batch_op.create_index('ix_scan_jobs_owner_id', ['owner_id'], unique=False)
+
+    op.create_table(
+        'held_scans',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('scan_job_id', sa.Integer(), nullable=False),
+        sa.Column('owner_id', sa.Integer(), nullable=True),
+        sa.Column('options', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['scan_job_id'], ['scan_jobs.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('scan_job_id')
+    )
+    op.create_index('ix_held_scans_id', 'held_scans', ['id'], unique=False)
+    op.create_index('ix_held_scans_owner_id', 'held_scans', ['owner_id'], unique=False)
+    op.create_index('ix_held_scans_created_at', 'held_scans', ['created_at'], unique=False)
+
+
+def downgrade():
+    """Drop held_scans and scan_jobs.owner_id"""
+    op.drop_index('ix_held_scans_created_at', table_name='held_scans')
+    op.drop_index('ix_held_scans_owner_id', table_name='held_scans')
+    op.drop_index('ix_held_scans_id', table_name='held_scans')
+    op.drop_table('held_scans')
+
+    with op.batch_alter_table('scan_jobs') as batch_op:
+        batch_op.drop_index('ix_scan_jobs_owner_id')
+        batch_op.drop_column('owner_id')
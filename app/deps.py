@@ -3,7 +3,7 @@ Dependencies and configuration for the recon API
 """
 import os
 import json
-from typing import Generator, List, Union
+from typing import Generator, List, Optional, Union
 
 from fastapi import Depends
 from fastapi.middleware.cors import CORSMiddleware
@@ -41,6 +41,72 @@ class Settings(BaseSettings):
     
     # File storage
     jobs_directory: str = "./jobs"
+
+    # Content-addressed artifact store (see app/services/artifacts.py): finished jobs' files move
+    # into artifact_store_path, deduplicated by SHA-256 and compressed with zstd (zlib without
+    # the zstandard package); unreferenced blobs younger than the grace period are kept
+    artifact_store_enabled: bool = False
+    artifact_store_path: str = "./artifacts"
+    artifact_store_compression: str = "zstd"
+    artifact_store_level: int = 3
+    artifact_gc_grace_seconds: int = 3600
+    # Where the store keeps its blobs: "local" (artifact_store_path, one node or a shared volume)
+    # or "s3" (an S3-compatible bucket such as MinIO; needs boto3), so workers can run on any node.
+    # artifact_read_mode "presign" redirects downloads of stored screenshots to presigned bucket
+    # URLs instead of proxying them through the API
+    artifact_backend: str = "local"
+    artifact_s3_bucket: str = "recon-artifacts"
+    artifact_s3_prefix: str = ""
+    artifact_s3_endpoint_url: Optional[str] = None
+    artifact_s3_region: Optional[str] = None
+    artifact_s3_access_key: Optional[str] = None
+    artifact_s3_secret_key: Optional[str] = None
+    artifact_read_mode: str = "proxy"
+    artifact_presign_expires: int = 900
+
+    # Locality-aware routing (see app/services/locality.py): follow-on stage tasks of a job go to the
+    # direct queue of the worker holding its job directory, unless that worker is gone (no heartbeat
+    # for locality_node_ttl seconds) or runs locality_max_load x its concurrency tasks; then they take
+    # the shared queue and stage their inputs from the artifact store. Owners keep their local copies;
+    # every locality_evict_interval seconds a worker removes those of jobs it no longer owns
+    locality_routing_enabled: bool = False
+    locality_owner_ttl: int = 86400
+    locality_node_ttl: int = 60
+    locality_max_load: float = 1.0
+    locality_evict_interval: int = 600
+
+    # Stage tasks pass artifact references (job_id + key + checksum) instead of data; these caps
+    # reject any Celery message or stage result whose JSON is larger (0 = no cap)
+    celery_max_message_bytes: int = 256 * 1024
+    celery_max_result_bytes: int = 64 * 1024
+
+    # Celery encoding (see app/workers/serialization.py): "json" or "msgpack" (needs msgpack), and
+    # "", "zlib" or "zstd" (needs zstandard) body compression, for tasks on celery_serialization_queues
+    # (empty = all) and for results/progress meta. Every node accepts json and msgpack, so deploy
+    # first and switch the serializer afterwards
+    celery_serializer: str = "json"
+    celery_compression: str = ""
+    celery_serialization_queues: List[str] = []
+    celery_result_serializer: str = "json"
+    celery_result_compression: str = ""
+
+    # Admission control (see app/services/admission.py). POST /scans answers 429 + Retry-After when
+    # recon_full holds admission_max_queue_depth messages or the user has admission_max_active_per_user
+    # dispatched, unfinished scans (updated within admission_active_window seconds). Bulk scans are held
+    # in the database and released every admission_release_interval seconds (and when a scan finishes),
+    # at most admission_release_batch at a time and only while recon_full is below
+    # admission_bulk_queue_depth, so interactive scans never queue behind more than that.
+    # Enabling it needs `celery beat` running (docker-compose "beat", systemd/recon-celery-beat.service,
+    # start_beat.bat) and a worker consuming the maintenance queue, or held scans are never released
+    admission_control_enabled: bool = False
+    admission_max_active_per_user: int = 20
+    admission_max_queue_depth: int = 200
+    admission_active_window: int = 4 * 3600
+    admission_bulk_queue_depth: int = 20
+    admission_release_batch: int = 50
+    admission_release_interval: int = 10
+    admission_max_held_per_user: int = 10000
+    admission_retry_after: int = 30
     
     # Tool paths (assuming tools are in PATH)
     subfinder_path: str = "subfinder"
@@ -64,16 +130,89 @@ class Settings(BaseSettings):
     wafw00f_timeout: int = 900    # 15 minutes
     sourceleakhacker_timeout: int = 1800  # 30 minutes
 
+    # httpx probing: "two_phase" sweeps every host with the fast settings, then re-probes
+    # only hosts that connected but timed out with the slow settings; "single" uses the slow settings once
+    httpx_probe_mode: str = "two_phase"
+    httpx_fast_timeout: int = 5   # seconds per request
+    httpx_fast_retries: int = 0
+    httpx_slow_timeout: int = 30
+    httpx_slow_retries: int = 3
+
+    # Probe engine: "cli" (httpx binary) or "native" (in-process httpx.AsyncClient, see
+    # app/services/probe.py). The native engine connects with the fast timeout and reads
+    # with the slow timeout/retries above.
+    probe_engine: str = "cli"
+    probe_concurrency: int = 100          # hosts in flight
+    probe_per_host_connections: int = 4   # connections per host:port, incl. redirect targets
+    probe_http2: bool = True              # needs the optional h2 package
+
+    # Response capture: the probe stage keeps headers and the first response_capture_bytes of
+    # each body in a per-job content-addressed store (see app/services/response_store.py)
+    response_store_enabled: bool = False
+    response_capture_bytes: int = 256 * 1024
+    response_store_compression: str = "zstd"  # "zstd" (needs the optional zstandard package) or "zlib"
+    response_store_level: int = 3
+
+    # In-process technology fingerprinting over captured responses (see app/services/fingerprint.py);
+    # enabling it also enables response capture
+    fingerprint_enabled: bool = False
+    fingerprint_signatures_path: str = "./config/fingerprints.json"
+    fingerprint_workers: int = 0             # matching processes (0 = CPU count)
+
+    # Screenshot WebP derivatives (see app/services/thumbnails.py): "eager" renders them after
+    # capture, "lazy" on the first request for each size; needs the optional Pillow package
+    screenshot_derivatives: str = "eager"
+    screenshot_thumb_width: int = 320
+    screenshot_webp_quality: int = 75
+    screenshot_derivative_workers: int = 4
+
+    # Perceptual hashes of screenshots (needs Pillow): GET /scans/{job_id}/screenshots/clusters groups
+    # screenshots whose dHashes differ in at most screenshot_cluster_distance of 64 bits
+    screenshot_cluster_distance: int = 6
+    # Keep one file per set of byte-identical screenshots; the others point at it
+    screenshot_store_duplicates_once: bool = False
+
+    # Hosts whose responses match on (final URL, body SHA-256, status, length) form a cluster;
+    # screenshots and leak scans run on one host per cluster (see app/services/clustering.py)
+    host_clustering_enabled: bool = True
+
     # WAF and Leak detection options
     enable_sourceleakhacker: bool = False
     sourceleakhacker_mode: str = "tiny"  # tiny or full
     sourceleakhacker_threads: int = 8
+    leak_rules_path: str = "./config/leak_rules.json"  # severity rules (see app/services/leak_rules.py)
+
+    # Metrics: port for the Celery worker Prometheus exporter (0 = disabled)
+    worker_metrics_port: int = 0
+
+    # Tracing: "none", "jsonl" (append spans to tracing_jsonl_path) or "otlp"
+    tracing_exporter: str = "none"
+    tracing_jsonl_path: str = "./traces/spans.jsonl"
+    tracing_otlp_endpoint: str = "http://localhost:4318"
+    tracing_service_name: str = "recon-api"
+
+    # Profiling: fraction of scans profiled even without profile=true (0.0-1.0)
+    profile_sample_rate: float = 0.0
+    profile_sampling_interval_ms: int = 5
+
+    # DNS resolution stage between enumeration and httpx (see app/services/dns_resolver.py)
+    dns_resolution_enabled: bool = True
+    dns_resolvers: List[str] = ["1.1.1.1", "8.8.8.8", "9.9.9.9"]  # "host" or "host:port"
+    dns_concurrency: int = 200    # queries in flight
+    dns_timeout: float = 2.0      # seconds per attempt
+    dns_retries: int = 2          # extra attempts, rotating resolvers
+    dns_wildcard_probes: int = 3  # random labels resolved per parent zone
+    # DNS answer cache: "redis" (in-process LRU + Redis shared by all workers), "memory" or "none"
+    dns_cache_backend: str = "redis"
+    dns_cache_size: int = 100000       # in-process LRU entries
+    dns_cache_max_ttl: int = 3600      # cap on record TTLs (seconds)
+    dns_cache_negative_ttl: int = 60   # NXDOMAIN / no-address answers
     
     class Config:
         env_file = ".env"
         extra = "ignore"  # Ignore extra fields in .env
 
-    @field_validator("cors_origins", mode="before")
+    @field_validator("cors_origins", "dns_resolvers", mode="before")
     @classmethod
     def parse_cors_origins(cls, v: Union[str, List[str]]) -> List[str]:
         """
@@ -8,8 +8,10 @@ from fastapi import status
 from sqlalchemy.orm import Session
 
 from app.deps import settings, setup_cors, create_jobs_directory, get_db
-from app.routers import scans, auth
+from app.routers import scans, auth, job_files
 from app.auth.dependencies import get_current_user_optional
+from app.services.metrics import setup_metrics
+from app.services.tracing import setup_tracing
 
 
 def create_app() -> FastAPI:
@@ -25,6 +27,12 @@ def create_app() -> FastAPI:
     
     # Setup CORS
     setup_cors(app)
+
+    # Request metrics middleware and /metrics endpoint
+    setup_metrics(app)
+
+    # Root span per API request (propagated to Celery tasks)
+    setup_tracing(app)
     
     # Create necessary directories
     create_jobs_directory()
@@ -40,8 +48,8 @@ def create_app() -> FastAPI:
     if web_dir.exists():
         app.mount("/static", StaticFiles(directory="web"), name="static")
 
-    # Serve jobs directory (screenshots and scan results)
-    app.mount("/jobs", StaticFiles(directory="jobs"), name="jobs")
+    # Serve job files (screenshots and scan results), from the artifact store if enabled
+    app.include_router(job_files.router, tags=["job files"])
 
     # Root route - redirect to login
     @app.get("/", response_class=HTMLResponse)
@@ -0,0 +1,33 @@
+"""
+Job file downloads (screenshots and raw tool outputs)
+
+Replaces the /jobs static mount: files are served from the job directory,
+or fetched back from the artifact store once the job's files were moved
+there (see app/services/artifacts.py). With an S3 store and
+artifact_read_mode "presign", stored screenshots redirect to a presigned
+bucket URL instead of passing through the API.
+"""
+import asyncio
+
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import FileResponse, RedirectResponse
+
+from app.services.artifacts import job_path, presigned_job_url
+
+router = APIRouter()
+
+
+@router.get("/jobs/{job_id}/{path:path}")
+async def get_job_file(job_id: str, path: str):
+    """One file of a job, by its path relative to the job directory"""
+    url = await asyncio.to_thread(presigned_job_url, job_id, path)
+    if url is not None:
+        return RedirectResponse(url, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+
+    local = await asyncio.to_thread(job_path, job_id, path)
+    if local is None or not local.is_file():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found"
+        )
+    return FileResponse(local)
@@ -1,16 +1,35 @@
 """
 REST API endpoints for scan operations
 """
+import io
 import uuid
-from typing import List, Optional
+import asyncio
+import functools
+import zipfile
+from pathlib import Path
+from urllib.parse import urlparse
+from typing import Any, List, Literal, Optional, Dict
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import Response, FileResponse
 from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 
-from app.deps import get_db
-from app.storage.repo import ScanJobRepository, SubdomainRepository, ScreenshotRepository, WafDetectionRepository, LeakDetectionRepository
+from app.deps import get_db, settings
+from app.storage.repo import ScanJobRepository, SubdomainRepository, ScreenshotRepository, WafDetectionRepository, LeakDetectionRepository, StageRunRepository, TechnologyRepository
 from app.storage.models import ScanStatus
 from app.workers.tasks import run_recon_scan
+from app.services.profiling import profile_dir
+from app.services.leak_rules import get_leak_rule_engine
+from app.services.fingerprint import fingerprint_records, get_fingerprint_engine, merge_technologies
+from app.services.parsers import iter_httpx_records
+from app.services.response_store import ResponseStore
+from app.services.scope import DomainScope
+from app.services.thumbnails import SIZES as SCREENSHOT_SIZES, derivative_path, derivatives_available, ensure_derivative
+from app.services.perceptual_hash import group_near_duplicates
+from app.services.artifacts import job_path, delete_job_files
+from app.services.locality import dispatch_stage
+from app.services.artifact_refs import write_ref
+from app.services.admission import AdmissionRejected, check_bulk, check_interactive, publish_scans, release_held
 from app.auth.dependencies import require_auth
 from app.auth.models import User
 
@@ -25,6 +44,29 @@ class ScanRequest(BaseModel):
     amass_timeout: Optional[int] = Field(default=30, ge=5, le=3600, description="Amass timeout in minutes (5-3600)", example=30)
     amass_max_dns_queries: Optional[int] = Field(default=40, ge=1, le=200, description="Maximum concurrent DNS queries (1-200)", example=40)
     amass_use_wordlist: Optional[bool] = Field(default=False, description="Use custom wordlist for brute-force enumeration", example=False)
+    profile: Optional[bool] = Field(default=False, description="Write cProfile/flamegraph profiles to the job directory", example=False)
+    # Scope: extra patterns in/out of scope besides the target domain and its subdomains
+    scope_include: Optional[List[str]] = Field(default=None, description="Additional in-scope patterns (e.g. '*.example.org')", example=None)
+    scope_exclude: Optional[List[str]] = Field(default=None, description="Out-of-scope patterns (e.g. 'admin.example.com', '*.dev.example.com')", example=None)
+    # httpx probing (defaults from settings): two-phase fast sweep + slow re-probe of hosts that timed out
+    probe_engine: Optional[Literal["cli", "native"]] = Field(default=None, description="Probe engine: 'cli' (httpx binary) or 'native' (in-process)", example="cli")
+    probe_mode: Optional[Literal["two_phase", "single"]] = Field(default=None, description="httpx probe mode: 'two_phase' or 'single'", example="two_phase")
+    probe_fast_timeout: Optional[int] = Field(default=None, ge=1, le=120, description="Sweep timeout in seconds (two_phase)", example=5)
+    probe_fast_retries: Optional[int] = Field(default=None, ge=0, le=10, description="Sweep retries (two_phase)", example=0)
+    probe_slow_timeout: Optional[int] = Field(default=None, ge=1, le=300, description="Re-probe timeout in seconds", example=30)
+    probe_slow_retries: Optional[int] = Field(default=None, ge=0, le=10, description="Re-probe retries", example=3)
+
+
+def _probe_config(request) -> Dict[str, Any]:
+    """Per-scan httpx overrides; unset fields fall back to settings in the pipeline"""
+    return {
+        "engine": request.probe_engine,
+        "mode": request.probe_mode,
+        "fast_timeout": request.probe_fast_timeout,
+        "fast_retries": request.probe_fast_retries,
+        "slow_timeout": request.probe_slow_timeout,
+        "slow_retries": request.probe_slow_retries,
+    }
 
 
 class ScanResponse(BaseModel):
@@ -41,12 +83,24 @@ class BulkScanRequest(BaseModel):
     amass_timeout: Optional[int] = Field(default=30, ge=5, le=3600, description="Amass timeout in minutes (5-3600)", example=30)
     amass_max_dns_queries: Optional[int] = Field(default=40, ge=1, le=200, description="Maximum concurrent DNS queries (1-200)", example=40)
     amass_use_wordlist: Optional[bool] = Field(default=False, description="Use custom wordlist for brute-force enumeration", example=False)
+    profile: Optional[bool] = Field(default=False, description="Write cProfile/flamegraph profiles to the job directory", example=False)
+    # Scope: extra patterns in/out of scope besides the target domain and its subdomains
+    scope_include: Optional[List[str]] = Field(default=None, description="Additional in-scope patterns (e.g. '*.example.org')", example=None)
+    scope_exclude: Optional[List[str]] = Field(default=None, description="Out-of-scope patterns (e.g. 'admin.example.com', '*.dev.example.com')", example=None)
+    # httpx probing (defaults from settings): two-phase fast sweep + slow re-probe of hosts that timed out
+    probe_engine: Optional[Literal["cli", "native"]] = Field(default=None, description="Probe engine: 'cli' (httpx binary) or 'native' (in-process)", example="cli")
+    probe_mode: Optional[Literal["two_phase", "single"]] = Field(default=None, description="httpx probe mode: 'two_phase' or 'single'", example="two_phase")
+    probe_fast_timeout: Optional[int] = Field(default=None, ge=1, le=120, description="Sweep timeout in seconds (two_phase)", example=5)
+    probe_fast_retries: Optional[int] = Field(default=None, ge=0, le=10, description="Sweep retries (two_phase)", example=0)
+    probe_slow_timeout: Optional[int] = Field(default=None, ge=1, le=300, description="Re-probe timeout in seconds", example=30)
+    probe_slow_retries: Optional[int] = Field(default=None, ge=0, le=10, description="Re-probe retries", example=3)
 
 
 class BulkScanResponse(BaseModel):
     total_submitted: int
     jobs: List[ScanResponse]
     message: str
+    held: int = 0  # scans waiting for the admission dispatcher
 
 
 class TechnologyInfo(BaseModel):
@@ -87,6 +141,10 @@ class SubdomainInfo(BaseModel):
     ipv6_addresses: Optional[List[str]] = None
     technologies: Optional[List[TechnologyInfo]] = None
 
+    # Response clustering: hosts serving the same page share a cluster_id
+    body_hash: Optional[str] = None
+    cluster_id: Optional[str] = None
+
 
 class ScreenshotInfo(BaseModel):
     id: int
@@ -94,6 +152,11 @@ class ScreenshotInfo(BaseModel):
     filename: str
     file_path: str
     file_size: Optional[int] = None
+    phash: Optional[str] = None
+    # Image URLs per size: WebP thumbnail for galleries, WebP full view, original capture
+    thumb_url: Optional[str] = None
+    full_url: Optional[str] = None
+    original_url: Optional[str] = None
 
 
 class WafDetectionInfo(BaseModel):
@@ -127,6 +190,42 @@ class ScanResultResponse(BaseModel):
     leak_detections: List[LeakDetectionInfo] = []
 
 
+class StageRunInfo(BaseModel):
+    """Resource usage of a single tool invocation"""
+    model_config = {"from_attributes": True}
+
+    stage: str
+    tool: str
+    command: Optional[str] = None
+    exit_code: Optional[int] = None
+    timed_out: bool = False
+    wall_time: Optional[float] = None
+    user_cpu: Optional[float] = None
+    sys_cpu: Optional[float] = None
+    max_rss_kb: Optional[int] = None
+    bytes_in: Optional[int] = None
+    bytes_out: Optional[int] = None
+    lines_in: Optional[int] = None
+    lines_out: Optional[int] = None
+    started_at: Optional[str] = None
+
+
+class StageTimingSummary(BaseModel):
+    """Aggregated timings for one pipeline stage"""
+    stage: str
+    runs: int
+    wall_time: float
+    cpu_time: float
+    max_rss_kb: Optional[int] = None
+
+
+class ScanTimingsResponse(BaseModel):
+    job_id: str
+    total_wall_time: float
+    stages: List[StageTimingSummary] = []
+    runs: List[StageRunInfo] = []
+
+
 class ScanListResponse(BaseModel):
     job_id: str
     domain: str
@@ -144,6 +243,9 @@ async def create_scan(
 ):
     """
     Create a new reconnaissance scan job (requires authentication)
+
+    Answers 429 with Retry-After while the scan queue is full or the user
+    has too many scans running.
     """
     # Generate unique job ID
     job_id = str(uuid.uuid4())
@@ -156,9 +258,15 @@ async def create_scan(
             detail="Invalid domain format"
         )
 
+    if settings.admission_control_enabled:
+        try:
+            check_interactive(db, current_user.id)
+        except AdmissionRejected as e:
+            raise _too_many_requests(e)
+
     # Create scan job in database
     scan_repo = ScanJobRepository(db)
-    scan_job = scan_repo.create_scan_job(job_id, domain)
+    scan_job = scan_repo.create_scan_job(job_id, domain, owner_id=current_user.id)
 
     # Prepare Amass configuration
     amass_config = {
@@ -169,7 +277,10 @@ async def create_scan(
     }
 
     # Start background task with Amass configuration
-    task = run_recon_scan.delay(job_id, domain, amass_config)
+    scope_config = {"include": scan_request.scope_include or [], "exclude": scan_request.scope_exclude or []}
+
+    task = run_recon_scan.delay(job_id, domain, amass_config, profile=scan_request.profile or False, scope_config=scope_config,
+                               probe_config=_probe_config(scan_request))
 
     # Store task_id in database for progress tracking
     scan_repo.update_task_id(job_id, task.id)
@@ -192,49 +303,93 @@ async def create_bulk_scans(
     Create multiple reconnaissance scan jobs at once
 
     Each domain will be processed as a separate Celery task,
-    automatically distributed across available workers.
+    automatically distributed across available workers. Duplicate
+    domains are submitted once. With admission
+    control the jobs are held and released as workers free up (status
+    "queued" until then); 429 with Retry-After if the user already has
+    too many held.
     """
-    scan_repo = ScanJobRepository(db)
-    jobs = []
-
+    # Validate and dedupe up front: the jobs are created in one INSERT
+    domains = []
     for domain in bulk_request.domains:
         # Validate domain
         domain = domain.strip().lower()
         if not domain or '.' not in domain:
             # Skip invalid domains
             continue
+        domains.append(domain)
+    domains = list(dict.fromkeys(domains))
 
-        # Generate unique job ID
-        job_id = str(uuid.uuid4())
-
-        # Create scan job in database
-        scan_job = scan_repo.create_scan_job(job_id, domain)
+    hold = settings.admission_control_enabled
+    if hold:
+        try:
+            check_bulk(db, current_user.id, len(domains))
+        except AdmissionRejected as e:
+            raise _too_many_requests(e)
 
-        # Use Amass configuration from request (or defaults)
-        amass_config = {
+    # Use Amass configuration from request (or defaults)
+    options = {
+        "amass_config": {
             "mode": bulk_request.amass_mode or "passive",
             "timeout": bulk_request.amass_timeout or 30,
             "max_dns_queries": bulk_request.amass_max_dns_queries or 40,
             "use_wordlist": bulk_request.amass_use_wordlist or False
-        }
-
-        # Start background task with Amass configuration
-        task = run_recon_scan.delay(job_id, domain, amass_config)
-
-        # Store task_id in database
-        scan_repo.update_task_id(job_id, task.id)
+        },
+        "profile": bulk_request.profile or False,
+        "scope_config": {"include": bulk_request.scope_include or [], "exclude": bulk_request.scope_exclude or []},
+        "probe_config": _probe_config(bulk_request),
+    }
 
-        jobs.append(ScanResponse(
-            job_id=job_id,
-            domain=domain,
-            status="pending",
-            message=f"Task ID: {task.id}"
-        ))
+    # Task ids are assigned here so they are stored with the jobs, in the same transaction
+    rows = [{
+        "job_id": str(uuid.uuid4()),
+        "domain": domain,
+        "owner_id": current_user.id,
+        "task_id": None if hold else str(uuid.uuid4()),
+    } for domain in domains]
+    scan_repo = ScanJobRepository(db)
+    scan_repo.bulk_create_scan_jobs(rows, held_options=options if hold else None)
+
+    if not hold:
+        published = publish_scans([(row["job_id"], row["domain"], options, row["task_id"]) for row in rows])
+        scan_repo.fail_scan_jobs([row["job_id"] for row in rows[published:]], "Could not queue the scan task")
+        jobs = [ScanResponse(
+            job_id=row["job_id"],
+            domain=row["domain"],
+            status="pending" if i < published else "failed",
+            message=f"Task ID: {row['task_id']}" if i < published else "Could not queue the scan task"
+        ) for i, row in enumerate(rows)]
+        return BulkScanResponse(
+            total_submitted=published,
+            jobs=jobs,
+            message=f"Successfully submitted {published} scan jobs. Workers will process them in parallel."
+        )
 
+    # Start what the queue has room for now; the dispatcher releases the rest
+    release_held(db)
+    released = dict(scan_repo.get_task_ids([row["job_id"] for row in rows]))
+    jobs = [ScanResponse(
+        job_id=row["job_id"],
+        domain=row["domain"],
+        status="pending" if released.get(row["job_id"]) else "queued",
+        message=f"Task ID: {released[row['job_id']]}" if released.get(row["job_id"]) else "Held for dispatch"
+    ) for row in rows]
+
+    held = sum(1 for job in jobs if job.status == "queued")
     return BulkScanResponse(
         total_submitted=len(jobs),
         jobs=jobs,
-        message=f"Successfully submitted {len(jobs)} scan jobs. Workers will process them in parallel."
+        held=held,
+        message=f"Successfully submitted {len(jobs)} scan jobs; {len(jobs) - held} started, {held} held "
+                f"until workers free up."
+    )
+
+
+def _too_many_requests(rejection: AdmissionRejected) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=rejection.detail,
+        headers={"Retry-After": str(rejection.retry_after)}
     )
 
 
@@ -301,6 +456,8 @@ async def get_scan_result(
                 chain_status_codes=sub.chain_status_codes,
                 ipv4_addresses=sub.ipv4_addresses,
                 ipv6_addresses=sub.ipv6_addresses,
+                body_hash=sub.body_hash,
+                cluster_id=sub.cluster_id,
                 # Technologies (relationship)
                 technologies=[TechnologyInfo(id=tech.id, name=tech.name) for tech in sub.technologies] if sub.technologies else []
             )
@@ -312,7 +469,9 @@ async def get_scan_result(
                 url=shot.url,
                 filename=shot.filename,
                 file_path=shot.file_path,
-                file_size=shot.file_size
+                file_size=shot.file_size,
+                phash=shot.phash,
+                **_screenshot_urls(job_id, shot.id)
             )
             for shot in screenshots
         ],
@@ -381,7 +540,6 @@ async def delete_scan(
     """
     Delete a scan job and its associated data
     """
-    import shutil
     from pathlib import Path
     from app.deps import settings
     
@@ -394,10 +552,8 @@ async def delete_scan(
             detail="Scan job not found"
         )
     
-    # Delete job directory
-    job_dir = Path(settings.jobs_directory) / job_id
-    if job_dir.exists():
-        shutil.rmtree(job_dir)
+    # Delete job directory and stored artifacts
+    delete_job_files(job_id)
     
     # Delete from database (cascade will handle related records)
     db.delete(scan_job)
@@ -481,6 +637,439 @@ async def get_scan_progress(job_id: str, db: Session = Depends(get_db)):
     }
 
 
+@router.get("/scans/{job_id}/timings", response_model=ScanTimingsResponse)
+async def get_scan_timings(job_id: str, db: Session = Depends(get_db)):
+    """
+    Get per-tool telemetry (wall time, CPU, max RSS, I/O) for a scan job
+    """
+    scan_repo = ScanJobRepository(db)
+    scan_job = scan_repo.get_scan_job(job_id)
+
+    if not scan_job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Scan job not found"
+        )
+
+    stage_run_repo = StageRunRepository(db)
+    runs = stage_run_repo.get_by_job(job_id)
+
+    # Aggregate per stage, keeping first-seen order
+    stages = {}
+    for run in runs:
+        summary = stages.setdefault(run.stage, {
+            'stage': run.stage, 'runs': 0, 'wall_time': 0.0, 'cpu_time': 0.0, 'max_rss_kb': None
+        })
+        summary['runs'] += 1
+        summary['wall_time'] += run.wall_time or 0.0
+        summary['cpu_time'] += (run.user_cpu or 0.0) + (run.sys_cpu or 0.0)
+        if run.max_rss_kb is not None:
+            summary['max_rss_kb'] = max(summary['max_rss_kb'] or 0, run.max_rss_kb)
+
+    return ScanTimingsResponse(
+        job_id=job_id,
+        total_wall_time=round(sum(s['wall_time'] for s in stages.values()), 4),
+        stages=[StageTimingSummary(**summary) for summary in stages.values()],
+        runs=[
+            StageRunInfo(
+                stage=run.stage,
+                tool=run.tool,
+                command=run.command,
+                exit_code=run.exit_code,
+                timed_out=bool(run.timed_out),
+                wall_time=run.wall_time,
+                user_cpu=run.user_cpu,
+                sys_cpu=run.sys_cpu,
+                max_rss_kb=run.max_rss_kb,
+                bytes_in=run.bytes_in,
+                bytes_out=run.bytes_out,
+                lines_in=run.lines_in,
+                lines_out=run.lines_out,
+                started_at=run.started_at.isoformat() if run.started_at else None
+            )
+            for run in runs
+        ]
+    )
+
+
+@router.get("/scans/{job_id}/profile")
+async def download_scan_profile(job_id: str, db: Session = Depends(get_db)):
+    """
+    Download the profiles recorded for a scan job as a zip archive
+
+    Contains {phase}.pstats, {phase}.collapsed (flamegraph input) and
+    {phase}.txt for each profiled phase. Only available for scans started
+    with profile=true or picked by PROFILE_SAMPLE_RATE.
+    """
+    scan_repo = ScanJobRepository(db)
+    if not scan_repo.get_scan_job(job_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Scan job not found"
+        )
+
+    directory = await asyncio.to_thread(job_path, job_id, "profile") or profile_dir(job_id)
+    files = sorted(p for p in directory.glob('*') if p.is_file()) if directory.is_dir() else []
+    if not files:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No profile recorded for this scan"
+        )
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for path in files:
+            archive.write(path, arcname=path.name)
+
+    return Response(
+        content=buffer.getvalue(),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="profile-{job_id}.zip"'}
+    )
+
+
+class LeakReclassifyResponse(BaseModel):
+    """Result of re-scoring stored leak detections"""
+    job_id: str
+    rules_version: str
+    total: int
+    changed: int
+    by_severity: Dict[str, int]
+
+
+@router.post("/scans/{job_id}/leaks/reclassify", response_model=LeakReclassifyResponse)
+async def reclassify_leaks(
+    job_id: str,
+    batch_size: int = 1000,
+    db: Session = Depends(get_db)
+):
+    """
+    Re-score a job's stored leak detections with the current leak rules
+
+    Rows are read in id order and only changed severities are written back,
+    one UPDATE per batch, so rule changes apply without rerunning the scan.
+    """
+    scan_repo = ScanJobRepository(db)
+    scan_job = scan_repo.get_scan_job(job_id)
+
+    if not scan_job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Scan job not found"
+        )
+
+    batch_size = max(1, min(batch_size, 10000))
+    engine = get_leak_rule_engine()
+    leak_repo = LeakDetectionRepository(db)
+    total = changed = 0
+    by_severity: Dict[str, int] = {}
+
+    for batch in leak_repo.iter_batches(scan_job.id, batch_size):
+        severities = engine.classify_batch(
+            {'leaked_file_url': leak.leaked_file_url, 'http_status': leak.http_status, 'file_size': leak.file_size}
+            for leak in batch
+        )
+        updates = [
+            {'id': leak.id, 'severity': severity}
+            for leak, severity in zip(batch, severities)
+            if leak.severity != severity
+        ]
+        changed += leak_repo.bulk_update_severity(updates)
+        total += len(batch)
+        for severity in severities:
+            by_severity[severity] = by_severity.get(severity, 0) + 1
+
+    return LeakReclassifyResponse(
+        job_id=job_id,
+        rules_version=engine.version,
+        total=total,
+        changed=changed,
+        by_severity=by_severity
+    )
+
+
+class FingerprintRescanResponse(BaseModel):
+    """Result of re-fingerprinting stored probe responses"""
+    job_id: str
+    signatures_version: str
+    responses: int
+    hosts_updated: int
+    changed: int
+
+
+def _load_live_records(live_file: Path) -> List[Dict[str, Any]]:
+    with open(live_file, 'r', encoding='utf-8', errors='ignore') as f:
+        return list(iter_httpx_records(f))
+
+
+@router.post("/scans/{job_id}/technologies/refingerprint", response_model=FingerprintRescanResponse)
+async def refingerprint_technologies(
+    job_id: str,
+    db: Session = Depends(get_db)
+):
+    """
+    Re-run technology fingerprinting over a job's captured responses
+
+    Uses the headers and bodies the probe stage captured (scans run with
+    FINGERPRINT_ENABLED or RESPONSE_STORE_ENABLED), so signature changes
+    apply without sending a single request. Each host's technologies are
+    replaced with httpx's own list merged with the current fingerprints.
+    """
+    scan_repo = ScanJobRepository(db)
+    scan_job = scan_repo.get_scan_job(job_id)
+
+    if not scan_job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Scan job not found"
+        )
+
+    live_file = await asyncio.to_thread(job_path, job_id, "live.txt")
+    if live_file is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No probe results stored for this scan"
+        )
+
+    # Every body is read, so the whole responses/ tree is fetched at once
+    await asyncio.to_thread(job_path, job_id, "responses")
+    store = ResponseStore(live_file.parent)
+    records = await asyncio.to_thread(_load_live_records, live_file)
+    by_url = await asyncio.to_thread(fingerprint_records, records, lookup=store.get)
+
+    subdomain_ids = {s.subdomain: s.id for s in SubdomainRepository(db).get_subdomains_by_job(job_id)}
+    technologies: Dict[int, List[str]] = {}
+    for url, names in by_url.items():
+        subdomain_id = subdomain_ids.get(urlparse(url).hostname or '')
+        if subdomain_id is not None:
+            technologies[subdomain_id] = merge_technologies(technologies.get(subdomain_id, []), names)
+
+    changed = TechnologyRepository(db).replace_technologies(technologies)
+
+    return FingerprintRescanResponse(
+        job_id=job_id,
+        signatures_version=get_fingerprint_engine().version,
+        responses=len(by_url),
+        hosts_updated=len(technologies),
+        changed=changed
+    )
+
+
+class StoredResponseInfo(BaseModel):
+    """Index entry of a captured response"""
+    url: str
+    input: Optional[str] = None
+    status_code: Optional[int] = None
+    content_type: Optional[str] = None
+    body_sha256: str
+    body_size: int
+    truncated: bool
+
+
+class StoredResponseDetail(StoredResponseInfo):
+    """Captured response with headers and the decoded body"""
+    header: Dict[str, Any]
+    body: Optional[str] = None
+
+
+class StoredResponseListResponse(BaseModel):
+    job_id: str
+    total: int
+    unique_bodies: int
+    responses: List[StoredResponseInfo]
+
+
+def _job_response_store(job_id: str, db: Session) -> ResponseStore:
+    if not ScanJobRepository(db).get_scan_job(job_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Scan job not found"
+        )
+    # The index and the bodies a request reads are fetched one by one (in the handlers' worker threads)
+    return ResponseStore(Path(settings.jobs_directory) / job_id, fetch=functools.partial(job_path, job_id))
+
+
+@router.get("/scans/{job_id}/responses", response_model=StoredResponseListResponse)
+async def list_stored_responses(
+    job_id: str,
+    limit: int = 100,
+    offset: int = 0,
+    db: Session = Depends(get_db)
+):
+    """
+    List the HTTP responses captured by the probe stage
+
+    Only scans run with RESPONSE_STORE_ENABLED (or FINGERPRINT_ENABLED) have
+    stored responses. Bodies are shared between URLs that served identical
+    content; unique_bodies counts the distinct ones.
+    """
+    store = _job_response_store(job_id, db)
+    entries = list((await asyncio.to_thread(store.index)).values())
+    return StoredResponseListResponse(
+        job_id=job_id,
+        total=len(entries),
+        unique_bodies=len({entry['body_sha256'] for entry in entries}),
+        responses=[StoredResponseInfo(**entry) for entry in entries[offset:offset + max(0, limit)]]
+    )
+
+
+@router.get("/scans/{job_id}/responses/entry", response_model=StoredResponseDetail)
+async def get_stored_response(
+    job_id: str,
+    url: str,
+    db: Session = Depends(get_db)
+):
+    """Headers and body captured for one URL"""
+    store = _job_response_store(job_id, db)
+    entry = await asyncio.to_thread(store.get, url)
+    if entry is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No response stored for this URL"
+        )
+    return StoredResponseDetail(**entry)
+
+
+@router.get("/scans/{job_id}/responses/bodies/{body_sha256}")
+async def download_stored_body(
+    job_id: str,
+    body_sha256: str,
+    db: Session = Depends(get_db)
+):
+    """Raw bytes of a stored body, by the body_sha256 of its index entries"""
+    store = _job_response_store(job_id, db)
+    body = await asyncio.to_thread(store.get_body, body_sha256.lower())
+    if body is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Body not found"
+        )
+    return Response(content=body, media_type="application/octet-stream")
+
+
+def _screenshot_urls(job_id: str, screenshot_id: int) -> Dict[str, str]:
+    base = f"/api/v1/scans/{job_id}/screenshots/{screenshot_id}/image"
+    return {"thumb_url": f"{base}/thumb", "full_url": f"{base}/full", "original_url": f"{base}/original"}
+
+
+def _screenshot_source(job_id: str, file_path: str) -> Optional[Path]:
+    """Screenshot file below the job directory (file_path is stored as jobs/{job_id}/...)"""
+    relative = file_path.replace('\\', '/').lstrip('/')
+    prefix = f"jobs/{job_id}/"
+    if relative.startswith(prefix):
+        relative = relative[len(prefix):]
+    source = job_path(job_id, relative)
+    return source if source is not None and source.is_file() else None
+
+
+def _screenshot_derivative(job_id: str, job_dir: Path, source: Path, size: str) -> Optional[Path]:
+    """Derivative of a screenshot, fetched from the artifact store if the pipeline committed one"""
+    if derivatives_available():
+        job_path(job_id, derivative_path(job_dir, source, size).relative_to(job_dir).as_posix())
+    return ensure_derivative(job_dir, source, size)
+
+
+@router.get("/scans/{job_id}/screenshots/{screenshot_id}/image/{size}")
+async def get_screenshot_image(
+    job_id: str,
+    screenshot_id: int,
+    size: Literal["thumb", "full", "original"],
+    db: Session = Depends(get_db)
+):
+    """
+    Screenshot image in one size
+
+    thumb and full are WebP derivatives, rendered on the first request when
+    the pipeline did not render them after capture. Without Pillow, every
+    size serves the original file.
+    """
+    shot = ScreenshotRepository(db).get_screenshot(job_id, screenshot_id)
+    source = await asyncio.to_thread(_screenshot_source, job_id, shot.file_path) if shot else None
+    if source is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Screenshot not found"
+        )
+
+    path = source
+    if size in SCREENSHOT_SIZES:
+        job_dir = Path(settings.jobs_directory).resolve() / job_id
+        try:
+            path = await asyncio.to_thread(_screenshot_derivative, job_id, job_dir, source, size) or source
+        except Exception:
+            path = source  # unreadable image: let the browser try the original
+    return FileResponse(path, headers={"Cache-Control": "public, max-age=86400"})
+
+
+class ScreenshotCluster(BaseModel):
+    """Visually near-identical screenshots, shown through their first one"""
+    representative: ScreenshotInfo
+    size: int
+    member_ids: List[int]
+
+
+class ScreenshotClusterListResponse(BaseModel):
+    job_id: str
+    max_distance: int
+    total_screenshots: int
+    total_clusters: int
+    unhashed: int
+    clusters: List[ScreenshotCluster]
+
+
+@router.get("/scans/{job_id}/screenshots/clusters", response_model=ScreenshotClusterListResponse)
+async def list_screenshot_clusters(
+    job_id: str,
+    max_distance: Optional[int] = None,
+    limit: int = 100,
+    offset: int = 0,
+    db: Session = Depends(get_db)
+):
+    """
+    Group a scan's screenshots into clusters of near-duplicates, largest first
+
+    Screenshots whose dHashes differ in at most max_distance of 64 bits
+    (default SCREENSHOT_CLUSTER_DISTANCE) share a cluster. Screenshots
+    without a hash (captured without Pillow installed) are single-member
+    clusters and counted in unhashed.
+    """
+    if not ScanJobRepository(db).get_scan_job(job_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Scan job not found"
+        )
+    distance = settings.screenshot_cluster_distance if max_distance is None else max(0, min(max_distance, 64))
+
+    shots = {shot.id: shot for shot in ScreenshotRepository(db).get_screenshots_by_job(job_id)}
+    hashed = [(shot.id, shot.phash) for shot in shots.values() if shot.phash]
+    groups = await asyncio.to_thread(group_near_duplicates, hashed, distance)
+    groups += [[shot.id] for shot in shots.values() if not shot.phash]
+    groups.sort(key=len, reverse=True)
+
+    def info(shot) -> ScreenshotInfo:
+        return ScreenshotInfo(
+            id=shot.id,
+            url=shot.url,
+            filename=shot.filename,
+            file_path=shot.file_path,
+            file_size=shot.file_size,
+            phash=shot.phash,
+            **_screenshot_urls(job_id, shot.id)
+        )
+
+    return ScreenshotClusterListResponse(
+        job_id=job_id,
+        max_distance=distance,
+        total_screenshots=len(shots),
+        total_clusters=len(groups),
+        unhashed=len(shots) - len(hashed),
+        clusters=[
+            ScreenshotCluster(representative=info(shots[group[0]]), size=len(group), member_ids=group)
+            for group in groups[offset:offset + max(0, limit)]
+        ]
+    )
+
+
 # Selective Leak Scanning
 class SelectiveScanRequest(BaseModel):
     urls: List[str] = Field(..., description="List of URLs to scan for leaks", example=["https://example.com", "https://api.example.com"])
@@ -569,10 +1158,9 @@ async def run_selective_leak_scan(
         )
 
     # Validate URLs belong to this job
-    job_dir = Path(settings.jobs_directory) / job_id
-    live_file = job_dir / "live.txt"
+    live_file = await asyncio.to_thread(job_path, job_id, "live.txt")
 
-    if not live_file.exists():
+    if live_file is None:
         raise HTTPException(
             status_code=400,
             detail="No live hosts found for this job. Run a full scan first."
@@ -601,8 +1189,10 @@ async def run_selective_leak_scan(
             detail="None of the provided URLs are valid live hosts from this job"
         )
 
-    # Dispatch Celery task (ASYNC - returns immediately)
-    task = run_sourceleakhacker_check.delay(job_id, urls_to_scan, request.mode)
+    # Dispatch Celery task (ASYNC - returns immediately), to the worker holding the job directory if any.
+    # The URL list travels as an artifact reference, not in the message
+    urls_ref = await asyncio.to_thread(write_ref, job_id, "stages/leak_urls.json", urls_to_scan)
+    task = dispatch_stage(run_sourceleakhacker_check, job_id, job_id, urls_ref, request.mode)
 
     return SelectiveScanResponse(
         task_id=task.id,
@@ -644,7 +1234,9 @@ async def add_subdomain_manually(
     ```
     """
     import re
+    from pathlib import Path
     from urllib.parse import urlparse
+    from app.deps import settings
     from app.storage.models import SubdomainStatus
 
     # Get scan job from database
@@ -675,11 +1267,14 @@ async def add_subdomain_manually(
             detail="Invalid subdomain format. Must be a valid domain name (e.g., 'admin.example.com')"
         )
 
-    # Validate subdomain belongs to the scan's domain
-    if not subdomain_str.endswith(scan_job.domain):
+    # Validate subdomain is in the scan's scope (label-aware; honours include/exclude saved with the job)
+    scope_file = (await asyncio.to_thread(job_path, job_id, "scope.json")
+                  or Path(settings.jobs_directory) / job_id / "scope.json")
+    scope = DomainScope.load(scope_file, scan_job.domain)
+    if subdomain_str not in scope:
         raise HTTPException(
             status_code=400,
-            detail=f"Subdomain must belong to the scan's domain ({scan_job.domain})"
+            detail=f"Subdomain must belong to the scan's domain ({scan_job.domain}) and not be excluded from its scope"
         )
 
     # Check if subdomain already exists
@@ -835,7 +1430,6 @@ async def delete_scan(
     **Note:** This will NOT delete running scans. Use POST /scans/{job_id}/stop first,
     or use DELETE /scans/{job_id}/force to stop and delete in one operation.
     """
-    import shutil
     from pathlib import Path
     from app.deps import settings
 
@@ -875,13 +1469,11 @@ async def delete_scan(
         except Exception as e:
             print(f"Error deleting screenshot file {screenshot.file_path}: {e}")
 
-    # Delete job directory if it exists
-    job_dir = Path(settings.jobs_directory) / job_id
-    if job_dir.exists():
-        try:
-            shutil.rmtree(job_dir)
-        except Exception as e:
-            print(f"Error deleting job directory {job_dir}: {e}")
+    # Delete job directory and stored artifacts
+    try:
+        delete_job_files(job_id)
+    except Exception as e:
+        print(f"Error deleting files of job {job_id}: {e}")
 
     # Delete scan job (cascade will delete all related records)
     db.delete(scan_job)
@@ -918,7 +1510,6 @@ async def force_delete_scan(
     **Warning:** This will forcefully terminate running scans and delete all data.
     Use with caution!
     """
-    import shutil
     from pathlib import Path
     from app.deps import settings
     from app.workers.celery_app import celery_app
@@ -962,13 +1553,11 @@ async def force_delete_scan(
         except Exception as e:
             print(f"Error deleting screenshot file {screenshot.file_path}: {e}")
 
-    # Delete job directory if it exists
-    job_dir = Path(settings.jobs_directory) / job_id
-    if job_dir.exists():
-        try:
-            shutil.rmtree(job_dir)
-        except Exception as e:
-            print(f"Error deleting job directory {job_dir}: {e}")
+    # Delete job directory and stored artifacts
+    try:
+        delete_job_files(job_id)
+    except Exception as e:
+        print(f"Error deleting files of job {job_id}: {e}")
 
     # Delete scan job (cascade will delete all related records)
     db.delete(scan_job)
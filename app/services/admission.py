@@ -0,0 +1,158 @@
+"""
+Admission control for scan submissions
+
+A bulk request used to publish one run_recon_scan per domain at once, and
+every interactive scan submitted afterwards waited behind all of them in
+recon_full. Submissions are now admitted by queue depth and per user:
+
+    POST /scans        rejected (429 + Retry-After) while recon_full holds
+                       admission_max_queue_depth messages or the user has
+                       admission_max_active_per_user dispatched, unfinished scans
+    POST /scans/bulk   rejected above admission_max_held_per_user held scans;
+                       otherwise the scans are held in held_scans
+
+release_held() (the release_held_scans task: on a beat schedule, after a
+scan finishes and after a bulk submission) publishes held scans while
+recon_full is below admission_bulk_queue_depth, round-robin across users
+and within their active-scan limit. An interactive scan therefore queues
+behind at most admission_bulk_queue_depth bulk messages.
+
+An unreachable broker reads as an empty queue; publishing then fails as
+it did before admission control.
+"""
+import uuid
+import logging
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.deps import settings
+from app.services.metrics import get_queue_depths
+from app.storage.models import ScanStatus
+from app.storage.repo import ScanJobRepository, HeldScanRepository
+
+logger = logging.getLogger(__name__)
+
+QUEUE = "recon_full"
+
+
+class AdmissionRejected(Exception):
+    """A submission over an admission limit; retry after retry_after seconds"""
+
+    def __init__(self, detail: str, retry_after: Optional[int] = None):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = retry_after if retry_after is not None else settings.admission_retry_after
+
+
+def queue_depth() -> int:
+    """Messages waiting in recon_full (0 if the broker is unreachable)"""
+    return get_queue_depths().get(QUEUE, 0)
+
+
+def _active_since() -> datetime:
+    return datetime.utcnow() - timedelta(seconds=settings.admission_active_window)
+
+
+def check_interactive(db: Session, owner_id: Optional[int]):
+    """Raise AdmissionRejected if a scan submitted now would exceed the queue or the user's limit"""
+    depth = queue_depth()
+    if depth >= settings.admission_max_queue_depth:
+        raise AdmissionRejected(f"Scan queue is full ({depth} waiting scans), retry later")
+    if owner_id is not None:
+        active = ScanJobRepository(db).count_active_jobs(owner_id, _active_since())
+        if active >= settings.admission_max_active_per_user:
+            raise AdmissionRejected(
+                f"{active} of your scans are still running (limit {settings.admission_max_active_per_user}), "
+                f"retry when one finishes"
+            )
+
+
+def check_bulk(db: Session, owner_id: Optional[int], count: int):
+    """Raise AdmissionRejected if holding count more scans would exceed the user's held limit"""
+    held = HeldScanRepository(db).count_held(owner_id)
+    if held + count > settings.admission_max_held_per_user:
+        raise AdmissionRejected(
+            f"{held} of your bulk scans are still held; {count} more would exceed the limit of "
+            f"{settings.admission_max_held_per_user}",
+            retry_after=settings.admission_retry_after * 10,
+        )
+
+
+def publish_scans(scans: List[Tuple[str, str, Dict[str, Any], str]]) -> int:
+    """
+    Publish run_recon_scan for (job_id, domain, options, task_id) tuples
+
+    All messages go through one producer (one broker connection) instead of
+    a pool checkout per .delay(). Stops at the first error and returns the
+    number published until then.
+    """
+    from app.workers.celery_app import celery_app
+    from app.workers.tasks import run_recon_scan
+
+    published = 0
+    try:
+        with celery_app.producer_or_acquire() as producer:
+            for job_id, domain, options, task_id in scans:
+                run_recon_scan.apply_async((job_id, domain), options, task_id=task_id, producer=producer)
+                published += 1
+    except Exception as e:
+        logger.error(f"Publishing scans failed after {published} of {len(scans)}: {e}")
+    return published
+
+
+def release_held(db: Session, limit: Optional[int] = None) -> int:
+    """
+    Publish held scans while recon_full is below admission_bulk_queue_depth
+
+    Takes one scan per user in turn, oldest first, skipping users at their
+    active-scan limit. Held scans whose job was stopped meanwhile are
+    dropped. Returns the number of scans published.
+    """
+    budget = min(limit or settings.admission_release_batch, settings.admission_bulk_queue_depth - queue_depth())
+    if budget <= 0:
+        return 0
+
+    scan_repo = ScanJobRepository(db)
+    held_repo = HeldScanRepository(db)
+    owners = held_repo.held_owners()
+    active = scan_repo.count_active_jobs_by_owner([o for o in owners if o is not None], _active_since())
+
+    pending = {}
+    for owner_id in owners:
+        room = budget if owner_id is None else settings.admission_max_active_per_user - active.get(owner_id, 0)
+        if room > 0:
+            pending[owner_id] = deque(held_repo.oldest(owner_id, min(room, budget)))
+
+    selected = []
+    while len(selected) < budget and pending:
+        for owner_id in list(pending):
+            if len(selected) >= budget:
+                break
+            if not pending[owner_id]:
+                del pending[owner_id]
+                continue
+            selected.append(pending[owner_id].popleft())
+
+    # Held scans whose job was stopped meanwhile are dropped
+    release = [held for held in selected
+               if held.scan_job.status == ScanStatus.PENDING and not held.scan_job.task_id]
+    for held in selected:
+        if held not in release:
+            db.delete(held)
+
+    task_ids = [str(uuid.uuid4()) for _ in release]
+    released = publish_scans([
+        (held.scan_job.job_id, held.scan_job.domain, held.options, task_id)
+        for held, task_id in zip(release, task_ids)
+    ])
+    for held, task_id in zip(release[:released], task_ids):
+        held.scan_job.task_id = task_id
+        db.delete(held)
+    db.commit()
+
+    if released:
+        logger.info(f"Released {released} held scans ({held_repo.count_held()} still held)")
+    return released
@@ -0,0 +1,275 @@
+"""
+Object storage backends of the artifact store
+
+The store (app/services/artifacts.py) addresses everything by a relative
+key such as "blobs/ab/cd/abcd...ef.zst"; a backend maps keys to storage:
+
+    LocalBackend(root)                    files below a directory (one node, or a shared volume)
+    S3Backend(bucket, prefix, ...)        objects in S3 or an S3-compatible server (MinIO),
+                                          so API and workers can run on different nodes
+
+A key ending in "/" is a prefix: list("refs/ab/abcd...ef/") yields the keys
+below it. Timestamps are what the garbage collector compares against its
+grace period, and touch() restarts them.
+
+Keys several writers update (job manifests) are written with
+put_bytes_if(), which only replaces the version get_versioned() returned:
+under a file lock locally, as a conditional PUT (If-Match) on S3.
+"""
+import os
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+import mimetypes
+import contextlib
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # optional: without it (Windows) conditional writes are only serialized within a process
+    fcntl = None
+
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+except ImportError:  # optional: only the local backend is available without it
+    boto3 = None
+    ClientError = Exception
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def sibling_tempfile(target: Path) -> Path:
+    """A new, uniquely named temporary file next to target, to os.replace() it with"""
+    fd, tmp = tempfile.mkstemp(prefix=f".{target.name}.", suffix=".tmp", dir=target.parent)
+    os.close(fd)
+    os.chmod(tmp, 0o644)
+    return Path(tmp)
+
+
+class LocalBackend:
+    """Keys as files below root"""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        # Compressed blobs are written here first, on the same filesystem, so put_file() can rename them
+        self.staging_dir = self.root / "tmp"
+        self._lock = threading.Lock()
+
+    def describe(self) -> str:
+        return str(self.root)
+
+    def _path(self, key: str) -> Path:
+        return self.root / key
+
+    def stat(self, key: str) -> Optional[Tuple[int, float]]:
+        """(size, modification time) of a key, or None if it does not exist"""
+        try:
+            st = self._path(key).stat()
+        except FileNotFoundError:
+            return None
+        return st.st_size, st.st_mtime
+
+    def touch(self, key: str):
+        os.utime(self._path(key))
+
+    def put_file(self, key: str, path: Path, move: bool = False):
+        target = self._path(key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if not move:
+            tmp = sibling_tempfile(target)
+            try:
+                shutil.copyfile(path, tmp)
+                os.replace(tmp, target)
+            finally:
+                tmp.unlink(missing_ok=True)
+            return
+        os.replace(path, target)
+
+    def put_bytes(self, key: str, data: bytes):
+        target = self._path(key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = sibling_tempfile(target)
+        try:
+            tmp.write_bytes(data)
+            os.replace(tmp, target)
+        finally:
+            tmp.unlink(missing_ok=True)
+
+    @contextlib.contextmanager
+    def _locked(self, key: str):
+        """Exclusive access to a key across threads and, with fcntl, processes sharing root"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            self.staging_dir.mkdir(parents=True, exist_ok=True)
+            with open(self.staging_dir / (key.replace("/", "%") + ".lock.tmp"), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def get_versioned(self, key: str) -> Tuple[Optional[bytes], Optional[str]]:
+        """Content of a key and a version token for put_bytes_if() (None, None if missing)"""
+        data = self.get_bytes(key)
+        return data, hashlib.sha256(data).hexdigest() if data is not None else None
+
+    def put_bytes_if(self, key: str, data: bytes, version: Optional[str]) -> bool:
+        """Write a key only if it is still at version (None: still missing); False if it changed"""
+        with self._locked(key):
+            if self.get_versioned(key)[1] != version:
+                return False
+            self.put_bytes(key, data)
+        return True
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        try:
+            return self._path(key).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def iter_chunks(self, key: str) -> Iterator[bytes]:
+        with open(self._path(key), "rb") as f:
+            yield from iter(lambda: f.read(CHUNK_SIZE), b"")
+
+    def delete(self, key: str):
+        path = self._path(key)
+        path.unlink(missing_ok=True)
+        # Drop emptied shard directories so listings stay small
+        parent = path.parent
+        while parent != self.root and self.root in parent.parents:
+            try:
+                parent.rmdir()
+            except OSError:
+                break
+            parent = parent.parent
+
+    def list(self, prefix: str) -> Iterator[str]:
+        base = self._path(prefix)
+        if not base.is_dir():
+            return
+        for dirpath, _, filenames in os.walk(base):
+            for name in filenames:
+                if not name.endswith(".tmp"):
+                    yield (Path(dirpath) / name).relative_to(self.root).as_posix()
+
+    def presigned_url(self, key: str, expires: int, content_type: Optional[str] = None) -> Optional[str]:
+        """Local files have no URL of their own; callers serve them"""
+        return None
+
+
+class S3Backend:
+    """Keys as objects of an S3 bucket, below an optional prefix"""
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: Optional[str] = None,
+                 region: Optional[str] = None, access_key: Optional[str] = None,
+                 secret_key: Optional[str] = None, client=None):
+        if client is None:
+            if boto3 is None:
+                raise RuntimeError("The s3 artifact backend needs the boto3 package")
+            client = boto3.client(
+                "s3",
+                endpoint_url=endpoint_url or None,
+                region_name=region or None,
+                aws_access_key_id=access_key or None,
+                aws_secret_access_key=secret_key or None,
+            )
+        self.client = client
+        self.bucket = bucket
+        self.prefix = f"{prefix.strip('/')}/" if prefix.strip("/") else ""
+        # Compressed blobs are staged in the system temp directory before the upload
+        self.staging_dir = None
+
+    def describe(self) -> str:
+        return f"s3://{self.bucket}/{self.prefix}"
+
+    def _key(self, key: str) -> str:
+        return self.prefix + key
+
+    def stat(self, key: str) -> Optional[Tuple[int, float]]:
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return head["ContentLength"], head["LastModified"].timestamp()
+
+    def touch(self, key: str):
+        # Copying an object onto itself (with replaced metadata) renews its LastModified
+        head = self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        self.client.copy_object(
+            Bucket=self.bucket, Key=self._key(key),
+            CopySource={"Bucket": self.bucket, "Key": self._key(key)},
+            ContentType=head.get("ContentType", "binary/octet-stream"),
+            Metadata=head.get("Metadata", {}), MetadataDirective="REPLACE",
+        )
+
+    def put_file(self, key: str, path: Path, move: bool = False):
+        content_type = mimetypes.guess_type(path.name)[0] if key.endswith(".raw") else None
+        self.client.upload_file(str(path), self.bucket, self._key(key),
+                                ExtraArgs={"ContentType": content_type or "application/octet-stream"})
+        if move:
+            Path(path).unlink(missing_ok=True)
+
+    def put_bytes(self, key: str, data: bytes):
+        self.client.put_object(Bucket=self.bucket, Key=self._key(key), Body=data)
+
+    def get_versioned(self, key: str) -> Tuple[Optional[bytes], Optional[str]]:
+        """Content of a key and its ETag for put_bytes_if() (None, None if missing)"""
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self._key(key))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None, None
+            raise
+        return response["Body"].read(), response["ETag"]
+
+    def put_bytes_if(self, key: str, data: bytes, version: Optional[str]) -> bool:
+        """Conditional PUT: only over the ETag version (None: only if missing); False if it changed"""
+        condition = {"IfMatch": version} if version is not None else {"IfNoneMatch": "*"}
+        try:
+            self.client.put_object(Bucket=self.bucket, Key=self._key(key), Body=data, **condition)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("PreconditionFailed", "ConditionalRequestConflict",
+                                                            "412", "409"):
+                return False
+            raise
+        return True
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._key(key))["Body"].read()
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def iter_chunks(self, key: str) -> Iterator[bytes]:
+        body = self.client.get_object(Bucket=self.bucket, Key=self._key(key))["Body"]
+        try:
+            yield from iter(lambda: body.read(CHUNK_SIZE), b"")
+        finally:
+            body.close()
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def list(self, prefix: str) -> Iterator[str]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(prefix)):
+            for item in page.get("Contents", []):
+                yield item["Key"][len(self.prefix):]
+
+    def presigned_url(self, key: str, expires: int, content_type: Optional[str] = None) -> Optional[str]:
+        params = {"Bucket": self.bucket, "Key": self._key(key)}
+        if content_type:
+            params["ResponseContentType"] = content_type
+        return self.client.generate_presigned_url("get_object", Params=params, ExpiresIn=expires)
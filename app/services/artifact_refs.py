@@ -0,0 +1,147 @@
+"""
+Artifact references in Celery messages and results
+
+Stage tasks hand each other their data as files of the job, not as task
+arguments or results. A reference names the file and pins its content:
+
+    {"job_id": "...", "key": "stages/live_hosts.json", "sha256": "...", "size": 18234,
+     "format": "json", "count": 412}
+
+    ref = write_ref(job_id, "stages/live_hosts.json", live_hosts)   # key "stages/live_hosts-<uuid>.json"
+    live_hosts = load_ref(ref)          # from the job directory, or the artifact store
+
+Every reference gets a file of its own (a unique key), so a second
+dispatch for the same job never replaces a file that a task still in the
+queue is going to read.
+
+Messages and results stay a few hundred bytes whatever the target size.
+As a backstop, every published message and every stage result is checked
+against celery_max_message_bytes / celery_max_result_bytes and rejected
+with PayloadTooLarge above them.
+"""
+import os
+import json
+import uuid
+import shutil
+import logging
+from pathlib import Path, PurePosixPath
+from typing import Any, Dict, Optional
+
+from celery import Task
+
+from app.deps import settings
+from app.services.artifacts import file_digest, get_artifact_store, job_path
+from app.services.parsers import iter_lines
+
+logger = logging.getLogger(__name__)
+
+REF_FIELDS = ("job_id", "key", "sha256")
+
+
+class PayloadTooLarge(ValueError):
+    """A Celery message or result over its size cap"""
+
+
+def is_ref(value: Any) -> bool:
+    return isinstance(value, dict) and all(field in value for field in REF_FIELDS)
+
+
+def payload_size(value: Any) -> int:
+    """Size of value as JSON, roughly what it costs in the broker or result backend"""
+    return len(json.dumps(value, default=str, separators=(",", ":")).encode("utf-8"))
+
+
+def ensure_size(value: Any, limit: int, what: str) -> Any:
+    """Return value, or raise PayloadTooLarge if it is over limit bytes (0 = no limit)"""
+    if limit:
+        size = payload_size(value)
+        if size > limit:
+            raise PayloadTooLarge(f"{what} is {size} bytes, over the {limit} byte cap; pass an artifact reference")
+    return value
+
+
+def unique_key(key: str) -> str:
+    """key with a random suffix: stages/leak_urls.json -> stages/leak_urls-<uuid>.json"""
+    path = PurePosixPath(key)
+    return str(path.with_name(f"{path.stem}-{uuid.uuid4().hex}{path.suffix}"))
+
+
+def file_ref(job_id: str, key: str, fmt: str = "lines", count: Optional[int] = None) -> Dict[str, Any]:
+    """Reference to an existing file of the job; stores it in the artifact store if enabled"""
+    job_dir = Path(settings.jobs_directory) / job_id
+    path = job_dir / key
+    store = get_artifact_store()
+    if store is not None:
+        store.commit_job(job_id, job_dir, remove_local=False, paths=[path])
+    ref = {"job_id": job_id, "key": key, "sha256": file_digest(path), "size": path.stat().st_size, "format": fmt}
+    if count is not None:
+        ref["count"] = count
+    return ref
+
+
+def write_ref(job_id: str, key: str, data: Any) -> Dict[str, Any]:
+    """Write data as a new JSON file of the job (at unique_key(key)) and return a reference to it"""
+    key = unique_key(key)
+    path = Path(settings.jobs_directory) / job_id / key
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, default=str)
+    os.replace(tmp, path)
+    return file_ref(job_id, key, fmt="json", count=len(data) if isinstance(data, (list, dict)) else None)
+
+
+def copy_ref(job_id: str, source: str, key: str, fmt: str = "lines", count: Optional[int] = None) -> Dict[str, Any]:
+    """Reference to a copy (at unique_key(key)) of a job file that later stages may rewrite, such as subs.txt"""
+    job_dir = Path(settings.jobs_directory) / job_id
+    key = unique_key(key)
+    path = job_dir / key
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.tmp")
+    shutil.copyfile(job_dir / source, tmp)
+    os.replace(tmp, path)
+    return file_ref(job_id, key, fmt=fmt, count=count)
+
+
+def load_ref(ref: Dict[str, Any]) -> Any:
+    """
+    Content of a referenced file
+
+    A local copy whose checksum does not match (left behind by an earlier
+    stage on this node) is replaced from the artifact store. Raises
+    FileNotFoundError if the file is nowhere, ValueError if no copy matches.
+    """
+    path = job_path(ref["job_id"], ref["key"])
+    if path is None:
+        raise FileNotFoundError(f"Artifact {ref['key']} of job {ref['job_id']} not found")
+    if file_digest(path) != ref["sha256"]:
+        if get_artifact_store() is None:
+            raise ValueError(f"Artifact {ref['key']} of job {ref['job_id']} does not match its checksum")
+        logger.info(f"[{ref['job_id']}] Stale local copy of {ref['key']}, fetching it from the artifact store")
+        path.unlink()
+        path = job_path(ref["job_id"], ref["key"])
+        if path is None or file_digest(path) != ref["sha256"]:
+            raise ValueError(f"Artifact {ref['key']} of job {ref['job_id']} does not match its checksum")
+
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        if ref.get("format") == "json":
+            return json.load(f)
+        return list(dict.fromkeys(iter_lines(f)))
+
+
+def resolve(value: Any) -> Any:
+    """The data behind a reference; other values (inline payloads of older messages) as they are"""
+    return load_ref(value) if is_ref(value) else value
+
+
+def summary_stats(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """The scalar counters of pipeline stats; lists such as stage_runs stay in the database"""
+    return {key: value for key, value in stats.items() if isinstance(value, (int, float, str, bool)) or value is None}
+
+
+class PayloadCappedTask(Task):
+    """Task base class rejecting messages over celery_max_message_bytes before they are published"""
+
+    def apply_async(self, args=None, kwargs=None, *rest, **options):
+        ensure_size([args or (), kwargs or {}], settings.celery_max_message_bytes, f"Message for {self.name}")
+        return super().apply_async(args, kwargs, *rest, **options)
@@ -0,0 +1,518 @@
+"""
+Content-addressed store for job files
+
+When a scan task finishes, every file in its job directory is moved into a
+shared store, named by the SHA-256 of its content, and the job keeps a
+manifest of relative path -> blob:
+
+    artifacts/
+        blobs/ab/cd/abcd12...ef.zst     text outputs, zstd (or zlib without zstandard)
+        blobs/9f/01/9f01aa...42.raw     images and already-compressed files, as is
+        refs/ab/abcd12...ef/<job_id>    one marker per job referencing the blob
+        manifests/<job_id>.json         {"files": {"live.txt": {"sha256": ..., "size": ...}}}
+
+Identical files of repeated scans (subs.txt, default-page screenshots,
+wordlist output) are stored once. Two levels of 256 shards keep every
+directory small at millions of blobs.
+
+A blob is referenced by the markers under its refs directory; deleting a
+job removes its markers and then every blob left without one. A blob
+written or reused within artifact_gc_grace_seconds is never removed, so a
+scan committing the same content while another job is being deleted keeps
+its blob; gc() sweeps what that leaves behind.
+
+The layout lives in a local directory or, with artifact_backend = "s3", in
+an S3-compatible bucket (see app/services/artifact_backends.py). With the
+bucket, the job directory is only a node's scratch space: a stage task
+stages the inputs it needs from the store, works locally and commits its
+outputs when it finishes, so API and workers need no shared volume.
+
+Readers go through job_path(), which returns the file from the job
+directory if it is there and otherwise fetches it back from the store:
+
+    live_file = job_path(job_id, "live.txt")
+
+Screenshots and other uncompressed blobs can also be handed out as
+presigned bucket URLs (artifact_read_mode = "presign").
+"""
+import os
+import json
+import time
+import zlib
+import shutil
+import hashlib
+import logging
+import tempfile
+import mimetypes
+from pathlib import Path
+from typing import Dict, Any, Optional, Iterable, Iterator, List
+
+try:
+    import zstandard
+except ImportError:  # optional: zlib is used without it
+    zstandard = None
+
+from app.deps import settings
+from app.services.artifact_backends import LocalBackend, S3Backend, CHUNK_SIZE, sibling_tempfile
+from app.services.locality import forget_owner
+
+logger = logging.getLogger(__name__)
+
+# Stored without compression: images and files that are compressed already
+INCOMPRESSIBLE_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp", ".gif", ".zst", ".zz", ".gz", ".zip", ".br"}
+
+CODEC_SUFFIXES = {"zstd": ".zst", "zlib": ".zz", "raw": ".raw"}
+
+# Conditional manifest writes lost to concurrent commits of the same job before commit_job() gives up
+MANIFEST_WRITE_ATTEMPTS = 10
+
+
+def _compressor(codec: str, level: int):
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=level).compressobj()
+    if codec == "zlib":
+        return zlib.compressobj(min(max(level, 1), 9))
+    return None
+
+
+def _decompressor(codec: str):
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Blob is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompressobj()
+    if codec == "zlib":
+        return zlib.decompressobj()
+    return None
+
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArtifactStore:
+    """Deduplicated, compressed blobs plus per-job manifests and reference markers"""
+
+    def __init__(self, backend, compression: str = "zstd", level: int = 3, gc_grace_seconds: int = 3600):
+        # A directory is shorthand for the local backend
+        self.backend = LocalBackend(backend) if isinstance(backend, (str, Path)) else backend
+        if compression == "zstd" and zstandard is None:
+            logger.info("zstandard is not installed, compressing artifacts with zlib")
+            compression = "zlib"
+        self.compression = compression
+        self.level = level
+        self.gc_grace_seconds = gc_grace_seconds
+
+    # -- keys -----------------------------------------------------------------
+
+    @staticmethod
+    def _blob_key(digest: str, codec: str) -> str:
+        return f"blobs/{digest[:2]}/{digest[2:4]}/{digest}{CODEC_SUFFIXES[codec]}"
+
+    @staticmethod
+    def _refs_prefix(digest: str) -> str:
+        return f"refs/{digest[:2]}/{digest}/"
+
+    @staticmethod
+    def _manifest_key(job_id: str) -> str:
+        return f"manifests/{job_id}.json"
+
+    def find_blob(self, digest: str) -> Optional[str]:
+        """Key of a stored blob, or None"""
+        for codec in CODEC_SUFFIXES:
+            key = self._blob_key(digest, codec)
+            if self.backend.stat(key) is not None:
+                return key
+        return None
+
+    @staticmethod
+    def _codec_of(key: str) -> str:
+        return next(codec for codec, suffix in CODEC_SUFFIXES.items() if key.endswith(suffix))
+
+    # -- blobs ----------------------------------------------------------------
+
+    def put_file(self, path: Path, compress: Optional[bool] = None) -> Dict[str, Any]:
+        """Store a file's content once; returns {sha256, size, codec, stored_size, new}"""
+        path = Path(path)
+        digest = file_digest(path)
+        size = path.stat().st_size
+
+        existing = self.find_blob(digest)
+        if existing is not None:
+            self.backend.touch(existing)  # restarts the gc grace period
+            return {"sha256": digest, "size": size, "codec": self._codec_of(existing),
+                    "stored_size": self.backend.stat(existing)[0], "new": False}
+
+        if compress is None:
+            compress = path.suffix.lower() not in INCOMPRESSIBLE_SUFFIXES
+        codec = self.compression if compress and size else "raw"
+        key = self._blob_key(digest, codec)
+        if codec == "raw":
+            self.backend.put_file(key, path)
+            return {"sha256": digest, "size": size, "codec": codec, "stored_size": size, "new": True}
+
+        staging_dir = self.backend.staging_dir
+        if staging_dir is not None:
+            Path(staging_dir).mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=staging_dir)
+        try:
+            compressor = _compressor(codec, self.level)
+            with open(path, "rb") as src, os.fdopen(fd, "wb") as dst:
+                for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+                    dst.write(compressor.compress(chunk))
+                dst.write(compressor.flush())
+            stored_size = os.path.getsize(tmp)
+            self.backend.put_file(key, Path(tmp), move=True)
+        finally:
+            Path(tmp).unlink(missing_ok=True)
+        return {"sha256": digest, "size": size, "codec": codec, "stored_size": stored_size, "new": True}
+
+    def iter_blob(self, digest: str, codec: Optional[str] = None) -> Iterator[bytes]:
+        """Decompressed content of a blob in chunks; codec (from a manifest) saves the lookup"""
+        key = self._blob_key(digest, codec) if codec else self.find_blob(digest)
+        if key is None:
+            raise FileNotFoundError(f"Blob {digest} not found")
+        decompressor = _decompressor(self._codec_of(key))
+        for chunk in self.backend.iter_chunks(key):
+            data = decompressor.decompress(chunk) if decompressor else chunk
+            if data:
+                yield data
+        if decompressor is not None and hasattr(decompressor, "flush"):
+            tail = decompressor.flush()
+            if tail:
+                yield tail
+
+    def read_blob(self, digest: str) -> bytes:
+        return b"".join(self.iter_blob(digest))
+
+    # -- references -----------------------------------------------------------
+
+    def add_ref(self, digest: str, job_id: str):
+        self.backend.put_bytes(self._refs_prefix(digest) + job_id, b"")
+
+    def refcount(self, digest: str) -> int:
+        return sum(1 for _ in self.backend.list(self._refs_prefix(digest)))
+
+    def _release(self, digest: str, job_id: str) -> bool:
+        """Drop a job's reference; delete the blob if nothing references it. True if deleted"""
+        self.backend.delete(self._refs_prefix(digest) + job_id)
+        if self.refcount(digest):
+            return False
+        return self._delete_unreferenced(digest)
+
+    def _delete_unreferenced(self, digest: str) -> bool:
+        key = self.find_blob(digest)
+        if key is None or self.refcount(digest):
+            return False
+        stat = self.backend.stat(key)
+        if stat is None or time.time() - stat[1] < self.gc_grace_seconds:
+            return False
+        self.backend.delete(key)
+        return True
+
+    # -- manifests ------------------------------------------------------------
+
+    def read_manifest(self, job_id: str) -> Dict[str, Dict[str, Any]]:
+        """relative path -> blob entry of a job's stored files"""
+        return self._read_manifest_versioned(job_id)[0]
+
+    def _read_manifest_versioned(self, job_id: str):
+        data, version = self.backend.get_versioned(self._manifest_key(job_id))
+        if data is None:
+            return {}, None
+        return json.loads(data).get("files", {}), version
+
+    def _write_manifest(self, job_id: str, files: Dict[str, Dict[str, Any]], version: Optional[str]) -> bool:
+        """Replace the manifest version that was read; False if another commit changed it meanwhile"""
+        return self.backend.put_bytes_if(self._manifest_key(job_id),
+                                         json.dumps({"job_id": job_id, "files": files}).encode("utf-8"),
+                                         version)
+
+    # -- jobs -----------------------------------------------------------------
+
+    def commit_job(self, job_id: str, job_dir: Path, remove_local: bool = True,
+                   paths: Optional[Iterable[Path]] = None) -> Dict[str, int]:
+        """
+        Store every file of a job directory (or just paths) and record it in the job's manifest
+
+        Later commits of the same job merge into the manifest, and a path
+        whose content changed releases its old blob. Stage tasks of a job
+        commit concurrently, so the manifest is written conditionally and
+        the merge is redone on top of whatever another commit wrote. With
+        remove_local, the stored files are deleted from the job directory.
+        """
+        job_dir = Path(job_dir)
+        stats = {"files": 0, "new_blobs": 0, "bytes": 0, "stored_bytes": 0}
+        if not job_dir.exists():
+            return stats
+        if paths is None:
+            paths = [Path(dirpath) / name for dirpath, _, filenames in os.walk(job_dir)
+                     for name in filenames if not name.endswith(".tmp")]
+
+        updates: Dict[str, Dict[str, Any]] = {}
+        committed: List[Path] = []
+        committed_at = time.time()
+        for path in paths:
+            path = Path(path)
+            entry = self.put_file(path)
+            self.add_ref(entry["sha256"], job_id)
+            updates[path.relative_to(job_dir).as_posix()] = {
+                **{key: entry[key] for key in ("sha256", "size", "codec")}, "committed": committed_at
+            }
+            committed.append(path)
+            stats["files"] += 1
+            stats["new_blobs"] += entry["new"]
+            stats["bytes"] += entry["size"]
+            stats["stored_bytes"] += entry["stored_size"] if entry["new"] else 0
+
+        for _ in range(MANIFEST_WRITE_ATTEMPTS):
+            files, version = self._read_manifest_versioned(job_id)
+            previous = {entry["sha256"] for entry in files.values()}
+            files.update(updates)
+            if self._write_manifest(job_id, files, version):
+                break
+        else:
+            raise RuntimeError(f"Manifest of job {job_id} kept changing, gave up after "
+                               f"{MANIFEST_WRITE_ATTEMPTS} attempts")
+        for digest in previous - {entry["sha256"] for entry in files.values()}:
+            self._release(digest, job_id)
+
+        if remove_local:
+            for path in committed:
+                path.unlink(missing_ok=True)
+            for dirpath, _, _ in sorted(os.walk(job_dir), key=lambda item: len(item[0]), reverse=True):
+                if Path(dirpath) != job_dir:
+                    try:
+                        os.rmdir(dirpath)
+                    except OSError:
+                        pass
+        return stats
+
+    @staticmethod
+    def is_stale(path: Path, entry: Dict[str, Any]) -> bool:
+        """
+        True if a local copy predates the stored version of its path and differs from it
+
+        A copy written after the commit (fetched from the store, or new
+        output of a running stage) is current. An older one is checked
+        against the manifest's size and sha256 and, if it matches, touched
+        so the check is not repeated.
+        """
+        stat = path.stat()
+        if stat.st_mtime >= entry.get("committed", 0):
+            return False
+        if stat.st_size != entry["size"] or file_digest(path) != entry["sha256"]:
+            return True
+        os.utime(path)
+        return False
+
+    def materialize(self, job_id: str, relpath: str, job_dir: Path) -> Optional[Path]:
+        """
+        Write a stored file, or every stored file below a directory, back into job_dir
+
+        Local copies are kept unless they are stale (see is_stale): another
+        node may have committed a newer version of the file since. Returns
+        the local path, or None if the job has nothing stored there.
+        """
+        files = self.read_manifest(job_id)
+        relpath = relpath.strip("/")
+        prefix = f"{relpath}/" if relpath else ""
+        keys = [relpath] if relpath in files else [key for key in files if key.startswith(prefix)]
+        if not keys:
+            return None
+
+        for key in keys:
+            target = Path(job_dir) / key
+            if target.exists() and not self.is_stale(target, files[key]):
+                continue
+            if target.exists():
+                logger.info(f"[{job_id}] Local copy of {key} is stale, fetching it from the artifact store")
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp = sibling_tempfile(target)
+            try:
+                with open(tmp, "wb") as f:
+                    for chunk in self.iter_blob(files[key]["sha256"], files[key].get("codec")):
+                        f.write(chunk)
+                os.replace(tmp, target)
+            finally:
+                tmp.unlink(missing_ok=True)
+        return Path(job_dir) / relpath
+
+    def refresh_local(self, job_id: str, job_dir: Path) -> int:
+        """Replace the stale local copies of a job's stored files; returns how many"""
+        files = self.read_manifest(job_id)
+        stale = [key for key, entry in files.items()
+                 if (Path(job_dir) / key).is_file() and self.is_stale(Path(job_dir) / key, entry)]
+        for key in stale:
+            (Path(job_dir) / key).unlink(missing_ok=True)
+            self.materialize(job_id, key, job_dir)
+        if stale:
+            logger.info(f"[{job_id}] Replaced {len(stale)} stale local files from the artifact store")
+        return len(stale)
+
+    def presigned_url(self, job_id: str, relpath: str, expires: int) -> Optional[str]:
+        """
+        Direct download URL of a stored file, or None
+
+        Only uncompressed blobs (screenshots and other binary files) can be
+        handed out as is; everything else has to be served decompressed.
+        """
+        entry = self.read_manifest(job_id).get(relpath.strip("/"))
+        if entry is None or entry.get("codec") != "raw":
+            return None
+        content_type = mimetypes.guess_type(relpath)[0] or "application/octet-stream"
+        return self.backend.presigned_url(self._blob_key(entry["sha256"], "raw"), expires, content_type)
+
+    def delete_job(self, job_id: str) -> int:
+        """Remove a job's manifest and references; returns the number of blobs deleted"""
+        files = self.read_manifest(job_id)
+        deleted = sum(self._release(digest, job_id) for digest in {entry["sha256"] for entry in files.values()})
+        self.backend.delete(self._manifest_key(job_id))
+        return deleted
+
+    def gc(self) -> int:
+        """Delete unreferenced blobs older than the grace period; returns how many"""
+        return sum(self._delete_unreferenced(key.rsplit("/", 1)[-1].split(".", 1)[0])
+                   for key in list(self.backend.list("blobs/")))
+
+
+_store: Optional[ArtifactStore] = None
+_store_config: Optional[tuple] = None
+
+
+def _make_backend():
+    if settings.artifact_backend == "s3":
+        return S3Backend(
+            settings.artifact_s3_bucket,
+            prefix=settings.artifact_s3_prefix,
+            endpoint_url=settings.artifact_s3_endpoint_url,
+            region=settings.artifact_s3_region,
+            access_key=settings.artifact_s3_access_key,
+            secret_key=settings.artifact_s3_secret_key,
+        )
+    if settings.artifact_backend != "local":
+        raise ValueError(f"Unknown artifact backend: {settings.artifact_backend}")
+    return LocalBackend(Path(settings.artifact_store_path))
+
+
+def get_artifact_store() -> Optional[ArtifactStore]:
+    """The configured store, or None when artifact_store_enabled is off"""
+    global _store, _store_config
+    if not settings.artifact_store_enabled:
+        return None
+    config = (settings.artifact_backend, settings.artifact_store_path, settings.artifact_s3_bucket,
+              settings.artifact_s3_prefix, settings.artifact_s3_endpoint_url)
+    if _store is None or _store_config != config:
+        _store = ArtifactStore(_make_backend(), settings.artifact_store_compression, settings.artifact_store_level,
+                               settings.artifact_gc_grace_seconds)
+        _store_config = config
+        logger.info(f"Artifact store: {_store.backend.describe()}")
+    return _store
+
+
+def _job_dir(job_id: str) -> Optional[Path]:
+    """The job's directory, or None if job_id is not a single name below jobs_directory (e.g. "..")"""
+    jobs_dir = Path(settings.jobs_directory).resolve()
+    job_dir = (jobs_dir / job_id).resolve()
+    return job_dir if job_dir.parent == jobs_dir else None
+
+
+def job_path(job_id: str, relpath: str = "") -> Optional[Path]:
+    """
+    Local path of a job file or directory, fetched from the artifact store if needed
+
+    Returns None if it exists neither in the job directory nor in the
+    store, or if job_id or relpath point outside the job directory.
+    """
+    job_dir = _job_dir(job_id)
+    if job_dir is None:
+        return None
+    path = (job_dir / relpath).resolve()
+    if path != job_dir and job_dir not in path.parents:
+        return None
+    # Local copies are checked against the store (another node may have committed a newer version);
+    # directories may be partly local (e.g. thumbnails rendered after the commit)
+    store = get_artifact_store()
+    if store is not None:
+        stored = store.materialize(job_id, path.relative_to(job_dir).as_posix(), job_dir)
+        if stored is not None and stored.exists():
+            return stored
+    return path if path.exists() else None
+
+
+def presigned_job_url(job_id: str, relpath: str) -> Optional[str]:
+    """Bucket URL of a stored job file when artifact_read_mode is "presign", otherwise None"""
+    store = get_artifact_store()
+    if store is None or settings.artifact_read_mode != "presign" or _job_dir(job_id) is None:
+        return None
+    return store.presigned_url(job_id, relpath, settings.artifact_presign_expires)
+
+
+def evict_local_jobs(hostname: str) -> int:
+    """
+    Remove job directories this node keeps but no longer needs; returns how many
+
+    With locality routing, owners keep their job directories after the
+    commit. A directory is removed once the node is not the job's owner
+    any more (the owner key expired or another node ran a later stage) and
+    nothing in it changed for artifact_gc_grace_seconds. Every file the
+    store does not hold yet is committed first (jobs from before the store
+    was enabled, failed commits, output newer than the last commit), and
+    the directory is only removed once the manifest covers all of them.
+    """
+    from app.services.locality import owner_of
+
+    store = get_artifact_store()
+    jobs_dir = Path(settings.jobs_directory)
+    if store is None or not jobs_dir.is_dir():
+        return 0
+
+    def uncommitted(job_dir: Path, local: List[Path]) -> List[Path]:
+        files = store.read_manifest(job_dir.name)
+        pending = []
+        for path in local:
+            entry = files.get(path.relative_to(job_dir).as_posix())
+            if entry is None or (path.stat().st_mtime >= entry.get("committed", 0)
+                                 and (path.stat().st_size != entry["size"] or file_digest(path) != entry["sha256"])):
+                pending.append(path)
+        return pending
+
+    evicted = 0
+    cutoff = time.time() - settings.artifact_gc_grace_seconds
+    for job_dir in jobs_dir.iterdir():
+        if not job_dir.is_dir() or owner_of(job_dir.name) == hostname:
+            continue
+        local = [Path(dirpath) / name for dirpath, _, filenames in os.walk(job_dir)
+                 for name in filenames if not name.endswith(".tmp")]
+        try:
+            if any(path.stat().st_mtime > cutoff for path in local) or job_dir.stat().st_mtime > cutoff:
+                continue
+            pending = uncommitted(job_dir, local)
+            if pending:
+                store.commit_job(job_dir.name, job_dir, remove_local=False, paths=pending)
+                pending = uncommitted(job_dir, local)
+            if pending:
+                logger.warning(f"[{job_dir.name}] Not evicting the local job directory: "
+                               f"{len(pending)} files are not in the artifact store")
+                continue
+        except Exception as e:
+            logger.warning(f"[{job_dir.name}] Not evicting the local job directory: {e}")
+            continue
+        shutil.rmtree(job_dir, ignore_errors=True)
+        evicted += 1
+    if evicted:
+        logger.info(f"Evicted {evicted} job directories not owned by {hostname}")
+    return evicted
+
+
+def delete_job_files(job_id: str) -> int:
+    """Delete a job's directory and its stored artifacts; returns the number of blobs deleted"""
+    job_dir = _job_dir(job_id)
+    if job_dir is not None and job_dir.exists():
+        shutil.rmtree(job_dir, ignore_errors=True)
+    forget_owner(job_id)
+    store = get_artifact_store()
+    return store.delete_job(job_id) if store is not None else 0
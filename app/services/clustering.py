@@ -0,0 +1,107 @@
+"""
+Group probed hosts that serve the same page
+
+Hosts are clustered by (final_url, body SHA-256, status code, content
+length): default vhosts, CDN error pages and SSO redirects to one login
+page all collapse into a cluster. Screenshot and leak stages run on one
+representative per cluster and copy its results to the other members, with
+URLs rebased onto each member's origin:
+
+    targets, members = split_representatives(live_hosts)
+    rows = run_tool([h['url'] for h in targets])
+    rows = attribute_to_members(rows, members, 'url')
+"""
+import json
+import hashlib
+import logging
+from typing import Dict, Any, List, Optional, Tuple, Iterable
+
+from app.services.parsers import BASE_URL_RE
+
+logger = logging.getLogger(__name__)
+
+
+def cluster_key(host: Dict[str, Any]) -> Optional[Tuple]:
+    """Clustering key, or None when the host has neither a body hash nor a redirect target"""
+    body_hash = host.get('body_hash')
+    final_url = host.get('final_url')
+    if not body_hash and not final_url:
+        return None
+    return (final_url or '', body_hash or '', host.get('status_code'), host.get('content_length'))
+
+
+def cluster_id_for(key: Tuple) -> str:
+    return hashlib.sha256(json.dumps(key).encode()).hexdigest()[:16]
+
+
+def assign_clusters(live_hosts: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Set host['cluster_id'] on every clusterable host
+
+    Returns cluster_id -> member hosts in input order; the first member is
+    the cluster's representative.
+    """
+    clusters: Dict[str, List[Dict[str, Any]]] = {}
+    for host in live_hosts:
+        key = cluster_key(host)
+        host['cluster_id'] = cluster_id_for(key) if key is not None else None
+        if host['cluster_id'] is not None:
+            clusters.setdefault(host['cluster_id'], []).append(host)
+    return clusters
+
+
+def origin(url: str) -> str:
+    match = BASE_URL_RE.match(url or '')
+    return match.group(0) if match else (url or '')
+
+
+def split_representatives(hosts: Iterable[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, List[str]]]:
+    """
+    (hosts to process, representative origin -> member origins)
+
+    Hosts without a cluster_id are processed as they are. Of each cluster
+    only the first host is processed; the other members' origins are
+    returned for attribute_to_members.
+    """
+    targets: List[Dict[str, Any]] = []
+    representative: Dict[str, str] = {}
+    members: Dict[str, List[str]] = {}
+    for host in hosts:
+        cluster_id = host.get('cluster_id')
+        if not cluster_id:
+            targets.append(host)
+        elif cluster_id not in representative:
+            representative[cluster_id] = origin(host['url'])
+            targets.append(host)
+        else:
+            rep_origin = representative[cluster_id]
+            member_origin = origin(host['url'])
+            if member_origin != rep_origin:
+                members.setdefault(rep_origin, []).append(member_origin)
+    return targets, members
+
+
+def attribute_to_members(rows: List[Dict[str, Any]], members: Dict[str, List[str]], key_field: str,
+                         rebase_fields: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+    """
+    rows plus, for every row of a representative, one copy per cluster member
+
+    A row belongs to the representative whose origin prefixes
+    row[key_field]. In the copies, each of rebase_fields (default:
+    key_field) that starts with the representative's origin is rebased
+    onto the member's origin.
+    """
+    if not members:
+        return rows
+    fields = list(rebase_fields or [key_field])
+    expanded = list(rows)
+    for row in rows:
+        rep_origin = origin(row.get(key_field) or '')
+        for member_origin in members.get(rep_origin, ()):
+            copy = dict(row)
+            for field in fields:
+                value = copy.get(field)
+                if isinstance(value, str) and value.startswith(rep_origin):
+                    copy[field] = member_origin + value[len(rep_origin):]
+            expanded.append(copy)
+    return expanded
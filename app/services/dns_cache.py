@@ -0,0 +1,180 @@
+"""
+Shared DNS answer cache
+
+Two layers in front of the resolvers: an in-process LRU, then Redis so
+answers are shared by every worker and job. Positive answers live for
+their record TTL (capped at settings.dns_cache_max_ttl); NXDOMAIN and
+empty answers for settings.dns_cache_negative_ttl. Errors are never cached.
+
+    resolver = AsyncResolver(settings.dns_resolvers, cache=get_dns_cache())
+
+The Redis client belongs to the event loop that opened it (each Celery task
+runs its own); close it with aclose() before that loop ends.
+"""
+import json
+import time
+import asyncio
+import logging
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.deps import settings
+from app.services import metrics
+from app.services.dns_resolver import DnsAnswer
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "recon:dns:"
+
+# After a Redis error, skip it for this long instead of paying a timeout per query
+REDIS_RETRY_INTERVAL = 30.0
+
+
+class DnsCache:
+    """In-process LRU backed by an optional Redis layer"""
+
+    def __init__(self, max_entries: int = 100000, negative_ttl: int = 60, max_ttl: int = 3600,
+                 redis_url: Optional[str] = None):
+        self.max_entries = max_entries
+        self.negative_ttl = negative_ttl
+        self.max_ttl = max_ttl
+        self.redis_url = redis_url
+        # (name, qtype) -> (expires_at, answer)
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[float, DnsAnswer]]" = OrderedDict()
+        # event loop -> redis.asyncio client opened on it
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+        self._redis_down_until = 0.0
+        self.stats: Dict[str, int] = {"memory_hits": 0, "redis_hits": 0, "misses": 0, "redis_errors": 0}
+
+    def ttl_for(self, answer: DnsAnswer) -> int:
+        if not answer.resolved:
+            return self.negative_ttl
+        return max(1, min(answer.ttl, self.max_ttl))
+
+    @staticmethod
+    def _with_remaining_ttl(answer: DnsAnswer, expires_at: float) -> DnsAnswer:
+        remaining = max(0, int(expires_at - time.time()))
+        return DnsAnswer(answer.name, answer.qtype, answer.rcode, list(answer.addresses), list(answer.cnames), remaining)
+
+    # -- in-process layer ---------------------------------------------------
+
+    def _get_local(self, key: Tuple[str, int]) -> Optional[DnsAnswer]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, answer = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return self._with_remaining_ttl(answer, expires_at)
+
+    def _set_local(self, key: Tuple[str, int], expires_at: float, answer: DnsAnswer):
+        self._entries[key] = (expires_at, answer)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    # -- Redis layer --------------------------------------------------------
+
+    def _client(self):
+        """redis.asyncio client for the running loop (each Celery task runs its own loop)"""
+        if not self.redis_url or time.monotonic() < self._redis_down_until:
+            return None
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            import redis.asyncio as redis_asyncio
+
+            client = redis_asyncio.Redis.from_url(self.redis_url, socket_connect_timeout=0.5, socket_timeout=0.5)
+            self._clients[loop] = client
+        return client
+
+    async def aclose(self):
+        """Close the running loop's Redis client; the next query on a loop opens a new one"""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is None:
+            return
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.debug(f"DNS cache: closing the Redis client failed: {e}")
+
+    def _redis_failed(self, e: Exception):
+        self.stats["redis_errors"] += 1
+        self._redis_down_until = time.monotonic() + REDIS_RETRY_INTERVAL
+        logger.warning(f"DNS cache: Redis unavailable, using in-process cache only for {REDIS_RETRY_INTERVAL:.0f}s: {e}")
+
+    @staticmethod
+    def _redis_key(name: str, qtype: int) -> str:
+        return f"{KEY_PREFIX}{qtype}:{name}"
+
+    # -- public API -----------------------------------------------------------
+
+    async def get(self, name: str, qtype: int) -> Optional[DnsAnswer]:
+        key = (name, qtype)
+        answer = self._get_local(key)
+        if answer is not None:
+            self.stats["memory_hits"] += 1
+            metrics.record_cache_lookup("dns_memory", True)
+            return answer
+        metrics.record_cache_lookup("dns_memory", False)
+
+        client = self._client()
+        if client is not None:
+            try:
+                raw = await client.get(self._redis_key(name, qtype))
+            except Exception as e:
+                self._redis_failed(e)
+                raw = None
+            metrics.record_cache_lookup("dns_redis", raw is not None)
+            if raw is not None:
+                data = json.loads(raw)
+                expires_at = data.pop("expires_at")
+                cached = DnsAnswer.from_dict(data)
+                self._set_local(key, expires_at, cached)
+                self.stats["redis_hits"] += 1
+                return self._with_remaining_ttl(cached, expires_at)
+
+        self.stats["misses"] += 1
+        return None
+
+    async def set(self, answer: DnsAnswer):
+        if answer.rcode not in (0, 3):  # NOERROR / NXDOMAIN only
+            return
+        ttl = self.ttl_for(answer)
+        expires_at = time.time() + ttl
+        self._set_local((answer.name, answer.qtype), expires_at, answer)
+
+        client = self._client()
+        if client is not None:
+            value = json.dumps({**answer.to_dict(), "expires_at": expires_at})
+            try:
+                await client.set(self._redis_key(answer.name, answer.qtype), value, ex=ttl)
+            except Exception as e:
+                self._redis_failed(e)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_cache: Optional[DnsCache] = None
+
+
+def get_dns_cache() -> Optional[DnsCache]:
+    """Process-wide cache per settings.dns_cache_backend ("redis", "memory" or "none")"""
+    global _cache
+    if settings.dns_cache_backend == "none":
+        return None
+    if _cache is None:
+        _cache = DnsCache(
+            max_entries=settings.dns_cache_size,
+            negative_ttl=settings.dns_cache_negative_ttl,
+            max_ttl=settings.dns_cache_max_ttl,
+            redis_url=settings.redis_url if settings.dns_cache_backend == "redis" else None
+        )
+    return _cache
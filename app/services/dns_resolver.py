@@ -0,0 +1,389 @@
+"""
+Asynchronous DNS resolution with wildcard detection
+
+A small pure-Python stub resolver: queries are encoded to DNS wire format
+and sent over asyncio UDP to the configured resolvers, with a bounded
+number of in-flight lookups. Used by ReconPipeline to drop names that do
+not resolve, or only resolve through a wildcard record, before httpx.
+"""
+import random
+import socket
+import string
+import struct
+import asyncio
+import logging
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Any, List, Optional, Iterable, Tuple, Set
+
+logger = logging.getLogger(__name__)
+
+TYPE_A = 1
+TYPE_CNAME = 5
+TYPE_AAAA = 28
+CLASS_IN = 1
+
+RCODE_NOERROR = 0
+RCODE_SERVFAIL = 2
+RCODE_NXDOMAIN = 3
+
+MAX_UDP_PAYLOAD = 4096
+
+# With hundreds of queries in flight, bursts of answers overflow the default
+# receive buffer and the kernel silently drops them (each costing a timeout)
+SOCKET_RCVBUF = 1 << 20
+
+
+class DnsError(Exception):
+    """Raised when no configured resolver answers a query"""
+
+
+# ---------------------------------------------------------------------------
+# Wire format
+# ---------------------------------------------------------------------------
+
+def encode_name(name: str) -> bytes:
+    out = bytearray()
+    for label in name.rstrip(".").split("."):
+        encoded = label.encode("idna") if not label.isascii() else label.encode()
+        if not encoded or len(encoded) > 63:
+            raise ValueError(f"Invalid DNS label in {name!r}")
+        out.append(len(encoded))
+        out += encoded
+    out.append(0)
+    return bytes(out)
+
+
+def build_query(query_id: int, name: str, qtype: int) -> bytes:
+    """Standard recursive query with an EDNS0 OPT record advertising a larger UDP payload"""
+    header = struct.pack("!HHHHHH", query_id, 0x0100, 1, 0, 0, 1)
+    question = encode_name(name) + struct.pack("!HH", qtype, CLASS_IN)
+    opt = b"\x00" + struct.pack("!HHIH", 41, MAX_UDP_PAYLOAD, 0, 0)
+    return header + question + opt
+
+
+def decode_name(data: bytes, offset: int) -> Tuple[str, int]:
+    """Decode a possibly compressed name; returns (name, offset after the name)"""
+    labels = []
+    end = None
+    jumps = 0
+    while True:
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            if end is None:
+                end = offset + 2
+            offset = ((length & 0x3F) << 8) | data[offset + 1]
+            jumps += 1
+            if jumps > 32:
+                raise ValueError("DNS name compression loop")
+            continue
+        offset += 1
+        if length == 0:
+            break
+        labels.append(data[offset:offset + length].decode("ascii", errors="replace"))
+        offset += length
+    return ".".join(labels).lower(), end if end is not None else offset
+
+
+@dataclass
+class DnsMessage:
+    """Decoded response: header fields plus answer records (name, type, ttl, value)"""
+    query_id: int
+    rcode: int
+    truncated: bool
+    answers: List[Tuple[str, int, int, str]] = field(default_factory=list)
+
+
+def parse_response(data: bytes) -> DnsMessage:
+    query_id, flags, qdcount, ancount, _, _ = struct.unpack("!HHHHHH", data[:12])
+    message = DnsMessage(query_id=query_id, rcode=flags & 0x0F, truncated=bool(flags & 0x0200))
+
+    offset = 12
+    for _ in range(qdcount):
+        _, offset = decode_name(data, offset)
+        offset += 4
+
+    for _ in range(ancount):
+        name, offset = decode_name(data, offset)
+        rtype, _, ttl, rdlength = struct.unpack("!HHIH", data[offset:offset + 10])
+        offset += 10
+        rdata_offset = offset
+        offset += rdlength
+
+        if rtype == TYPE_A and rdlength == 4:
+            value = socket.inet_ntop(socket.AF_INET, data[rdata_offset:offset])
+        elif rtype == TYPE_AAAA and rdlength == 16:
+            value = socket.inet_ntop(socket.AF_INET6, data[rdata_offset:offset])
+        elif rtype == TYPE_CNAME:
+            value, _ = decode_name(data, rdata_offset)
+        else:
+            continue
+        message.answers.append((name, rtype, ttl, value))
+
+    return message
+
+
+# ---------------------------------------------------------------------------
+# Resolver
+# ---------------------------------------------------------------------------
+
+def parse_nameserver(value: str) -> Tuple[str, int]:
+    """"1.1.1.1", "127.0.0.1:5353", "[::1]:53" -> (host, port)"""
+    value = value.strip()
+    if value.startswith("["):
+        host, _, port = value[1:].partition("]")
+        return host, int(port.lstrip(":") or 53)
+    if value.count(":") == 1:
+        host, port = value.split(":")
+        return host, int(port)
+    return value, 53
+
+
+@dataclass
+class DnsAnswer:
+    """Answer to one (name, type) query"""
+    name: str
+    qtype: int
+    rcode: int
+    addresses: List[str] = field(default_factory=list)
+    cnames: List[str] = field(default_factory=list)
+    ttl: int = 0
+
+    @property
+    def resolved(self) -> bool:
+        return self.rcode == RCODE_NOERROR and bool(self.addresses)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DnsAnswer":
+        return cls(**data)
+
+
+@dataclass
+class ResolvedHost:
+    """A and AAAA data for one name"""
+    name: str
+    a: List[str] = field(default_factory=list)
+    aaaa: List[str] = field(default_factory=list)
+    cnames: List[str] = field(default_factory=list)
+    rcode: int = RCODE_NOERROR
+    wildcard: bool = False
+
+    @property
+    def resolved(self) -> bool:
+        return bool(self.a or self.aaaa)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class _DnsProtocol(asyncio.DatagramProtocol):
+    def __init__(self):
+        self.pending: Dict[int, asyncio.Future] = {}
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        if len(data) < 12:
+            return
+        future = self.pending.pop(struct.unpack("!H", data[:2])[0], None)
+        if future is not None and not future.done():
+            future.set_result(data)
+
+    def error_received(self, exc):
+        # ICMP port unreachable etc.; pending queries fail on their own timeout
+        logger.debug(f"DNS socket error: {exc}")
+
+
+class AsyncResolver:
+    """Bounded-concurrency UDP stub resolver over a list of recursive resolvers"""
+
+    def __init__(self, nameservers: Iterable[str], timeout: float = 2.0, retries: int = 2,
+                 concurrency: int = 200, cache=None):
+        self.nameservers = [parse_nameserver(ns) for ns in nameservers]
+        if not self.nameservers:
+            raise ValueError("At least one DNS resolver is required")
+        self.timeout = timeout
+        self.retries = retries
+        self.concurrency = max(1, concurrency)
+        self.cache = cache
+        self._endpoints: Dict[Tuple[str, int], _DnsProtocol] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.queries_sent = 0
+        self.cache_hits = 0
+
+    async def _endpoint(self, nameserver: Tuple[str, int]) -> _DnsProtocol:
+        protocol = self._endpoints.get(nameserver)
+        if protocol is None or protocol.transport is None or protocol.transport.is_closing():
+            loop = asyncio.get_running_loop()
+            transport, protocol = await loop.create_datagram_endpoint(_DnsProtocol, remote_addr=nameserver)
+            try:
+                transport.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_RCVBUF)
+            except OSError:
+                pass
+            self._endpoints[nameserver] = protocol
+        return protocol
+
+    async def _exchange(self, nameserver: Tuple[str, int], name: str, qtype: int) -> DnsMessage:
+        protocol = await self._endpoint(nameserver)
+        query_id = random.randrange(1 << 16)
+        while query_id in protocol.pending:
+            query_id = random.randrange(1 << 16)
+
+        future = asyncio.get_running_loop().create_future()
+        protocol.pending[query_id] = future
+        try:
+            protocol.transport.sendto(build_query(query_id, name, qtype))
+            self.queries_sent += 1
+            data = await asyncio.wait_for(future, self.timeout)
+        finally:
+            protocol.pending.pop(query_id, None)
+        return parse_response(data)
+
+    async def query(self, name: str, qtype: int = TYPE_A, use_cache: bool = True) -> DnsAnswer:
+        """Resolve one record type, rotating through resolvers on timeout or SERVFAIL"""
+        name = name.rstrip(".").lower()
+        use_cache = use_cache and self.cache is not None
+        if use_cache:
+            cached = await self.cache.get(name, qtype)
+            if cached is not None:
+                self.cache_hits += 1
+                return cached
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        last_error = None
+        offset = random.randrange(len(self.nameservers))
+        async with self._semaphore:
+            for attempt in range(self.retries + 1):
+                nameserver = self.nameservers[(offset + attempt) % len(self.nameservers)]
+                try:
+                    message = await self._exchange(nameserver, name, qtype)
+                except (asyncio.TimeoutError, OSError) as e:
+                    last_error = e
+                    continue
+                if message.rcode == RCODE_SERVFAIL:
+                    last_error = DnsError(f"SERVFAIL from {nameserver[0]}")
+                    continue
+                answer = self._to_answer(name, qtype, message)
+                break
+            else:
+                raise DnsError(f"No answer for {name} ({qtype}): {last_error}")
+
+        if use_cache:
+            await self.cache.set(answer)
+        return answer
+
+    @staticmethod
+    def _to_answer(name: str, qtype: int, message: DnsMessage) -> DnsAnswer:
+        answer = DnsAnswer(name=name, qtype=qtype, rcode=message.rcode)
+        ttls = []
+        for _, rtype, ttl, value in message.answers:
+            if rtype == qtype:
+                answer.addresses.append(value)
+                ttls.append(ttl)
+            elif rtype == TYPE_CNAME:
+                answer.cnames.append(value)
+                ttls.append(ttl)
+        answer.ttl = min(ttls) if ttls else 0
+        return answer
+
+    async def resolve(self, name: str, use_cache: bool = True) -> ResolvedHost:
+        """A and AAAA for a name; unreachable resolvers count as not resolved"""
+        results = await asyncio.gather(
+            self.query(name, TYPE_A, use_cache), self.query(name, TYPE_AAAA, use_cache), return_exceptions=True
+        )
+        host = ResolvedHost(name=name.rstrip(".").lower())
+        rcodes = []
+        for result in results:
+            if isinstance(result, Exception):
+                rcodes.append(RCODE_SERVFAIL)
+                continue
+            rcodes.append(result.rcode)
+            target = host.a if result.qtype == TYPE_A else host.aaaa
+            target.extend(result.addresses)
+            for cname in result.cnames:
+                if cname not in host.cnames:
+                    host.cnames.append(cname)
+        host.rcode = RCODE_NOERROR if RCODE_NOERROR in rcodes else max(rcodes)
+        return host
+
+    async def resolve_many(self, names: Iterable[str]) -> List[ResolvedHost]:
+        """Resolve names with at most `concurrency` lookups in flight"""
+        iterator = iter(names)
+        results: List[ResolvedHost] = []
+
+        async def worker():
+            for name in iterator:
+                results.append(await self.resolve(name))
+
+        # Each resolve() issues two queries, so half as many workers fill the semaphore
+        workers = max(1, self.concurrency // 2)
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        return results
+
+    async def is_reachable(self, probe_name: str) -> bool:
+        """Whether any resolver answers at all (NXDOMAIN counts as an answer); never served from cache"""
+        try:
+            await self.query(probe_name, TYPE_A, use_cache=False)
+            return True
+        except DnsError:
+            return False
+
+    def close(self):
+        for protocol in self._endpoints.values():
+            if protocol.transport is not None:
+                protocol.transport.close()
+        self._endpoints.clear()
+
+
+# ---------------------------------------------------------------------------
+# Wildcard detection
+# ---------------------------------------------------------------------------
+
+def _random_label(length: int = 12) -> str:
+    return "".join(random.choices(string.ascii_lowercase + string.digits, k=length))
+
+
+def parent_zone(name: str) -> str:
+    return name.split(".", 1)[1] if "." in name else ""
+
+
+class WildcardDetector:
+    """Detect wildcard zones by resolving random labels under each parent"""
+
+    def __init__(self, resolver: AsyncResolver, probes: int = 3):
+        self.resolver = resolver
+        self.probes = probes
+        # parent zone -> answers seen for random labels (addresses and CNAME targets)
+        self.wildcards: Dict[str, Set[str]] = {}
+
+    async def detect(self, parents: Iterable[str]):
+        parents = [p for p in set(parents) if p and p not in self.wildcards]
+
+        async def probe(parent: str):
+            # Random labels never repeat, so caching them would only evict useful answers
+            hosts = await asyncio.gather(*(
+                self.resolver.resolve(f"{_random_label()}.{parent}", use_cache=False) for _ in range(self.probes)
+            ))
+            answers: Set[str] = set()
+            for host in hosts:
+                if host.resolved:
+                    answers.update(host.a, host.aaaa, host.cnames)
+            self.wildcards[parent] = answers
+
+        await asyncio.gather(*(probe(parent) for parent in parents))
+
+    def is_wildcard(self, host: ResolvedHost) -> bool:
+        """Resolved only because of the parent's wildcard (same addresses or CNAME target)"""
+        answers = self.wildcards.get(parent_zone(host.name))
+        if not answers:
+            return False
+        if host.cnames and set(host.cnames) & answers:
+            return True
+        addresses = set(host.a) | set(host.aaaa)
+        return bool(addresses) and addresses <= answers
@@ -0,0 +1,547 @@
+"""
+Technology fingerprinting over captured HTTP responses
+
+Signatures use the Wappalyzer format and are loaded from
+settings.fingerprint_signatures_path (default config/fingerprints.json):
+
+    {"technologies": {
+      "WordPress": {
+        "headers": {"X-Pingback": "/xmlrpc\\.php$"},   # header name -> pattern
+        "cookies": {"wordpress_test_cookie": ""},       # Set-Cookie name -> pattern
+        "meta": {"generator": "^WordPress ?([\\d.]+)?\\;version:\\1"},
+        "html": ["<link[^>]+/wp-content/"],             # searched in the body
+        "scriptSrc": "/wp-(?:content|includes)/",       # <script src=...> values
+        "implies": "PHP",
+        "excludes": []
+      }
+    }}
+
+Patterns are case-insensitive. A "\\;version:\\1" suffix reports a capture
+group as the version ("WordPress:6.4", the same form httpx -tech-detect
+uses); an empty pattern only requires the header, cookie or meta tag.
+JavaScript/DOM signatures need a browser and are ignored.
+
+The signature set is compiled once per process into an index, so a
+response is not tested against every signature: header, cookie and meta
+patterns are keyed by name, and each HTML/script pattern is keyed by the
+longest literal every match must contain. A response only runs the regexes
+whose literal it contains; patterns without a usable literal sit behind
+one combined alternation that is searched first.
+
+Matching runs over a process pool (settings.fingerprint_workers), and
+identical responses (parking pages, CDN error pages) are matched once.
+"""
+import os
+import re
+import json
+import hashlib
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Iterable, Iterator, Tuple, Callable, Pattern as RegexPattern
+
+from app.deps import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIGNATURES_PATH = Path(__file__).parent.parent.parent / "config" / "fingerprints.json"
+
+# Headers as lowercased name -> values, body as text
+Response = Tuple[Dict[str, List[str]], str]
+
+META_TAG_RE = re.compile(r'<meta\s[^>]*>', re.IGNORECASE)
+META_NAME_RE = re.compile(r'''(?:name|property|http-equiv)\s*=\s*["']?([^"'\s>]+)''', re.IGNORECASE)
+META_CONTENT_RE = re.compile(r'''content\s*=\s*(?:"([^"]*)"|'([^']*)')''', re.IGNORECASE)
+SCRIPT_SRC_RE = re.compile(r'''<script[^>]+src\s*=\s*["']?([^"'\s>]+)''', re.IGNORECASE)
+VERSION_GROUP_RE = re.compile(r'\\(\d)')
+VERSION_TERNARY_RE = re.compile(r'\\(\d)\?([^:]*):(.*)')
+
+# Shorter literals match almost every page and would not filter anything
+MIN_LITERAL_LENGTH = 3
+
+# Characters after \x, \u and \U that belong to the escape, not to the literal text
+ESCAPE_ARGUMENT_LENGTHS = {'x': 2, 'u': 4, 'U': 8}
+
+# Below this many distinct responses, matching inline beats starting worker processes
+POOL_MIN_RESPONSES = 64
+
+
+@dataclass
+class Signature:
+    """One compiled pattern of a technology"""
+    tech: str
+    regex: Optional[RegexPattern] = None  # None: presence is enough
+    version: Optional[str] = None
+
+    def match(self, value: str) -> Optional[str]:
+        """Version string ("" if unknown) when the pattern matches, else None"""
+        if self.regex is None:
+            return ''
+        match = self.regex.search(value)
+        if match is None:
+            return None
+        return _render_version(self.version, match) if self.version else ''
+
+
+def _render_version(template: str, match) -> str:
+    def group(number: str) -> str:
+        try:
+            return match.group(int(number)) or ''
+        except IndexError:
+            return ''
+
+    template = VERSION_TERNARY_RE.sub(lambda m: m.group(2) if group(m.group(1)) else m.group(3), template)
+    return VERSION_GROUP_RE.sub(lambda m: group(m.group(1)), template).strip()
+
+
+def _skip_class(source: str, i: int) -> int:
+    """Index after the character class starting at source[i] == '['"""
+    i += 1
+    if source[i:i + 1] == '^':
+        i += 1
+    if source[i:i + 1] == ']':
+        i += 1
+    while i < len(source) and source[i] != ']':
+        i += 2 if source[i] == '\\' else 1
+    return i + 1
+
+
+def _skip_group(source: str, i: int) -> int:
+    """Index after the group starting at source[i] == '('"""
+    depth = 0
+    while i < len(source):
+        c = source[i]
+        if c == '\\':
+            i += 2
+            continue
+        if c == '[':
+            i = _skip_class(source, i)
+            continue
+        if c == '(':
+            depth += 1
+        elif c == ')':
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return i
+
+
+def _skip_escape_argument(source: str, i: int, escaped: str) -> int:
+    """Index after the argument of the escape \\<escaped> that ends at source[i]"""
+    if escaped in ESCAPE_ARGUMENT_LENGTHS:
+        return min(i + ESCAPE_ARGUMENT_LENGTHS[escaped], len(source))
+    if escaped == 'N' and source[i:i + 1] == '{':
+        end = source.find('}', i)
+        return len(source) if end < 0 else end + 1
+    if escaped.isdigit():
+        # Octal escape (\0, \012, \123) or group reference (\1, \12): up to two more digits
+        end = i
+        while end < min(i + 2, len(source)) and source[end].isdigit():
+            end += 1
+        return end
+    return i
+
+
+def required_literal(source: str) -> Optional[str]:
+    """
+    Longest lowercased literal that every match of the regex contains
+
+    Only top-level characters are considered: groups, classes, escapes
+    such as \\d or \\x2d (with their arguments) and optional characters
+    end a run. Returns None when the
+    pattern has a top-level alternation or no run is long enough.
+    """
+    runs: List[str] = []
+    current: List[str] = []
+
+    def flush():
+        if current:
+            runs.append(''.join(current))
+            current.clear()
+
+    i, n = 0, len(source)
+    while i < n:
+        c = source[i]
+        if c == '\\':
+            escaped = source[i + 1:i + 2]
+            i += 2
+            if not escaped or escaped.isalnum():
+                flush()
+                i = _skip_escape_argument(source, i, escaped)
+                continue
+            char = escaped
+        elif c == '|':
+            return None
+        elif c == '[':
+            flush()
+            i = _skip_class(source, i)
+            continue
+        elif c == '(':
+            flush()
+            i = _skip_group(source, i)
+            continue
+        elif c == '{':
+            flush()
+            end = source.find('}', i)
+            i = n if end < 0 else end + 1
+            continue
+        elif c in '.^$?*+)':
+            flush()
+            i += 1
+            continue
+        else:
+            char = c
+            i += 1
+
+        quantifier = source[i:i + 1]
+        if quantifier in ('?', '*') or (quantifier == '{' and re.match(r'\{0?[,}]|\{0,', source[i:])):
+            # Optional character: the run before it is still required
+            flush()
+            continue
+        current.append(char)
+        if quantifier in ('+', '{'):
+            flush()
+    flush()
+
+    best = max(runs, key=len, default='')
+    return best.lower() if len(best) >= MIN_LITERAL_LENGTH else None
+
+
+class LiteralIndex:
+    """Patterns keyed by a required literal, plus a combined gate for the rest"""
+
+    def __init__(self):
+        self.by_literal: Dict[str, List[Signature]] = {}
+        self.unindexed: List[Signature] = []
+        self._unindexed_sources: List[str] = []
+        self.gate: Optional[RegexPattern] = None
+
+    def add(self, signature: Signature, source: str):
+        literal = required_literal(source) if source else None
+        if literal:
+            self.by_literal.setdefault(literal, []).append(signature)
+        else:
+            self.unindexed.append(signature)
+            self._unindexed_sources.append(source)
+
+    def finalize(self):
+        if self._unindexed_sources and all(self._unindexed_sources):
+            try:
+                self.gate = re.compile('|'.join(f"(?:{s})" for s in self._unindexed_sources), re.IGNORECASE)
+            except re.error:
+                # Back-references or duplicate group names do not survive concatenation
+                self.gate = None
+
+    def candidates(self, lowered: str, text: str) -> Iterator[Signature]:
+        for literal, signatures in self.by_literal.items():
+            if literal in lowered:
+                yield from signatures
+        if self.unindexed and (self.gate is None or self.gate.search(text)):
+            yield from self.unindexed
+
+    def __len__(self):
+        return sum(len(s) for s in self.by_literal.values()) + len(self.unindexed)
+
+
+def _as_list(value: Any) -> List[str]:
+    if value is None:
+        return []
+    return [value] if isinstance(value, str) else list(value)
+
+
+def normalize_headers(raw: Any) -> Dict[str, List[str]]:
+    """
+    Lowercased header name -> values
+
+    Accepts the httpx CLI "header" map (names like "x_powered_by", values a
+    string or a list), a plain dict, or a list of (name, value) pairs.
+    """
+    headers: Dict[str, List[str]] = {}
+    items = raw.items() if isinstance(raw, dict) else (raw or [])
+    for name, value in items:
+        key = str(name).lower().replace('_', '-')
+        headers.setdefault(key, []).extend(str(v) for v in _as_list(value))
+    return headers
+
+
+def captured_response(data: Dict[str, Any], max_body: Optional[int] = None) -> Optional[Response]:
+    """(headers, body) from an httpx JSON record written with response capture, else None"""
+    body = data.get('body')
+    header = data.get('header')
+    if body is None and data.get('response'):
+        # -include-response without a separate body field: split the raw response
+        _, _, body = data['response'].partition('\r\n\r\n')
+    if body is None and header is None:
+        return None
+    body = body or ''
+    if max_body is not None:
+        body = body[:max_body]
+    return normalize_headers(header), body
+
+
+class FingerprintEngine:
+    """Match responses against a compiled Wappalyzer-style signature set"""
+
+    def __init__(self, config: Dict[str, Any]):
+        technologies = config.get('technologies', config)
+        self.version = hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:12]
+        self.technologies = sorted(technologies)
+
+        self.headers: Dict[str, List[Signature]] = {}
+        self.cookies: Dict[str, List[Signature]] = {}
+        self.meta: Dict[str, List[Signature]] = {}
+        self.html = LiteralIndex()
+        self.scripts = LiteralIndex()
+        self.implies: Dict[str, List[str]] = {}
+        self.excludes: Dict[str, List[str]] = {}
+        self.skipped = 0
+
+        for tech, spec in technologies.items():
+            for kind, table in (('headers', self.headers), ('cookies', self.cookies), ('meta', self.meta)):
+                for name, value in (spec.get(kind) or {}).items():
+                    for pattern in _as_list(value):
+                        signature = self._compile(tech, pattern)
+                        if signature is not None:
+                            table.setdefault(name.lower(), []).append(signature)
+
+            for kind, index in (('html', self.html), ('scriptSrc', self.scripts)):
+                for pattern in _as_list(spec.get(kind)):
+                    signature = self._compile(tech, pattern)
+                    if signature is not None:
+                        index.add(signature, signature.regex.pattern if signature.regex else '')
+
+            self.implies[tech] = [i.split('\\;')[0] for i in _as_list(spec.get('implies'))]
+            self.excludes[tech] = _as_list(spec.get('excludes'))
+
+        self.html.finalize()
+        self.scripts.finalize()
+        if self.skipped:
+            logger.warning(f"Fingerprints: skipped {self.skipped} patterns that are not valid Python regexes")
+
+    def _compile(self, tech: str, pattern: str) -> Optional[Signature]:
+        source, *options = pattern.split('\\;')
+        version = None
+        for option in options:
+            key, _, value = option.partition(':')
+            if key == 'version':
+                version = value
+        try:
+            regex = re.compile(source, re.IGNORECASE) if source else None
+        except re.error:
+            self.skipped += 1
+            return None
+        return Signature(tech, regex, version)
+
+    @classmethod
+    def from_file(cls, path) -> "FingerprintEngine":
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def response_key(self, response: Response) -> str:
+        """Hash of the parts of a response any signature looks at"""
+        headers, body = response
+        digest = hashlib.sha256(body.encode('utf-8', errors='replace'))
+        for name in sorted(headers):
+            if name in self.headers or (name == 'set-cookie' and self.cookies):
+                digest.update(f"\0{name}\0{chr(1).join(headers[name])}".encode('utf-8', errors='replace'))
+        return digest.hexdigest()
+
+    def analyze(self, headers: Dict[str, List[str]], body: str) -> List[str]:
+        """Technologies for one response, as "Name" or "Name:version", sorted"""
+        found: Dict[str, str] = {}
+        lowered = body.lower()
+
+        def check(signature: Signature, value: str) -> bool:
+            version = signature.match(value)
+            if version is None:
+                return False
+            if version or signature.tech not in found:
+                found[signature.tech] = version
+            return True
+
+        for name, values in headers.items():
+            for signature in self.headers.get(name, ()):
+                any(check(signature, value) for value in values)
+
+        if self.cookies:
+            for cookie in headers.get('set-cookie', ()):
+                name, _, value = cookie.split(';', 1)[0].partition('=')
+                for signature in self.cookies.get(name.strip().lower(), ()):
+                    check(signature, value.strip())
+
+        if self.meta and '<meta' in lowered:
+            for tag in META_TAG_RE.findall(body):
+                name = META_NAME_RE.search(tag)
+                signatures = self.meta.get(name.group(1).lower(), ()) if name else ()
+                if signatures:
+                    content = META_CONTENT_RE.search(tag)
+                    value = (content.group(1) or content.group(2) or '') if content else ''
+                    for signature in signatures:
+                        check(signature, value)
+
+        if len(self.html):
+            for signature in self.html.candidates(lowered, body):
+                check(signature, body)
+
+        if len(self.scripts):
+            sources = SCRIPT_SRC_RE.findall(body)
+            if sources:
+                joined = '\n'.join(sources)
+                for signature in self.scripts.candidates(joined.lower(), joined):
+                    any(check(signature, src) for src in sources)
+
+        pending = list(found)
+        while pending:
+            for implied in self.implies.get(pending.pop(), ()):
+                if implied not in found:
+                    found[implied] = ''
+                    pending.append(implied)
+        for tech in list(found):
+            for excluded in self.excludes.get(tech, ()):
+                found.pop(excluded, None)
+
+        return [f"{tech}:{version}" if version else tech for tech, version in sorted(found.items())]
+
+
+def merge_technologies(existing: Iterable[str], found: Iterable[str]) -> List[str]:
+    """Union by technology name, keeping a versioned entry over an unversioned one"""
+    merged: Dict[str, str] = {}
+    for entry in list(existing or []) + list(found or []):
+        name = entry.split(':', 1)[0].lower()
+        if name not in merged or (':' in entry and ':' not in merged[name]):
+            merged[name] = entry
+    return list(merged.values())
+
+
+def signatures_path() -> Path:
+    path = Path(settings.fingerprint_signatures_path) if settings.fingerprint_signatures_path else DEFAULT_SIGNATURES_PATH
+    if not path.is_absolute() and not path.exists():
+        path = DEFAULT_SIGNATURES_PATH.parent.parent / path
+    if not path.exists():
+        logger.warning(f"Fingerprint signatures not found: {path}, using {DEFAULT_SIGNATURES_PATH}")
+        path = DEFAULT_SIGNATURES_PATH
+    return path
+
+
+_engine: Optional[FingerprintEngine] = None
+_engine_key = None
+
+
+def get_fingerprint_engine() -> FingerprintEngine:
+    """Engine for settings.fingerprint_signatures_path, recompiled when the file changes"""
+    global _engine, _engine_key
+
+    path = signatures_path()
+    key = (str(path), path.stat().st_mtime_ns)
+    if key != _engine_key:
+        _engine = FingerprintEngine.from_file(path)
+        _engine_key = key
+        logger.info(f"Loaded {len(_engine.technologies)} technology fingerprints from {path} "
+                    f"(version {_engine.version})")
+    return _engine
+
+
+# -- process pool ------------------------------------------------------------
+
+_worker_engine: Optional[FingerprintEngine] = None
+
+
+def _init_worker(path: str):
+    global _worker_engine
+    _worker_engine = FingerprintEngine.from_file(path)
+
+
+def _analyze_chunk(chunk: List[Response]) -> List[List[str]]:
+    return [_worker_engine.analyze(headers, body) for headers, body in chunk]
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_key = None
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Worker pool that has loaded the current signature file, reused across scans"""
+    global _pool, _pool_key
+
+    key = (_engine_key, workers)
+    if _pool is None or key != _pool_key:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        _pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(_engine_key[0],))
+        _pool_key = key
+    return _pool
+
+
+def _shutdown_pool():
+    global _pool, _pool_key
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+    _pool, _pool_key = None, None
+
+
+def fingerprint_responses(responses: List[Response], workers: Optional[int] = None) -> List[List[str]]:
+    """
+    Technologies for each (headers, body), in input order
+
+    Identical responses are matched once. Large batches are split over
+    the process pool; small ones, single-worker settings and processes that
+    cannot start children (daemonic Celery prefork workers) match inline.
+    """
+    engine = get_fingerprint_engine()
+    if workers is None:
+        workers = settings.fingerprint_workers or os.cpu_count() or 1
+
+    keys = [engine.response_key(response) for response in responses]
+    unique: Dict[str, Response] = {}
+    for key, response in zip(keys, responses):
+        unique.setdefault(key, response)
+    batch = list(unique.values())
+
+    results: Optional[List[List[str]]] = None
+    if workers > 1 and len(batch) >= POOL_MIN_RESPONSES and not multiprocessing.current_process().daemon:
+        chunk_size = max(1, len(batch) // (workers * 4))
+        chunks = [batch[i:i + chunk_size] for i in range(0, len(batch), chunk_size)]
+        try:
+            pool = _get_pool(workers)
+            results = [tech for chunk in pool.map(_analyze_chunk, chunks) for tech in chunk]
+        except Exception as e:
+            logger.warning(f"Fingerprint pool unavailable, matching inline: {e}")
+            _shutdown_pool()
+    if results is None:
+        results = [engine.analyze(headers, body) for headers, body in batch]
+
+    by_key = dict(zip(unique, results))
+    return [by_key[key] for key in keys]
+
+
+def fingerprint_records(records: Iterable[Dict[str, Any]], max_body: Optional[int] = None,
+                        lookup: Optional[Callable[[str], Optional[Dict[str, Any]]]] = None) -> Dict[str, List[str]]:
+    """
+    url -> technologies for httpx JSON records with a captured response
+
+    The response is read from the record itself or, when it was moved to
+    the response store, from lookup(url) (ResponseStore.get). httpx's own
+    "tech" list is kept and merged with the fingerprints, so the result can
+    replace a host's stored technologies.
+    """
+    urls: List[str] = []
+    detected: List[List[str]] = []
+    responses: List[Response] = []
+    for data in records:
+        if not data.get('url'):
+            continue
+        response = captured_response(data, max_body)
+        if response is None and lookup is not None:
+            stored = lookup(data['url'])
+            response = captured_response(stored, max_body) if stored else None
+        if response is None:
+            continue
+        urls.append(data['url'])
+        detected.append(data.get('tech') or [])
+        responses.append(response)
+
+    results = fingerprint_responses(responses) if responses else []
+    return {url: merge_technologies(tech, found) for url, tech, found in zip(urls, detected, results)}
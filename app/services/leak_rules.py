@@ -0,0 +1,172 @@
+"""
+Rule engine for leak severity classification
+
+Rules are loaded from a JSON file (settings.leak_rules_path, default
+config/leak_rules.json). A row starts from the severity of its HTTP status
+and the first matching rule adjusts it:
+
+    {
+      "name": "critical-files",
+      "contains": [".sql", ".env"],      # case-insensitive substrings of the URL
+      "extensions": [".bak"],           # URL path ends with one of these
+      "regex": "/wp-config\\.php",      # regex searched in the lowercased URL
+      "status_codes": [200, 403],       # only rows with these statuses
+      "min_size": 1, "max_size": null,  # file size bounds (bytes)
+      "raise": 1,                       # or "severity": "high"
+      "max_severity": "medium"
+    }
+
+All URL patterns are compiled once into a single alternation, so a row
+that matches no rule (the common case) costs one regex search; only rows
+that hit the combined pattern are checked rule by rule.
+"""
+import re
+import json
+import hashlib
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Iterable, Pattern
+
+from app.deps import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RULES_PATH = Path(__file__).parent.parent.parent / "config" / "leak_rules.json"
+
+
+@dataclass
+class LeakRule:
+    """A compiled classification rule"""
+    name: str
+    pattern: Optional[Pattern] = None
+    status_codes: Optional[frozenset] = None
+    min_size: Optional[int] = None
+    max_size: Optional[int] = None
+    severity: Optional[str] = None
+    raise_levels: int = 0
+    max_severity: Optional[str] = None
+
+    def matches(self, lowered_url: str, http_status: Optional[int], file_size: Optional[int]) -> bool:
+        if self.status_codes is not None and http_status not in self.status_codes:
+            return False
+        if self.min_size is not None and (file_size is None or file_size < self.min_size):
+            return False
+        if self.max_size is not None and (file_size is None or file_size > self.max_size):
+            return False
+        if self.pattern is not None and not self.pattern.search(lowered_url):
+            return False
+        return True
+
+
+def _url_pattern(spec: Dict[str, Any]) -> Optional[str]:
+    """Regex source for a rule's contains/extensions/regex conditions"""
+    alternatives = [re.escape(s.lower()) for s in spec.get('contains', [])]
+    alternatives += [re.escape(ext.lower()) + r'(?:[?#]|$)' for ext in spec.get('extensions', [])]
+    if spec.get('regex'):
+        alternatives.append(f"(?:{spec['regex']})")
+    return '|'.join(alternatives) or None
+
+
+class LeakRuleEngine:
+    """Classify leak rows by HTTP status, URL patterns and file size"""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.levels: List[str] = config.get('severity_levels', ['low', 'medium', 'high'])
+        self.default_severity: str = config.get('default_severity', self.levels[0])
+        self.status_severity: Dict[int, str] = {
+            int(code): severity for code, severity in config.get('status_severity', {}).items()
+        }
+        self.version = hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:12]
+
+        self.rules: List[LeakRule] = []
+        sources = []
+        self._unconditional = False
+        for spec in config.get('rules', []):
+            source = _url_pattern(spec)
+            if source:
+                sources.append(source)
+            else:
+                # A rule without URL conditions can match rows the combined pattern misses
+                self._unconditional = True
+
+            for key in ('severity', 'max_severity'):
+                if spec.get(key) is not None and spec[key] not in self.levels:
+                    raise ValueError(f"Leak rule {spec.get('name')!r}: unknown {key} {spec[key]!r}")
+
+            self.rules.append(LeakRule(
+                name=spec.get('name', f"rule-{len(self.rules)}"),
+                pattern=re.compile(source) if source else None,
+                status_codes=frozenset(spec['status_codes']) if spec.get('status_codes') else None,
+                min_size=spec.get('min_size'),
+                max_size=spec.get('max_size'),
+                severity=spec.get('severity'),
+                raise_levels=spec.get('raise', 0),
+                max_severity=spec.get('max_severity')
+            ))
+
+        self.combined = re.compile('|'.join(f"(?:{s})" for s in sources)) if sources else None
+
+    @classmethod
+    def from_file(cls, path) -> "LeakRuleEngine":
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def base_severity(self, http_status: Optional[int]) -> str:
+        return self.status_severity.get(http_status, self.default_severity)
+
+    def _apply(self, rule: LeakRule, severity: str) -> str:
+        if rule.severity is not None:
+            return rule.severity
+        index = min(self.levels.index(severity) + rule.raise_levels, len(self.levels) - 1)
+        if rule.max_severity is not None:
+            # A capped rule never lowers a severity that is already above its cap
+            index = max(min(index, self.levels.index(rule.max_severity)), self.levels.index(severity))
+        return self.levels[index]
+
+    def classify(self, url: str, http_status: Optional[int] = None, file_size: Optional[int] = None) -> str:
+        """Severity for a single leak row"""
+        severity = self.base_severity(http_status)
+        lowered = url.lower()
+
+        if not self._unconditional and (self.combined is None or not self.combined.search(lowered)):
+            return severity
+
+        for rule in self.rules:
+            if rule.matches(lowered, http_status, file_size):
+                return self._apply(rule, severity)
+        return severity
+
+    def classify_batch(self, rows: Iterable[Dict[str, Any]]) -> List[str]:
+        """Severities for rows with leaked_file_url / http_status / file_size keys"""
+        classify = self.classify
+        return [
+            classify(row.get('leaked_file_url') or '', row.get('http_status'), row.get('file_size'))
+            for row in rows
+        ]
+
+
+_engine: Optional[LeakRuleEngine] = None
+_engine_key = None
+
+
+def get_leak_rule_engine() -> LeakRuleEngine:
+    """Engine for settings.leak_rules_path, reloaded when the file changes"""
+    global _engine, _engine_key
+
+    path = Path(settings.leak_rules_path) if settings.leak_rules_path else DEFAULT_RULES_PATH
+    if not path.is_absolute() and not path.exists():
+        path = DEFAULT_RULES_PATH.parent.parent / path
+
+    try:
+        key = (str(path), path.stat().st_mtime_ns)
+    except OSError:
+        logger.warning(f"Leak rules file not found: {path}, using {DEFAULT_RULES_PATH}")
+        path = DEFAULT_RULES_PATH
+        key = (str(path), path.stat().st_mtime_ns)
+
+    if key != _engine_key:
+        _engine = LeakRuleEngine.from_file(path)
+        _engine_key = key
+        logger.info(f"Loaded {len(_engine.rules)} leak rules from {path} (version {_engine.version})")
+    return _engine
@@ -0,0 +1,208 @@
+"""
+Locality-aware routing of stage tasks
+
+The worker that runs a job's stage writes the job directory on its own
+disk. Follow-on stage tasks of that job are cheapest on the same node, so
+the node is recorded in Redis as the job's owner and stage_route() sends
+them to its direct queue (celery's worker_direct, "<hostname>.dq2"):
+
+    recon:locality:job:<job_id>     hostname of the owner (locality_owner_ttl)
+    recon:locality:node:<hostname>  {"active": running tasks, "capacity": concurrency},
+                                    rewritten by a heartbeat thread (locality_node_ttl)
+
+Owners keep job directories after the commit; every locality_evict_interval
+seconds the heartbeat thread also removes the ones the node no longer owns
+(artifacts.evict_local_jobs).
+
+The heartbeat runs in the worker's main process and reports the worker's
+own count of active requests, which also drops tasks whose child process
+was killed (revoke with terminate, time limits). It rewrites the whole
+key, so a node key lost with Redis comes back on the next beat.
+
+When the owner is gone (its node key expired) or saturated (active tasks
+at locality_max_load x capacity), the task takes its normal shared queue
+and the worker there stages the inputs from the artifact store. Redis
+errors fall back the same way.
+
+    dispatch_stage(run_sourceleakhacker_check, job_id, job_id, urls, mode)
+"""
+import os
+import time
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from app.deps import settings
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "recon:locality:"
+
+# After a Redis error, route to shared queues for this long instead of paying a timeout per dispatch
+REDIS_RETRY_INTERVAL = 30.0
+
+# Seconds between node heartbeats; the load stage_route() sees is at most this old
+HEARTBEAT_INTERVAL = 5.0
+
+_redis = None
+_redis_down_until = 0.0
+
+
+def _client():
+    """Redis client, or None while routing is disabled or Redis is down"""
+    global _redis
+    if not settings.locality_routing_enabled or time.monotonic() < _redis_down_until:
+        return None
+    if _redis is None:
+        import redis
+
+        _redis = redis.Redis.from_url(settings.redis_url, socket_connect_timeout=0.5, socket_timeout=0.5,
+                                      decode_responses=True)
+    return _redis
+
+
+def _redis_failed(e: Exception):
+    global _redis, _redis_down_until
+    _redis = None
+    _redis_down_until = time.monotonic() + REDIS_RETRY_INTERVAL
+    logger.warning(f"Locality routing: Redis unavailable, using shared queues for {REDIS_RETRY_INTERVAL:.0f}s: {e}")
+
+
+def _job_key(job_id: str) -> str:
+    return f"{KEY_PREFIX}job:{job_id}"
+
+
+def _node_key(hostname: str) -> str:
+    return f"{KEY_PREFIX}node:{hostname}"
+
+
+# -- ownership ----------------------------------------------------------------
+
+def record_owner(job_id: str, hostname: Optional[str]):
+    """Mark hostname as the node holding the job directory"""
+    client = _client()
+    if client is None or not hostname:
+        return
+    try:
+        client.set(_job_key(job_id), hostname, ex=settings.locality_owner_ttl)
+    except Exception as e:
+        _redis_failed(e)
+
+
+def owner_of(job_id: str) -> Optional[str]:
+    client = _client()
+    if client is None:
+        return None
+    try:
+        return client.get(_job_key(job_id))
+    except Exception as e:
+        _redis_failed(e)
+        return None
+
+
+def forget_owner(job_id: str):
+    client = _client()
+    if client is None:
+        return
+    try:
+        client.delete(_job_key(job_id))
+    except Exception as e:
+        _redis_failed(e)
+
+
+# -- node load ----------------------------------------------------------------
+
+def node_heartbeat(hostname: str, capacity: int, active: int):
+    """Publish a node's concurrency and running tasks, alive for locality_node_ttl"""
+    client = _client()
+    if client is None:
+        return
+    try:
+        key = _node_key(hostname)
+        client.hset(key, mapping={"active": active, "capacity": capacity})
+        client.expire(key, settings.locality_node_ttl)
+    except Exception as e:
+        _redis_failed(e)
+
+
+def node_stopped(hostname: str):
+    client = _client()
+    if client is None:
+        return
+    try:
+        client.delete(_node_key(hostname))
+    except Exception as e:
+        _redis_failed(e)
+
+
+def node_available(hostname: str) -> bool:
+    """True if the node is alive and below locality_max_load of its capacity"""
+    client = _client()
+    if client is None:
+        return False
+    try:
+        load = client.hgetall(_node_key(hostname))
+    except Exception as e:
+        _redis_failed(e)
+        return False
+    if not load:
+        return False
+    capacity = max(1, int(load.get("capacity", 1)))
+    return int(load.get("active", 0)) < capacity * settings.locality_max_load
+
+
+# -- routing ------------------------------------------------------------------
+
+def stage_route(job_id: str) -> Dict[str, Any]:
+    """apply_async options sending a stage task of job_id to its owner, or {} for the shared queue"""
+    owner = owner_of(job_id)
+    if owner is None:
+        return {}
+    if not node_available(owner):
+        logger.info(f"[{job_id}] Owner {owner} is gone or saturated, using the shared queue")
+        return {}
+    from celery.utils import worker_direct
+
+    return {"queue": worker_direct(owner)}
+
+
+def dispatch_stage(task, job_id: str, *args, **kwargs):
+    """task.apply_async with locality routing for job_id"""
+    return task.apply_async(args=args, kwargs=kwargs, **stage_route(job_id))
+
+
+def setup_locality_tracking(celery_app):
+    """Connect worker signals that keep the node keys current"""
+    from celery import signals
+
+    @signals.worker_ready.connect(weak=False)
+    def _worker_ready(sender=None, **kwargs):
+        hostname = getattr(sender, "hostname", None)
+        if not settings.locality_routing_enabled or not hostname:
+            return
+        from celery.worker import state as worker_state
+
+        controller = getattr(sender, "controller", None)
+        capacity = getattr(controller, "concurrency", None) or celery_app.conf.worker_concurrency or os.cpu_count()
+
+        def beat():
+            next_eviction = time.monotonic() + settings.locality_evict_interval
+            while True:
+                node_heartbeat(hostname, capacity, len(worker_state.active_requests))
+                if time.monotonic() >= next_eviction:
+                    next_eviction = time.monotonic() + settings.locality_evict_interval
+                    try:
+                        from app.services.artifacts import evict_local_jobs
+
+                        evict_local_jobs(hostname)
+                    except Exception as e:
+                        logger.warning(f"Evicting local job directories failed: {e}")
+                time.sleep(min(HEARTBEAT_INTERVAL, settings.locality_node_ttl / 3))
+
+        threading.Thread(target=beat, name="locality-heartbeat", daemon=True).start()
+
+    @signals.worker_shutdown.connect(weak=False)
+    def _worker_shutdown(sender=None, **kwargs):
+        hostname = getattr(sender, "hostname", None)
+        if hostname:
+            node_stopped(hostname)
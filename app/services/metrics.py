@@ -0,0 +1,254 @@
+"""
+Prometheus metrics for the API, Celery workers and pipeline stages
+
+All metrics live in a module-local CollectorRegistry (not the global default
+one), so importing this module never exports anything by itself and tests
+need no Prometheus server, Redis or worker.
+"""
+import os
+import time
+import logging
+from contextvars import ContextVar
+from typing import Optional, List
+
+from prometheus_client import (
+    CollectorRegistry, Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+)
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.deps import settings
+
+logger = logging.getLogger(__name__)
+
+registry = CollectorRegistry(auto_describe=True)
+
+# Buckets for long-running work (tools and tasks can take up to ~45 minutes)
+LONG_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, 2700, 3600)
+
+# API
+HTTP_REQUEST_DURATION = Histogram(
+    'recon_http_request_duration_seconds', 'API request latency by route',
+    ['method', 'route', 'status'], registry=registry
+)
+HTTP_DB_QUERIES = Histogram(
+    'recon_http_db_queries_per_request', 'Database queries issued per API request',
+    ['route'], buckets=(0, 1, 2, 5, 10, 20, 50, 100, 250, 500, 1000), registry=registry
+)
+
+# Celery tasks
+TASK_DURATION = Histogram(
+    'recon_task_duration_seconds', 'Celery task runtime by task name',
+    ['task', 'state'], buckets=LONG_BUCKETS, registry=registry
+)
+
+# Pipeline stages and tools
+STAGE_DURATION = Histogram(
+    'recon_stage_duration_seconds', 'Wall time of a single tool invocation',
+    ['stage', 'tool'], buckets=LONG_BUCKETS, registry=registry
+)
+TOOL_FAILURES = Counter(
+    'recon_tool_failures_total', 'Tool invocations that exited non-zero',
+    ['tool'], registry=registry
+)
+TOOL_TIMEOUTS = Counter(
+    'recon_tool_timeouts_total', 'Tool invocations killed on timeout',
+    ['tool'], registry=registry
+)
+SUBDOMAINS_PROCESSED = Counter(
+    'recon_subdomains_processed_total', 'Subdomains produced by enumeration',
+    registry=registry
+)
+HOSTS_PROBED = Counter(
+    'recon_hosts_probed_total', 'Hosts returned by the probe stage',
+    registry=registry
+)
+
+# Caches (hit rate = rate(hit) / rate(hit + miss))
+CACHE_REQUESTS = Counter(
+    'recon_cache_requests_total', 'Cache lookups by cache and result',
+    ['cache', 'result'], registry=registry
+)
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    """Count a cache hit or miss"""
+    CACHE_REQUESTS.labels(cache=cache, result='hit' if hit else 'miss').inc()
+
+
+def render_metrics(collector_registry: CollectorRegistry = None) -> bytes:
+    """Render metrics in Prometheus text exposition format"""
+    return generate_latest(collector_registry or registry)
+
+
+# ---------------------------------------------------------------------------
+# Queue depth (read from the broker at scrape time)
+# ---------------------------------------------------------------------------
+
+class QueueDepthCollector:
+    """Report the number of pending messages for every queue in task_routes"""
+
+    def collect(self):
+        gauge = GaugeMetricFamily('recon_queue_depth', 'Messages waiting per Celery queue', labels=['queue'])
+        for queue, depth in get_queue_depths().items():
+            gauge.add_metric([queue], depth)
+        yield gauge
+
+    def describe(self):
+        return []
+
+
+def get_routed_queues() -> List[str]:
+    """Queue names declared in celery task_routes"""
+    from app.workers.celery_app import celery_app
+
+    routes = celery_app.conf.task_routes or {}
+    if not isinstance(routes, dict):
+        routes = next((r for r in routes if isinstance(r, dict)), {})
+    return sorted({route.get('queue') for route in routes.values() if route.get('queue')})
+
+
+def _queue_keys(queue: str) -> List[str]:
+    """
+    Redis lists holding a queue's messages
+
+    kombu's Redis transport keeps one list per priority step: the queue name
+    for step 0 and "<queue>\\x06\\x16<step>" for the others, so messages at
+    the default priority (5) are not in the plain list at all.
+    """
+    from kombu.transport.redis import Channel
+    from app.workers.celery_app import celery_app
+
+    options = celery_app.conf.broker_transport_options or {}
+    sep = options.get('sep', Channel.sep)
+    steps = options.get('priority_steps', Channel.priority_steps)
+    return [queue] + [f"{queue}{sep}{step}" for step in steps if step]
+
+
+def get_queue_depths() -> dict:
+    """Messages waiting in every routed queue on the Redis broker, all priorities (empty if unreachable)"""
+    import redis
+
+    depths = {}
+    try:
+        client = redis.Redis.from_url(settings.redis_url, socket_connect_timeout=0.5, socket_timeout=0.5)
+        pipe = client.pipeline()
+        queues = {queue: _queue_keys(queue) for queue in get_routed_queues()}
+        for keys in queues.values():
+            for key in keys:
+                pipe.llen(key)
+        lengths = iter(pipe.execute())
+        for queue, keys in queues.items():
+            depths[queue] = sum(next(lengths) for _ in keys)
+    except Exception as e:
+        logger.debug(f"Queue depth unavailable: {e}")
+    return depths
+
+
+registry.register(QueueDepthCollector())
+
+
+# ---------------------------------------------------------------------------
+# API instrumentation
+# ---------------------------------------------------------------------------
+
+# Mutable [count] holder for the request currently being served; shared with
+# threadpool workers because starlette copies the context into them
+_db_query_counter: ContextVar[Optional[list]] = ContextVar('recon_db_query_counter', default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_db_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _db_query_counter.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+def setup_metrics(app):
+    """Add request instrumentation middleware and the /metrics endpoint"""
+    from fastapi import Request
+    from fastapi.responses import Response
+
+    @app.middleware("http")
+    async def metrics_middleware(request: Request, call_next):
+        if request.url.path == "/metrics":
+            return await call_next(request)
+
+        counter = [0]
+        token = _db_query_counter.set(counter)
+        start = time.perf_counter()
+        status_code = 500
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+            return response
+        finally:
+            _db_query_counter.reset(token)
+            route = request.scope.get('route')
+            route_path = getattr(route, 'path', None) or 'unmatched'
+            HTTP_REQUEST_DURATION.labels(
+                method=request.method, route=route_path, status=str(status_code)
+            ).observe(time.perf_counter() - start)
+            HTTP_DB_QUERIES.labels(route=route_path).observe(counter[0])
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics_endpoint():
+        return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+
+# ---------------------------------------------------------------------------
+# Celery worker instrumentation
+# ---------------------------------------------------------------------------
+
+_task_started = {}
+
+
+def setup_worker_metrics():
+    """Connect Celery signals for task runtime and the worker exporter"""
+    from celery import signals
+
+    @signals.task_prerun.connect(weak=False)
+    def _task_prerun(task_id=None, **kwargs):
+        _task_started[task_id] = time.perf_counter()
+
+    @signals.task_postrun.connect(weak=False)
+    def _task_postrun(task_id=None, task=None, state=None, **kwargs):
+        started = _task_started.pop(task_id, None)
+        if started is not None and task is not None:
+            TASK_DURATION.labels(task=task.name, state=state or 'UNKNOWN').observe(time.perf_counter() - started)
+
+    @signals.worker_init.connect(weak=False)
+    def _start_exporter(**kwargs):
+        if settings.worker_metrics_port:
+            start_worker_exporter(settings.worker_metrics_port)
+
+    @signals.worker_process_shutdown.connect(weak=False)
+    def _mark_process_dead(pid=None, **kwargs):
+        if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+            from prometheus_client import multiprocess
+            multiprocess.mark_process_dead(pid or os.getpid())
+
+
+def start_worker_exporter(port: int):
+    """
+    Serve worker metrics over HTTP
+
+    With the prefork pool, tasks run in child processes; set
+    PROMETHEUS_MULTIPROC_DIR so their samples are aggregated here.
+    """
+    from prometheus_client import start_http_server
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        collector_registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(collector_registry)
+        collector_registry.register(QueueDepthCollector())
+    else:
+        collector_registry = registry
+
+    try:
+        start_http_server(port, registry=collector_registry)
+        logger.info(f"Worker metrics exporter listening on :{port}")
+    except OSError as e:
+        logger.warning(f"Worker metrics exporter could not bind :{port}: {e}")
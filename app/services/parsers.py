@@ -1,10 +1,194 @@
 """
 Parsers for tool outputs
+
+The iter_* functions are the streaming layer: they take any iterable of
+lines (an open file, io.StringIO, a list) and yield parsed records one at a
+time with precompiled patterns, so memory stays flat regardless of output
+size. The *Parser classes keep their list-returning API on top of them.
 """
+import io
+import csv
 import json
 import re
-from typing import List, Dict, Any, Optional
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Union
 from dataclasses import dataclass
+from urllib.parse import urlparse
+
+from app.services.leak_rules import LeakRuleEngine, get_leak_rule_engine
+
+try:
+    import orjson
+except ImportError:  # optional fast path
+    orjson = None
+
+
+def loads_json(data: Union[str, bytes]) -> Any:
+    """json.loads, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# orjson.JSONDecodeError and json.JSONDecodeError both subclass ValueError
+JSONDecodeError = ValueError
+
+# "sub.example.com (FQDN) --> a_record --> 1.2.3.4 (IPAddress)"
+AMASS_FQDN_RE = re.compile(r'^((?:[a-zA-Z0-9](?:[a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?\.)+[a-zA-Z]{2,})\s+\(FQDN\)')
+
+# "[403] 0 0.07s text/html https://example.com/.htaccess"
+SOURCELEAKHACKER_LINE_RE = re.compile(r'\[(\d+)\]\s+(\d+)\s+([\d.]+)s?\s+(\S+)\s+(.+)')
+
+# scheme://netloc prefix of a URL
+BASE_URL_RE = re.compile(r'^[a-zA-Z][a-zA-Z0-9+.\-]*://[^/?#]*')
+
+# httpx -probe errors: timeouts, and failures while still dialing the TCP connection
+HTTPX_TIMEOUT_ERROR_RE = re.compile(r'deadline exceeded|timeout|timed out', re.IGNORECASE)
+HTTPX_DIAL_ERROR_RE = re.compile(r'\bdial tcp\b')
+
+# Status codes that indicate a "live" host (server is responding, incl. 4xx/5xx)
+LIVE_STATUS_CODES = {200, 201, 202, 204, 301, 302, 303, 304, 307, 308, 400, 401, 403, 404, 500, 501, 502, 503, 504}
+
+
+# ---------------------------------------------------------------------------
+# Streaming layer
+# ---------------------------------------------------------------------------
+
+def iter_lines(lines: Iterable[str]) -> Iterator[str]:
+    """Yield stripped, non-empty lines"""
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield line
+
+
+def iter_subdomains(lines: Iterable[str], skip_log_lines: bool = True) -> Iterator[str]:
+    """Yield lowercased names from plain one-per-line enumerator output"""
+    for line in iter_lines(lines):
+        if '.' in line and not (skip_log_lines and line.startswith('[')):
+            yield line.lower()
+
+
+def iter_amass_fqdns(lines: Iterable[str]) -> Iterator[str]:
+    """Yield FQDNs from amass output in graph or simple format (not deduplicated)"""
+    match_fqdn = AMASS_FQDN_RE.match
+    for line in iter_lines(lines):
+        if '-->' in line:
+            match = match_fqdn(line)
+            if match:
+                yield match.group(1).lower()
+        elif not line.startswith('['):
+            name = line.split(None, 1)[0].lower()
+            if '.' in name:
+                yield name
+
+
+def iter_httpx_records(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Yield decoded httpx -json records, skipping lines that are not JSON objects"""
+    for line in iter_lines(lines):
+        try:
+            data = loads_json(line)
+        except JSONDecodeError:
+            continue
+        if isinstance(data, dict):
+            yield data
+
+
+def httpx_host_record(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Map an httpx JSON record to the live host dictionary stored per subdomain"""
+    status_code = data.get('status_code')
+    title = data.get('title')
+    return {
+        # Core fields
+        'url': data.get('url', ''),
+        'status_code': status_code,
+        'is_live': status_code in LIVE_STATUS_CODES if status_code else False,
+
+        # Essential httpx fields
+        'title': title.strip() if title else None,
+        'content_length': data.get('content_length'),
+        'webserver': data.get('webserver'),
+        'final_url': data.get('final_url'),
+        'body_hash': (data.get('hash') or {}).get('body_sha256'),  # httpx -hash sha256
+
+        # Useful httpx fields
+        'response_time': data.get('time'),  # httpx uses 'time' field (e.g., "11.4100539s")
+        'cdn_name': data.get('cdn_name'),
+        'content_type': data.get('content_type'),
+        'host': data.get('host'),  # Primary IP address
+
+        # Array fields
+        'chain_status_codes': data.get('chain_status_codes', []),
+        'ipv4_addresses': data.get('a', []),  # httpx uses 'a' for IPv4
+        'ipv6_addresses': data.get('aaaa', []),  # httpx uses 'aaaa' for IPv6
+        'technologies': data.get('tech', [])  # httpx uses 'tech' for technologies
+    }
+
+
+def _leak_record(engine: LeakRuleEngine, url: str, http_status: int, file_type: str, file_size: Any) -> Dict[str, Any]:
+    file_size = int(file_size) if str(file_size).isdigit() else 0
+    match = BASE_URL_RE.match(url)
+    if match:
+        base_url = match.group(0)
+    else:
+        parsed = urlparse(url)
+        base_url = f"{parsed.scheme}://{parsed.netloc}"
+    return {
+        'base_url': base_url,
+        'leaked_file_url': url,
+        'file_type': file_type,
+        'severity': engine.classify(url, http_status, file_size),
+        'file_size': file_size,
+        'http_status': http_status
+    }
+
+
+def iter_sourceleakhacker_stdout(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Yield leaks from SourceLeakHacker stdout ("[CODE] SIZE TIME TYPE URL"), skipping 404s"""
+    engine = get_leak_rule_engine()
+    match_line = SOURCELEAKHACKER_LINE_RE.match
+    for line in iter_lines(lines):
+        match = match_line(line)
+        if not match:
+            continue
+        http_status = int(match.group(1))
+        if http_status == 404:
+            continue
+        yield _leak_record(engine, match.group(5), http_status, match.group(4), match.group(2))
+
+
+def iter_sourceleakhacker_csv(csv_path: Union[str, Path]) -> Iterator[Dict[str, Any]]:
+    """Yield leaks from one SourceLeakHacker CSV file (named after its status code)"""
+    engine = get_leak_rule_engine()
+    stem = Path(csv_path).stem
+    http_status = int(stem) if stem.isdigit() else 0
+    with open(csv_path, 'r', encoding='utf-8', errors='ignore') as f:
+        for row in csv.DictReader(f):
+            url = row.get('URL', '')
+            if url:
+                yield _leak_record(engine, url, http_status, row.get('Type', 'unknown'), row.get('Length'))
+
+
+def iter_gowitness_jsonl(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Yield one record per captured screenshot from gowitness --write-jsonl output"""
+    for line in iter_lines(lines):
+        try:
+            data = loads_json(line)
+        except JSONDecodeError:
+            continue
+        if not isinstance(data, dict) or data.get('failed') or not data.get('url') or not data.get('file_name'):
+            continue
+        yield {
+            'url': data['url'],
+            'final_url': data.get('final_url'),
+            'status_code': data.get('response_code'),
+            'title': data.get('title'),
+            'filename': data['file_name']
+        }
+
+
+def _text_lines(output: str) -> io.StringIO:
+    return io.StringIO(output)
 
 
 @dataclass
@@ -32,21 +216,10 @@ class SubfinderParser:
     @staticmethod
     def parse(output: str) -> List[SubdomainResult]:
         """Parse subfinder output"""
-        results = []
-        lines = output.strip().split('\n')
-        
-        for line in lines:
-            line = line.strip()
-            if line and not line.startswith('[') and '.' in line:
-                # Clean up the subdomain
-                subdomain = line.lower().strip()
-                if subdomain:
-                    results.append(SubdomainResult(
-                        subdomain=subdomain,
-                        source="subfinder"
-                    ))
-        
-        return results
+        return [
+            SubdomainResult(subdomain=subdomain, source="subfinder")
+            for subdomain in iter_subdomains(_text_lines(output))
+        ]
 
 
 class AmassParser:
@@ -55,56 +228,17 @@ class AmassParser:
     @staticmethod
     def parse(output: str) -> List[SubdomainResult]:
         """Parse amass output and extract only FQDNs (subdomains)"""
-        results = []
-        seen_domains = set()
-        lines = output.strip().split('\n')
-
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-
-            # Check if this is graph format (contains arrows -->)
-            if '-->' in line:
-                # Extract FQDN from graph format
-                # Format: "subdomain.example.com (FQDN) --> relationship --> target"
-                fqdn = AmassParser._extract_fqdn_from_graph(line)
-                if fqdn and fqdn not in seen_domains:
-                    seen_domains.add(fqdn)
-                    results.append(SubdomainResult(
-                        subdomain=fqdn,
-                        source="amass"
-                    ))
-            else:
-                # Simple format - just domain names
-                if not line.startswith('[') and '.' in line:
-                    parts = line.split()
-                    if parts:
-                        subdomain = parts[0].lower().strip()
-                        if subdomain and '.' in subdomain and subdomain not in seen_domains:
-                            seen_domains.add(subdomain)
-                            results.append(SubdomainResult(
-                                subdomain=subdomain,
-                                source="amass"
-                            ))
-
-        return results
+        # dict.fromkeys deduplicates while keeping first-seen order
+        return [
+            SubdomainResult(subdomain=fqdn, source="amass")
+            for fqdn in dict.fromkeys(iter_amass_fqdns(_text_lines(output)))
+        ]
 
     @staticmethod
     def _extract_fqdn_from_graph(line: str) -> Optional[str]:
         """Extract FQDN from amass graph format line"""
-        import re
-
-        # Pattern to match: "domain.com (FQDN)" at the start of line
-        # Example: "bot.fpt.ai (FQDN) --> a_record --> 124.197.26.207"
-        match = re.match(r'^([a-zA-Z0-9]([a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?\.)+[a-zA-Z]{2,}\s+\(FQDN\)', line)
-
-        if match:
-            # Extract just the domain part (before the space and (FQDN))
-            domain = line.split('(FQDN)')[0].strip()
-            return domain.lower()
-
-        return None
+        match = AMASS_FQDN_RE.match(line.strip())
+        return match.group(1).lower() if match else None
 
 
 class AssetfinderParser:
@@ -113,20 +247,10 @@ class AssetfinderParser:
     @staticmethod
     def parse(output: str) -> List[SubdomainResult]:
         """Parse assetfinder output"""
-        results = []
-        lines = output.strip().split('\n')
-        
-        for line in lines:
-            line = line.strip()
-            if line and '.' in line:
-                subdomain = line.lower().strip()
-                if subdomain:
-                    results.append(SubdomainResult(
-                        subdomain=subdomain,
-                        source="assetfinder"
-                    ))
-        
-        return results
+        return [
+            SubdomainResult(subdomain=subdomain, source="assetfinder")
+            for subdomain in iter_subdomains(_text_lines(output), skip_log_lines=False)
+        ]
 
 
 class HttpxParser:
@@ -136,27 +260,24 @@ class HttpxParser:
     def parse(output: str) -> List[LiveCheckResult]:
         """Parse httpx JSON output"""
         results = []
-        lines = output.strip().split('\n')
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-                
+
+        for line in iter_lines(_text_lines(output)):
             try:
                 # Try to parse as JSON first (httpx -json output)
-                data = json.loads(line)
-                result = HttpxParser._parse_json_line(data)
-                if result:
-                    results.append(result)
-            except json.JSONDecodeError:
+                data = loads_json(line)
+            except JSONDecodeError:
                 # Fallback to simple URL parsing
                 if line.startswith('http'):
                     results.append(LiveCheckResult(
                         url=line,
                         is_live=True
                     ))
-        
+                continue
+
+            result = HttpxParser._parse_json_line(data) if isinstance(data, dict) else None
+            if result:
+                results.append(result)
+
         return results
     
     @staticmethod
@@ -215,15 +336,7 @@ class GoWitnessParser:
     @staticmethod
     def parse_file_list(output: str) -> List[str]:
         """Parse list of generated screenshot files"""
-        files = []
-        lines = output.strip().split('\n')
-        
-        for line in lines:
-            line = line.strip()
-            if line.endswith('.png') or line.endswith('.jpg'):
-                files.append(line)
-        
-        return files
+        return [line for line in iter_lines(_text_lines(output)) if line.endswith(('.png', '.jpg'))]
 
 
 class OutputCombiner:
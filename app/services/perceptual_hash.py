@@ -0,0 +1,132 @@
+"""
+Perceptual hashes of screenshots and near-duplicate grouping
+
+A dHash compares the brightness of horizontally adjacent pixels of a 9x8
+grayscale thumbnail, giving a 64-bit value (16 hex digits) that stays put
+under re-encoding, small rendering differences and a changed clock or
+hostname in the page. Two screenshots whose hashes differ in at most a few
+bits look the same: login portals, default server pages, browser error
+pages.
+
+    phash = dhash(path)                         # needs the optional Pillow package
+    groups = group_near_duplicates([(shot_id, phash), ...], max_distance=6)
+
+Grouping indexes the hashes in a BK-tree, so each radius query visits only
+the subtrees whose distance band can contain matches instead of every hash.
+"""
+import logging
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+try:
+    from PIL import Image
+except ImportError:  # optional: screenshots are not hashed without it
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+HASH_SIZE = 8  # 8x8 comparisons = 64 bits
+
+
+def dhash(path: Path, hash_size: int = HASH_SIZE) -> Optional[str]:
+    """Difference hash of an image as hex, or None without Pillow"""
+    if Image is None:
+        return None
+    with Image.open(path) as image:
+        pixels = list(image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR).getdata())
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return f"{value:0{hash_size * hash_size // 4}x}"
+
+
+def hash_files(paths: Iterable[Path], workers: int = 4) -> Dict[Path, str]:
+    """dHash of each distinct readable file; unreadable files are left out"""
+    if Image is None:
+        logger.info("Pillow is not installed, skipping screenshot hashes")
+        return {}
+    unique = list(dict.fromkeys(Path(path) for path in paths))
+
+    def safe_hash(path: Path) -> Optional[str]:
+        try:
+            return dhash(path)
+        except Exception as e:
+            logger.warning(f"Could not hash {path.name}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return {path: value for path, value in zip(unique, pool.map(safe_hash, unique)) if value is not None}
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class BKTree:
+    """Burkhard-Keller tree over integer hashes under Hamming distance"""
+
+    def __init__(self):
+        # node = [hash, item, {distance to parent: child node}]
+        self.root: Optional[list] = None
+        self.size = 0
+
+    def add(self, value: int, item: Any):
+        self.size += 1
+        if self.root is None:
+            self.root = [value, item, {}]
+            return
+        node = self.root
+        while True:
+            distance = hamming(value, node[0])
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, item, {}]
+                return
+            node = child
+
+    def search(self, value: int, radius: int) -> List[Tuple[int, Any]]:
+        """(distance, item) of every hash within radius of value"""
+        results = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node_value, item, children = stack.pop()
+            distance = hamming(value, node_value)
+            if distance <= radius:
+                results.append((distance, item))
+            # Triangle inequality: matches below a child lie within radius of distance
+            for child_distance, child in children.items():
+                if distance - radius <= child_distance <= distance + radius:
+                    stack.append(child)
+        return results
+
+
+def group_near_duplicates(items: Iterable[Tuple[Hashable, str]], max_distance: int) -> List[List[Hashable]]:
+    """
+    Group keys whose hex hashes are within max_distance bits
+
+    Greedy and order-preserving: the first ungrouped key becomes a group's
+    representative and takes every ungrouped key within max_distance of
+    it, nearest first. Groups come back in representative order.
+    """
+    entries = [(key, int(value, 16)) for key, value in items]
+    tree = BKTree()
+    for index, (_, value) in enumerate(entries):
+        tree.add(value, index)
+
+    grouped = [False] * len(entries)
+    groups = []
+    for index, (key, value) in enumerate(entries):
+        if grouped[index]:
+            continue
+        members = sorted((distance, other) for distance, other in tree.search(value, max_distance)
+                         if not grouped[other] and other != index)
+        group = [key]
+        grouped[index] = True
+        for _, other in members:
+            grouped[other] = True
+            group.append(entries[other][0])
+        groups.append(group)
+    return groups
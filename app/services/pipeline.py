@@ -1,18 +1,38 @@
 """
 Pipeline service for orchestrating reconnaissance tools
 """
+import io
 import os
+import re
 import asyncio
 import subprocess
+import json
 import logging
 from typing import List, Dict, Any, Optional, Callable
 from pathlib import Path
+from urllib.parse import urlparse
 
 from app.deps import settings
 from app.services.parsers import (
     SubfinderParser, AmassParser, AssetfinderParser,
-    HttpxParser, GoWitnessParser, OutputCombiner
+    HttpxParser, GoWitnessParser, OutputCombiner,
+    iter_lines, iter_amass_fqdns, iter_httpx_records, httpx_host_record,
+    iter_sourceleakhacker_stdout, iter_sourceleakhacker_csv, iter_gowitness_jsonl, loads_json, JSONDecodeError,
+    HTTPX_TIMEOUT_ERROR_RE, HTTPX_DIAL_ERROR_RE
 )
+from app.services.telemetry import ToolRunner
+from app.services.scope import DomainScope
+from app.services.dns_resolver import AsyncResolver, WildcardDetector, parent_zone
+from app.services.dns_cache import get_dns_cache
+from app.services.probe import NativeProber
+from app.services.fingerprint import fingerprint_records
+from app.services.response_store import ResponseStore
+from app.services.clustering import assign_clusters, split_representatives, attribute_to_members
+from app.services.thumbnails import render_derivatives
+from app.services.perceptual_hash import hash_files
+from app.services.artifacts import get_artifact_store, job_path, file_digest
+from app.services import metrics
+from app.services.tracing import traced
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -21,13 +41,17 @@ logger = logging.getLogger(__name__)
 class ReconPipeline:
     """Main reconnaissance pipeline with enhanced CLI tool integration"""
 
-    def __init__(self, job_id: str, domain: str, progress_callback: Optional[Callable] = None, amass_config: dict = None):
+    def __init__(self, job_id: str, domain: str, progress_callback: Optional[Callable] = None, amass_config: dict = None,
+                 scope_config: dict = None, probe_config: dict = None):
         self.job_id = job_id
         self.domain = domain
         self.job_dir = Path(settings.jobs_directory) / job_id
         self.shots_dir = self.job_dir / "shots"
         self.progress_callback = progress_callback
 
+        # Per-tool wall time / CPU / RSS / I/O records for this run
+        self.tool_runner = ToolRunner(job_id)
+
         # Amass configuration
         self.amass_config = amass_config or {
             "mode": "passive",
@@ -36,10 +60,27 @@ class ReconPipeline:
             "use_wordlist": False
         }
 
+        # httpx probe configuration (per-scan overrides of the settings defaults)
+        self.probe_config = {
+            "engine": settings.probe_engine,
+            "mode": settings.httpx_probe_mode,
+            "fast_timeout": settings.httpx_fast_timeout,
+            "fast_retries": settings.httpx_fast_retries,
+            "slow_timeout": settings.httpx_slow_timeout,
+            "slow_retries": settings.httpx_slow_retries,
+            **{key: value for key, value in (probe_config or {}).items() if value is not None}
+        }
+
+        # Files of finished jobs live in the artifact store (None when disabled)
+        self.artifacts = get_artifact_store()
+
         # Create job directories
         self.job_dir.mkdir(parents=True, exist_ok=True)
         self.shots_dir.mkdir(parents=True, exist_ok=True)
 
+        # Local copies kept from an earlier stage may be older than what another node committed since
+        self.refresh_local_files()
+
         # File paths for pipeline stages
         self.subs_file = self.job_dir / "subs.txt"
         self.amass_file = self.job_dir / "amass.txt"
@@ -50,14 +91,44 @@ class ReconPipeline:
         self.waf_results_file = self.job_dir / "waf_results.json"
         self.urls_no_waf_file = self.job_dir / "urls_no_waf.txt"
         self.leaks_output_dir = self.job_dir / "leaks_results"
+        self.subfinder_file = self.job_dir / "subfinder.txt"
+        self.scope_file = self.job_dir / "scope.json"
+        self.dns_file = self.job_dir / "resolved.jsonl"
+        self.resolved_file = self.job_dir / "resolved.txt"
+        self.gowitness_urls_file = self.job_dir / "urls_for_gowitness.txt"
+        self.screenshot_manifest = self.job_dir / "gowitness.jsonl"  # URL -> screenshot file, written by gowitness
+
+        # A/AAAA/CNAME data per resolved name, kept for the probe and later stages
+        self.dns_records: Dict[str, Dict[str, Any]] = {}
+
+        # Captured response headers/bodies (fingerprinting needs them too)
+        self.response_store: Optional[ResponseStore] = None
+        if settings.response_store_enabled or settings.fingerprint_enabled:
+            self.response_store = ResponseStore(
+                self.job_dir,
+                compression=settings.response_store_compression,
+                level=settings.response_store_level,
+                max_body_bytes=settings.response_capture_bytes
+            )
+
+        # Scope (root domain + include/exclude patterns) applied to every enumerator's output.
+        # Saved with the job so follow-up tasks and manual additions use the same scope.
+        if scope_config is None:
+            self.stage_inputs("scope.json")
+        if scope_config is None and self.scope_file.exists():
+            self.scope = DomainScope.load(self.scope_file, domain)
+        else:
+            self.scope = DomainScope.from_config(domain, scope_config)
+            self.scope.save(self.scope_file)
     
+    @traced("pipeline.run")
     async def run_full_pipeline(self) -> Dict[str, Any]:
         """
         Run the complete reconnaissance pipeline with enhanced CLI integration
 
         Pipeline Steps (4 steps total):
         1. Subdomain enumeration (subfinder + amass + assetfinder)
-        2. Live host detection (httprobe + httpx)
+        2. Live host detection (DNS resolution + httpx on names that resolve)
         3. WAF detection (wafw00f)
         4. Screenshot capture (gowitness)
 
@@ -75,10 +146,14 @@ class ReconPipeline:
             'errors': [],
             'stats': {
                 'total_subdomains': 0,
+                'resolved_hosts': 0,
+                'wildcard_hosts': 0,
                 'live_hosts': 0,
+                'host_clusters': 0,
                 'screenshots_taken': 0,
                 'waf_protected': 0,
-                'leaks_found': 0  # Will be 0 - use selective scanning API instead
+                'leaks_found': 0,  # Will be 0 - use selective scanning API instead
+                'stage_runs': []
             }
         }
 
@@ -90,18 +165,24 @@ class ReconPipeline:
             subdomains = await self.enumerate_subdomains_enhanced()
             results['subdomains'] = subdomains
             results['stats']['total_subdomains'] = len(subdomains)
+            metrics.SUBDOMAINS_PROCESSED.inc(len(subdomains))
 
             if not subdomains:
                 results['errors'].append("No subdomains found")
                 return results
 
-            # Step 2: Live host detection (httprobe + httpx)
-            self._update_progress(40, f"Checking live hosts for {len(subdomains)} subdomains...")
-            logger.info(f"[{self.job_id}] Checking live hosts for {len(subdomains)} subdomains")
+            # Step 2: Live host detection (DNS resolution + httpx)
+            self._update_progress(40, f"Resolving {len(subdomains)} subdomains...")
+            probe_targets = await self.resolve_subdomains(subdomains)
+            results['stats']['resolved_hosts'] = len(self.dns_records)
+            results['stats']['wildcard_hosts'] = len(self.dns_records) - len(probe_targets) if self.dns_records else 0
 
-            live_hosts = await self.check_live_hosts_enhanced(subdomains)
+            logger.info(f"[{self.job_id}] Checking live hosts for {len(probe_targets)} subdomains")
+            live_hosts = await self.check_live_hosts_enhanced(probe_targets)
             results['live_hosts'] = live_hosts
             results['stats']['live_hosts'] = len(live_hosts)
+            results['stats']['host_clusters'] = len({h['cluster_id'] for h in live_hosts if h.get('cluster_id')})
+            metrics.HOSTS_PROBED.inc(len(live_hosts))
 
             if not live_hosts:
                 results['errors'].append("No live hosts found")
@@ -143,9 +224,12 @@ class ReconPipeline:
             error_msg = f"Pipeline error: {str(e)}"
             results['errors'].append(error_msg)
             logger.error(f"[{self.job_id}] {error_msg}")
+        finally:
+            results['stats']['stage_runs'] = self.tool_runner.to_list()
 
         return results
     
+    @traced("stage.enumeration")
     async def enumerate_subdomains_enhanced(self) -> List[str]:
         """Enhanced subdomain enumeration with proper CLI tool integration"""
 
@@ -180,13 +264,82 @@ class ReconPipeline:
 
         return subdomains
     
+    @traced("stage.resolve")
+    async def resolve_subdomains(self, subdomains: List[str]) -> List[str]:
+        """
+        Resolve subdomains and return the names worth probing with httpx
+
+        Names that do not resolve, or whose answers only come from a wildcard
+        record of their parent zone, are dropped. All results are written to
+        resolved.jsonl and the names to probe to resolved.txt, which httpx
+        reads instead of subs.txt. If the stage is disabled or no resolver
+        answers, every name is probed as before.
+        """
+        self.resolved_file.unlink(missing_ok=True)
+        self.dns_records = {}
+        if not settings.dns_resolution_enabled:
+            return subdomains
+
+        cache = get_dns_cache()
+        resolver = AsyncResolver(
+            settings.dns_resolvers,
+            timeout=settings.dns_timeout,
+            retries=settings.dns_retries,
+            concurrency=settings.dns_concurrency,
+            cache=cache
+        )
+        try:
+            if not await resolver.is_reachable(self.domain):
+                logger.warning(f"[{self.job_id}] No DNS resolver reachable, probing all {len(subdomains)} subdomains")
+                return subdomains
+
+            hosts = await resolver.resolve_many(subdomains)
+            resolved = [host for host in hosts if host.resolved]
+
+            # Only probe parent zones inside the scan scope (never e.g. "com")
+            detector = WildcardDetector(resolver, probes=settings.dns_wildcard_probes)
+            await detector.detect(parent for parent in {parent_zone(h.name) for h in resolved} if parent in self.scope)
+            for host in resolved:
+                host.wildcard = detector.is_wildcard(host)
+        except Exception as e:
+            logger.error(f"[{self.job_id}] DNS resolution error, probing all subdomains: {e}")
+            return subdomains
+        finally:
+            resolver.close()
+            if cache is not None:
+                # Its Redis connections belong to this task's event loop
+                await cache.aclose()
+
+        targets = []
+        with open(self.dns_file, 'w', encoding='utf-8') as f:
+            for host in hosts:
+                f.write(json.dumps(host.to_dict()) + "\n")
+                if host.resolved:
+                    self.dns_records[host.name] = host.to_dict()
+                    if not host.wildcard:
+                        targets.append(host.name)
+
+        with open(self.resolved_file, 'w', encoding='utf-8') as f:
+            f.writelines(f"{name}\n" for name in targets)
+
+        logger.info(
+            f"[{self.job_id}] DNS: {len(resolved)}/{len(subdomains)} resolved, "
+            f"{len(resolved) - len(targets)} wildcard, {resolver.queries_sent} queries, "
+            f"{resolver.cache_hits} cache hits"
+        )
+        return targets
+
+    @traced("stage.probe")
     async def check_live_hosts_enhanced(self, subdomains: List[str]) -> List[Dict[str, Any]]:
         """Enhanced live host detection with httpx (httprobe removed for optimization)"""
 
-        # Run httpx for comprehensive live host analysis
+        # Run httpx (CLI or in-process engine) for comprehensive live host analysis
         self._update_progress(55, "Running httpx for live host detection and analysis...")
         try:
-            await self._run_httpx_cli()
+            if self.probe_config["engine"] == "native":
+                await self._run_native_probe()
+            else:
+                await self._run_httpx_cli()
             logger.info(f"[{self.job_id}] Httpx completed")
         except Exception as e:
             logger.error(f"[{self.job_id}] Httpx error: {e}")
@@ -194,15 +347,55 @@ class ReconPipeline:
 
         # Parse httpx JSON results
         live_hosts = await self._parse_live_results()
+        if settings.fingerprint_enabled and live_hosts:
+            await self.fingerprint_live_hosts(live_hosts)
+        if settings.host_clustering_enabled and live_hosts:
+            await self.cluster_live_hosts(live_hosts)
+        if self.response_store is not None:
+            self.response_store.close()
         self._update_progress(75, f"Found {len(live_hosts)} live hosts")
 
         return live_hosts
     
+    @traced("stage.fingerprint")
+    async def fingerprint_live_hosts(self, live_hosts: List[Dict[str, Any]]) -> int:
+        """Merge in-process fingerprints of the captured responses into each host's technologies"""
+        try:
+            with open(self.live_file, 'r', encoding='utf-8', errors='ignore') as f:
+                records = list(iter_httpx_records(f))
+            by_url = await asyncio.to_thread(fingerprint_records, records, lookup=self.response_store.get)
+        except Exception as e:
+            logger.warning(f"[{self.job_id}] Fingerprinting failed, keeping httpx technologies: {e}")
+            return 0
+
+        for host in live_hosts:
+            technologies = by_url.get(host['url'])
+            if technologies is not None:
+                host['technologies'] = technologies
+        logger.info(f"[{self.job_id}] Fingerprinted {len(by_url)} responses")
+        return len(by_url)
+
+    @traced("stage.cluster")
+    async def cluster_live_hosts(self, live_hosts: List[Dict[str, Any]]) -> int:
+        """Tag hosts serving the same page with a shared cluster_id; returns the number of clusters"""
+        clusters = assign_clusters(live_hosts)
+        redundant = sum(len(members) - 1 for members in clusters.values())
+        logger.info(f"[{self.job_id}] Clustered {len(live_hosts)} hosts into {len(clusters)} clusters, "
+                    f"{redundant} hosts reuse their cluster's screenshot and leak results")
+        return len(clusters)
+
+    @traced("stage.screenshots")
     async def capture_screenshots_enhanced(self, live_hosts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Enhanced screenshot capture using gowitness with file input"""
+        """
+        Enhanced screenshot capture using gowitness with file input
+
+        Only one host per cluster is captured; the other members get a copy
+        of its screenshot record with their own URL.
+        """
         try:
             # Step 1: Prepare URLs file for gowitness
-            urls = [host['url'] for host in live_hosts]
+            targets, members = split_representatives(live_hosts)
+            urls = [host['url'] for host in targets]
             await self._prepare_urls_for_gowitness(urls)
 
             # Step 2: Run gowitness with file input
@@ -212,23 +405,135 @@ class ReconPipeline:
 
             # Step 3: Parse screenshot results
             screenshots = await self._parse_screenshot_results()
+            if screenshots:
+                await self.hash_screenshots(screenshots)
+            if settings.screenshot_derivatives == "eager" and screenshots:
+                await self.render_screenshot_derivatives(screenshots)
+            if members:
+                screenshots = attribute_to_members(screenshots, members, 'url')
 
             return screenshots
         except Exception as e:
             logger.error(f"[{self.job_id}] Gowitness error: {e}")
             return []
     
+    @traced("stage.screenshot_hash")
+    async def hash_screenshots(self, screenshots: List[Dict[str, Any]]) -> int:
+        """
+        Set each screenshot's 'phash' to the dHash of its image
+
+        With screenshot_store_duplicates_once, a screenshot whose file is
+        byte-identical to an earlier one's has its file deleted and points
+        at the earlier file. Equal dHashes only make candidates: pages that
+        differ in a hostname or a clock hash the same.
+        """
+        try:
+            hashes = await asyncio.to_thread(
+                hash_files, [self.job_dir / shot['file_path'] for shot in screenshots],
+                settings.screenshot_derivative_workers
+            )
+        except Exception as e:
+            logger.warning(f"[{self.job_id}] Screenshot hashing failed: {e}")
+            return 0
+
+        first: Dict[str, List[Dict[str, Any]]] = {}
+        digests: Dict[Path, str] = {}
+
+        def same_file(kept: Dict[str, Any], shot: Dict[str, Any]) -> bool:
+            for path in (self.job_dir / kept['file_path'], self.job_dir / shot['file_path']):
+                if path not in digests:
+                    digests[path] = file_digest(path)
+            return digests[self.job_dir / kept['file_path']] == digests[self.job_dir / shot['file_path']]
+
+        def assign() -> int:
+            removed = 0
+            for shot in screenshots:
+                phash = hashes.get(self.job_dir / shot['file_path'])
+                if phash is None:
+                    continue
+                shot['phash'] = phash
+                kept = first.setdefault(phash, [])
+                if settings.screenshot_store_duplicates_once:
+                    original = next((k for k in kept if k['file_path'] != shot['file_path'] and same_file(k, shot)), None)
+                    if original is not None:
+                        (self.job_dir / shot['file_path']).unlink(missing_ok=True)
+                        shot.update(filename=original['filename'], file_path=original['file_path'],
+                                    file_size=original['file_size'])
+                        removed += 1
+                        continue
+                kept.append(shot)
+            return removed
+
+        try:
+            removed = await asyncio.to_thread(assign)
+        except Exception as e:
+            logger.warning(f"[{self.job_id}] Screenshot deduplication failed: {e}")
+            removed = 0
+
+        logger.info(f"[{self.job_id}] Hashed {len(hashes)} screenshots, {len(first)} distinct"
+                    + (f", {removed} duplicate files removed" if removed else ""))
+        return len(hashes)
+
+    @traced("stage.thumbnails")
+    async def render_screenshot_derivatives(self, screenshots: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Render thumbnail and WebP full views of the captured screenshots"""
+        sources = [self.job_dir / shot['file_path'] for shot in screenshots]
+        try:
+            stats = await asyncio.to_thread(render_derivatives, self.job_dir, sources)
+        except Exception as e:
+            logger.warning(f"[{self.job_id}] Screenshot derivatives failed, they will be rendered on request: {e}")
+            return {}
+        logger.info(f"[{self.job_id}] Screenshot derivatives: {stats['rendered']} rendered, {stats['failed']} failed")
+        return stats
+
+    def stage_inputs(self, *relpaths: str):
+        """Fetch files of an earlier task back from the artifact store into the job directory"""
+        if self.artifacts is None:
+            return
+        for relpath in relpaths:
+            job_path(self.job_id, relpath)
+
+    def refresh_local_files(self) -> int:
+        """Replace stale local copies of the job's stored files (no-op when the store is disabled)"""
+        if self.artifacts is None:
+            return 0
+        try:
+            return self.artifacts.refresh_local(self.job_id, self.job_dir)
+        except Exception as e:
+            logger.warning(f"[{self.job_id}] Could not check local job files against the artifact store: {e}")
+            return 0
+
+    def commit_artifacts(self) -> Dict[str, int]:
+        """Move the job directory's files into the artifact store (no-op when disabled)"""
+        if self.artifacts is None:
+            return {}
+        try:
+            # With locality routing the owner keeps its copy for the job's next stages, until
+            # evict_local_jobs() removes it once another node owns the job
+            stats = self.artifacts.commit_job(self.job_id, self.job_dir,
+                                              remove_local=not settings.locality_routing_enabled)
+        except Exception as e:
+            logger.warning(f"[{self.job_id}] Could not commit job files to the artifact store: {e}")
+            return {}
+        logger.info(f"[{self.job_id}] Artifact store: {stats['files']} files ({stats['bytes']} bytes), "
+                    f"{stats['new_blobs']} new blobs ({stats['stored_bytes']} bytes stored)")
+        return stats
+
     # Enhanced CLI tool methods
     async def _run_subfinder_cli(self):
-        """Run subfinder with direct file output"""
+        """Run subfinder, then merge its in-scope results into subs.txt"""
         cmd = [
             settings.subfinder_path,
             "-d", self.domain,
             "-silent",
-            "-o", "subs.txt"  # Just filename since cwd is job_dir
+            "-o", self.subfinder_file.name  # Just filename since cwd is job_dir
         ]
         await self._run_command_with_logging(cmd, "subfinder")
 
+        if self.subfinder_file.exists():
+            with open(self.subfinder_file, 'r', encoding='utf-8', errors='ignore') as f:
+                await self._merge_in_scope(f, self.subs_file, "subfinder")
+
     async def _run_amass_cli(self):
         """Run amass with configurable mode, timeout, and options"""
         # Run amass and save raw output
@@ -316,68 +621,46 @@ class ReconPipeline:
 
     async def _merge_files_with_anew(self, source_file: Path, target_file: Path):
         """Merge source file into target file using anew (Windows-safe)"""
-        import subprocess
-
         # Read source file content
         with open(source_file, 'r', encoding='utf-8', errors='ignore') as f:
             content = f.read()
 
         # Use anew via stdin to merge into target
-        result = subprocess.run(
+        result = self.tool_runner.run(
             [settings.anew_path, str(target_file)],
-            input=content,
-            capture_output=True,
-            text=True,
-            encoding='utf-8',
-            errors='ignore'
+            "anew",
+            input=content
         )
 
         logger.info(f"[{self.job_id}] Merged {source_file.name} into {target_file.name}")
 
     async def _merge_text_with_anew(self, text: str, target_file: Path):
         """Merge text content into target file using anew (Windows-safe)"""
-        import subprocess
-
-        result = subprocess.run(
+        result = self.tool_runner.run(
             [settings.anew_path, str(target_file)],
-            input=text,
-            capture_output=True,
-            text=True,
-            encoding='utf-8',
-            errors='ignore'
+            "anew",
+            input=text
         )
 
         logger.debug(f"[{self.job_id}] Merged text into {target_file.name}")
 
-    async def _filter_amass_output(self, raw_file: Path):
-        """Filter amass output to extract only FQDNs"""
-        import re
+    async def _merge_in_scope(self, lines, target_file: Path, tool_name: str):
+        """Drop out-of-scope names from a tool's output, then merge the rest into target_file"""
+        names = list(iter_lines(lines))
+        in_scope = list(self.scope.filter(names))
 
-        fqdns = set()
+        total = len(names)
+        if total != len(in_scope):
+            logger.info(f"[{self.job_id}] {tool_name}: dropped {total - len(in_scope)} of {total} names outside scope")
+        if in_scope:
+            await self._merge_text_with_anew(''.join(f"{name}\n" for name in in_scope), target_file)
 
+    @traced("parse.amass")
+    async def _filter_amass_output(self, raw_file: Path):
+        """Filter amass output to extract only FQDNs"""
         with open(raw_file, 'r', encoding='utf-8', errors='ignore') as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-
-                # Check if this is graph format (contains -->)
-                if '-->' in line:
-                    # Extract FQDN from graph format
-                    # Pattern: "domain.com (FQDN) --> ..."
-                    match = re.match(r'^([a-zA-Z0-9]([a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?\.)+[a-zA-Z]{2,}\s+\(FQDN\)', line)
-                    if match:
-                        domain = line.split('(FQDN)')[0].strip().lower()
-                        # Only add if it's a subdomain of target domain
-                        if domain.endswith(self.domain):
-                            fqdns.add(domain)
-                else:
-                    # Simple format - just domain names
-                    parts = line.split()
-                    if parts and '.' in parts[0]:
-                        domain = parts[0].lower().strip()
-                        if domain.endswith(self.domain):
-                            fqdns.add(domain)
+            # Only keep in-scope names
+            fqdns = set(self.scope.filter(iter_amass_fqdns(f)))
 
         # Write filtered FQDNs to amass output file
         with open(self.amass_file, 'w', encoding='utf-8') as f:
@@ -389,72 +672,194 @@ class ReconPipeline:
     async def _run_assetfinder_cli(self):
         """Run assetfinder and merge with anew (Windows-safe)"""
         # Run assetfinder to get output
-        import subprocess
-        result = subprocess.run(
+        result = self.tool_runner.run(
             [settings.assetfinder_path, "--subs-only", self.domain],
-            capture_output=True,
-            text=True,
-            timeout=settings.assetfinder_timeout,
-            encoding='utf-8',
-            errors='ignore'
+            "assetfinder",
+            timeout=settings.assetfinder_timeout
         )
 
         if result.returncode == 0 and result.stdout:
-            # Merge with existing subs using anew via stdin
-            await self._merge_text_with_anew(result.stdout, self.subs_file)
+            # Merge in-scope names with existing subs using anew via stdin
+            await self._merge_in_scope(io.StringIO(result.stdout), self.subs_file, "assetfinder")
             logger.info(f"[{self.job_id}] Assetfinder completed")
 
 
 
-    async def _run_httpx_cli(self):
-        """Run httpx for detailed live host analysis (Windows-safe)"""
-        if not self.subs_file.exists():
+    def _httpx_command(self, timeout: int, retries: int, probe: bool = False) -> List[str]:
+        # Capture ALL status codes including 5xx errors; -follow-redirects to get the final status code
+        cmd = [
+            settings.httpx_path,
+            "-silent",
+            "-title",
+            "-tech-detect",
+            "-json",
+            "-hash", "sha256",  # body_sha256, used to cluster hosts serving the same page
+            "-retries", str(retries),
+            "-timeout", str(timeout),
+            "-follow-redirects"
+        ]
+        if probe:
+            # Also emit {"failed": true, "error": ...} records for hosts that did not answer
+            cmd.append("-probe")
+        if self.response_store is not None:
+            # Response headers and bodies, moved to the response store before live.txt is written
+            cmd.append("-include-response")
+        return cmd
+
+    def _run_httpx_phase(self, hosts: List[str], timeout: int, retries: int, phase: str,
+                         probe: bool = False) -> Optional[List[str]]:
+        """Probe hosts with one httpx invocation; JSON lines, or None if httpx failed"""
+        result = self.tool_runner.run(
+            self._httpx_command(timeout, retries, probe),
+            "httpx",
+            input="".join(f"{host}\n" for host in hosts),
+            timeout=settings.httpx_timeout,
+            cwd=str(self.job_dir)
+        )
+        if result.returncode != 0:
+            logger.warning(f"[{self.job_id}] Httpx {phase} phase exited with {result.returncode}")
+            return None
+        return [line for line in (result.stdout or "").splitlines() if line.strip()]
+
+    @staticmethod
+    def _split_sweep_results(hosts: List[str], lines: List[str]):
+        """
+        Split -probe output into (answered lines, hosts to re-probe)
+
+        Only hosts that accepted a connection and then timed out (TLS
+        handshake, waiting for headers), or have no record at all, are worth
+        a slower retry. Hosts that refused, failed DNS/TLS, or did not even
+        complete the TCP handshake within the sweep timeout are treated as
+        dead: a filtered port does not answer a SYN given 30s either.
+        """
+        answered, done = [], set()
+        for line in lines:
+            try:
+                data = loads_json(line)
+            except JSONDecodeError:
+                continue
+            error = data.get('error') or ''
+            if data.get('failed') and HTTPX_TIMEOUT_ERROR_RE.search(error) and not HTTPX_DIAL_ERROR_RE.search(error):
+                continue
+            if not data.get('failed'):
+                answered.append(line)
+            done.add((data.get('input') or urlparse(data.get('url', '')).hostname or '').lower())
+        return answered, [host for host in hosts if host.lower() not in done]
+
+    def _probe_input_hosts(self) -> List[str]:
+        """Names that passed DNS resolution, or every subdomain if that stage was skipped"""
+        input_file = self.resolved_file if self.resolved_file.exists() else self.subs_file
+        if not input_file.exists():
+            return []
+        with open(input_file, 'r', encoding='utf-8', errors='ignore') as f:
+            return [line.strip() for line in f if line.strip()]
+
+    @traced("probe.native")
+    async def _run_native_probe(self):
+        """Probe hosts in-process and write httpx-CLI-compatible JSON lines to live.txt"""
+        hosts = self._probe_input_hosts()
+        if not hosts:
             return
 
-        # Read subs and pipe to httpx via stdin
-        import subprocess
-        with open(self.subs_file, 'r', encoding='utf-8', errors='ignore') as f:
-            subs_content = f.read()
-
-        # Capture ALL status codes including 5xx errors
-        # Added flags:
-        # -retries 3: Retry failed requests up to 3 times (fixes domains that timeout on first attempt)
-        # -timeout 30: Set timeout to 30 seconds per request
-        # -follow-redirects: Follow HTTP redirects to get final status code
-        result = subprocess.run(
-            [
-                settings.httpx_path,
-                "-silent",
-                "-title",
-                "-tech-detect",
-                "-json",
-                "-retries", "3",
-                "-timeout", "30",
-                "-follow-redirects"
-            ],
-            input=subs_content,
-            capture_output=True,
-            text=True,
-            timeout=settings.httpx_timeout,
-            cwd=str(self.job_dir),
-            encoding='utf-8',
-            errors='ignore'
+        config = self.probe_config
+        prober = NativeProber(
+            connect_timeout=config["fast_timeout"],
+            read_timeout=config["slow_timeout"],
+            retries=config["slow_retries"],
+            concurrency=settings.probe_concurrency,
+            per_host_connections=settings.probe_per_host_connections,
+            http2=settings.probe_http2,
+            # One byte over the capture size so the store can tell the body was truncated
+            capture_bytes=settings.response_capture_bytes + 1 if self.response_store is not None else 0
         )
 
-        if result.returncode == 0 and result.stdout:
+        answered = 0
+        with open(self.live_file, 'w', encoding='utf-8') as f:
+            def write(record: Dict[str, Any]):
+                nonlocal answered
+                if not record.get('failed'):
+                    if self.response_store is not None:
+                        self.response_store.add(record)
+                    f.write(json.dumps(record) + "\n")
+                    answered += 1
+
+            await prober.probe_many(hosts, self.dns_records, on_record=write)
+        self._log_response_store()
+
+        logger.info(f"[{self.job_id}] Native probe: {answered}/{len(hosts)} hosts answered, "
+                    f"{prober.requests_sent} requests (http2={prober.http2})")
+
+    async def _run_httpx_cli(self):
+        """
+        Run httpx for detailed live host analysis (Windows-safe)
+
+        In "two_phase" mode every host is swept once with a short timeout and
+        no retries, then only hosts that connected but timed out are probed
+        again with the slow settings, so dead hosts cost one short attempt
+        instead of several long ones. "single" mode runs the slow settings on
+        every host.
+        """
+        hosts = self._probe_input_hosts()
+        if not hosts:
+            return
+
+        config = self.probe_config
+        output: Optional[List[str]] = None
+        pending = hosts
+
+        if config["mode"] == "two_phase":
+            sweep = self._run_httpx_phase(hosts, config["fast_timeout"], config["fast_retries"], "fast", probe=True)
+            if sweep is not None:
+                output, pending = self._split_sweep_results(hosts, sweep)
+                logger.info(f"[{self.job_id}] Httpx fast phase: {len(output)}/{len(hosts)} answered, "
+                            f"{len(pending)} timed out")
+
+        if pending:
+            slow = self._run_httpx_phase(pending, config["slow_timeout"], config["slow_retries"],
+                                         "slow" if output is not None else "single")
+            if slow is not None:
+                output = (output or []) + slow
+
+        if output:
             with open(self.live_file, 'w', encoding='utf-8') as f:
-                f.write(result.stdout)
-            logger.info(f"[{self.job_id}] Httpx completed with retries and follow-redirects enabled")
+                if self.response_store is None:
+                    f.writelines(f"{line}\n" for line in output)
+                else:
+                    for line in output:
+                        f.write(self._store_response_line(line) + "\n")
+            self._log_response_store()
+
+    def _store_response_line(self, line: str) -> str:
+        """Move the captured response of one httpx JSON line into the response store"""
+        try:
+            data = loads_json(line)
+        except JSONDecodeError:
+            return line
+        if not isinstance(data, dict) or self.response_store.add(data) is None:
+            return line
+        return json.dumps(data)
+
+    def _log_response_store(self):
+        store = self.response_store
+        if store is None:
+            return
+        store.flush()
+        stats = store.stats
+        logger.info(
+            f"[{self.job_id}] Response store: {stats['responses']} responses, {stats['bodies_written']} bodies "
+            f"written, {stats['duplicate_bodies']} duplicates, {stats['raw_bytes']} -> {stats['stored_bytes']} bytes"
+        )
 
     async def _run_gowitness_cli(self):
         """Run gowitness for screenshot capture (v3.x compatible)"""
-        urls_file = self.job_dir / "urls_for_gowitness.txt"
+        urls_file = self.gowitness_urls_file
         if not urls_file.exists() or urls_file.stat().st_size == 0:
             logger.warning(f"[{self.job_id}] Skip gowitness: URLs file missing/empty")
             return
 
-        # Ensure screenshots directory exists
+        # Ensure screenshots directory exists; drop the manifest of an earlier run
         self.shots_dir.mkdir(exist_ok=True)
+        self.screenshot_manifest.unlink(missing_ok=True)
 
         # Count URLs
         with open(urls_file, 'r', encoding='utf-8') as f:
@@ -472,6 +877,8 @@ class ReconPipeline:
             "file",
             "-f", str(urls_file.resolve()),  # Absolute path
             "--screenshot-path", str(self.shots_dir.resolve()),  # Absolute path
+            # One JSON line per URL with the screenshot's file name: the URL -> file manifest
+            "--write-jsonl", "--write-jsonl-file", str(self.screenshot_manifest.resolve()),
             "--threads", "4",
             "--timeout", "30"
         ]
@@ -479,14 +886,10 @@ class ReconPipeline:
         logger.info(f"[{self.job_id}] Gowitness command: {' '.join(cmd)}")
 
         # Note: Don't set cwd for gowitness to avoid path issues
-        import subprocess
-        result = subprocess.run(
+        result = self.tool_runner.run(
             cmd,
-            capture_output=True,
-            text=True,
-            timeout=settings.gowitness_timeout,
-            encoding='utf-8',
-            errors='ignore'
+            "gowitness",
+            timeout=settings.gowitness_timeout
         )
 
         # Log output
@@ -505,15 +908,14 @@ class ReconPipeline:
             logger.info(f"[{self.job_id}] gowitness completed successfully - {len(screenshot_files)} screenshots captured")
     
     # Helper methods for file operations and parsing
+    @traced("parse.subdomains")
     async def _read_subdomains_file(self) -> List[str]:
         """Read subdomains from file"""
         if not self.subs_file.exists():
             return []
 
         with open(self.subs_file, 'r', encoding='utf-8', errors='ignore') as f:
-            subdomains = [line.strip() for line in f if line.strip()]
-
-        return list(set(subdomains))  # Deduplicate
+            return list(set(iter_lines(f)))  # Deduplicate
 
     async def _write_live_urls_file(self, live_hosts: List[Dict[str, Any]]):
         """Write live URLs to a file for wafw00f input"""
@@ -526,6 +928,7 @@ class ReconPipeline:
 
         logger.info(f"[{self.job_id}] Wrote {len(urls)} live URLs to {self.live_urls_file}")
 
+    @traced("stage.waf")
     async def _run_wafw00f_cli(self, live_hosts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Run wafw00f to detect WAF/CDN protection"""
         try:
@@ -548,7 +951,6 @@ class ReconPipeline:
 
             # Parse wafw00f JSON output
             # wafw00f outputs JSON array format with fields: detected, firewall, manufacturer, url
-            import json
             detections: List[Dict[str, Any]] = []
 
             if self.waf_results_file.exists():
@@ -558,7 +960,7 @@ class ReconPipeline:
                         if content:
                             try:
                                 # wafw00f outputs a JSON array
-                                data_list = json.loads(content)
+                                data_list = loads_json(content)
                                 if not isinstance(data_list, list):
                                     data_list = [data_list]
 
@@ -577,7 +979,7 @@ class ReconPipeline:
                                             'waf_name': firewall if firewall != 'None' else None,
                                             'waf_manufacturer': manufacturer if manufacturer != 'None' else None
                                         })
-                            except json.JSONDecodeError as je:
+                            except JSONDecodeError as je:
                                 logger.warning(f"[{self.job_id}] Failed to parse wafw00f JSON: {je}")
                 except Exception as e:
                     logger.warning(f"[{self.job_id}] Failed to parse wafw00f results: {e}")
@@ -589,6 +991,7 @@ class ReconPipeline:
             logger.error(f"[{self.job_id}] WAF detection error: {e}")
             raise
 
+    @traced("stage.leaks")
     async def _run_sourceleakhacker_cli(
         self,
         live_hosts: List[Dict[str, Any]],
@@ -607,16 +1010,23 @@ class ReconPipeline:
         try:
             # Filter out WAF-protected URLs
             waf_urls = {w.get('url') for w in waf_detections if w.get('has_waf')}
-            non_waf_urls = [h.get('url') for h in live_hosts if h.get('url') not in waf_urls]
+            non_waf_hosts = [h for h in live_hosts if h.get('url') not in waf_urls]
 
             # If selected_urls provided, filter to only those
             if selected_urls:
-                non_waf_urls = [url for url in non_waf_urls if url in selected_urls]
+                non_waf_hosts = [h for h in non_waf_hosts if h.get('url') in selected_urls]
 
-            if not non_waf_urls:
+            if not non_waf_hosts:
                 logger.info(f"[{self.job_id}] All URLs are WAF-protected, skipping leak detection")
                 return []
 
+            # Scan one host per cluster of identical pages, copy its leaks to the other members
+            scan_hosts, members = split_representatives(non_waf_hosts)
+            non_waf_urls = [h.get('url') for h in scan_hosts]
+            if members:
+                logger.info(f"[{self.job_id}] Skipping {len(non_waf_hosts) - len(scan_hosts)} URLs "
+                            f"that serve the same page as a scanned URL")
+
             # Write non-WAF URLs to file
             with open(self.urls_no_waf_file, 'w', encoding='utf-8') as f:
                 for url in non_waf_urls:
@@ -631,7 +1041,6 @@ class ReconPipeline:
             self.leaks_output_dir.mkdir(parents=True, exist_ok=True)
 
             # Run SourceLeakHacker
-            import subprocess
             from pathlib import Path
 
             # SourceLeakHacker needs to run from its own directory (for dict files)
@@ -653,14 +1062,11 @@ class ReconPipeline:
 
             logger.info(f"[{self.job_id}] SourceLeakHacker command: {' '.join(cmd)}")
 
-            result = subprocess.run(
+            result = self.tool_runner.run(
                 cmd,
+                "sourceleakhacker",
                 cwd=str(sourceleakhacker_dir),  # Changed to SourceLeakHacker directory
-                capture_output=True,
-                text=True,
-                timeout=getattr(settings, 'sourceleakhacker_timeout', 2800),
-                encoding='utf-8',
-                errors='ignore'
+                timeout=getattr(settings, 'sourceleakhacker_timeout', 2800)
             )
 
             if result.returncode != 0:
@@ -668,6 +1074,7 @@ class ReconPipeline:
 
             # Parse SourceLeakHacker results from STDOUT and CSV files
             leaks = await self._parse_sourceleakhacker_results(result.stdout)
+            leaks = attribute_to_members(leaks, members, 'base_url', ('base_url', 'leaked_file_url'))
             logger.info(f"[{self.job_id}] Leak detection completed: {len(leaks)} leaks found")
             return leaks
 
@@ -675,6 +1082,7 @@ class ReconPipeline:
             logger.error(f"[{self.job_id}] Source leak detection error: {e}")
             raise
 
+    @traced("parse.sourceleakhacker")
     async def _parse_sourceleakhacker_results(self, stdout_output: str = "") -> List[Dict[str, Any]]:
         """Parse SourceLeakHacker results from STDOUT and CSV files
 
@@ -687,70 +1095,10 @@ class ReconPipeline:
         results: List[Dict[str, Any]] = []
 
         # Parse STDOUT output first (real-time results)
-        # Format: [CODE]  SIZE    TIME    CONTENT_TYPE    URL
+        # Format: [CODE]  SIZE    TIME    CONTENT_TYPE    URL (404s are skipped)
         if stdout_output:
             logger.info(f"[{self.job_id}] Parsing SourceLeakHacker STDOUT output...")
-            import re
-            from urllib.parse import urlparse
-
-            for line in stdout_output.splitlines():
-                line = line.strip()
-                # Parse ALL status codes, not just [200]
-                # Format: [403] 0 0.07s text/html https://example.com/.htaccess
-                match = re.match(r'\[(\d+)\]\s+(\d+)\s+([\d.]+)s?\s+(\S+)\s+(.+)', line)
-                if match:
-                    try:
-                        http_status = int(match.group(1))
-
-                        # Skip 404 status codes - these are "Not Found", not actual leaks
-                        if http_status == 404:
-                            continue
-
-                        # Convert file_size to integer (database expects Integer type)
-                        file_size_str = match.group(2)
-                        file_size = int(file_size_str) if file_size_str.isdigit() else 0
-
-                        response_time = match.group(3)
-                        content_type = match.group(4)
-                        url = match.group(5)
-
-                        # Extract base URL
-                        parsed = urlparse(url)
-                        base_url = f"{parsed.scheme}://{parsed.netloc}"
-
-                        # Determine severity based on HTTP status and file type
-                        severity = 'low'
-
-                        # High severity: Accessible sensitive files (200)
-                        if http_status == 200:
-                            severity = 'high'
-                        # Medium severity: Forbidden files (403) - file exists but access denied
-                        elif http_status == 403:
-                            severity = 'medium'
-                        # Low severity: Other status codes
-                        else:
-                            severity = 'low'
-
-                        # Upgrade severity for critical file types
-                        if any(x in url.lower() for x in ['.sql', '.env', '.git/config', 'backup', 'database']):
-                            if severity == 'medium':
-                                severity = 'high'
-                            elif severity == 'low':
-                                severity = 'medium'
-                        elif any(x in url.lower() for x in ['.zip', '.tar', '.rar', '.bak', '.7z']):
-                            if severity == 'low':
-                                severity = 'medium'
-
-                        results.append({
-                            'base_url': base_url,
-                            'leaked_file_url': url,
-                            'file_type': content_type,
-                            'severity': severity,
-                            'file_size': file_size,  # Now an integer
-                            'http_status': http_status
-                        })
-                    except Exception as e:
-                        logger.warning(f"[{self.job_id}] Failed to parse STDOUT line: {line} - {e}")
+            results.extend(iter_sourceleakhacker_stdout(io.StringIO(stdout_output)))
 
         # Parse CSV files (if they exist)
         if self.leaks_output_dir.exists():
@@ -786,9 +1134,6 @@ class ReconPipeline:
         results = []
 
         try:
-            import csv
-            from urllib.parse import urlparse
-
             # Parse ALL CSV files in the output directory (EXCEPT 404.csv)
             csv_files = list(self.leaks_output_dir.glob("*.csv"))
 
@@ -799,64 +1144,16 @@ class ReconPipeline:
             logger.info(f"[{self.job_id}] Found {len(csv_files)} CSV files to parse")
 
             for csv_file in csv_files:
-                http_status = csv_file.stem  # e.g., "200", "403", "404"
-
                 # Skip 404.csv - these are "Not Found" responses, not actual leaks
-                if http_status == "404":
+                if csv_file.stem == "404":
                     logger.info(f"[{self.job_id}] Skipping {csv_file.name} (404 = Not Found, not a leak)")
                     continue
 
                 logger.info(f"[{self.job_id}] Parsing {csv_file.name}...")
 
-                file_count = 0
-                with open(csv_file, 'r', encoding='utf-8', errors='ignore') as f:
-                    reader = csv.DictReader(f)
-                    for row in reader:
-                        try:
-                            url = row.get('URL', '')
-                            if not url:
-                                continue
-
-                            # Extract base URL
-                            parsed = urlparse(url)
-                            base_url = f"{parsed.scheme}://{parsed.netloc}"
-
-                            # Determine severity based on HTTP status and file type
-                            severity = 'low'
-
-                            # High severity: Accessible sensitive files (200)
-                            if http_status == '200':
-                                severity = 'high'
-                            # Medium severity: Forbidden files (403) - file exists but access denied
-                            elif http_status == '403':
-                                severity = 'medium'
-                            # Low severity: Other status codes
-                            else:
-                                severity = 'low'
-
-                            # Upgrade severity for critical file types
-                            if any(x in url.lower() for x in ['.sql', '.env', '.git/config', 'backup', 'database']):
-                                if severity == 'medium':
-                                    severity = 'high'
-                                elif severity == 'low':
-                                    severity = 'medium'
-                            elif any(x in url.lower() for x in ['.zip', '.tar', '.rar', '.bak', '.7z']):
-                                if severity == 'low':
-                                    severity = 'medium'
-
-                            results.append({
-                                'base_url': base_url,
-                                'leaked_file_url': url,
-                                'file_type': row.get('Type', 'unknown'),
-                                'severity': severity,
-                                'file_size': row.get('Length'),
-                                'http_status': int(http_status) if http_status.isdigit() else 0
-                            })
-                            file_count += 1
-                        except Exception as e:
-                            logger.warning(f"[{self.job_id}] Failed to parse CSV row in {csv_file.name}: {row} - {e}")
-
-                logger.info(f"[{self.job_id}] Parsed {file_count} leaks from {csv_file.name}")
+                before = len(results)
+                results.extend(iter_sourceleakhacker_csv(csv_file))
+                logger.info(f"[{self.job_id}] Parsed {len(results) - before} leaks from {csv_file.name}")
 
             logger.info(f"[{self.job_id}] Total leaks from all CSV files: {len(results)}")
 
@@ -865,122 +1162,115 @@ class ReconPipeline:
 
         return results
 
+    @traced("parse.httpx")
     async def _parse_live_results(self) -> List[Dict[str, Any]]:
         """Parse httpx JSON output - includes both live and dead hosts with all httpx fields"""
         if not self.live_file.exists():
             return []
 
-        # Status codes that indicate a "live" host (server is responding)
-        # 2xx: Success
-        # 3xx: Redirects (server is responding)
-        # 4xx: Client errors (server is responding)
-        # 5xx: Server errors (server is responding - important for visibility!)
-        LIVE_STATUS_CODES = {200, 201, 202, 204, 301, 302, 303, 304, 307, 308, 400, 401, 403, 404, 500, 501, 502, 503, 504}
-
-        live_hosts = []
+        # Records include both live and dead hosts; is_live is derived from the status code
         with open(self.live_file, 'r', encoding='utf-8', errors='ignore') as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
+            live_hosts = [httpx_host_record(data) for data in iter_httpx_records(f)]
 
-                try:
-                    import json
-                    data = json.loads(line)
-                    status_code = data.get('status_code')
-                    is_live = status_code in LIVE_STATUS_CODES if status_code else False
-
-                    # Extract all httpx JSON fields
-                    live_hosts.append({
-                        # Core fields
-                        'url': data.get('url', ''),
-                        'status_code': status_code,
-                        'is_live': is_live,
-
-                        # Essential httpx fields
-                        'title': data.get('title', '').strip() if data.get('title') else None,
-                        'content_length': data.get('content_length'),
-                        'webserver': data.get('webserver'),
-                        'final_url': data.get('final_url'),
-
-                        # Useful httpx fields
-                        'response_time': data.get('time'),  # httpx uses 'time' field (e.g., "11.4100539s")
-                        'cdn_name': data.get('cdn_name'),
-                        'content_type': data.get('content_type'),
-                        'host': data.get('host'),  # Primary IP address
-
-                        # Array fields
-                        'chain_status_codes': data.get('chain_status_codes', []),
-                        'ipv4_addresses': data.get('a', []),  # httpx uses 'a' for IPv4
-                        'ipv6_addresses': data.get('aaaa', []),  # httpx uses 'aaaa' for IPv6
-                        'technologies': data.get('tech', [])  # httpx uses 'tech' for technologies
-                    })
-                except json.JSONDecodeError:
-                    continue
+        # Fill in addresses from the resolution stage where httpx did not report them
+        if self.dns_records:
+            for host in live_hosts:
+                record = self.dns_records.get(urlparse(host['url']).hostname or '')
+                if record:
+                    host['ipv4_addresses'] = host['ipv4_addresses'] or record['a']
+                    host['ipv6_addresses'] = host['ipv6_addresses'] or record['aaaa']
 
         return live_hosts
 
     async def _prepare_urls_for_gowitness(self, urls: List[str]):
         """Prepare URLs file for gowitness input"""
-        urls_file = self.job_dir / "urls_for_gowitness.txt"
+        urls_file = self.gowitness_urls_file
         with open(urls_file, 'w', encoding='utf-8') as f:
             for url in urls:
                 f.write(f"{url}\n")
 
         logger.info(f"[{self.job_id}] Prepared {len(urls)} URLs for gowitness: {urls_file}")
 
+    @traced("parse.gowitness")
     async def _parse_screenshot_results(self) -> List[Dict[str, Any]]:
-        """Parse gowitness v3.x results from screenshot files"""
-        screenshots = []
+        """
+        Screenshot records ({url, filename, file_path, file_size}) for this run
 
-        # Check if screenshots directory exists
+        URLs come from the manifest gowitness writes with --write-jsonl, so
+        each screenshot maps to exactly the URL that was captured. Without a
+        manifest (older gowitness builds), URLs are read back from the file
+        names and matched against the URLs that were sent to gowitness.
+        """
         if not self.shots_dir.exists():
             logger.warning(f"[{self.job_id}] Screenshots directory does not exist: {self.shots_dir}")
             return []
 
-        # List all screenshot image files (support nested folders and jpg/png)
-        screenshot_files = list(self.shots_dir.rglob("*.png")) + list(self.shots_dir.rglob("*.jpg")) + list(self.shots_dir.rglob("*.jpeg"))
+        if self.screenshot_manifest.exists():
+            screenshots = []
+            with open(self.screenshot_manifest, 'r', encoding='utf-8', errors='ignore') as f:
+                for entry in iter_gowitness_jsonl(f):
+                    path = self.shots_dir / Path(entry['filename']).name
+                    if path.is_file():
+                        screenshots.append(self._screenshot_record(entry['url'], path))
+            logger.info(f"[{self.job_id}] Parsed {len(screenshots)} screenshots from {self.screenshot_manifest.name}")
+            return screenshots
+
+        return self._parse_screenshot_files()
 
+    def _screenshot_record(self, url: str, path: Path) -> Dict[str, Any]:
+        return {
+            'url': url,
+            'filename': path.name,
+            'file_path': str(path.relative_to(self.job_dir)),
+            'file_size': path.stat().st_size
+        }
+
+    def _parse_screenshot_files(self) -> List[Dict[str, Any]]:
+        """Screenshot records from file names, for gowitness runs without a manifest"""
+        screenshot_files = [
+            path for path in self.shots_dir.rglob("*") if path.suffix.lower() in ('.png', '.jpg', '.jpeg')
+        ]
         if not screenshot_files:
             logger.warning(f"[{self.job_id}] No screenshot files found in {self.shots_dir}")
             return []
 
-        logger.info(f"[{self.job_id}] Found {len(screenshot_files)} screenshot files")
+        urls = []
+        if self.gowitness_urls_file.exists():
+            with open(self.gowitness_urls_file, 'r', encoding='utf-8') as f:
+                urls = list(iter_lines(f))
 
-        # Parse each screenshot file
+        screenshots = []
         for screenshot_file in screenshot_files:
-            try:
-                # Gowitness v3.x filename format: <url-encoded>.png
-                # Example: https-example-com.png
-                filename = screenshot_file.name
-
-                # Try to extract URL from filename
-                # Remove .png extension
-                url_part = filename.replace('.png', '')
-
-                # Convert filename back to URL
-                # https-example-com -> https://example.com
-                if url_part.startswith('https-'):
-                    url = 'https://' + url_part[6:].replace('-', '.')
-                elif url_part.startswith('http-'):
-                    url = 'http://' + url_part[5:].replace('-', '.')
-                else:
-                    url = url_part.replace('-', '.')
+            # Gowitness v3.x filename format: https-example-com.png -> https://example.com
+            url_part = screenshot_file.stem
+            if url_part.startswith('https-'):
+                url = 'https://' + url_part[6:].replace('-', '.')
+            elif url_part.startswith('http-'):
+                url = 'http://' + url_part[5:].replace('-', '.')
+            else:
+                url = url_part.replace('-', '.')
+            screenshots.append(self._screenshot_record(url, screenshot_file))
 
-                screenshots.append({
-                    'url': url,
-                    'filename': filename,
-                    'file_path': str(screenshot_file.relative_to(self.job_dir)),
-                    'file_size': screenshot_file.stat().st_size
-                })
+        logger.info(f"[{self.job_id}] Parsed {len(screenshots)} screenshots from file names (no manifest)")
+        return self._restore_screenshot_urls(screenshots, urls)
 
-            except Exception as e:
-                logger.warning(f"[{self.job_id}] Error parsing screenshot {screenshot_file.name}: {e}")
-                continue
+    @staticmethod
+    def _restore_screenshot_urls(screenshots: List[Dict[str, Any]], urls: List[str]) -> List[Dict[str, Any]]:
+        """
+        Replace URLs rebuilt from gowitness filenames with the URLs that were captured
+
+        The filename loses '-', ':' and '/' (https://a-b.example.com becomes
+        https-a-b-example-com.png, read back as https://a.b.example.com), so
+        both sides are compared with every punctuation run folded to '.'.
+        """
+        def fold(url: str) -> str:
+            return re.sub(r'[^a-z0-9]+', '.', url.lower()).strip('.')
 
-        logger.info(f"[{self.job_id}] Parsed {len(screenshots)} screenshots")
+        by_key = {fold(url): url for url in urls}
+        for shot in screenshots:
+            shot['url'] = by_key.get(fold(shot['url']), shot['url'])
         return screenshots
-    
+
     async def _run_assetfinder(self):
         """Run assetfinder"""
         cmd = [settings.assetfinder_path, self.domain]
@@ -1064,14 +1354,11 @@ class ReconPipeline:
                 raise FileNotFoundError(f"Tool not found: {cmd[0]}")
 
             # Use synchronous subprocess for Windows compatibility
-            result = subprocess.run(
+            result = self.tool_runner.run(
                 cmd,
+                tool_name,
                 cwd=str(self.job_dir),
-                capture_output=True,
-                text=True,
-                timeout=timeout,
-                encoding='utf-8',
-                errors='ignore'
+                timeout=timeout
             )
 
             # Log output
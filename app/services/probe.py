@@ -0,0 +1,258 @@
+"""
+In-process HTTP probing engine built on httpx.AsyncClient
+
+An alternative to shelling out to the ProjectDiscovery httpx binary: one
+client per scan with connection reuse, optional HTTP/2, a global limit on
+hosts in flight and a per-host connection limit. Each host produces a
+record in the same JSON shape the httpx CLI writes with
+`-json -title -tech-detect -follow-redirects -hash sha256`, so live.txt and
+`_parse_live_results` are unchanged.
+
+Timeouts follow the two-phase split used for the CLI: connecting gets the
+short timeout (a port that drops the SYN is dead), reading the response
+gets the long one, and only read timeouts are retried.
+"""
+import re
+import html
+import time
+import hashlib
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional, Iterable, Callable
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+TITLE_RE = re.compile(rb'<title[^>]*>(.*?)</title', re.IGNORECASE | re.DOTALL)
+CHARSET_RE = re.compile(r'charset=([\w-]+)', re.IGNORECASE)
+
+# Bytes of the body read per response (title extraction only needs the head)
+MAX_BODY_BYTES = 512 * 1024
+
+# Response headers mapped to technology names, a small subset of -tech-detect
+HEADER_TECHNOLOGIES = {
+    'server': {'nginx': 'Nginx', 'apache': 'Apache HTTP Server', 'microsoft-iis': 'IIS', 'cloudflare': 'Cloudflare',
+               'openresty': 'OpenResty', 'envoy': 'Envoy', 'litespeed': 'LiteSpeed', 'caddy': 'Caddy'},
+    'x-powered-by': {'php': 'PHP', 'asp.net': 'Microsoft ASP.NET', 'express': 'Express', 'next.js': 'Next.js'},
+}
+
+
+def h2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def decode_body(body: bytes, content_type: Optional[str] = None) -> str:
+    charset = CHARSET_RE.search(content_type or '')
+    try:
+        return body.decode(charset.group(1) if charset else 'utf-8', errors='replace')
+    except LookupError:
+        return body.decode('utf-8', errors='replace')
+
+
+def extract_title(body: bytes, content_type: Optional[str] = None) -> Optional[str]:
+    match = TITLE_RE.search(body)
+    if not match:
+        return None
+    return ' '.join(html.unescape(decode_body(match.group(1), content_type)).split()) or None
+
+
+def header_map(headers: httpx.Headers) -> Dict[str, Any]:
+    """Headers in the httpx CLI "header" JSON shape: x_powered_by -> value, or a list if repeated"""
+    result: Dict[str, Any] = {}
+    for name, value in headers.multi_items():
+        key = name.lower().replace('-', '_')
+        if key not in result:
+            result[key] = value
+        elif isinstance(result[key], list):
+            result[key].append(value)
+        else:
+            result[key] = [result[key], value]
+    return result
+
+
+def detect_technologies(headers: httpx.Headers) -> List[str]:
+    found = []
+    for header, names in HEADER_TECHNOLOGIES.items():
+        value = headers.get(header, '').lower()
+        for needle, name in names.items():
+            if needle in value and name not in found:
+                found.append(name)
+    return found
+
+
+def _server_address(response: httpx.Response) -> Optional[str]:
+    stream = response.extensions.get("network_stream")
+    try:
+        server_addr = stream.get_extra_info("server_addr") if stream is not None else None
+    except Exception:
+        return None
+    return server_addr[0] if server_addr else None
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Response body that releases its host's semaphore once closed"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, semaphore: asyncio.Semaphore):
+        self.stream = stream
+        self.semaphore = semaphore
+        self.released = False
+
+    async def __aiter__(self):
+        async for chunk in self.stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self.stream.aclose()
+        finally:
+            if not self.released:
+                self.released = True
+                self.semaphore.release()
+
+
+class _HostLimitedTransport(httpx.AsyncBaseTransport):
+    """Cap concurrent requests per host:port, including redirect targets, until their bodies are closed"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, per_host: int):
+        self.transport = transport
+        self.per_host = per_host
+        self._semaphores: Dict[tuple, asyncio.Semaphore] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = (request.url.host, request.url.port)
+        semaphore = self._semaphores.get(key)
+        if semaphore is None:
+            semaphore = self._semaphores[key] = asyncio.Semaphore(self.per_host)
+        await semaphore.acquire()
+        try:
+            response = await self.transport.handle_async_request(request)
+        except BaseException:
+            semaphore.release()
+            raise
+        # Headers are in, but the connection is busy until the body has been read or dropped
+        response.stream = _ReleasingStream(response.stream, semaphore)
+        return response
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+class NativeProber:
+    """Probe hosts over HTTPS then HTTP and build httpx-CLI-shaped records"""
+
+    def __init__(self, connect_timeout: float = 5.0, read_timeout: float = 30.0, retries: int = 3,
+                 concurrency: int = 100, per_host_connections: int = 4, http2: bool = True,
+                 max_redirects: int = 10, user_agent: Optional[str] = None, capture_bytes: int = 0):
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.retries = retries
+        self.concurrency = max(1, concurrency)
+        self.per_host_connections = max(1, per_host_connections)
+        self.http2 = http2 and h2_available()
+        self.max_redirects = max_redirects
+        self.headers = {"User-Agent": user_agent or "Mozilla/5.0 (compatible; recon-probe)"}
+        # Bytes of each body kept in the record ("header"/"body", as httpx -include-response)
+        self.capture_bytes = capture_bytes
+        self.requests_sent = 0
+
+    def _client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(max_connections=self.concurrency * 2, max_keepalive_connections=self.concurrency)
+        transport = httpx.AsyncHTTPTransport(verify=False, http2=self.http2, limits=limits)
+        return httpx.AsyncClient(
+            transport=_HostLimitedTransport(transport, self.per_host_connections),
+            timeout=self.timeout,
+            follow_redirects=True,
+            max_redirects=self.max_redirects,
+            headers=self.headers
+        )
+
+    async def _fetch(self, client: httpx.AsyncClient, url: str):
+        """(first response, final response, body prefix, elapsed seconds), retrying read timeouts"""
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                self.requests_sent += 1
+                async with client.stream("GET", url) as response:
+                    body = bytearray()
+                    async for chunk in response.aiter_bytes():
+                        body += chunk
+                        if len(body) >= MAX_BODY_BYTES:
+                            break
+                    first = response.history[0] if response.history else response
+                    return first, response, bytes(body), time.perf_counter() - started
+            except (httpx.ReadTimeout, httpx.WriteTimeout, httpx.PoolTimeout, httpx.RemoteProtocolError):
+                attempt += 1
+                if attempt > self.retries:
+                    raise
+
+    def _record(self, host: str, url: str, first: httpx.Response, final: httpx.Response, body: bytes,
+                elapsed: float, dns: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        content_type = final.headers.get('content-type', '')
+        content_length = final.headers.get('content-length')
+        record = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "url": url,
+            "input": host,
+            "title": extract_title(body, content_type),
+            "webserver": final.headers.get('server'),
+            "content_type": content_type.split(';')[0].strip() or None,
+            "method": "GET",
+            "path": first.request.url.raw_path.decode(),
+            "time": f"{elapsed * 1000:.1f}ms",
+            "tech": detect_technologies(final.headers),
+            "status_code": first.status_code,
+            "content_length": int(content_length) if content_length and content_length.isdigit() else len(body),
+            "http2": final.http_version == "HTTP/2",
+            "hash": {"body_sha256": hashlib.sha256(body).hexdigest()},
+            "failed": False,
+        }
+        if self.capture_bytes:
+            record["header"] = header_map(final.headers)
+            record["body"] = decode_body(body[:self.capture_bytes], content_type)
+        if final is not first:
+            record["chain_status_codes"] = [r.status_code for r in final.history] + [final.status_code]
+            record["final_url"] = str(final.url)
+
+        if dns:
+            record["a"], record["aaaa"] = dns.get('a', []), dns.get('aaaa', [])
+            record["host"] = (record["a"] or record["aaaa"] or [None])[0]
+        else:
+            record["host"] = _server_address(final)
+        return record
+
+    async def probe_host(self, client: httpx.AsyncClient, host: str,
+                         dns: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Record for the first scheme that answers, or a failed record with the last error"""
+        error = None
+        targets = [host] if "://" in host else [f"https://{host}", f"http://{host}"]
+        for url in targets:
+            try:
+                first, final, body, elapsed = await self._fetch(client, url)
+            except httpx.HTTPError as e:
+                error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+                continue
+            return self._record(host, url, first, final, body, elapsed, dns)
+        return {"input": host, "url": targets[0], "failed": True, "error": error}
+
+    async def probe_many(self, hosts: Iterable[str], dns_records: Optional[Dict[str, Dict[str, Any]]] = None,
+                         on_record: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+        """Probe hosts with at most `concurrency` in flight; records in completion order"""
+        dns_records = dns_records or {}
+        iterator = iter(hosts)
+        records: List[Dict[str, Any]] = []
+
+        async with self._client() as client:
+            async def worker():
+                for host in iterator:
+                    record = await self.probe_host(client, host, dns_records.get(host.lower()))
+                    records.append(record)
+                    if on_record is not None:
+                        on_record(record)
+
+            await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        return records
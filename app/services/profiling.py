@@ -0,0 +1,113 @@
+"""
+Opt-in profiling of the Python side of a scan
+
+A profiled phase runs under cProfile (deterministic, for pstats) while a
+background thread samples the phase's stack (for collapsed-stack flamegraphs).
+Output goes to jobs/{job_id}/profile/:
+
+    {phase}.pstats     - load with pstats / snakeviz
+    {phase}.collapsed  - feed to flamegraph.pl or speedscope
+    {phase}.txt        - top functions by cumulative time
+"""
+import io
+import sys
+import random
+import pstats
+import logging
+import cProfile
+import threading
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Optional
+
+from app.deps import settings
+
+logger = logging.getLogger(__name__)
+
+
+def should_profile(requested: bool = False) -> bool:
+    """Profile when the scan asked for it or when picked by the global sample rate"""
+    if requested:
+        return True
+    return settings.profile_sample_rate > 0 and random.random() < settings.profile_sample_rate
+
+
+def profile_dir(job_id: str) -> Path:
+    return Path(settings.jobs_directory) / job_id / "profile"
+
+
+class StackSampler(threading.Thread):
+    """Periodically sample one thread's Python stack into collapsed-stack counts"""
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.samples[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def collapsed(self) -> str:
+        return ''.join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+class ScanProfiler:
+    """Profile named phases of a scan into the job's profile directory"""
+
+    def __init__(self, job_id: str, sampling_interval: Optional[float] = None):
+        self.job_id = job_id
+        self.output_dir = profile_dir(job_id)
+        self.sampling_interval = sampling_interval or settings.profile_sampling_interval_ms / 1000.0
+
+    @contextmanager
+    def phase(self, name: str):
+        """Profile the enclosed block and write {name}.pstats/.collapsed/.txt"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+        sampler = StackSampler(threading.get_ident(), self.sampling_interval)
+        profiler = cProfile.Profile()
+        sampler.start()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            sampler.stop()
+            self._write(name, profiler, sampler)
+
+    def _write(self, name: str, profiler: cProfile.Profile, sampler: StackSampler):
+        try:
+            profiler.dump_stats(str(self.output_dir / f"{name}.pstats"))
+
+            with open(self.output_dir / f"{name}.collapsed", 'w', encoding='utf-8') as f:
+                f.write(sampler.collapsed())
+
+            report = io.StringIO()
+            pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(50)
+            with open(self.output_dir / f"{name}.txt", 'w', encoding='utf-8') as f:
+                f.write(report.getvalue())
+
+            logger.info(f"[{self.job_id}] Wrote {name} profile ({sum(sampler.samples.values())} samples) to {self.output_dir}")
+        except Exception as e:
+            logger.warning(f"[{self.job_id}] Failed to write {name} profile: {e}")
+
+
+def profile_phase(profiler: Optional[ScanProfiler], name: str):
+    """profiler.phase(name), or a no-op context when profiling is off"""
+    return profiler.phase(name) if profiler else nullcontext()
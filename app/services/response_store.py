@@ -0,0 +1,219 @@
+"""
+Per-job content-addressed store of probed HTTP responses
+
+    jobs/{job_id}/responses/
+        index.jsonl                 one line per URL: status, headers, body hash
+        bodies/ab/ab12...ef.zst     body prefix, named by the SHA-256 of its bytes
+
+The probe stage moves the "header"/"body" fields of each captured httpx
+record here instead of keeping them in live.txt. Bodies are compressed
+with zstd when the optional zstandard package is installed and zlib
+otherwise (the suffix records which), and a body is written once however
+many hosts served it, so parking and CDN error pages cost one blob per job.
+
+    store = ResponseStore(job_dir)
+    store.add(record)            # pops header/body from an httpx record
+    store.get("https://a.example.com")   # index entry + decoded body
+
+Readers of a job whose files went to the artifact store pass fetch (e.g.
+functools.partial(job_path, job_id)): the index and each body they read
+are fetched back one file at a time instead of the whole directory.
+"""
+import os
+import json
+import zlib
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, Any, Optional, Iterator, Callable, Tuple
+
+try:
+    import zstandard
+except ImportError:  # optional: zlib is used without it
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Fields of an httpx -include-response record that hold the captured response
+CAPTURE_FIELDS = ("header", "body", "response", "request", "raw_header")
+
+SHA256_HEX_LENGTH = 64
+
+
+def _codec(name: str, level: int) -> Tuple[str, Callable[[bytes], bytes]]:
+    """(file suffix, compress function) for "zstd" or "zlib" """
+    if name == "zstd" and zstandard is not None:
+        compressor = zstandard.ZstdCompressor(level=level)
+        return ".zst", compressor.compress
+    if name == "zstd":
+        logger.info("zstandard is not installed, compressing stored responses with zlib")
+    return ".zz", lambda data: zlib.compress(data, min(max(level, 1), 9))
+
+
+def _decompress(path: Path, data: bytes) -> bytes:
+    if path.suffix == ".zst":
+        if zstandard is None:
+            raise RuntimeError(f"{path.name} is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def is_body_digest(value: str) -> bool:
+    return len(value) == SHA256_HEX_LENGTH and all(c in "0123456789abcdef" for c in value)
+
+
+class ResponseStore:
+    """Index of captured responses plus deduplicated, compressed body blobs"""
+
+    def __init__(self, job_dir: Path, compression: str = "zstd", level: int = 3, max_body_bytes: int = 256 * 1024,
+                 fetch: Optional[Callable[[str], Optional[Path]]] = None):
+        self.root = Path(job_dir) / "responses"
+        # Called with a path relative to the job directory to bring a file back before it is read
+        self.fetch = fetch
+        self.bodies_dir = self.root / "bodies"
+        self.index_file = self.root / "index.jsonl"
+        self.compression = compression
+        self.level = level
+        self.max_body_bytes = max_body_bytes
+        self._suffix: Optional[str] = None
+        self._compress: Optional[Callable[[bytes], bytes]] = None
+        self._known: set = set()
+        self._index: Optional[Dict[str, Dict[str, Any]]] = None
+        self._index_handle = None
+        self.stats: Dict[str, int] = {
+            "responses": 0, "bodies_written": 0, "duplicate_bodies": 0, "raw_bytes": 0, "stored_bytes": 0
+        }
+
+    # -- bodies ---------------------------------------------------------------
+
+    def _body_path(self, digest: str, suffix: str) -> Path:
+        return self.bodies_dir / digest[:2] / f"{digest}{suffix}"
+
+    def _find_body(self, digest: str) -> Optional[Path]:
+        for suffix in (".zst", ".zz"):
+            path = self._body_path(digest, suffix)
+            if path.exists():
+                return path
+        return None
+
+    def _fetch_body(self, digest: str) -> Optional[Path]:
+        for suffix in (".zst", ".zz"):
+            path = self.fetch(f"responses/bodies/{digest[:2]}/{digest}{suffix}")
+            if path is not None:
+                return path
+        return None
+
+    def put_body(self, body: bytes) -> str:
+        """Store a body once; returns its SHA-256"""
+        digest = hashlib.sha256(body).hexdigest()
+        self.stats["raw_bytes"] += len(body)
+        if digest in self._known or self._find_body(digest) is not None:
+            self._known.add(digest)
+            self.stats["duplicate_bodies"] += 1
+            return digest
+
+        if self._compress is None:
+            self._suffix, self._compress = _codec(self.compression, self.level)
+        data = self._compress(body)
+        path = self._body_path(digest, self._suffix)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+        self._known.add(digest)
+        self.stats["bodies_written"] += 1
+        self.stats["stored_bytes"] += len(data)
+        return digest
+
+    def get_body(self, digest: str) -> Optional[bytes]:
+        if not is_body_digest(digest):
+            return None
+        path = self._find_body(digest)
+        if path is None and self.fetch is not None:
+            path = self._fetch_body(digest)
+        if path is None:
+            return None
+        with open(path, "rb") as f:
+            return _decompress(path, f.read())
+
+    # -- index ----------------------------------------------------------------
+
+    def add(self, record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Move a record's captured response into the store
+
+        Removes the capture fields from the record in place (so live.txt
+        stays small) and returns the index entry, or None if the record
+        carried no captured response.
+        """
+        captured = {field: record.pop(field) for field in CAPTURE_FIELDS if field in record}
+        if not record.get("url") or ("body" not in captured and "header" not in captured and "response" not in captured):
+            return None
+
+        body = captured.get("body")
+        if body is None and captured.get("response"):
+            _, _, body = captured["response"].partition("\r\n\r\n")
+        raw = (body or "").encode("utf-8", errors="replace")
+
+        entry = {
+            "url": record["url"],
+            "input": record.get("input"),
+            "status_code": record.get("status_code"),
+            "content_type": record.get("content_type"),
+            "header": captured.get("header") or {},
+            "body_sha256": self.put_body(raw[:self.max_body_bytes]),
+            "body_size": min(len(raw), self.max_body_bytes),
+            "truncated": len(raw) > self.max_body_bytes,
+        }
+
+        if self._index_handle is None:
+            self.root.mkdir(parents=True, exist_ok=True)
+            self._index_handle = open(self.index_file, "a", encoding="utf-8")
+        self._index_handle.write(json.dumps(entry) + "\n")
+        if self._index is not None:
+            self._index[entry["url"]] = entry
+        self.stats["responses"] += 1
+        return entry
+
+    def index(self) -> Dict[str, Dict[str, Any]]:
+        """url -> latest index entry"""
+        if self._index is None:
+            self.flush()
+            self._index = {}
+            if self.fetch is not None:
+                self.fetch("responses/index.jsonl")
+            if self.index_file.exists():
+                with open(self.index_file, "r", encoding="utf-8") as f:
+                    for line in f:
+                        if line.strip():
+                            entry = json.loads(line)
+                            self._index[entry["url"]] = entry
+        return self._index
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Index entry for a URL with the decoded body under "body" """
+        entry = self.index().get(url)
+        if entry is None:
+            return None
+        body = self.get_body(entry["body_sha256"])
+        return {**entry, "body": body.decode("utf-8", errors="replace") if body is not None else None}
+
+    def iter_entries(self) -> Iterator[Dict[str, Any]]:
+        yield from self.index().values()
+
+    def flush(self):
+        if self._index_handle is not None:
+            self._index_handle.flush()
+
+    def close(self):
+        if self._index_handle is not None:
+            self._index_handle.close()
+            self._index_handle = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
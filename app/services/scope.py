@@ -0,0 +1,139 @@
+"""
+Domain scope matching on a reversed-label trie
+
+Patterns are stored label by label from the TLD down, so checking a name
+costs one dictionary lookup per label regardless of how many patterns are
+in scope, and "evilexample.com" can never match "example.com".
+
+Pattern syntax:
+    example.com           the domain and everything below it
+    *.example.com         only names below example.com (not the apex)
+    api.*.example.com     "*" as an inner label matches exactly one label
+"""
+import json
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Dict, Any
+
+WILDCARD = "*"
+
+
+class _Node:
+    __slots__ = ("children", "exact", "subtree")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.exact = False      # the name ending here matches
+        self.subtree = False    # every name strictly below here matches
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase, strip whitespace, a trailing dot and a leading "*." from tool output"""
+    name = name.strip().lower().rstrip(".")
+    if name.startswith("*."):
+        name = name[2:]
+    return name
+
+
+class ScopeTrie:
+    """Set of domain patterns stored as a reversed-label trie"""
+
+    def __init__(self, patterns: Iterable[str] = ()):
+        self.root = _Node()
+        self.patterns: List[str] = []
+        for pattern in patterns:
+            self.add(pattern)
+
+    def add(self, pattern: str):
+        pattern = pattern.strip().lower().rstrip(".")
+        if not pattern:
+            return
+
+        subtree_only = pattern.startswith("*.")
+        labels = pattern[2:].split(".") if subtree_only else pattern.split(".")
+
+        node = self.root
+        for label in reversed(labels):
+            node = node.children.setdefault(label, _Node())
+        node.subtree = True
+        if not subtree_only:
+            node.exact = True
+        self.patterns.append(pattern)
+
+    def match(self, name: str) -> bool:
+        """Whether a normalized name matches any pattern"""
+        labels = name.split(".")
+        return self._match(self.root, labels, len(labels) - 1)
+
+    def _match(self, node: _Node, labels: List[str], index: int) -> bool:
+        # labels[index] is the next label to consume (walking from the TLD)
+        while True:
+            if index < 0:
+                return node.exact
+            if node.subtree and node is not self.root:
+                return True
+
+            wildcard = node.children.get(WILDCARD)
+            child = node.children.get(labels[index])
+            if wildcard is not None and child is not None:
+                # Rare: branch only when both a literal and a wildcard label exist
+                return self._match(child, labels, index - 1) or self._match(wildcard, labels, index - 1)
+            node = child or wildcard
+            if node is None:
+                return False
+            index -= 1
+
+    def __len__(self):
+        return len(self.patterns)
+
+
+class DomainScope:
+    """In-scope test for a scan: under the root domain or an include, and not excluded"""
+
+    def __init__(self, root_domain: str, include: Optional[Iterable[str]] = None,
+                 exclude: Optional[Iterable[str]] = None):
+        self.root_domain = normalize_name(root_domain)
+        self.include = list(include or [])
+        self.exclude = list(exclude or [])
+        self._include = ScopeTrie([self.root_domain, *self.include])
+        self._exclude = ScopeTrie(self.exclude)
+
+    @classmethod
+    def from_config(cls, root_domain: str, config: Optional[Dict[str, Any]] = None) -> "DomainScope":
+        config = config or {}
+        return cls(root_domain, config.get("include"), config.get("exclude"))
+
+    def contains(self, name: str) -> bool:
+        name = normalize_name(name)
+        if not name or " " in name:
+            return False
+        return self._include.match(name) and not (self._exclude and self._exclude.match(name))
+
+    __contains__ = contains
+
+    def filter(self, names: Iterable[str]) -> Iterator[str]:
+        """Yield normalized in-scope names from an iterable of raw lines"""
+        include_match = self._include.match
+        exclude_match = self._exclude.match if self._exclude else None
+        for name in names:
+            name = normalize_name(name)
+            if not name or " " in name:
+                continue
+            if include_match(name) and not (exclude_match and exclude_match(name)):
+                yield name
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"root_domain": self.root_domain, "include": self.include, "exclude": self.exclude}
+
+    def save(self, path: Path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path: Path, root_domain: str) -> "DomainScope":
+        """Scope saved for a job, or just the root domain if none was saved"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return cls(root_domain, data.get("include"), data.get("exclude"))
+        except (OSError, ValueError):
+            return cls(root_domain)
@@ -0,0 +1,201 @@
+"""
+Per-invocation telemetry for external recon tools
+
+Every CLI tool the pipeline launches goes through ToolRunner.run(), which
+records wall time, child CPU time, max RSS, pipe I/O volume, exit code and
+line counts for that single process.
+"""
+import os
+import sys
+import time
+import logging
+import threading
+import subprocess
+from dataclasses import dataclass, asdict, field
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+
+from app.services import metrics
+from app.services.tracing import start_span
+
+logger = logging.getLogger(__name__)
+
+
+# Pipeline stage each tool belongs to (used to group timings)
+TOOL_STAGES = {
+    'subfinder': 'enumeration',
+    'amass': 'enumeration',
+    'assetfinder': 'enumeration',
+    'anew': 'enumeration',
+    'httpx': 'probe',
+    'wafw00f': 'waf',
+    'gowitness': 'screenshots',
+    'sourceleakhacker': 'leaks',
+}
+
+
+@dataclass
+class ToolRun:
+    """Resource usage of a single tool invocation"""
+    tool: str
+    stage: str
+    command: str
+    started_at: datetime = field(default_factory=datetime.utcnow)
+    exit_code: Optional[int] = None
+    timed_out: bool = False
+    wall_time: float = 0.0
+    user_cpu: Optional[float] = None
+    sys_cpu: Optional[float] = None
+    max_rss_kb: Optional[int] = None
+    bytes_in: int = 0
+    bytes_out: int = 0
+    lines_in: int = 0
+    lines_out: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data['started_at'] = self.started_at.isoformat()
+        return data
+
+
+class ToolRunner:
+    """Run tool subprocesses and collect a ToolRun for each invocation"""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.runs: List[ToolRun] = []
+
+    def run(self, cmd: List[str], tool: str, input: Optional[str] = None,
+            cwd: Optional[str] = None, timeout: Optional[float] = None) -> subprocess.CompletedProcess:
+        """
+        Drop-in replacement for subprocess.run(..., capture_output=True, text=True)
+
+        The ToolRun is recorded even when the tool times out or fails, so
+        slow and broken tools show up in the timings as well.
+        """
+        tool_run = ToolRun(
+            tool=tool,
+            stage=TOOL_STAGES.get(tool, tool),
+            command=' '.join(str(c) for c in cmd)
+        )
+        if input:
+            tool_run.bytes_in = len(input.encode('utf-8', errors='ignore'))
+            tool_run.lines_in = input.count('\n')
+
+        self.runs.append(tool_run)
+        with start_span(f"tool.{tool}", {'job_id': self.job_id, 'tool.stage': tool_run.stage}) as span:
+            start = time.perf_counter()
+            try:
+                returncode, stdout, stderr, rusage = _run_with_rusage(cmd, input, cwd, timeout)
+            except subprocess.TimeoutExpired:
+                tool_run.timed_out = True
+                metrics.TOOL_TIMEOUTS.labels(tool=tool).inc()
+                raise
+            finally:
+                tool_run.wall_time = round(time.perf_counter() - start, 4)
+                metrics.STAGE_DURATION.labels(stage=tool_run.stage, tool=tool).observe(tool_run.wall_time)
+
+            if returncode != 0:
+                metrics.TOOL_FAILURES.labels(tool=tool).inc()
+
+            tool_run.exit_code = returncode
+            tool_run.bytes_out = len(stdout.encode('utf-8', errors='ignore')) + len(stderr.encode('utf-8', errors='ignore'))
+            tool_run.lines_out = stdout.count('\n')
+            if rusage is not None:
+                tool_run.user_cpu = round(rusage.ru_utime, 4)
+                tool_run.sys_cpu = round(rusage.ru_stime, 4)
+                # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere
+                tool_run.max_rss_kb = rusage.ru_maxrss // 1024 if sys.platform == 'darwin' else rusage.ru_maxrss
+
+            span.set_attribute('tool.exit_code', returncode)
+            span.set_attribute('tool.max_rss_kb', tool_run.max_rss_kb)
+            span.set_attribute('tool.lines_out', tool_run.lines_out)
+
+        logger.info(
+            f"[{self.job_id}] {tool} finished: exit={returncode} wall={tool_run.wall_time:.2f}s "
+            f"cpu={tool_run.user_cpu}/{tool_run.sys_cpu}s rss={tool_run.max_rss_kb}KB "
+            f"lines_in={tool_run.lines_in} lines_out={tool_run.lines_out}"
+        )
+        return subprocess.CompletedProcess(cmd, returncode, stdout, stderr)
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        """Serializable list of all recorded runs"""
+        return [run.to_dict() for run in self.runs]
+
+
+def _run_with_rusage(cmd: List[str], input: Optional[str], cwd: Optional[str], timeout: Optional[float]):
+    """
+    Run cmd to completion and return (returncode, stdout, stderr, rusage)
+
+    On POSIX the child is reaped with os.wait4 so its own rusage is available.
+    On Windows (no wait4) this falls back to communicate() and rusage is None.
+    """
+    proc = subprocess.Popen(
+        cmd,
+        cwd=cwd,
+        stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding='utf-8',
+        errors='ignore'
+    )
+
+    if not hasattr(os, 'wait4'):
+        try:
+            stdout, stderr = proc.communicate(input=input, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.communicate()
+            raise
+        return proc.returncode, stdout or '', stderr or '', None
+
+    # Pump pipes in threads (like communicate) so we can reap with wait4 ourselves
+    buffers = {'stdout': [], 'stderr': []}
+
+    def _reader(stream, key):
+        buffers[key].append(stream.read())
+        stream.close()
+
+    def _writer():
+        try:
+            proc.stdin.write(input)
+        except (BrokenPipeError, OSError):
+            pass
+        finally:
+            try:
+                proc.stdin.close()
+            except OSError:
+                pass
+
+    threads = [
+        threading.Thread(target=_reader, args=(proc.stdout, 'stdout'), daemon=True),
+        threading.Thread(target=_reader, args=(proc.stderr, 'stderr'), daemon=True),
+    ]
+    if input is not None:
+        threads.append(threading.Thread(target=_writer, daemon=True))
+    for thread in threads:
+        thread.start()
+
+    deadline = time.monotonic() + timeout if timeout else None
+    delay = 0.005
+    while True:
+        pid, status, rusage = os.wait4(proc.pid, os.WNOHANG)
+        if pid != 0:
+            break
+        if deadline is not None and time.monotonic() >= deadline:
+            proc.kill()
+            os.wait4(proc.pid, 0)
+            proc.returncode = -9
+            for thread in threads:
+                thread.join(timeout=5)
+            raise subprocess.TimeoutExpired(cmd, timeout)
+        time.sleep(delay)
+        delay = min(delay * 2, 0.25)
+
+    # Mark as reaped so Popen never calls waitpid on it again
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    for thread in threads:
+        thread.join()
+
+    return proc.returncode, ''.join(buffers['stdout']), ''.join(buffers['stderr']), rusage
@@ -0,0 +1,109 @@
+"""
+WebP derivatives of captured screenshots
+
+Every screenshot gets two derivatives, cached next to the job:
+
+    jobs/{job_id}/derived/thumb/<name>.webp    gallery thumbnail (screenshot_thumb_width wide)
+    jobs/{job_id}/derived/full/<name>.webp     full-size lossy WebP for the viewer
+
+The pipeline renders them after capture ("eager"), or the first request for
+a size renders it ("lazy"); a derivative older than its source is rendered
+again. Rendering needs the optional Pillow package; without it callers get
+None and serve the original file.
+
+    path = ensure_derivative(job_dir, job_dir / "shots/a.png", "thumb")
+"""
+import os
+import logging
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+
+try:
+    from PIL import Image
+except ImportError:  # optional: originals are served without it
+    Image = None
+
+from app.deps import settings
+from app.services.artifact_backends import sibling_tempfile
+
+logger = logging.getLogger(__name__)
+
+SIZES = ("thumb", "full")
+
+# Thumbnails are cropped to this height/width ratio (screenshots of long pages are mostly below the fold)
+THUMB_ASPECT = 0.625
+
+
+def derivatives_available() -> bool:
+    return Image is not None
+
+
+def derivative_path(job_dir: Path, source: Path, size: str) -> Path:
+    """Cache path of one derivative; mirrors the source's path below the job directory"""
+    relative = Path(source).resolve().relative_to(Path(job_dir).resolve())
+    return Path(job_dir) / "derived" / size / relative.with_suffix(".webp")
+
+
+def render_derivative(source: Path, target: Path, size: str, thumb_width: int, quality: int) -> Path:
+    """Encode one derivative of source to target (atomically)"""
+    with Image.open(source) as image:
+        image = image.convert("RGB")
+        if size == "thumb":
+            width = min(thumb_width, image.width)
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), Image.LANCZOS)
+            image = image.crop((0, 0, width, min(height, max(1, round(width * THUMB_ASPECT)))))
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = sibling_tempfile(target)
+        try:
+            image.save(tmp, "WEBP", quality=quality, method=4)
+            os.replace(tmp, target)
+        finally:
+            tmp.unlink(missing_ok=True)
+    return target
+
+
+def ensure_derivative(job_dir: Path, source: Path, size: str) -> Optional[Path]:
+    """Path of an up-to-date derivative, rendering it if needed; None without Pillow"""
+    if size not in SIZES:
+        raise ValueError(f"Unknown screenshot size: {size}")
+    if Image is None:
+        return None
+    target = derivative_path(job_dir, source, size)
+    if not target.exists() or target.stat().st_mtime < Path(source).stat().st_mtime:
+        render_derivative(Path(source), target, size, settings.screenshot_thumb_width,
+                          settings.screenshot_webp_quality)
+    return target
+
+
+def render_derivatives(job_dir: Path, sources: Iterable[Path], workers: Optional[int] = None) -> Dict[str, int]:
+    """
+    Render every size of each distinct source on a thread pool
+
+    Pillow releases the GIL while decoding and encoding, so threads scale
+    without the start-up cost of processes. Returns counts of rendered and
+    failed sources.
+    """
+    stats = {"sources": 0, "rendered": 0, "failed": 0}
+    if Image is None:
+        logger.info("Pillow is not installed, skipping screenshot derivatives")
+        return stats
+
+    unique = list(dict.fromkeys(Path(source) for source in sources))
+    stats["sources"] = len(unique)
+
+    def render(source: Path) -> bool:
+        try:
+            for size in SIZES:
+                ensure_derivative(job_dir, source, size)
+            return True
+        except Exception as e:
+            logger.warning(f"Could not render derivatives of {source.name}: {e}")
+            return False
+
+    with ThreadPoolExecutor(max_workers=max(1, workers or settings.screenshot_derivative_workers)) as pool:
+        for ok in pool.map(render, unique):
+            stats["rendered" if ok else "failed"] += 1
+    return stats
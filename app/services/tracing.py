@@ -0,0 +1,331 @@
+"""
+Lightweight distributed tracing for API requests, Celery tasks and pipeline stages
+
+Spans follow the W3C trace-context model: a trace id is created for the API
+request, carried to workers in the `traceparent` Celery message header, and
+every stage, tool run, parse step and DB batch becomes a child span.
+
+Finished spans are buffered per local root span and exported either to a
+JSONL file or to an OTLP/HTTP (JSON) collector, depending on settings.
+"""
+import json
+import time
+import secrets
+import logging
+import functools
+import threading
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from app.deps import settings
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT_HEADER = "traceparent"
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("recon_current_span", default=None)
+
+
+@dataclass
+class Span:
+    """A single timed operation within a trace"""
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    start_time_ns: int = field(default_factory=time.time_ns)
+    end_time_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    status: str = "ok"
+    # Spans whose parent lives in another process (or none) flush the buffer
+    is_local_root: bool = False
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        if self.end_time_ns is None:
+            return None
+        return (self.end_time_ns - self.start_time_ns) / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'service': settings.tracing_service_name,
+            'start_time_ns': self.start_time_ns,
+            'end_time_ns': self.end_time_ns,
+            'duration_ms': self.duration_ms,
+            'status': self.status,
+            'attributes': self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Returned when tracing is disabled so callers never need to check"""
+    traceparent = None
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[tuple]:
+    """Parse a W3C traceparent header into (trace_id, span_id)"""
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2]
+
+
+# ---------------------------------------------------------------------------
+# Exporters
+# ---------------------------------------------------------------------------
+
+class JsonlSpanExporter:
+    """Append finished spans to a JSON Lines file (one span per line)"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        lines = ''.join(json.dumps(span.to_dict(), default=str) + "\n" for span in spans)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+
+
+class OtlpHttpSpanExporter:
+    """POST spans to an OTLP/HTTP collector using the JSON protobuf mapping"""
+
+    def __init__(self, endpoint: str, timeout: float = 2.0):
+        self.endpoint = endpoint.rstrip("/")
+        if not self.endpoint.endswith("/v1/traces"):
+            self.endpoint += "/v1/traces"
+        self.timeout = timeout
+
+    def export(self, spans: List[Span]):
+        import httpx
+
+        try:
+            httpx.post(self.endpoint, json=self._encode(spans), timeout=self.timeout)
+        except Exception as e:
+            logger.debug(f"OTLP export to {self.endpoint} failed: {e}")
+
+    @staticmethod
+    def _attribute(key: str, value: Any) -> Dict[str, Any]:
+        if isinstance(value, bool):
+            encoded = {'boolValue': value}
+        elif isinstance(value, int):
+            encoded = {'intValue': str(value)}
+        elif isinstance(value, float):
+            encoded = {'doubleValue': value}
+        else:
+            encoded = {'stringValue': str(value)}
+        return {'key': key, 'value': encoded}
+
+    def _encode(self, spans: List[Span]) -> Dict[str, Any]:
+        return {
+            'resourceSpans': [{
+                'resource': {'attributes': [self._attribute('service.name', settings.tracing_service_name)]},
+                'scopeSpans': [{
+                    'scope': {'name': 'recon-api'},
+                    'spans': [{
+                        'traceId': span.trace_id,
+                        'spanId': span.span_id,
+                        'parentSpanId': span.parent_id or '',
+                        'name': span.name,
+                        'kind': 1,
+                        'startTimeUnixNano': str(span.start_time_ns),
+                        'endTimeUnixNano': str(span.end_time_ns),
+                        'attributes': [self._attribute(k, v) for k, v in span.attributes.items()],
+                        'status': {'code': 2 if span.status == 'error' else 1},
+                    } for span in spans]
+                }]
+            }]
+        }
+
+
+_exporter = None
+_exporter_config = None
+_buffers: Dict[str, List[Span]] = {}
+_buffers_lock = threading.Lock()
+
+
+def get_exporter():
+    """Exporter for the current settings (None when tracing is disabled)"""
+    global _exporter, _exporter_config
+
+    config = (settings.tracing_exporter, settings.tracing_jsonl_path, settings.tracing_otlp_endpoint)
+    if config != _exporter_config:
+        _exporter_config = config
+        if settings.tracing_exporter == "jsonl":
+            _exporter = JsonlSpanExporter(settings.tracing_jsonl_path)
+        elif settings.tracing_exporter == "otlp":
+            _exporter = OtlpHttpSpanExporter(settings.tracing_otlp_endpoint)
+        else:
+            _exporter = None
+    return _exporter
+
+
+def _finish(span: Span):
+    """Buffer a finished span and flush the trace once its local root ends"""
+    with _buffers_lock:
+        _buffers.setdefault(span.trace_id, []).append(span)
+        if not span.is_local_root:
+            return
+        spans = _buffers.pop(span.trace_id, [])
+
+    exporter = get_exporter()
+    if exporter and spans:
+        try:
+            exporter.export(spans)
+        except Exception as e:
+            logger.warning(f"Span export failed: {e}")
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def start_span(name: str, attributes: Optional[Dict[str, Any]] = None, traceparent: Optional[str] = None):
+    """
+    Start a span as a child of the current span (or of `traceparent`)
+
+    Yields NOOP_SPAN when tracing is disabled.
+    """
+    if get_exporter() is None:
+        yield NOOP_SPAN
+        return
+
+    parent = _current_span.get()
+    remote = parse_traceparent(traceparent) if traceparent else None
+    if remote:
+        trace_id, parent_id, is_local_root = remote[0], remote[1], True
+    elif parent is not None:
+        trace_id, parent_id, is_local_root = parent.trace_id, parent.span_id, False
+    else:
+        trace_id, parent_id, is_local_root = secrets.token_hex(16), None, True
+
+    span = Span(
+        name=name,
+        trace_id=trace_id,
+        span_id=secrets.token_hex(8),
+        parent_id=parent_id,
+        attributes=dict(attributes or {}),
+        is_local_root=is_local_root
+    )
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.status = "error"
+        span.set_attribute("error", f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        span.end_time_ns = time.time_ns()
+        _current_span.reset(token)
+        _finish(span)
+
+
+def traced(name: str):
+    """Decorator wrapping a sync or async function in a span"""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with start_span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with start_span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def inject_headers(headers: Dict[str, Any]) -> Dict[str, Any]:
+    """Add the current span's traceparent to outgoing message headers"""
+    span = _current_span.get()
+    if span is not None and TRACEPARENT_HEADER not in headers:
+        headers[TRACEPARENT_HEADER] = span.traceparent
+    return headers
+
+
+def setup_tracing(app):
+    """Wrap every API request in a root span"""
+    from fastapi import Request
+
+    @app.middleware("http")
+    async def tracing_middleware(request: Request, call_next):
+        with start_span(
+            f"{request.method} {request.url.path}",
+            {'http.method': request.method, 'http.target': request.url.path},
+            traceparent=request.headers.get(TRACEPARENT_HEADER)
+        ) as span:
+            response = await call_next(request)
+            span.set_attribute('http.status_code', response.status_code)
+            route = request.scope.get('route')
+            if route is not None:
+                span.set_attribute('http.route', getattr(route, 'path', ''))
+            return response
+
+
+_task_spans: Dict[str, Any] = {}
+
+
+def setup_celery_tracing():
+    """Propagate traceparent through Celery headers and span each task"""
+    from celery import signals
+
+    @signals.before_task_publish.connect(weak=False)
+    def _inject(headers=None, **kwargs):
+        if headers is not None:
+            inject_headers(headers)
+
+    @signals.task_prerun.connect(weak=False)
+    def _task_prerun(task_id=None, task=None, args=None, kwargs=None, **extra):
+        request = task.request
+        traceparent = getattr(request, TRACEPARENT_HEADER, None) or (getattr(request, 'headers', None) or {}).get(TRACEPARENT_HEADER)
+        attributes = {'celery.task': task.name, 'celery.task_id': task_id}
+        job_id = (kwargs or {}).get('job_id') or (args[0] if args else None)
+        if isinstance(job_id, str):
+            attributes['job_id'] = job_id
+
+        context = start_span(f"celery.task {task.name}", attributes, traceparent=traceparent)
+        context.__enter__()
+        _task_spans[task_id] = context
+
+    @signals.task_postrun.connect(weak=False)
+    def _task_postrun(task_id=None, state=None, **extra):
+        context = _task_spans.pop(task_id, None)
+        if context is not None:
+            span = current_span()
+            if span is not None and state not in (None, 'SUCCESS'):
+                span.status = 'error'
+                span.set_attribute('celery.state', state)
+            context.__exit__(None, None, None)
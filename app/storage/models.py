@@ -3,7 +3,7 @@ Database models for the recon API
 """
 from datetime import datetime
 from enum import Enum
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean, JSON, Index
+from sqlalchemy import Column, Integer, BigInteger, Float, String, DateTime, Text, ForeignKey, Boolean, JSON, Index
 from sqlalchemy.orm import relationship
 
 from app.deps import Base
@@ -38,12 +38,28 @@ class ScanJob(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     completed_at = Column(DateTime, nullable=True)
     error_message = Column(Text, nullable=True)
+    owner_id = Column(Integer, nullable=True, index=True)  # Submitting user (users.id; not a foreign key, users live in app.auth)
 
     # Relationships
+    held_scan = relationship("HeldScan", back_populates="scan_job", uselist=False, cascade="all, delete-orphan")
     subdomains = relationship("Subdomain", back_populates="scan_job", cascade="all, delete-orphan")
     screenshots = relationship("Screenshot", back_populates="scan_job", cascade="all, delete-orphan")
     waf_detections = relationship("WafDetection", back_populates="scan_job", cascade="all, delete-orphan")
     leak_detections = relationship("LeakDetection", back_populates="scan_job", cascade="all, delete-orphan")
+    stage_runs = relationship("StageRun", back_populates="scan_job", cascade="all, delete-orphan")
+
+
+class HeldScan(Base):
+    """Bulk-submitted scan waiting for the admission dispatcher (see app/services/admission.py)"""
+    __tablename__ = "held_scans"
+
+    id = Column(Integer, primary_key=True, index=True)
+    scan_job_id = Column(Integer, ForeignKey("scan_jobs.id"), nullable=False, unique=True)
+    owner_id = Column(Integer, nullable=True, index=True)
+    options = Column(JSON, nullable=False)  # run_recon_scan keyword arguments
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+    scan_job = relationship("ScanJob", back_populates="held_scan")
 
 
 class Subdomain(Base):
@@ -79,6 +95,10 @@ class Subdomain(Base):
     ipv4_addresses = Column(JSON, nullable=True)  # e.g., ["104.20.28.61", "172.66.170.120"]
     ipv6_addresses = Column(JSON, nullable=True)  # e.g., ["2606:4700:10::ac42:aa78"]
 
+    # Response clustering (see app/services/clustering.py)
+    body_hash = Column(String(64), nullable=True)  # SHA-256 of the response body (httpx -hash sha256)
+    cluster_id = Column(String(16), nullable=True, index=True)  # Hosts serving the same page share an id
+
     # Metadata
     discovered_by = Column(String(64), nullable=True)  # subfinder/amass/assetfinder
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
@@ -100,6 +120,7 @@ class Screenshot(Base):
     filename = Column(String, nullable=False)
     file_path = Column(String, nullable=False)
     file_size = Column(Integer, nullable=True)
+    phash = Column(String(16), nullable=True, index=True)  # 64-bit dHash (see app/services/perceptual_hash.py)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # Relationships
@@ -157,3 +178,34 @@ class Technology(Base):
     __table_args__ = (
         Index('idx_tech_subdomain', 'subdomain_id', 'name', unique=True),
     )
+
+
+class StageRun(Base):
+    """Resource usage of a single tool invocation during a scan"""
+    __tablename__ = "stage_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    scan_job_id = Column(Integer, ForeignKey("scan_jobs.id"), nullable=False, index=True)
+    stage = Column(String(32), nullable=False)  # enumeration/probe/waf/screenshots/leaks
+    tool = Column(String(64), nullable=False)  # subfinder/amass/httpx/...
+    command = Column(Text, nullable=True)
+    exit_code = Column(Integer, nullable=True)
+    timed_out = Column(Boolean, default=False)
+
+    # Resource usage of the child process (from os.wait4 rusage)
+    wall_time = Column(Float, nullable=True)  # seconds
+    user_cpu = Column(Float, nullable=True)  # seconds
+    sys_cpu = Column(Float, nullable=True)  # seconds
+    max_rss_kb = Column(BigInteger, nullable=True)
+
+    # Pipe I/O (stdin written to the tool, stdout+stderr read back)
+    bytes_in = Column(BigInteger, nullable=True)
+    bytes_out = Column(BigInteger, nullable=True)
+    lines_in = Column(Integer, nullable=True)
+    lines_out = Column(Integer, nullable=True)
+
+    started_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Relationships
+    scan_job = relationship("ScanJob", back_populates="stage_runs")
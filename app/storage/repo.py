@@ -1,11 +1,12 @@
 """
 Repository layer for database operations
 """
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterator
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from datetime import datetime
+from sqlalchemy import desc, func, insert, update
 
-from app.storage.models import ScanJob, Subdomain, Screenshot, ScanStatus, SubdomainStatus, WafDetection, LeakDetection, Technology
+from app.storage.models import ScanJob, HeldScan, Subdomain, Screenshot, ScanStatus, SubdomainStatus, WafDetection, LeakDetection, Technology, StageRun
 
 
 class ScanJobRepository:
@@ -14,14 +15,54 @@ class ScanJobRepository:
     def __init__(self, db: Session):
         self.db = db
     
-    def create_scan_job(self, job_id: str, domain: str) -> ScanJob:
+    def create_scan_job(self, job_id: str, domain: str, owner_id: Optional[int] = None) -> ScanJob:
         """Create a new scan job"""
-        scan_job = ScanJob(job_id=job_id, domain=domain)
+        scan_job = ScanJob(job_id=job_id, domain=domain, owner_id=owner_id)
         self.db.add(scan_job)
         self.db.commit()
         self.db.refresh(scan_job)
         return scan_job
     
+    def bulk_create_scan_jobs(self, jobs: List[Dict[str, Any]], held_options: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Create scan jobs ([{'job_id', 'domain', 'owner_id', 'task_id'}]) in one multi-row INSERT
+
+        With held_options, the jobs are also held for the admission dispatcher
+        (run_recon_scan keyword arguments shared by all of them). One commit.
+        """
+        if not jobs:
+            return 0
+        self.db.execute(insert(ScanJob), jobs)
+        if held_options is not None:
+            # job_id is unique; one SELECT maps the new rows to their primary keys
+            ids = dict(self.db.query(ScanJob.job_id, ScanJob.id).filter(
+                ScanJob.job_id.in_([job["job_id"] for job in jobs])
+            ).all())
+            self.db.execute(insert(HeldScan), [
+                {"scan_job_id": ids[job["job_id"]], "owner_id": job.get("owner_id"), "options": held_options}
+                for job in jobs
+            ])
+        self.db.commit()
+        return len(jobs)
+
+    def get_task_ids(self, job_ids: List[str]) -> List[tuple]:
+        """(job_id, task_id) of the given jobs, in one query"""
+        if not job_ids:
+            return []
+        return self.db.query(ScanJob.job_id, ScanJob.task_id).filter(ScanJob.job_id.in_(job_ids)).all()
+
+    def fail_scan_jobs(self, job_ids: List[str], error_message: str) -> int:
+        """Mark scan jobs failed in one UPDATE"""
+        if not job_ids:
+            return 0
+        result = self.db.execute(
+            update(ScanJob).where(ScanJob.job_id.in_(job_ids)).values(
+                status=ScanStatus.FAILED, error_message=error_message, updated_at=datetime.utcnow()
+            )
+        )
+        self.db.commit()
+        return result.rowcount
+
     def get_scan_job(self, job_id: str) -> Optional[ScanJob]:
         """Get scan job by job_id"""
         return self.db.query(ScanJob).filter(ScanJob.job_id == job_id).first()
@@ -53,6 +94,57 @@ class ScanJobRepository:
         """Get recent scan jobs with pagination support"""
         return self.db.query(ScanJob).order_by(desc(ScanJob.created_at)).limit(limit).offset(offset).all()
 
+    def _active_query(self, since: datetime):
+        """Dispatched scans still pending or running (updated after since)"""
+        return self.db.query(ScanJob).filter(
+            ScanJob.task_id.isnot(None),
+            ScanJob.status.in_([ScanStatus.PENDING, ScanStatus.RUNNING]),
+            ScanJob.updated_at >= since
+        )
+
+    def count_active_jobs(self, owner_id: int, since: datetime) -> int:
+        """Number of a user's dispatched scans still pending or running"""
+        return self._active_query(since).filter(ScanJob.owner_id == owner_id).count()
+
+    def count_active_jobs_by_owner(self, owner_ids: List[int], since: datetime) -> Dict[int, int]:
+        """owner_id -> number of dispatched scans still pending or running"""
+        if not owner_ids:
+            return {}
+        rows = self._active_query(since).filter(ScanJob.owner_id.in_(owner_ids)).with_entities(
+            ScanJob.owner_id, func.count(ScanJob.id)
+        ).group_by(ScanJob.owner_id).all()
+        return {owner_id: count for owner_id, count in rows}
+
+
+class HeldScanRepository:
+    """Repository for the holding table of bulk-submitted scans"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def hold(self, scan_job: ScanJob, options: Dict[str, Any]) -> HeldScan:
+        """Park a scan job until the admission dispatcher releases it"""
+        held = HeldScan(scan_job_id=scan_job.id, owner_id=scan_job.owner_id, options=options)
+        self.db.add(held)
+        self.db.commit()
+        return held
+
+    def count_held(self, owner_id: Optional[int] = None) -> int:
+        query = self.db.query(HeldScan)
+        if owner_id is not None:
+            query = query.filter(HeldScan.owner_id == owner_id)
+        return query.count()
+
+    def held_owners(self) -> List[Optional[int]]:
+        return [owner_id for (owner_id,) in self.db.query(HeldScan.owner_id).distinct().all()]
+
+    def oldest(self, owner_id: Optional[int], limit: int) -> List[HeldScan]:
+        """A user's oldest held scans, locked against concurrent dispatchers (rows already locked are skipped)"""
+        query = self.db.query(HeldScan).filter(
+            HeldScan.owner_id.is_(None) if owner_id is None else HeldScan.owner_id == owner_id
+        )
+        return query.order_by(HeldScan.created_at, HeldScan.id).limit(limit).with_for_update(skip_locked=True).all()
+
 
 class SubdomainRepository:
     """Repository for subdomain operations"""
@@ -94,7 +186,8 @@ class SubdomainRepository:
                               webserver: str = None, final_url: str = None,
                               cdn_name: str = None, content_type: str = None,
                               host: str = None, chain_status_codes: list = None,
-                              ipv4_addresses: list = None, ipv6_addresses: list = None) -> Optional[Subdomain]:
+                              ipv4_addresses: list = None, ipv6_addresses: list = None,
+                              body_hash: str = None, cluster_id: str = None) -> Optional[Subdomain]:
         """Update subdomain status and all httpx fields"""
         subdomain = self.db.query(Subdomain).filter(Subdomain.id == subdomain_id).first()
         if subdomain:
@@ -128,6 +221,10 @@ class SubdomainRepository:
                 subdomain.ipv4_addresses = ipv4_addresses
             if ipv6_addresses is not None:
                 subdomain.ipv6_addresses = ipv6_addresses
+            if body_hash is not None:
+                subdomain.body_hash = body_hash
+            if cluster_id is not None:
+                subdomain.cluster_id = cluster_id
 
             self.db.commit()
             self.db.refresh(subdomain)
@@ -168,6 +265,30 @@ class ScreenshotRepository:
         self.db.refresh(screenshot)
         return screenshot
     
+    def bulk_create(self, scan_job_id: int, screenshots: List[Dict[str, Any]]) -> List[Screenshot]:
+        """Bulk create screenshot records"""
+        screenshot_objs = [
+            Screenshot(
+                scan_job_id=scan_job_id,
+                subdomain_id=screenshot.get('subdomain_id'),
+                url=screenshot['url'],
+                filename=screenshot['filename'],
+                file_path=screenshot['file_path'],
+                file_size=screenshot.get('file_size'),
+                phash=screenshot.get('phash')
+            )
+            for screenshot in screenshots
+        ]
+        self.db.add_all(screenshot_objs)
+        self.db.commit()
+        return screenshot_objs
+
+    def get_screenshot(self, job_id: str, screenshot_id: int) -> Optional[Screenshot]:
+        """Get one screenshot of a scan job"""
+        return self.db.query(Screenshot).join(ScanJob).filter(
+            ScanJob.job_id == job_id, Screenshot.id == screenshot_id
+        ).first()
+
     def get_screenshots_by_job(self, job_id: str) -> List[Screenshot]:
         """Get all screenshots for a scan job"""
         return self.db.query(Screenshot).join(ScanJob).filter(ScanJob.job_id == job_id).all()
@@ -234,6 +355,26 @@ class LeakDetectionRepository:
         """Get all leak detections for a scan job"""
         return self.db.query(LeakDetection).join(ScanJob).filter(ScanJob.job_id == job_id).all()
 
+    def iter_batches(self, scan_job_id: int, batch_size: int = 1000) -> Iterator[List[LeakDetection]]:
+        """Yield a job's leak detections in id order, batch_size rows per query (keyset pagination)"""
+        last_id = 0
+        while True:
+            batch = self.db.query(LeakDetection).filter(
+                LeakDetection.scan_job_id == scan_job_id,
+                LeakDetection.id > last_id
+            ).order_by(LeakDetection.id).limit(batch_size).all()
+            if not batch:
+                return
+            yield batch
+            last_id = batch[-1].id
+
+    def bulk_update_severity(self, updates: List[Dict[str, Any]]) -> int:
+        """Set severity for [{'id': ..., 'severity': ...}] in one executemany UPDATE"""
+        if updates:
+            self.db.execute(update(LeakDetection), updates)
+            self.db.commit()
+        return len(updates)
+
 
 class TechnologyRepository:
     """Repository for technology operations"""
@@ -282,3 +423,72 @@ class TechnologyRepository:
     def get_by_subdomain(self, subdomain_id: int) -> List[Technology]:
         """Get all technologies for a subdomain"""
         return self.db.query(Technology).filter(Technology.subdomain_id == subdomain_id).all()
+
+    def replace_technologies(self, technologies: Dict[int, List[str]]) -> int:
+        """Make each subdomain's technologies exactly the given names; returns rows added + removed"""
+        if not technologies:
+            return 0
+
+        existing: Dict[int, Dict[str, Technology]] = {}
+        for tech in self.db.query(Technology).filter(Technology.subdomain_id.in_(list(technologies))):
+            existing.setdefault(tech.subdomain_id, {})[tech.name] = tech
+
+        changed = 0
+        for subdomain_id, names in technologies.items():
+            current = existing.get(subdomain_id, {})
+            wanted = set(names)
+            for name, tech in current.items():
+                if name not in wanted:
+                    self.db.delete(tech)
+                    changed += 1
+            for name in wanted - set(current):
+                self.db.add(Technology(subdomain_id=subdomain_id, name=name))
+                changed += 1
+
+        self.db.commit()
+        return changed
+
+
+class StageRunRepository:
+    """Repository for per-tool telemetry records"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def bulk_create(self, scan_job_id: int, runs: List[Dict[str, Any]]) -> List[StageRun]:
+        """Bulk create stage runs from ToolRun dictionaries"""
+        from datetime import datetime
+
+        run_objs = []
+        for run in runs:
+            started_at = run.get('started_at')
+            if isinstance(started_at, str):
+                started_at = datetime.fromisoformat(started_at)
+
+            run_objs.append(StageRun(
+                scan_job_id=scan_job_id,
+                stage=run.get('stage'),
+                tool=run.get('tool'),
+                command=run.get('command'),
+                exit_code=run.get('exit_code'),
+                timed_out=run.get('timed_out', False),
+                wall_time=run.get('wall_time'),
+                user_cpu=run.get('user_cpu'),
+                sys_cpu=run.get('sys_cpu'),
+                max_rss_kb=run.get('max_rss_kb'),
+                bytes_in=run.get('bytes_in'),
+                bytes_out=run.get('bytes_out'),
+                lines_in=run.get('lines_in'),
+                lines_out=run.get('lines_out'),
+                started_at=started_at
+            ))
+
+        self.db.add_all(run_objs)
+        self.db.commit()
+        return run_objs
+
+    def get_by_job(self, job_id: str) -> List[StageRun]:
+        """Get all stage runs for a scan job in execution order"""
+        return self.db.query(StageRun).join(ScanJob).filter(
+            ScanJob.job_id == job_id
+        ).order_by(StageRun.started_at, StageRun.id).all()
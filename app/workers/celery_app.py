@@ -4,19 +4,26 @@ Celery application configuration
 from celery import Celery
 
 from app.deps import settings
+from app.services.metrics import setup_worker_metrics
+from app.services.tracing import setup_celery_tracing
+from app.services.locality import setup_locality_tracking
+from app.services.artifact_refs import PayloadCappedTask
+from app.workers.serialization import configure_serialization
 
 # Create Celery instance
 celery_app = Celery(
     "recon_worker",
     broker=settings.redis_url,
     backend=settings.redis_url,
-    include=["app.workers.tasks"]
+    include=["app.workers.tasks"],
+    # Size cap on published task messages (stage data travels as artifact references)
+    task_cls=PayloadCappedTask
 )
 
 # Enhanced Celery configuration
 celery_app.conf.update(
     task_serializer="json",
-    accept_content=["json"],
+    accept_content=["json"],  # msgpack too, see configure_serialization() below
     result_serializer="json",
     timezone="UTC",
     enable_utc=True,
@@ -51,12 +58,36 @@ celery_app.conf.task_routes = {
 
     # Maintenance tasks
      "app.workers.tasks.cleanup_old_jobs": {"queue": "maintenance"},
+    "app.workers.tasks.release_held_scans": {"queue": "maintenance"},
 }
 
+# Admission control: `celery beat` releases held bulk scans as recon_full drains
+if settings.admission_control_enabled:
+    celery_app.conf.beat_schedule = {
+        "release-held-scans": {
+            "task": "app.workers.tasks.release_held_scans",
+            "schedule": float(settings.admission_release_interval),
+            "options": {"expires": settings.admission_release_interval},
+        },
+    }
+
 # Queue priorities (higher number = higher priority)
 celery_app.conf.task_queue_max_priority = 10
 celery_app.conf.task_default_priority = 5
+# Every worker also consumes "<hostname>.dq2"; locality routing sends a job's stage tasks there
 celery_app.conf.worker_direct = True
 
+# msgpack / compression for the configured queues and for results; json is always accepted
+configure_serialization(celery_app)
+
+# Task runtime metrics and the worker Prometheus exporter
+setup_worker_metrics()
+
+# traceparent header propagation and per-task spans
+setup_celery_tracing()
+
+# Node liveness/load and job owners for locality routing
+setup_locality_tracking(celery_app)
+
 if __name__ == "__main__":
     celery_app.start()
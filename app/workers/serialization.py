@@ -0,0 +1,87 @@
+"""
+Celery message and result encoding
+
+Bulk scans publish thousands of task messages and every running task
+rewrites its progress meta, so the encoding is configurable:
+
+    celery_serializer / celery_compression                 task messages on celery_serialization_queues
+    celery_result_serializer / celery_result_compression   results and progress meta
+
+msgpack needs the msgpack package and zstd the zstandard package; without
+them the settings fall back to json and zlib.
+
+Every node accepts json and msgpack (and any compression kombu knows, which
+is read from the message headers), whatever it sends. A rolling upgrade
+therefore deploys this code with the json defaults everywhere first and
+switches the serializer afterwards; messages queued as JSON by older
+publishers keep decoding.
+"""
+import logging
+from typing import Any, Dict, List, Optional
+
+from kombu import compression as kombu_compression
+
+from app.deps import settings
+
+try:
+    import msgpack
+except ImportError:  # optional: messages stay json without it
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+
+def accepted_content() -> List[str]:
+    return ["json", "msgpack"] if msgpack is not None else ["json"]
+
+
+def resolve_serializer(name: str) -> str:
+    if name == "msgpack" and msgpack is None:
+        logger.warning("msgpack is not installed, Celery messages stay json")
+        return "json"
+    if name not in ("json", "msgpack"):
+        raise ValueError(f"Unsupported Celery serializer: {name}")
+    return name
+
+
+def resolve_compression(name: Optional[str]) -> Optional[str]:
+    if not name:
+        return None
+    if name == "zstd" and "zstd" not in kombu_compression._aliases:
+        logger.warning("zstandard is not installed, compressing Celery messages with zlib")
+        return "zlib"
+    if name not in kombu_compression._aliases:
+        raise ValueError(f"Unsupported Celery compression: {name}")
+    return name
+
+
+def message_options() -> Dict[str, Any]:
+    """apply_async options of the configured task message encoding"""
+    options: Dict[str, Any] = {"serializer": resolve_serializer(settings.celery_serializer)}
+    compression = resolve_compression(settings.celery_compression)
+    if compression:
+        options["compression"] = compression
+    return options
+
+
+def task_annotations(task_routes: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Per-task serializer/compression of the tasks routed to celery_serialization_queues
+
+    Set as task annotations rather than route options: a task's own
+    serializer (task_serializer) takes precedence over its route's.
+    """
+    options = message_options()
+    if options == {"serializer": "json"}:
+        return {}
+    queues = set(settings.celery_serialization_queues)
+    return {name: dict(options) for name, route in task_routes.items() if not queues or route.get("queue") in queues}
+
+
+def configure_serialization(celery_app):
+    """Apply the encoding settings to celery_app (before its tasks are defined)"""
+    celery_app.conf.accept_content = accepted_content()
+    celery_app.conf.result_accept_content = accepted_content()
+    celery_app.conf.result_serializer = resolve_serializer(settings.celery_result_serializer)
+    celery_app.conf.result_compression = resolve_compression(settings.celery_result_compression)
+    celery_app.conf.task_annotations = task_annotations(celery_app.conf.task_routes)
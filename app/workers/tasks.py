@@ -2,7 +2,8 @@
 Celery tasks for background processing
 """
 import asyncio
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Union
+from urllib.parse import urlparse
 
 from celery import current_task
 from sqlalchemy.orm import Session
@@ -10,12 +11,18 @@ from sqlalchemy.orm import Session
 from app.workers.celery_app import celery_app
 from app.deps import SessionLocal, settings
 from app.services.pipeline import ReconPipeline
-from app.storage.repo import ScanJobRepository, SubdomainRepository, ScreenshotRepository, WafDetectionRepository, LeakDetectionRepository, TechnologyRepository
+from app.services.artifacts import get_artifact_store, delete_job_files
+from app.services.locality import record_owner
+from app.services.artifact_refs import copy_ref, ensure_size, resolve, summary_stats, write_ref
+from app.storage.repo import ScanJobRepository, SubdomainRepository, ScreenshotRepository, WafDetectionRepository, LeakDetectionRepository, TechnologyRepository, StageRunRepository
 from app.storage.models import ScanJob, ScanStatus, SubdomainStatus
+from app.services.tracing import start_span
+from app.services.profiling import ScanProfiler, should_profile, profile_phase
 
 
 @celery_app.task(bind=True, max_retries=3, default_retry_delay=60)
-def run_recon_scan(self, job_id: str, domain: str, amass_config: Dict[str, Any] = None) -> Dict[str, Any]:
+def run_recon_scan(self, job_id: str, domain: str, amass_config: Dict[str, Any] = None, profile: bool = False,
+                   scope_config: Dict[str, Any] = None, probe_config: Dict[str, Any] = None) -> Dict[str, Any]:
     """
     Enhanced main task to run reconnaissance scan with retry logic
 
@@ -27,8 +34,19 @@ def run_recon_scan(self, job_id: str, domain: str, amass_config: Dict[str, Any]
             - timeout: timeout in minutes (5-3600)
             - max_dns_queries: max concurrent DNS queries (1-200)
             - use_wordlist: whether to use custom wordlist (True/False)
+        profile: write cProfile + collapsed-stack profiles to jobs/{job_id}/profile/
+            (scans are also profiled at random per settings.profile_sample_rate)
+        scope_config: extra scope patterns applied to enumerator output:
+            - include: list of patterns in scope besides the domain ("*.example.org")
+            - exclude: list of patterns to drop ("admin.example.com")
+        probe_config: httpx overrides of the settings defaults:
+            - engine: "cli" (httpx binary) or "native" (in-process httpx.AsyncClient)
+            - mode: "two_phase" or "single" (cli engine)
+            - fast_timeout / fast_retries: sweep of every host (two_phase only)
+            - slow_timeout / slow_retries: re-probe of hosts that timed out
     """
     db = SessionLocal()
+    profiler = ScanProfiler(job_id) if should_profile(profile) else None
 
     # Set default Amass configuration if not provided
     if amass_config is None:
@@ -61,125 +79,26 @@ def run_recon_scan(self, job_id: str, domain: str, amass_config: Dict[str, Any]
         progress_callback(0, 'Initializing reconnaissance pipeline...')
 
         # Run the enhanced pipeline with Amass configuration
-        pipeline = ReconPipeline(job_id, domain, progress_callback, amass_config=amass_config)
+        pipeline = ReconPipeline(job_id, domain, progress_callback, amass_config=amass_config, scope_config=scope_config,
+                                 probe_config=probe_config)
+        record_owner(job_id, self.request.hostname)
 
         # Use asyncio to run the async pipeline
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
 
         try:
-            results = loop.run_until_complete(pipeline.run_full_pipeline())
+            with profile_phase(profiler, "pipeline"):
+                results = loop.run_until_complete(pipeline.run_full_pipeline())
         finally:
             loop.close()
 
         # Save results to database
-        scan_job = scan_repo.get_scan_job(job_id)
-        if scan_job:
-            # Save subdomains
-            subdomain_repo = SubdomainRepository(db)
-            screenshot_repo = ScreenshotRepository(db)
-
-            # Update progress
-            progress_callback(95, 'Saving results to database...')
-
-            # Save discovered subdomains
-            if results.get('subdomains'):
-                subdomain_repo.bulk_create_subdomains(
-                    scan_job.id,
-                    results['subdomains'],
-                    discovered_by="enhanced_pipeline"
-                )
-
-            # Update all hosts (both live and dead) with their status codes and httpx data
-            if results.get('live_hosts'):
-                tech_repo = TechnologyRepository(db)
-
-                for live_host in results['live_hosts']:
-                    # Extract domain from URL
-                    url = live_host['url']
-                    domain_part = url.replace('http://', '').replace('https://', '').split('/')[0]
+        with profile_phase(profiler, "ingest"):
+            _save_scan_results(db, job_id, results, progress_callback)
 
-                    # Find corresponding subdomain and update it
-                    subdomains = subdomain_repo.get_subdomains_by_job(job_id)
-                    for subdomain in subdomains:
-                        if subdomain.subdomain == domain_part:
-                            # Determine status based on is_live flag
-                            status = SubdomainStatus.LIVE if live_host.get('is_live') else SubdomainStatus.DEAD
-
-                            # Update subdomain with all httpx fields
-                            subdomain_repo.update_subdomain_status(
-                                subdomain.id,
-                                status,
-                                is_live=live_host.get('is_live', False),
-                                http_status=live_host.get('status_code'),
-                                response_time=live_host.get('response_time'),
-                                url=live_host.get('url'),
-                                title=live_host.get('title'),
-                                content_length=live_host.get('content_length'),
-                                webserver=live_host.get('webserver'),
-                                final_url=live_host.get('final_url'),
-                                cdn_name=live_host.get('cdn_name'),
-                                content_type=live_host.get('content_type'),
-                                host=live_host.get('host'),
-                                chain_status_codes=live_host.get('chain_status_codes'),
-                                ipv4_addresses=live_host.get('ipv4_addresses'),
-                                ipv6_addresses=live_host.get('ipv6_addresses')
-                            )
-
-                            # Save technologies to separate table
-                            technologies = live_host.get('technologies', [])
-                            if technologies:
-                                tech_repo.bulk_create_technologies(subdomain.id, technologies)
-
-                            break
-
-            # Save screenshots
-            if results.get('screenshots'):
-                for screenshot in results['screenshots']:
-                    # Find corresponding subdomain
-                    url = screenshot['url']
-                    domain_part = url.replace('http://', '').replace('https://', '').split('/')[0]
-
-                    subdomain_id = None
-                    subdomains = subdomain_repo.get_subdomains_by_job(job_id)
-                    for subdomain in subdomains:
-                        if subdomain.subdomain == domain_part:
-                            subdomain_id = subdomain.id
-                            break
-
-                    # Create screenshot record
-                    # Build correct file_path; prefer parser-provided relative path if available
-                    file_path = screenshot.get('file_path') if isinstance(screenshot, dict) else None
-                    if file_path:
-                        # Normalize and ensure it is rooted under jobs/{job_id}
-                        # If already starts with jobs/, keep as-is; else prefix with jobs/{job_id}/
-                        norm_path = str(file_path).replace('\\', '/').lstrip('/')
-                        if norm_path.startswith('jobs/'):
-                            final_path = norm_path
-                        else:
-                            final_path = f"jobs/{job_id}/{norm_path}"
-                    else:
-                        # Fallback: assume flat shots directory
-                        final_path = f"jobs/{job_id}/shots/{screenshot['filename']}"
-
-                    screenshot_repo.create_screenshot(
-                        scan_job_id=scan_job.id,
-                        url=screenshot['url'],
-                        filename=screenshot['filename'],
-                        file_path=final_path,
-                        subdomain_id=subdomain_id,
-                        file_size=screenshot.get('file_size') if isinstance(screenshot, dict) else None
-                    )
-
-            # Save WAF detections
-            if results.get('waf_detections'):
-                waf_repo = WafDetectionRepository(db)
-                waf_repo.bulk_create(scan_job.id, results['waf_detections'])
-
-            # Save leak detections
-            if results.get('leak_detections'):
-                leak_repo = LeakDetectionRepository(db)
-                leak_repo.bulk_create(scan_job.id, results['leak_detections'])
+        # Move the job's files into the artifact store (no-op when disabled)
+        pipeline.commit_artifacts()
 
         # Update job status to completed
         if results.get('errors'):
@@ -188,8 +107,8 @@ def run_recon_scan(self, job_id: str, domain: str, amass_config: Dict[str, Any]
         else:
             scan_repo.update_scan_status(job_id, ScanStatus.COMPLETED)
 
-        # Final progress update
-        final_stats = results.get('stats', {})
+        # Final progress update; per-tool records are in the database, only counters go to the result backend
+        final_stats = summary_stats(results.get('stats', {}))
         self.update_state(
             state='SUCCESS',
             meta={
@@ -207,13 +126,13 @@ def run_recon_scan(self, job_id: str, domain: str, amass_config: Dict[str, Any]
             }
         )
 
-        return {
+        return ensure_size({
             'job_id': job_id,
             'domain': domain,
             'status': 'completed',
             'stats': final_stats,
             'errors': results.get('errors', [])
-        }
+        }, settings.celery_max_result_bytes, 'run_recon_scan result')
 
     except Exception as e:
         # Check if this is a retryable error
@@ -256,6 +175,139 @@ def run_recon_scan(self, job_id: str, domain: str, amass_config: Dict[str, Any]
 
     finally:
         db.close()
+        # A recon_full slot is free: let the dispatcher release held bulk scans
+        if settings.admission_control_enabled:
+            try:
+                release_held_scans.delay()
+            except Exception as e:
+                import logging
+                logging.warning(f"[{job_id}] Could not trigger the held scan dispatcher: {e}")
+
+
+def _url_host(url: str) -> str:
+    """Host name of a probed URL, as stored in Subdomain.subdomain"""
+    return (urlparse(url).hostname or '') if '://' in url else url.split('/')[0].lower()
+
+
+def _save_scan_results(db: Session, job_id: str, results: Dict[str, Any], progress_callback) -> None:
+    """Persist pipeline results (subdomains, httpx data, screenshots, WAF, leaks, telemetry)"""
+    scan_repo = ScanJobRepository(db)
+    scan_job = scan_repo.get_scan_job(job_id)
+    if scan_job:
+        # Save subdomains
+        subdomain_repo = SubdomainRepository(db)
+        screenshot_repo = ScreenshotRepository(db)
+
+        # Update progress
+        progress_callback(95, 'Saving results to database...')
+
+        # Save discovered subdomains
+        if results.get('subdomains'):
+            with start_span("db.save_subdomains", {'job_id': job_id, 'db.rows': len(results['subdomains'])}):
+                subdomain_repo.bulk_create_subdomains(
+                    scan_job.id,
+                    results['subdomains'],
+                    discovered_by="enhanced_pipeline"
+                )
+
+        # One lookup table for the whole job instead of reloading every subdomain per host/screenshot
+        subdomains_by_name: Dict[str, Any] = {}
+        for subdomain in subdomain_repo.get_subdomains_by_job(job_id):
+            subdomains_by_name.setdefault(subdomain.subdomain, subdomain)
+
+        # Update all hosts (both live and dead) with their status codes and httpx data
+        if results.get('live_hosts'):
+            with start_span("db.update_live_hosts", {'job_id': job_id, 'db.rows': len(results['live_hosts'])}):
+                tech_repo = TechnologyRepository(db)
+
+                for live_host in results['live_hosts']:
+                    # Find corresponding subdomain and update it
+                    subdomain = subdomains_by_name.get(_url_host(live_host['url']))
+                    if subdomain is None:
+                        continue
+
+                    # Determine status based on is_live flag
+                    status = SubdomainStatus.LIVE if live_host.get('is_live') else SubdomainStatus.DEAD
+
+                    # Update subdomain with all httpx fields
+                    subdomain_repo.update_subdomain_status(
+                        subdomain.id,
+                        status,
+                        is_live=live_host.get('is_live', False),
+                        http_status=live_host.get('status_code'),
+                        response_time=live_host.get('response_time'),
+                        url=live_host.get('url'),
+                        title=live_host.get('title'),
+                        content_length=live_host.get('content_length'),
+                        webserver=live_host.get('webserver'),
+                        final_url=live_host.get('final_url'),
+                        cdn_name=live_host.get('cdn_name'),
+                        content_type=live_host.get('content_type'),
+                        host=live_host.get('host'),
+                        chain_status_codes=live_host.get('chain_status_codes'),
+                        ipv4_addresses=live_host.get('ipv4_addresses'),
+                        ipv6_addresses=live_host.get('ipv6_addresses'),
+                        body_hash=live_host.get('body_hash'),
+                        cluster_id=live_host.get('cluster_id')
+                    )
+
+                    # Save technologies to separate table
+                    technologies = live_host.get('technologies', [])
+                    if technologies:
+                        tech_repo.bulk_create_technologies(subdomain.id, technologies)
+
+        # Save screenshots
+        if results.get('screenshots'):
+            with start_span("db.save_screenshots", {'job_id': job_id, 'db.rows': len(results['screenshots'])}):
+                # Screenshot URLs are the probed URLs (from the gowitness manifest); fall back to the host name
+                subdomains_by_url = {sub.url: sub for sub in subdomains_by_name.values() if sub.url}
+                rows = []
+                for screenshot in results['screenshots']:
+                    url = screenshot['url']
+                    subdomain = subdomains_by_url.get(url) or subdomains_by_name.get(_url_host(url))
+
+                    # Build correct file_path; prefer parser-provided relative path if available
+                    file_path = screenshot.get('file_path')
+                    if file_path:
+                        # Normalize and ensure it is rooted under jobs/{job_id}
+                        # If already starts with jobs/, keep as-is; else prefix with jobs/{job_id}/
+                        norm_path = str(file_path).replace('\\', '/').lstrip('/')
+                        if norm_path.startswith('jobs/'):
+                            final_path = norm_path
+                        else:
+                            final_path = f"jobs/{job_id}/{norm_path}"
+                    else:
+                        # Fallback: assume flat shots directory
+                        final_path = f"jobs/{job_id}/shots/{screenshot['filename']}"
+
+                    rows.append({
+                        'url': url,
+                        'filename': screenshot['filename'],
+                        'file_path': final_path,
+                        'subdomain_id': subdomain.id if subdomain is not None else None,
+                        'file_size': screenshot.get('file_size'),
+                        'phash': screenshot.get('phash')
+                    })
+                screenshot_repo.bulk_create(scan_job.id, rows)
+
+        # Save WAF detections
+        if results.get('waf_detections'):
+            with start_span("db.save_waf_detections", {'job_id': job_id, 'db.rows': len(results['waf_detections'])}):
+                waf_repo = WafDetectionRepository(db)
+                waf_repo.bulk_create(scan_job.id, results['waf_detections'])
+
+        # Save leak detections
+        if results.get('leak_detections'):
+            with start_span("db.save_leak_detections", {'job_id': job_id, 'db.rows': len(results['leak_detections'])}):
+                leak_repo = LeakDetectionRepository(db)
+                leak_repo.bulk_create(scan_job.id, results['leak_detections'])
+
+        # Save per-tool telemetry
+        stage_runs = results.get('stats', {}).get('stage_runs')
+        if stage_runs:
+            with start_span("db.save_stage_runs", {'job_id': job_id, 'db.rows': len(stage_runs)}):
+                stage_run_repo = StageRunRepository(db)
+                stage_run_repo.bulk_create(scan_job.id, stage_runs)
 
 
 @celery_app.task(bind=True)
@@ -271,20 +323,24 @@ def run_subdomain_enumeration(self, job_id: str, domain: str) -> Dict[str, Any]:
             )
 
         pipeline = ReconPipeline(job_id, domain, progress_callback)
+        record_owner(job_id, self.request.hostname)
 
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
 
         try:
             subdomains = loop.run_until_complete(pipeline.enumerate_subdomains_enhanced())
-            return {
+            subdomains_ref = copy_ref(job_id, 'subs.txt', 'stages/subdomains.txt', count=len(subdomains)) \
+                if pipeline.subs_file.exists() else write_ref(job_id, 'stages/subdomains.json', subdomains)
+            return ensure_size({
                 'job_id': job_id,
                 'domain': domain,
-                'subdomains': subdomains,
+                'subdomains': subdomains_ref,
                 'count': len(subdomains)
-            }
+            }, settings.celery_max_result_bytes, 'run_subdomain_enumeration result')
         finally:
             loop.close()
+            pipeline.commit_artifacts()
 
     except Exception as e:
         self.update_state(
@@ -295,9 +351,12 @@ def run_subdomain_enumeration(self, job_id: str, domain: str) -> Dict[str, Any]:
 
 
 @celery_app.task(bind=True)
-def run_live_host_check(self, job_id: str, domain: str, subdomains: List[str]) -> Dict[str, Any]:
+def run_live_host_check(self, job_id: str, domain: str, subdomains: Union[Dict[str, Any], List[str]]) -> Dict[str, Any]:
     """
     Task to run only live host checking stage
+
+    subdomains is the artifact reference returned by run_subdomain_enumeration
+    (a plain list is still accepted from older messages)
     """
     try:
         def progress_callback(percentage: int, message: str):
@@ -307,20 +366,23 @@ def run_live_host_check(self, job_id: str, domain: str, subdomains: List[str]) -
             )
 
         pipeline = ReconPipeline(job_id, domain, progress_callback)
+        record_owner(job_id, self.request.hostname)
+        subdomains = resolve(subdomains)
 
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
 
         try:
             live_hosts = loop.run_until_complete(pipeline.check_live_hosts_enhanced(subdomains))
-            return {
+            return ensure_size({
                 'job_id': job_id,
                 'domain': domain,
-                'live_hosts': live_hosts,
+                'live_hosts': write_ref(job_id, 'stages/live_hosts.json', live_hosts),
                 'count': len(live_hosts)
-            }
+            }, settings.celery_max_result_bytes, 'run_live_host_check result')
         finally:
             loop.close()
+            pipeline.commit_artifacts()
 
     except Exception as e:
         self.update_state(
@@ -331,9 +393,13 @@ def run_live_host_check(self, job_id: str, domain: str, subdomains: List[str]) -
 
 
 @celery_app.task(bind=True)
-def run_screenshot_capture(self, job_id: str, domain: str, live_hosts: List[Dict[str, Any]]) -> Dict[str, Any]:
+def run_screenshot_capture(self, job_id: str, domain: str,
+                           live_hosts: Union[Dict[str, Any], List[Dict[str, Any]]]) -> Dict[str, Any]:
     """
     Task to run only screenshot capture stage
+
+    live_hosts is the artifact reference returned by run_live_host_check
+    (a plain list is still accepted from older messages)
     """
     try:
         def progress_callback(percentage: int, message: str):
@@ -343,20 +409,22 @@ def run_screenshot_capture(self, job_id: str, domain: str, live_hosts: List[Dict
             )
 
         pipeline = ReconPipeline(job_id, domain, progress_callback)
+        record_owner(job_id, self.request.hostname)
 
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
 
         try:
-            screenshots = loop.run_until_complete(pipeline.capture_screenshots_enhanced(live_hosts))
-            return {
+            screenshots = loop.run_until_complete(pipeline.capture_screenshots_enhanced(resolve(live_hosts)))
+            return ensure_size({
                 'job_id': job_id,
                 'domain': domain,
-                'screenshots': screenshots,
+                'screenshots': write_ref(job_id, 'stages/screenshots.json', screenshots),
                 'count': len(screenshots)
-            }
+            }, settings.celery_max_result_bytes, 'run_screenshot_capture result')
         finally:
             loop.close()
+            pipeline.commit_artifacts()
 
     except Exception as e:
         self.update_state(
@@ -371,9 +439,7 @@ def cleanup_old_jobs(days_old: int = 7) -> Dict[str, Any]:
     """
     Cleanup old scan jobs and their files
     """
-    import shutil
     from datetime import datetime, timedelta
-    from pathlib import Path
 
     db = SessionLocal()
     try:
@@ -385,10 +451,8 @@ def cleanup_old_jobs(days_old: int = 7) -> Dict[str, Any]:
 
         cleaned_count = 0
         for job in old_jobs:
-            # Remove job directory
-            job_dir = Path(settings.jobs_directory) / job.job_id
-            if job_dir.exists():
-                shutil.rmtree(job_dir)
+            # Remove job directory and its stored artifacts
+            delete_job_files(job.job_id)
 
             # Remove from database
             db.delete(job)
@@ -396,9 +460,14 @@ def cleanup_old_jobs(days_old: int = 7) -> Dict[str, Any]:
 
         db.commit()
 
+        # Blobs kept by the grace period of an earlier cleanup
+        store = get_artifact_store()
+        removed_blobs = store.gc() if store is not None else 0
+
         return {
             'status': 'completed',
             'cleaned_jobs': cleaned_count,
+            'removed_blobs': removed_blobs,
             'cutoff_date': cutoff_date.isoformat()
         }
 
@@ -409,14 +478,34 @@ def cleanup_old_jobs(days_old: int = 7) -> Dict[str, Any]:
         db.close()
 
 
+@celery_app.task
+def release_held_scans() -> Dict[str, Any]:
+    """
+    Publish held bulk scans as recon_full has room (see app/services/admission.py)
+    """
+    from app.services.admission import release_held
+
+    if not settings.admission_control_enabled:
+        return {'status': 'disabled', 'released': 0}
+
+    db = SessionLocal()
+    try:
+        return {'status': 'completed', 'released': release_held(db)}
+    finally:
+        db.close()
+
+
 
 @celery_app.task(bind=True)
-def run_waf_check(self, job_id: str, domain: str, live_hosts: List[Dict[str, Any]]) -> Dict[str, Any]:
+def run_waf_check(self, job_id: str, domain: str,
+                  live_hosts: Union[Dict[str, Any], List[Dict[str, Any]]]) -> Dict[str, Any]:
     """
     Task to run WAF detection stage on live hosts
 
     This task is dedicated to WAF detection and can be run independently
-    or as part of the full reconnaissance pipeline.
+    or as part of the full reconnaissance pipeline. live_hosts is the
+    artifact reference returned by run_live_host_check (or a plain list).
+    Detections are saved to the database; the result only counts them.
     """
     db = SessionLocal()
     try:
@@ -436,6 +525,7 @@ def run_waf_check(self, job_id: str, domain: str, live_hosts: List[Dict[str, Any
 
         # Create pipeline instance
         pipeline = ReconPipeline(job_id, domain, progress_callback)
+        record_owner(job_id, self.request.hostname)
 
         # Run asyncio event loop
         loop = asyncio.new_event_loop()
@@ -443,6 +533,7 @@ def run_waf_check(self, job_id: str, domain: str, live_hosts: List[Dict[str, Any
 
         try:
             # Prepare live URLs file
+            live_hosts = resolve(live_hosts)
             urls = [host['url'] for host in live_hosts]
             with open(pipeline.live_urls_file, 'w', encoding='utf-8') as f:
                 for url in urls:
@@ -465,16 +556,17 @@ def run_waf_check(self, job_id: str, domain: str, live_hosts: List[Dict[str, Any
 
             progress_callback(100, 'WAF detection completed successfully!')
 
-            return {
+            return ensure_size({
                 'job_id': job_id,
                 'domain': domain,
                 'status': 'completed',
-                'waf_detections': waf_detections,
+                'waf_protected': len([w for w in waf_detections if w.get('has_waf')]),
                 'count': len(waf_detections)
-            }
+            }, settings.celery_max_result_bytes, 'run_waf_check result')
 
         finally:
             loop.close()
+            pipeline.commit_artifacts()
 
     except Exception as e:
         self.update_state(
@@ -498,7 +590,8 @@ def run_waf_check(self, job_id: str, domain: str, live_hosts: List[Dict[str, Any
 # 3. Only the selective scanning version (below) should be used
 
 @celery_app.task(bind=True, max_retries=3, default_retry_delay=60)
-def run_sourceleakhacker_check(self, job_id: str, selected_urls: List[str], mode: str = "tiny") -> Dict[str, Any]:
+def run_sourceleakhacker_check(self, job_id: str, selected_urls: Union[Dict[str, Any], List[str]],
+                               mode: str = "tiny") -> Dict[str, Any]:
     db = SessionLocal()
 
     try:
@@ -510,6 +603,8 @@ def run_sourceleakhacker_check(self, job_id: str, selected_urls: List[str], mode
             raise ValueError(f"Scan job {job_id} not found")
 
         domain = scan_job.domain
+        # Artifact reference written by the API (a plain list from older messages)
+        selected_urls = resolve(selected_urls)
 
         # Progress callback function
         def progress_callback(percentage: int, message: str):
@@ -531,6 +626,7 @@ def run_sourceleakhacker_check(self, job_id: str, selected_urls: List[str], mode
 
         # Create pipeline instance
         pipeline = ReconPipeline(job_id, domain, progress_callback)
+        record_owner(job_id, self.request.hostname)
 
         # Use asyncio to run the async method
         loop = asyncio.new_event_loop()
@@ -539,8 +635,15 @@ def run_sourceleakhacker_check(self, job_id: str, selected_urls: List[str], mode
         try:
             progress_callback(20, 'Running SourceLeakHacker...')
 
-            # Create minimal live_hosts structure from selected URLs
-            live_hosts = [{'url': url} for url in selected_urls]
+            # Create minimal live_hosts structure from selected URLs; with their cluster ids,
+            # only one URL per cluster of identical pages is scanned
+            clusters = {}
+            if settings.host_clustering_enabled:
+                clusters = {
+                    sub.url: sub.cluster_id
+                    for sub in SubdomainRepository(db).get_subdomains_by_job(job_id) if sub.url and sub.cluster_id
+                }
+            live_hosts = [{'url': url, 'cluster_id': clusters.get(url)} for url in selected_urls]
 
             # Run SourceLeakHacker with selected URLs
             leak_detections = loop.run_until_complete(
@@ -563,7 +666,7 @@ def run_sourceleakhacker_check(self, job_id: str, selected_urls: List[str], mode
 
             progress_callback(100, f'Leak scan completed! Found {len(leak_detections)} leaks.')
 
-            return {
+            return ensure_size({
                 'job_id': job_id,
                 'domain': domain,
                 'status': 'completed',
@@ -571,10 +674,11 @@ def run_sourceleakhacker_check(self, job_id: str, selected_urls: List[str], mode
                 'leaks_found': len(leak_detections),
                 'mode': mode,
                 'message': f'Scanned {len(selected_urls)} URLs in {mode} mode, found {len(leak_detections)} leaks'
-            }
+            }, settings.celery_max_result_bytes, 'run_sourceleakhacker_check result')
 
         finally:
             loop.close()
+            pipeline.commit_artifacts()
 
     except Exception as e:
         import logging
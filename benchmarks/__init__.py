@@ -0,0 +1,3 @@
+"""
+Benchmark harness for the reconnaissance pipeline
+"""
@@ -0,0 +1,164 @@
+"""
+Celery message encoding benchmark
+
+Encodes representative task messages and result-backend entries of each
+task type with every available serializer (json, msgpack) and compression
+(none, zlib, zstd), the way kombu does before they reach Redis, and reports
+body bytes and encode/decode time per message.
+
+The inline cases are the list payloads stage tasks passed before artifact
+references, at --hosts live hosts, for comparison.
+
+Usage:
+    python -m benchmarks.bench_celery_messages [--hosts 5000] [--iterations 200] [--output report.json]
+"""
+import sys
+import json
+import time
+import argparse
+import statistics
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from kombu import compression, serialization
+
+from app.workers.serialization import accepted_content
+from benchmarks.fake_tools import subdomain_name, _ip
+
+DOMAIN = "bench.example.com"
+JOB_ID = "5f0c7a52-6c1e-4e3a-9a51-0d4b6f3e2a11"
+EMBED = {"callbacks": None, "errbacks": None, "chain": None, "chord": None}
+
+
+def _ref(key: str, count: int) -> Dict[str, Any]:
+    return {"job_id": JOB_ID, "key": key, "sha256": "9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08",
+            "size": count * 180, "format": "json", "count": count}
+
+
+def _live_hosts(count: int) -> List[Dict[str, Any]]:
+    hosts = []
+    for i in range(count):
+        name = subdomain_name(i, DOMAIN)
+        hosts.append({
+            "url": f"https://{name}", "subdomain": name, "status_code": [200, 301, 403][i % 3],
+            "title": "Welcome to nginx!" if i % 4 else "Sign in", "content_length": 1024 + i % 4096,
+            "technologies": ["Nginx", "PHP"], "a": [_ip(name)], "cluster_id": f"{i % 97:016x}",
+        })
+    return hosts
+
+
+def build_cases(hosts: int) -> Dict[str, Tuple[str, Any]]:
+    """case name -> (kind, payload); kind is "message" (args, kwargs, embed) or "result" (backend meta)"""
+    scope = {"include": [f"*.{DOMAIN}"], "exclude": ["staging.*", "*.internal.*"]}
+    amass = {"mode": "passive", "timeout": 30, "max_dns_queries": 40, "use_wordlist": False}
+    probe = {"engine": "httpx", "mode": "two_phase", "fast_timeout": 3, "fast_retries": 0}
+    live = _live_hosts(hosts)
+    progress = {"current": 55, "total": 100, "status": f"Found {hosts} live hosts, running WAF detection...",
+                "job_id": JOB_ID, "domain": DOMAIN}
+    stats = {"total_subdomains": hosts * 3, "resolved_hosts": hosts * 2, "wildcard_hosts": 0, "live_hosts": hosts,
+             "host_clusters": hosts // 4, "waf_protected": hosts // 10, "screenshots_taken": hosts // 4}
+
+    def result(value: Any, status: str = "SUCCESS") -> Dict[str, Any]:
+        return {"status": status, "result": value, "traceback": None, "children": [],
+                "date_done": "2026-01-01T00:00:00.000000", "task_id": JOB_ID}
+
+    return {
+        "run_recon_scan message": ("message", (
+            [JOB_ID, DOMAIN, amass], {"profile": False, "scope_config": scope, "probe_config": probe}, EMBED)),
+        "run_live_host_check message (ref)": ("message", (
+            [JOB_ID, DOMAIN, _ref("subs.txt", hosts * 3)], {}, EMBED)),
+        "run_live_host_check message (inline)": ("message", (
+            [JOB_ID, DOMAIN, [subdomain_name(i, DOMAIN) for i in range(hosts * 3)]], {}, EMBED)),
+        "run_screenshot_capture message (ref)": ("message", (
+            [JOB_ID, DOMAIN, _ref("stages/live_hosts.json", hosts)], {}, EMBED)),
+        "run_screenshot_capture message (inline)": ("message", ([JOB_ID, DOMAIN, live], {}, EMBED)),
+        "progress meta": ("result", result(progress, "PROGRESS")),
+        "run_recon_scan result": ("result", result(
+            {"job_id": JOB_ID, "domain": DOMAIN, "status": "completed", "stats": stats, "errors": []})),
+        "run_live_host_check result (ref)": ("result", result(
+            {"job_id": JOB_ID, "domain": DOMAIN, "live_hosts": _ref("stages/live_hosts.json", hosts), "count": hosts})),
+        "run_live_host_check result (inline)": ("result", result(
+            {"job_id": JOB_ID, "domain": DOMAIN, "live_hosts": live, "count": hosts})),
+    }
+
+
+def encodings() -> List[Tuple[str, str]]:
+    compressions = ["none", "zlib"] + (["zstd"] if "zstd" in compression._aliases else [])
+    return [(serializer, method) for serializer in accepted_content() for method in compressions]
+
+
+def _median_us(func: Callable[[], Any], iterations: int) -> float:
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return round(statistics.median(samples) * 1e6, 1)
+
+
+def measure(payload: Any, serializer: str, method: str, iterations: int) -> Dict[str, Any]:
+    def encode() -> Tuple[str, str, bytes]:
+        content_type, encoding, body = serialization.dumps(payload, serializer=serializer)
+        body = body.encode(encoding) if isinstance(body, str) else body
+        if method != "none":
+            body, _ = compression.compress(body, method)
+        return content_type, encoding, body
+
+    content_type, encoding, body = encode()
+    accept = serialization.prepare_accept_content(accepted_content())
+
+    def decode():
+        raw = compression.decompress(body, compression.get_encoder(method)[1]) if method != "none" else body
+        return serialization.loads(raw, content_type, encoding, accept=accept)
+
+    assert json.dumps(decode(), sort_keys=True, default=list) == json.dumps(payload, sort_keys=True, default=list)
+    return {
+        "serializer": serializer,
+        "compression": method,
+        "bytes": len(body),
+        "encode_us": _median_us(encode, iterations),
+        "decode_us": _median_us(decode, iterations),
+    }
+
+
+def run_benchmarks(hosts: int, iterations: int) -> Dict[str, Any]:
+    results = []
+    for case, (kind, payload) in build_cases(hosts).items():
+        for serializer, method in encodings():
+            results.append({"case": case, "kind": kind, **measure(payload, serializer, method, iterations)})
+    return {
+        "hosts": hosts,
+        "iterations": iterations,
+        "python": sys.version.split()[0],
+        "results": results,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Celery message encoding benchmark")
+    parser.add_argument("--hosts", type=int, default=5000, help="Live hosts in the inline payloads")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.hosts, args.iterations)
+
+    print(f"{args.hosts} live hosts, median of {args.iterations} runs")
+    case = None
+    for result in report["results"]:
+        if result["case"] != case:
+            case = result["case"]
+            print(f"  {case}")
+        print(f"    {result['serializer']:<8} {result['compression']:<5} {result['bytes']:>10} bytes "
+              f"{result['encode_us']:>10.1f} us encode {result['decode_us']:>10.1f} us decode")
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
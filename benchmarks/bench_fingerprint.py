@@ -0,0 +1,100 @@
+"""
+Fingerprint engine benchmark
+
+Builds synthetic responses (pages of --body-kb KB, a share of them
+identical parking pages) and matches them with the signature set three
+ways: every pattern on every response (no index), the indexed engine
+inline, and the indexed engine over the process pool.
+
+Usage:
+    python -m benchmarks.bench_fingerprint [--responses 2000] [--body-kb 64] \\
+        [--workers 4] [--duplicates 0.3] [--output report.json]
+"""
+import sys
+import json
+import time
+import random
+import argparse
+from pathlib import Path
+from typing import Dict, Any, List
+
+from app.services import fingerprint
+from app.services.fingerprint import FingerprintEngine, Response, fingerprint_responses, get_fingerprint_engine
+
+SNIPPETS = [
+    '<link rel="stylesheet" href="/wp-content/themes/twenty/style.css">',
+    '<meta name="generator" content="WordPress 6.4.2">',
+    '<script src="https://code.jquery.com/jquery-3.7.1.min.js"></script>',
+    '<script src="/_next/static/chunks/main.js"></script><script id="__NEXT_DATA__" type="application/json">',
+    '<div id="app" data-v-7ba5bd90>',
+    '<input type="hidden" name="__VIEWSTATE" value="abc">',
+    '<script src="https://www.googletagmanager.com/gtm.js?id=GTM-X"></script>',
+]
+SERVERS = ["nginx/1.25.3", "Apache/2.4.57 (Debian)", "cloudflare", "Microsoft-IIS/10.0", "openresty"]
+
+
+def build_responses(count: int, body_kb: int, duplicates: float, seed: int) -> List[Response]:
+    rng = random.Random(seed)
+    filler = "<p>" + "lorem ipsum dolor sit amet " * 40 + "</p>\n"
+    parking = ({"server": ["nginx"]}, "<html><title>Domain parked</title>" + filler * (body_kb * 1024 // len(filler)))
+    responses = []
+    for i in range(count):
+        if rng.random() < duplicates:
+            responses.append(parking)
+            continue
+        head = "".join(rng.sample(SNIPPETS, 2))
+        body = f"<html><head><title>Site {i}</title>{head}</head><body>" + filler * (body_kb * 1024 // len(filler))
+        responses.append(({"server": [rng.choice(SERVERS)], "x-powered-by": ["PHP/8.2.1"]}, body))
+    return responses
+
+
+def analyze_unindexed(engine: FingerprintEngine, headers, body: str) -> int:
+    """Every HTML/script pattern searched on every response, as a baseline"""
+    hits = 0
+    for index in (engine.html, engine.scripts):
+        signatures = [s for group in index.by_literal.values() for s in group] + index.unindexed
+        for signature in signatures:
+            hits += signature.match(body) is not None
+    return hits
+
+
+def timed(func) -> float:
+    started = time.perf_counter()
+    func()
+    return round(time.perf_counter() - started, 4)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--responses", type=int, default=2000)
+    parser.add_argument("--body-kb", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--duplicates", type=float, default=0.3, help="Share of identical parking pages")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args(argv)
+
+    responses = build_responses(args.responses, args.body_kb, args.duplicates, args.seed)
+    engine = get_fingerprint_engine()
+
+    report: Dict[str, Any] = {"responses": args.responses, "body_kb": args.body_kb, "workers": args.workers}
+    report["unindexed"] = timed(lambda: [analyze_unindexed(engine, h, b) for h, b in responses])
+    report["indexed"] = timed(lambda: [engine.analyze(h, b) for h, b in responses])
+    report["indexed_dedup"] = timed(lambda: fingerprint_responses(responses, workers=1))
+    # First pool call pays for starting the workers; report it separately
+    report["pool_start"] = timed(lambda: fingerprint_responses(responses[:fingerprint.POOL_MIN_RESPONSES],
+                                                               workers=args.workers))
+    report["pool"] = timed(lambda: fingerprint_responses(responses, workers=args.workers))
+
+    for key in ("unindexed", "indexed", "indexed_dedup", "pool_start", "pool"):
+        print(f"{key:<14} {report[key]:.3f}s")
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
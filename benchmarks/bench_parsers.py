@@ -0,0 +1,164 @@
+"""
+Microbenchmarks for the tool output parsers
+
+Generates synthetic outputs (1M lines by default) and reports throughput
+and peak Python memory (tracemalloc) for each streaming parser, next to the
+list-returning *Parser classes fed the whole output as one string.
+
+Usage:
+    python -m benchmarks.bench_parsers [--lines 1000000] [--no-orjson] [--output report.json]
+"""
+import gc
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, Any
+
+from app.services import parsers
+from benchmarks.fake_tools import subdomain_name, _ip
+
+DOMAIN = "bench.example.com"
+
+
+def write_inputs(directory: Path, lines: int) -> Dict[str, Path]:
+    """Write one synthetic output file per parser"""
+    inputs = {
+        "subfinder": directory / "subfinder.txt",
+        "amass": directory / "amass.txt",
+        "httpx": directory / "httpx.jsonl",
+        "sourceleakhacker": directory / "sourceleakhacker.txt",
+    }
+
+    with open(inputs["subfinder"], "w", encoding="utf-8") as f:
+        for i in range(lines):
+            f.write(subdomain_name(i, DOMAIN) + "\n")
+
+    with open(inputs["amass"], "w", encoding="utf-8") as f:
+        for i in range(lines):
+            name = subdomain_name(i, DOMAIN)
+            if i % 10 == 9:
+                f.write(f"AS{13335 + i % 7} (ASN) --> announces --> 10.{i % 256}.0.0/16 (Netblock)\n")
+            else:
+                f.write(f"{name} (FQDN) --> a_record --> {_ip(name)} (IPAddress)\n")
+
+    with open(inputs["httpx"], "w", encoding="utf-8") as f:
+        for i in range(lines):
+            name = subdomain_name(i, DOMAIN)
+            f.write(json.dumps({
+                "url": f"https://{name}", "input": name, "title": "Welcome", "webserver": "nginx",
+                "content_type": "text/html", "host": _ip(name), "time": "120.5ms", "a": [_ip(name)],
+                "tech": ["Nginx", "PHP"], "status_code": [200, 301, 403, 404, 500][i % 5],
+                "content_length": 1024 + i % 4096, "chain_status_codes": [], "failed": False,
+            }) + "\n")
+
+    with open(inputs["sourceleakhacker"], "w", encoding="utf-8") as f:
+        for i in range(lines):
+            status = [200, 403, 404, 301][i % 4]
+            path = [".env", ".git/config", "backup.zip", "robots.txt"][i % 4]
+            f.write(f"[{status}]\t{64 + i % 4096}\t0.05s\ttext/plain\thttps://{subdomain_name(i // 4, DOMAIN)}/{path}\n")
+
+    return inputs
+
+
+def measure(name: str, func: Callable[[], int], lines: int) -> Dict[str, Any]:
+    """Time func, then run it again under tracemalloc for peak memory"""
+    gc.collect()
+    started = time.perf_counter()
+    records = func()
+    elapsed = time.perf_counter() - started
+
+    # Separate pass: tracemalloc slows allocation-heavy code several times over
+    gc.collect()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "parser": name,
+        "lines": lines,
+        "records": records,
+        "seconds": round(elapsed, 4),
+        "lines_per_second": round(lines / elapsed) if elapsed else None,
+        "peak_memory_mb": round(peak / (1024 * 1024), 2),
+    }
+
+
+def _count(iterator) -> int:
+    """Consume an iterator without keeping its items"""
+    counter = iter(range(sys.maxsize))
+    deque(zip(iterator, counter), maxlen=0)
+    return next(counter)
+
+
+def _stream(path: Path, parse: Callable) -> Callable[[], int]:
+    def run():
+        with open(path, "r", encoding="utf-8") as f:
+            return _count(parse(f))
+    return run
+
+
+def _in_memory(path: Path, parse: Callable) -> Callable[[], int]:
+    def run():
+        with open(path, "r", encoding="utf-8") as f:
+            return len(parse(f.read()))
+    return run
+
+
+def run_benchmarks(lines: int) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="recon-parsers-") as tmp:
+        inputs = write_inputs(Path(tmp), lines)
+
+        cases = [
+            ("iter_subdomains", _stream(inputs["subfinder"], parsers.iter_subdomains)),
+            ("SubfinderParser.parse", _in_memory(inputs["subfinder"], parsers.SubfinderParser.parse)),
+            ("iter_amass_fqdns", _stream(inputs["amass"], parsers.iter_amass_fqdns)),
+            ("AmassParser.parse", _in_memory(inputs["amass"], parsers.AmassParser.parse)),
+            ("iter_httpx_records+httpx_host_record",
+             _stream(inputs["httpx"], lambda f: map(parsers.httpx_host_record, parsers.iter_httpx_records(f)))),
+            ("HttpxParser.parse", _in_memory(inputs["httpx"], parsers.HttpxParser.parse)),
+            ("iter_sourceleakhacker_stdout", _stream(inputs["sourceleakhacker"], parsers.iter_sourceleakhacker_stdout)),
+        ]
+
+        results = [measure(name, func, lines) for name, func in cases]
+
+    return {
+        "lines": lines,
+        "json_backend": "orjson" if parsers.orjson is not None else "json",
+        "python": sys.version.split()[0],
+        "results": results,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Parser microbenchmarks")
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    parser.add_argument("--no-orjson", action="store_true", help="Measure the stdlib json path")
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args(argv)
+
+    if args.no_orjson:
+        parsers.orjson = None
+
+    report = run_benchmarks(args.lines)
+
+    print(f"{args.lines} lines per input, json backend: {report['json_backend']}")
+    for result in report["results"]:
+        print(f"  {result['parser']:<40} {result['seconds']:>8.3f}s {result['lines_per_second']:>12} lines/s "
+              f"{result['peak_memory_mb']:>9.2f} MB peak  ({result['records']} records)")
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+Probe engine benchmark on a local HTTP server farm
+
+Starts benchmarks/http_farm.py with one server per site (ok, redirect,
+error, slow and closed ports) and probes every site with the in-process
+engine (app/services/probe.py) and, when --httpx-path points at the
+ProjectDiscovery httpx binary, with the CLI using the same timeouts.
+Reports wall time, hosts per second and answered hosts per engine.
+
+Usage:
+    python -m benchmarks.bench_probe [--sites 500] [--concurrency 100] \\
+        [--httpx-path ~/go/bin/httpx] [--output report.json]
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+import subprocess
+from pathlib import Path
+from typing import Dict, Any, List
+
+from app.services.probe import NativeProber
+from benchmarks.http_farm import HttpFarm
+
+
+def bench_native(hosts: List[str], args) -> Dict[str, Any]:
+    prober = NativeProber(
+        connect_timeout=args.connect_timeout,
+        read_timeout=args.read_timeout,
+        retries=args.retries,
+        concurrency=args.concurrency,
+        per_host_connections=args.per_host
+    )
+    started = time.perf_counter()
+    records = asyncio.run(prober.probe_many(hosts))
+    wall_time = time.perf_counter() - started
+    return {
+        "wall_time": round(wall_time, 4),
+        "hosts_per_second": round(len(hosts) / wall_time, 1),
+        "answered": sum(1 for r in records if not r.get("failed")),
+        "requests": prober.requests_sent,
+        "http2": prober.http2,
+    }
+
+
+def bench_cli(hosts: List[str], args) -> Dict[str, Any]:
+    cmd = [
+        args.httpx_path, "-silent", "-title", "-tech-detect", "-json", "-follow-redirects",
+        "-timeout", str(int(args.read_timeout)), "-retries", str(args.retries), "-threads", str(args.concurrency)
+    ]
+    started = time.perf_counter()
+    result = subprocess.run(cmd, input="".join(f"{h}\n" for h in hosts), capture_output=True, text=True)
+    wall_time = time.perf_counter() - started
+    answered = sum(1 for line in result.stdout.splitlines() if line.strip() and not json.loads(line).get("failed"))
+    return {
+        "wall_time": round(wall_time, 4),
+        "hosts_per_second": round(len(hosts) / wall_time, 1),
+        "answered": answered,
+        "exit_code": result.returncode,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sites", type=int, default=500)
+    parser.add_argument("--slow-delay", type=float, default=0.2, help="Response delay of 'slow' sites (seconds)")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--per-host", type=int, default=4)
+    parser.add_argument("--connect-timeout", type=float, default=5.0)
+    parser.add_argument("--read-timeout", type=float, default=30.0)
+    parser.add_argument("--retries", type=int, default=1)
+    parser.add_argument("--httpx-path", help="ProjectDiscovery httpx binary to compare against")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args(argv)
+
+    farm = HttpFarm.generate(args.sites, seed=args.seed, slow_delay=args.slow_delay)
+    farm.start_in_thread()
+    try:
+        report = {"sites": args.sites, "concurrency": args.concurrency, "engines": {}}
+        report["engines"]["native"] = bench_native(farm.hosts, args)
+        if args.httpx_path:
+            report["engines"]["cli"] = bench_cli(farm.hosts, args)
+    finally:
+        farm.stop()
+
+    for engine, result in report["engines"].items():
+        print(f"{engine:<8} {result['wall_time']:.3f}s  {result['hosts_per_second']} hosts/s  "
+              f"answered={result['answered']}/{args.sites}")
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+Diff two benchmark reports written by benchmarks/run_pipeline.py
+
+Usage:
+    python -m benchmarks.compare baseline.json current.json [--threshold 0.10]
+
+Exits 1 when any tracked metric regressed by more than the threshold.
+"""
+import sys
+import json
+import argparse
+from typing import Dict, Any, List, Iterator, Tuple
+
+# Metrics where a higher value is better; everything else is a cost
+HIGHER_IS_BETTER = {"db.rows_per_second"}
+
+# Ignore changes below this absolute size (timer noise on tiny runs)
+MIN_ABSOLUTE_DELTA = {"time": 0.05, "kb": 1024}
+
+
+def _metrics(report: Dict[str, Any]) -> Iterator[Tuple[str, float]]:
+    yield "wall_time", report.get("wall_time")
+    for name, seconds in report.get("stages", {}).items():
+        yield f"stages.{name}", seconds
+    for tool, summary in report.get("tools", {}).items():
+        yield f"tools.{tool}.wall_time", summary.get("wall_time")
+        yield f"tools.{tool}.max_rss_kb", summary.get("max_rss_kb")
+    for key in ("time", "queries", "rows_per_second"):
+        yield f"db.{key}", report.get("db", {}).get(key)
+    for key, value in report.get("peak_rss_kb", {}).items():
+        yield f"peak_rss_kb.{key}", value
+
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.10) -> List[Dict[str, Any]]:
+    """One row per metric present in both reports, flagged when it regressed"""
+    base_metrics = dict(_metrics(baseline))
+    rows = []
+    for name, value in _metrics(current):
+        before = base_metrics.get(name)
+        if value is None or before is None:
+            continue
+
+        delta = value - before
+        change = delta / before if before else 0.0
+        if name in HIGHER_IS_BETTER:
+            change = -change
+
+        noise = MIN_ABSOLUTE_DELTA["kb"] if "rss" in name else MIN_ABSOLUTE_DELTA["time"]
+        regressed = change > threshold and (name == "db.queries" or abs(delta) >= noise or name in HIGHER_IS_BETTER)
+
+        rows.append({
+            "metric": name,
+            "baseline": before,
+            "current": value,
+            "change": round(change, 4),
+            "regressed": regressed,
+        })
+    return rows
+
+
+def print_comparison(rows: List[Dict[str, Any]]):
+    for row in rows:
+        marker = "REGRESSED" if row["regressed"] else ""
+        print(f"{row['metric']:<40} {row['baseline']:>12} -> {row['current']:>12} {row['change']:+8.1%} {marker}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two benchmark reports")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, "r", encoding="utf-8") as f:
+        current = json.load(f)
+
+    rows = compare_reports(baseline, current, args.threshold)
+    print_comparison(rows)
+    return 1 if any(row["regressed"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
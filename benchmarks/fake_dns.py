@@ -0,0 +1,162 @@
+"""
+Stub authoritative DNS server for tests and benchmarks
+
+Answers A/AAAA/CNAME queries over UDP on localhost from an in-memory zone:
+
+    zone = FakeZone({"www.example.com": ["10.0.0.1"]}, wildcards={"wild.example.com": ["10.9.9.9"]})
+    server = FakeDnsServer(zone)
+    port = await server.start()            # inside a running loop
+    port = server.start_in_thread()        # or on a background thread
+
+Names not in the zone get NXDOMAIN unless a wildcard covers them.
+"""
+import socket
+import struct
+import asyncio
+import threading
+import ipaddress
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.services.dns_resolver import (
+    encode_name, decode_name, SOCKET_RCVBUF, TYPE_A, TYPE_AAAA, TYPE_CNAME, CLASS_IN, RCODE_NOERROR, RCODE_NXDOMAIN
+)
+
+
+class FakeZone:
+    """Records by exact name, wildcard answers by parent zone, or a callable fallback"""
+
+    def __init__(self, records: Optional[Dict[str, List[str]]] = None,
+                 wildcards: Optional[Dict[str, List[str]]] = None,
+                 cnames: Optional[Dict[str, str]] = None,
+                 lookup: Optional[Callable[[str], Optional[List[str]]]] = None,
+                 ttl: int = 300):
+        self.records = records or {}
+        self.wildcards = wildcards or {}
+        self.cnames = cnames or {}
+        self.lookup = lookup
+        self.ttl = ttl
+
+    def _addresses(self, name: str) -> Optional[List[str]]:
+        if name in self.records:
+            return self.records[name]
+        if self.lookup is not None:
+            found = self.lookup(name)
+            if found is not None:
+                return found
+        labels = name.split(".")
+        for i in range(1, len(labels)):
+            parent = ".".join(labels[i:])
+            if parent in self.wildcards:
+                return self.wildcards[parent]
+        return None
+
+    def answer(self, name: str, qtype: int) -> Tuple[int, List[Tuple[str, int, str]]]:
+        """(rcode, [(owner, type, value)]) following one level of CNAME"""
+        answers = []
+        if name in self.cnames:
+            target = self.cnames[name]
+            answers.append((name, TYPE_CNAME, target))
+            name = target
+
+        addresses = self._addresses(name)
+        if addresses is None:
+            return (RCODE_NOERROR if answers else RCODE_NXDOMAIN), answers
+
+        for address in addresses:
+            version = ipaddress.ip_address(address).version
+            if (qtype == TYPE_A and version == 4) or (qtype == TYPE_AAAA and version == 6):
+                answers.append((name, qtype, address))
+        return RCODE_NOERROR, answers
+
+
+def build_response(query: bytes, zone: FakeZone) -> bytes:
+    query_id, _ = struct.unpack("!HH", query[:4])
+    name, offset = decode_name(query, 12)
+    qtype, _ = struct.unpack("!HH", query[offset:offset + 4])
+    question = query[12:offset + 4]
+
+    rcode, answers = zone.answer(name, qtype)
+    body = bytearray()
+    for owner, rtype, value in answers:
+        # The question name is always at offset 12, so use a compression pointer for it
+        body += b"\xc0\x0c" if owner == name else encode_name(owner)
+        if rtype == TYPE_CNAME:
+            rdata = encode_name(value)
+        else:
+            family = socket.AF_INET if rtype == TYPE_A else socket.AF_INET6
+            rdata = socket.inet_pton(family, value)
+        body += struct.pack("!HHIH", rtype, CLASS_IN, zone.ttl, len(rdata)) + rdata
+
+    flags = 0x8180 | rcode  # response, recursion desired + available
+    header = struct.pack("!HHHHHH", query_id, flags, 1, len(answers), 0, 0)
+    return header + question + bytes(body)
+
+
+class _ServerProtocol(asyncio.DatagramProtocol):
+    def __init__(self, server: "FakeDnsServer"):
+        self.server = server
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.server.queries += 1
+        if self.server.drop:
+            return
+        self.transport.sendto(build_response(data, self.server.zone), addr)
+
+
+class FakeDnsServer:
+    """UDP DNS server on 127.0.0.1 answering from a FakeZone"""
+
+    def __init__(self, zone: FakeZone, host: str = "127.0.0.1"):
+        self.zone = zone
+        self.host = host
+        self.port = 0
+        self.queries = 0
+        self.drop = False  # ignore queries (simulates an unreachable resolver)
+        self._transport = None
+        self._thread = None
+        self._loop = None
+
+    @property
+    def address(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    async def start(self) -> int:
+        loop = asyncio.get_running_loop()
+        self._transport, _ = await loop.create_datagram_endpoint(
+            lambda: _ServerProtocol(self), local_addr=(self.host, 0)
+        )
+        self._transport.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_RCVBUF)
+        self.port = self._transport.get_extra_info("sockname")[1]
+        return self.port
+
+    def close(self):
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+
+    def start_in_thread(self) -> int:
+        """Serve on a daemon thread with its own event loop"""
+        started = threading.Event()
+        self._loop = asyncio.new_event_loop()
+
+        def run():
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self.start())
+            started.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name="fake-dns", daemon=True)
+        self._thread.start()
+        started.wait()
+        return self.port
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self.close)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+            self._loop = None
@@ -0,0 +1,383 @@
+"""
+Stand-in executables for the external recon tools
+
+Each fake tool accepts the same arguments the pipeline passes to the real
+one and produces output in the same format, at a scale controlled by
+RECON_BENCH_* environment variables (see FakeToolConfig). Output is
+deterministic for a given configuration, so runs are comparable.
+
+    install_fake_tools(bin_dir) -> {"subfinder": "/.../bin/subfinder", ...}
+"""
+import os
+import sys
+import csv
+import json
+import hashlib
+import time
+import zlib
+import random
+import argparse
+from dataclasses import dataclass, asdict, fields
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+TOOLS = ["subfinder", "amass", "assetfinder", "anew", "httpx", "wafw00f", "gowitness", "sourceleakhacker"]
+
+# Prefixes used to build realistic-looking subdomain names
+WORDS = [
+    "www", "api", "mail", "dev", "staging", "cdn", "admin", "portal", "vpn", "auth",
+    "shop", "blog", "static", "m", "beta", "test", "git", "jira", "grafana", "status",
+]
+WEBSERVERS = ["nginx", "Apache", "cloudflare", "Microsoft-IIS/10.0", "envoy", "openresty"]
+TECHNOLOGIES = [["Nginx"], ["PHP", "Apache HTTP Server"], ["Cloudflare"], ["React", "Nginx"], ["WordPress", "PHP", "MySQL"], []]
+WAFS = [("Cloudflare", "Cloudflare Inc."), ("AWS Elastic Load Balancer", "Amazon"), ("ModSecurity", "SpiderLabs")]
+LEAK_PATHS = [".env", ".git/config", "backup.zip", "index.php.bak", "database.sql", "robots.txt"]
+
+# 1x1 transparent PNG
+PNG_BYTES = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000154a24f5d0000000049454e44ae426082"
+)
+
+
+@dataclass
+class FakeToolConfig:
+    """Scale, latency and failure knobs shared by all fake tools"""
+    subdomains: int = 1000          # unique subdomains across all enumerators
+    live_ratio: float = 0.3         # fraction of subdomains httpx reports
+    slow_ratio: float = 0.0         # further fraction that only answers with -timeout >= SLOW_HOST_TIMEOUT
+    timeout_ratio: float = 0.5      # fraction of dead hosts that drop connections (the rest refuse)
+    probe_time_scale: float = 0.0   # sleep this fraction of httpx's simulated connect/timeout time
+    waf_ratio: float = 0.2          # fraction of live URLs wafw00f flags
+    leak_ratio: float = 0.05        # fraction of scanned URLs with leaked files
+    latency_ms: int = 0             # fixed delay per invocation
+    per_item_us: int = 0            # extra delay per output item
+    failure_rate: float = 0.0       # probability an invocation exits non-zero
+    screenshot_limit: int = 0       # cap on screenshots written (0 = no cap)
+    seed: int = 1
+
+    ENV_PREFIX = "RECON_BENCH_"
+
+    @classmethod
+    def from_env(cls) -> "FakeToolConfig":
+        config = cls()
+        for f in fields(cls):
+            value = os.environ.get(cls.ENV_PREFIX + f.name.upper())
+            if value is not None:
+                setattr(config, f.name, type(getattr(config, f.name))(value))
+        return config
+
+    def to_env(self) -> Dict[str, str]:
+        return {self.ENV_PREFIX + key.upper(): str(value) for key, value in asdict(self).items()}
+
+
+def install_fake_tools(bin_dir: Path, python: str = sys.executable) -> Dict[str, str]:
+    """Write one executable wrapper per tool into bin_dir and return their paths"""
+    bin_dir = Path(bin_dir)
+    bin_dir.mkdir(parents=True, exist_ok=True)
+
+    paths = {}
+    for tool in TOOLS:
+        filename = "SourceLeakHacker.py" if tool == "sourceleakhacker" else tool
+        path = bin_dir / filename
+        path.write_text(
+            f"#!{python}\n"
+            "import sys\n"
+            f"sys.path.insert(0, {str(REPO_ROOT)!r})\n"
+            "from benchmarks.fake_tools import main\n"
+            f"sys.exit(main({tool!r}, sys.argv[1:]))\n",
+            encoding="utf-8"
+        )
+        path.chmod(0o755)
+        paths[tool] = str(path)
+    return paths
+
+
+# ---------------------------------------------------------------------------
+# Deterministic data
+# ---------------------------------------------------------------------------
+
+def subdomain_name(index: int, domain: str) -> str:
+    return f"{WORDS[index % len(WORDS)]}{index}.{domain}"
+
+
+def _bucket(value: str) -> float:
+    """Stable pseudo-random number in [0, 1) for a string"""
+    return (zlib.crc32(value.encode()) % 10000) / 10000.0
+
+
+def _ip(value: str) -> str:
+    h = zlib.crc32(value.encode())
+    return f"10.{(h >> 16) & 0xff}.{(h >> 8) & 0xff}.{h & 0xff}"
+
+
+def _slice(config: FakeToolConfig, start: float, end: float) -> range:
+    """Index range covering [start, end) of the subdomain space"""
+    return range(int(config.subdomains * start), int(config.subdomains * end))
+
+
+def _read_lines(path: str) -> Iterator[str]:
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
+
+
+def _emit_delay(config: FakeToolConfig, items: int):
+    if config.per_item_us:
+        time.sleep(items * config.per_item_us / 1e6)
+
+
+# ---------------------------------------------------------------------------
+# Tools
+# ---------------------------------------------------------------------------
+
+def run_subfinder(config: FakeToolConfig, argv: List[str]) -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d")
+    parser.add_argument("-o")
+    parser.add_argument("-silent", action="store_true")
+    args, _ = parser.parse_known_args(argv)
+
+    indexes = _slice(config, 0.0, 0.6)
+    with open(args.o, "w", encoding="utf-8") as f:
+        for i in indexes:
+            f.write(subdomain_name(i, args.d) + "\n")
+    _emit_delay(config, len(indexes))
+    return 0
+
+
+def run_amass(config: FakeToolConfig, argv: List[str]) -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command")
+    parser.add_argument("-d")
+    parser.add_argument("-o")
+    args, _ = parser.parse_known_args(argv)
+
+    # Graph-style output, with ASN/netblock noise and out-of-scope names
+    indexes = _slice(config, 0.4, 0.9)
+    with open(args.o, "w", encoding="utf-8") as f:
+        for i in indexes:
+            name = subdomain_name(i, args.d)
+            f.write(f"{name} (FQDN) --> a_record --> {_ip(name)} (IPAddress)\n")
+            if i % 10 == 0:
+                f.write(f"{_ip(name)} (IPAddress) --> ptr_record --> edge{i}.cloudfront.net (FQDN)\n")
+                f.write(f"AS{13335 + i % 7} (ASN) --> managed_by --> CLOUDFLARENET (RIROrganization)\n")
+    _emit_delay(config, len(indexes))
+    return 0
+
+
+def run_assetfinder(config: FakeToolConfig, argv: List[str]) -> int:
+    domain = [a for a in argv if not a.startswith("-")][-1]
+    indexes = _slice(config, 0.7, 1.0)
+    out = sys.stdout
+    for i in indexes:
+        out.write(subdomain_name(i, domain) + "\n")
+    _emit_delay(config, len(indexes))
+    return 0
+
+
+def run_anew(config: FakeToolConfig, argv: List[str]) -> int:
+    target = Path(argv[0])
+    seen = set(_read_lines(str(target))) if target.exists() else set()
+
+    new_lines = []
+    for line in sys.stdin:
+        line = line.strip()
+        if line and line not in seen:
+            seen.add(line)
+            new_lines.append(line)
+
+    with open(target, "a", encoding="utf-8") as f:
+        for line in new_lines:
+            f.write(line + "\n")
+    sys.stdout.write("".join(line + "\n" for line in new_lines))
+    return 0
+
+
+SLOW_HOST_TIMEOUT = 10
+REFUSED_SECONDS = 0.05
+HTTPX_THREADS = 50
+
+
+def run_httpx(config: FakeToolConfig, argv: List[str]) -> int:
+    # No -h/--help: argparse would read httpx's "-hash" as "-h ash"
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("-timeout", type=int, default=10)
+    parser.add_argument("-retries", type=int, default=0)
+    parser.add_argument("-probe", action="store_true")
+    parser.add_argument("-hash")
+    args, _ = parser.parse_known_args(argv)
+
+    answering = config.live_ratio
+    if args.timeout >= SLOW_HOST_TIMEOUT:
+        answering += config.slow_ratio
+
+    count = 0
+    thread_time = 0.0
+    out = sys.stdout
+    for line in sys.stdin:
+        host = line.strip()
+        if not host:
+            continue
+        url = f"https://{host}"
+
+        if _bucket(host) >= answering:
+            # Slow hosts accept the connection but miss a short timeout; dead hosts drop or refuse the SYN
+            if _bucket(host) < config.live_ratio + config.slow_ratio:
+                cost, error = args.timeout, "context deadline exceeded (Client.Timeout exceeded while awaiting headers)"
+            elif _bucket(f"t:{host}") < config.timeout_ratio:
+                cost, error = args.timeout, f"dial tcp {_ip(host)}:443: i/o timeout"
+            else:
+                cost, error = REFUSED_SECONDS, f"dial tcp {_ip(host)}:443: connect: connection refused"
+            thread_time += cost * (args.retries + 1)
+            if args.probe:
+                out.write(json.dumps({"input": host, "url": url, "failed": True, "error": error}) + "\n")
+            continue
+
+        h = zlib.crc32(host.encode())
+        status = [200, 200, 200, 301, 302, 403, 404, 500, 503][h % 9]
+        record = {
+            "timestamp": "2026-10-18T09:00:00.000000000Z",
+            "url": url,
+            "input": host,
+            "title": f"{host.split('.')[0].title()} - Welcome",
+            "webserver": WEBSERVERS[h % len(WEBSERVERS)],
+            "content_type": "text/html",
+            "method": "GET",
+            "host": _ip(host),
+            "path": "/",
+            "time": f"{50 + h % 900}.{h % 10}ms",
+            "a": [_ip(host)],
+            "tech": TECHNOLOGIES[h % len(TECHNOLOGIES)],
+            "words": 100 + h % 5000,
+            "lines": 10 + h % 400,
+            "status_code": status,
+            "content_length": 512 + h % 65536,
+            "failed": False,
+        }
+        if status in (301, 302):
+            record["chain_status_codes"] = [status, 200]
+            record["final_url"] = f"{url}/home"
+        if h % 5 == 0:
+            record["cdn_name"] = "cloudflare"
+        if args.hash:
+            record["hash"] = {f"body_{args.hash}": hashlib.sha256(host.encode()).hexdigest()}
+        out.write(json.dumps(record) + "\n")
+        count += 1
+    _emit_delay(config, count)
+
+    # Hosts that never answer hold one of httpx's threads until they refuse or time out
+    if config.probe_time_scale:
+        time.sleep(thread_time / HTTPX_THREADS * config.probe_time_scale)
+    return 0
+
+
+def run_wafw00f(config: FakeToolConfig, argv: List[str]) -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-i")
+    parser.add_argument("-o")
+    parser.add_argument("-f")
+    args, _ = parser.parse_known_args(argv)
+
+    results = []
+    for url in _read_lines(args.i):
+        if _bucket("waf:" + url) < config.waf_ratio:
+            firewall, manufacturer = WAFS[zlib.crc32(url.encode()) % len(WAFS)]
+            results.append({"url": url, "detected": True, "firewall": firewall, "manufacturer": manufacturer})
+        else:
+            results.append({"url": url, "detected": False, "firewall": "None", "manufacturer": "None"})
+
+    with open(args.o, "w", encoding="utf-8") as f:
+        json.dump(results, f)
+    _emit_delay(config, len(results))
+    return 0
+
+
+def run_gowitness(config: FakeToolConfig, argv: List[str]) -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("mode", nargs="*")
+    parser.add_argument("-f")
+    parser.add_argument("--screenshot-path")
+    parser.add_argument("--write-jsonl-file")
+    args, _ = parser.parse_known_args(argv)
+
+    shots_dir = Path(args.screenshot_path)
+    shots_dir.mkdir(parents=True, exist_ok=True)
+    manifest = open(args.write_jsonl_file, "w", encoding="utf-8") if args.write_jsonl_file else None
+
+    count = 0
+    for url in _read_lines(args.f):
+        if config.screenshot_limit and count >= config.screenshot_limit:
+            break
+        filename = url.replace("://", "-").replace(".", "-").replace("/", "-") + ".png"
+        (shots_dir / filename).write_bytes(PNG_BYTES)
+        if manifest is not None:
+            manifest.write(json.dumps({"url": url, "final_url": url, "response_code": 200,
+                                       "title": "", "file_name": filename, "failed": False}) + "\n")
+        count += 1
+    if manifest is not None:
+        manifest.close()
+    _emit_delay(config, count)
+    return 0
+
+
+def run_sourceleakhacker(config: FakeToolConfig, argv: List[str]) -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--urls")
+    parser.add_argument("--output")
+    args, _ = parser.parse_known_args(argv)
+
+    output_dir = Path(args.output)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    rows_by_status: Dict[int, List[list]] = {}
+    for url in _read_lines(args.urls):
+        if _bucket("leak:" + url) >= config.leak_ratio:
+            continue
+        for path in LEAK_PATHS:
+            leaked = f"{url.rstrip('/')}/{path}"
+            h = zlib.crc32(leaked.encode())
+            status = [200, 403, 404, 301][h % 4]
+            row = [status, 64 + h % 4096, f"{(h % 300) / 1000:.2f}", "text/plain", leaked]
+            rows_by_status.setdefault(status, []).append(row)
+            sys.stdout.write(f"[{status}]\t{row[1]}\t{row[2]}s\t{row[3]}\t{leaked}\n")
+
+    for status, rows in rows_by_status.items():
+        with open(output_dir / f"{status}.csv", "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Code", "Length", "Time", "Type", "URL"])
+            writer.writerows(rows)
+    _emit_delay(config, sum(len(rows) for rows in rows_by_status.values()))
+    return 0
+
+
+RUNNERS = {
+    "subfinder": run_subfinder,
+    "amass": run_amass,
+    "assetfinder": run_assetfinder,
+    "anew": run_anew,
+    "httpx": run_httpx,
+    "wafw00f": run_wafw00f,
+    "gowitness": run_gowitness,
+    "sourceleakhacker": run_sourceleakhacker,
+}
+
+
+def main(tool: str, argv: List[str]) -> int:
+    config = FakeToolConfig.from_env()
+
+    if config.latency_ms:
+        time.sleep(config.latency_ms / 1000.0)
+
+    # anew only merges files; failing it would not model a real tool outage
+    if tool != "anew" and config.failure_rate > 0:
+        rng = random.Random(f"{config.seed}:{tool}:{' '.join(argv)}")
+        if rng.random() < config.failure_rate:
+            sys.stderr.write(f"{tool}: simulated failure\n")
+            return 1
+
+    return RUNNERS[tool](config, argv)
@@ -0,0 +1,154 @@
+"""
+Local HTTP server farm for probe tests and benchmarks
+
+Starts one small asyncio HTTP/1.1 server per site on 127.0.0.1, each with
+its own port, so a probe engine sees many distinct hosts:
+
+    farm = HttpFarm.generate(200, seed=1)
+    farm.start_in_thread()
+    hosts = farm.hosts            # ["127.0.0.1:41231", ...]
+    ...
+    farm.stop()
+
+Site kinds: "ok" (200 page with a title), "redirect" (301 -> /home),
+"error" (500), "slow" (answers after `delay` seconds) and "closed"
+(port not listening, refuses connections).
+"""
+import socket
+import random
+import asyncio
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+KINDS = ["ok", "ok", "ok", "redirect", "error", "slow", "closed"]
+SERVERS = ["nginx", "Apache/2.4.57", "cloudflare", "openresty"]
+
+
+@dataclass
+class Site:
+    kind: str
+    title: str
+    server: str = "nginx"
+    delay: float = 0.0
+    body_size: int = 2048
+    port: int = 0
+
+
+def _response(status: str, headers: Dict[str, str], body: bytes) -> bytes:
+    lines = [f"HTTP/1.1 {status}"] + [f"{k}: {v}" for k, v in headers.items()]
+    lines.append(f"Content-Length: {len(body)}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode() + body
+
+
+class HttpFarm:
+    """Many single-site HTTP servers on one event loop"""
+
+    def __init__(self, sites: List[Site], host: str = "127.0.0.1"):
+        self.sites = sites
+        self.host = host
+        self.requests = 0
+        self._servers: List[asyncio.AbstractServer] = []
+        self._handlers = set()
+        self._reserved: List[socket.socket] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def generate(cls, count: int, seed: int = 1, slow_delay: float = 0.2) -> "HttpFarm":
+        rng = random.Random(seed)
+        sites = []
+        for i in range(count):
+            kind = rng.choice(KINDS)
+            sites.append(Site(kind=kind, title=f"Site {i} &amp; Co", server=rng.choice(SERVERS),
+                              delay=slow_delay if kind == "slow" else 0.0, body_size=rng.randint(512, 32768)))
+        return cls(sites)
+
+    @property
+    def hosts(self) -> List[str]:
+        return [f"{self.host}:{site.port}" for site in self.sites]
+
+    def _body(self, site: Site) -> bytes:
+        head = f"<html><head><title>{site.title}</title></head><body>".encode()
+        return head + b"x" * max(0, site.body_size - len(head)) + b"</body></html>"
+
+    async def _handle(self, site: Site, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        try:
+            # A TLS ClientHello on a plain-HTTP port: close so the client falls back to http://
+            prefix = await reader.readexactly(1)
+            if prefix == b"\x16":
+                return
+            while True:
+                request = prefix + await reader.readuntil(b"\r\n\r\n")
+                prefix = b""
+                self.requests += 1
+                path = request.split(b" ", 2)[1].decode() if b" " in request else "/"
+                if site.delay:
+                    await asyncio.sleep(site.delay)
+
+                headers = {"Server": site.server, "Content-Type": "text/html; charset=utf-8"}
+                if site.kind == "redirect" and path == "/":
+                    data = _response("301 Moved Permanently", {**headers, "Location": "/home"}, b"")
+                elif site.kind == "error":
+                    data = _response("500 Internal Server Error", headers, self._body(site))
+                else:
+                    data = _response("200 OK", headers, self._body(site))
+                writer.write(data)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._handlers.discard(task)
+            writer.close()
+
+    async def start(self):
+        for site in self.sites:
+            if site.kind == "closed":
+                # Keep a bound, non-listening socket so the port refuses connections and is not reused
+                sock = socket.socket()
+                sock.bind((self.host, 0))
+                site.port = sock.getsockname()[1]
+                self._reserved.append(sock)
+                continue
+            server = await asyncio.start_server(
+                lambda r, w, site=site: self._handle(site, r, w), self.host, 0, backlog=512
+            )
+            site.port = server.sockets[0].getsockname()[1]
+            self._servers.append(server)
+
+    async def close(self):
+        for server in self._servers:
+            server.close()
+        self._servers = []
+        for sock in self._reserved:
+            sock.close()
+        self._reserved = []
+        # Drop keep-alive connections still held open by clients
+        tasks = list(self._handlers)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def start_in_thread(self):
+        started = threading.Event()
+        self._loop = asyncio.new_event_loop()
+
+        def run():
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self.start())
+            started.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name="http-farm", daemon=True)
+        self._thread.start()
+        started.wait()
+
+    def stop(self):
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self.close(), self._loop).result(timeout=5)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+            self._loop.close()
+            self._loop = None
@@ -237,6 +237,12 @@ else
     exit 1
 fi
 
+# Beat schedules the held bulk scan dispatcher (admission control); only where the unit is installed
+if systemctl list-unit-files recon-celery-beat.service >/dev/null 2>&1 && systemctl cat recon-celery-beat >/dev/null 2>&1; then
+    print_info "Restarting recon-celery-beat service..."
+    sudo systemctl restart recon-celery-beat
+fi
+
 print_info "Restarting recon-api service..."
 sudo systemctl restart recon-api
 sleep 5
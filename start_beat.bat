@@ -0,0 +1,19 @@
+@echo off
+title Recon API - Celery Beat
+echo ========================================
+echo Starting Celery Beat (Scheduler)
+echo ========================================
+echo.
+echo Needed only with ADMISSION_CONTROL_ENABLED=true:
+echo releases held bulk scans every ADMISSION_RELEASE_INTERVAL seconds
+echo (maintenance queue, see start_worker.bat)
+echo.
+echo Press Ctrl+C to stop Beat
+echo ========================================
+echo.
+
+REM Activate virtual environment
+call venv\Scripts\activate.bat
+
+REM Start Beat
+celery -A app.workers.celery_app beat --loglevel=info
@@ -0,0 +1,78 @@
+"""
+Shared fixtures: test database and API client
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.main import create_app
+from app.deps import get_db, Base
+
+
+# Test database
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def client():
+    """Create test client with test database"""
+    Base.metadata.create_all(bind=engine)
+    
+    app = create_app()
+    app.dependency_overrides[get_db] = override_get_db
+    
+    with TestClient(app) as test_client:
+        yield test_client
+    
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def fake_broker(monkeypatch):
+    """
+    In-memory Redis (fakeredis) as Celery broker and for redis.Redis.from_url
+
+    Published task messages land in it the way kombu's Redis transport
+    stores them (the result backend does not subscribe to their results).
+    Yields a client on it.
+    """
+    fakeredis = pytest.importorskip("fakeredis")
+    import redis
+    from kombu import pools
+    from kombu.transport import redis as kombu_redis
+    from app.workers.celery_app import celery_app
+
+    server = fakeredis.FakeServer()
+
+    class Connection(fakeredis.FakeRedisConnection):
+        def __init__(self, *args, **kwargs):
+            kwargs["server"] = server
+            super().__init__(*args, **kwargs)
+
+    def reset_pools():
+        # Broker connections opened before or during the test belong to the other server
+        pools.reset()
+        celery_app._pool = None
+        celery_app.amqp._producer_pool = None
+
+    monkeypatch.setattr(kombu_redis.Channel, "connection_class", Connection)
+    # The backend is per thread (the API runs requests in worker threads): patch its class
+    monkeypatch.setattr(type(celery_app.backend), "on_task_call", lambda self, producer, task_id: None)
+    monkeypatch.setattr(redis.Redis, "from_url", lambda *args, **kwargs: fakeredis.FakeRedis(
+        server=server, decode_responses=kwargs.get("decode_responses", False)))
+    reset_pools()
+    try:
+        yield fakeredis.FakeRedis(server=server)
+    finally:
+        reset_pools()
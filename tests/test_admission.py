@@ -0,0 +1,241 @@
+"""
+Tests for admission control of scan submissions
+"""
+import itertools
+from types import SimpleNamespace
+
+import pytest
+
+from app.deps import settings
+from app.auth.dependencies import require_auth
+from app.routers import scans
+from app.services import admission
+from app.storage.models import ScanJob, HeldScan, ScanStatus
+from app.storage.repo import ScanJobRepository, HeldScanRepository
+from tests.conftest import TestingSessionLocal
+
+
+class FakeTask:
+    def __init__(self):
+        self.ids = itertools.count(1)
+        self.calls = []
+
+    def delay(self, job_id, domain, *args, **kwargs):
+        self.calls.append((job_id, domain, args, kwargs))
+        return SimpleNamespace(id=f"task-{next(self.ids)}")
+
+
+@pytest.fixture
+def admitted(client, monkeypatch):
+    """API client as user 1, with an empty recon_full queue and recorded publishes"""
+    state = {"depth": 0, "published": []}
+    user = SimpleNamespace(id=1, username="alice")
+    client.app.dependency_overrides[require_auth] = lambda: user
+
+    def publish(scans_to_publish):
+        for job_id, domain, options, task_id in scans_to_publish:
+            state["published"].append((job_id, domain, options))
+            state["depth"] += 1
+        return len(scans_to_publish)
+
+    monkeypatch.setattr(settings, "admission_control_enabled", True)
+    monkeypatch.setattr(admission, "queue_depth", lambda: state["depth"])
+    monkeypatch.setattr(admission, "publish_scans", publish)
+    monkeypatch.setattr(scans, "publish_scans", publish)
+    monkeypatch.setattr(scans, "run_recon_scan", FakeTask())
+    state["client"] = client
+    state["user"] = user
+    return state
+
+
+def _add_held(db, owner_id, count):
+    repo = ScanJobRepository(db)
+    held_repo = HeldScanRepository(db)
+    for i in range(count):
+        scan_job = repo.create_scan_job(f"{owner_id}-{i}", f"d{i}.user{owner_id}.com", owner_id=owner_id)
+        held_repo.hold(scan_job, {"profile": False})
+
+
+class TestInteractiveAdmission:
+    def test_admitted(self, admitted):
+        response = admitted["client"].post("/api/v1/scans", json={"domain": "example.com"})
+        assert response.status_code == 200
+        db = TestingSessionLocal()
+        try:
+            job = db.query(ScanJob).one()
+            assert job.owner_id == 1
+            assert job.task_id == "task-1"
+        finally:
+            db.close()
+
+    def test_queue_full(self, admitted, monkeypatch):
+        monkeypatch.setattr(settings, "admission_max_queue_depth", 5)
+        admitted["depth"] = 5
+        response = admitted["client"].post("/api/v1/scans", json={"domain": "example.com"})
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == str(settings.admission_retry_after)
+        db = TestingSessionLocal()
+        try:
+            assert db.query(ScanJob).count() == 0
+        finally:
+            db.close()
+
+    def test_active_limit_per_user(self, admitted, monkeypatch):
+        monkeypatch.setattr(settings, "admission_max_active_per_user", 2)
+        client = admitted["client"]
+        assert client.post("/api/v1/scans", json={"domain": "a.com"}).status_code == 200
+        assert client.post("/api/v1/scans", json={"domain": "b.com"}).status_code == 200
+        assert client.post("/api/v1/scans", json={"domain": "c.com"}).status_code == 429
+
+        # Another user is not affected
+        client.app.dependency_overrides[require_auth] = lambda: SimpleNamespace(id=2, username="bob")
+        assert client.post("/api/v1/scans", json={"domain": "c.com"}).status_code == 200
+
+        # A finished scan frees its slot
+        db = TestingSessionLocal()
+        try:
+            job = db.query(ScanJob).filter(ScanJob.domain == "a.com").one()
+            ScanJobRepository(db).update_scan_status(job.job_id, ScanStatus.COMPLETED)
+        finally:
+            db.close()
+        client.app.dependency_overrides[require_auth] = lambda: admitted["user"]
+        assert client.post("/api/v1/scans", json={"domain": "c.com"}).status_code == 200
+
+    def test_disabled(self, admitted, monkeypatch):
+        monkeypatch.setattr(settings, "admission_control_enabled", False)
+        monkeypatch.setattr(settings, "admission_max_queue_depth", 1)
+        admitted["depth"] = 100
+        assert admitted["client"].post("/api/v1/scans", json={"domain": "example.com"}).status_code == 200
+
+
+class TestBulkAdmission:
+    def test_bulk_is_held_and_released_up_to_queue_room(self, admitted, monkeypatch):
+        monkeypatch.setattr(settings, "admission_bulk_queue_depth", 3)
+        domains = [f"d{i}.example.com" for i in range(10)] + ["invalid"]
+        response = admitted["client"].post("/api/v1/scans/bulk", json={"domains": domains})
+        assert response.status_code == 200
+        body = response.json()
+        assert body["total_submitted"] == 10
+        assert body["held"] == 7
+        assert [job["status"] for job in body["jobs"]].count("pending") == 3
+        assert [job["status"] for job in body["jobs"]].count("queued") == 7
+
+        published = admitted["published"]
+        assert [domain for _, domain, _ in published] == domains[:3]
+        assert published[0][2]["amass_config"]["mode"] == "passive"
+
+        db = TestingSessionLocal()
+        try:
+            assert db.query(HeldScan).count() == 7
+            assert db.query(ScanJob).filter(ScanJob.task_id.isnot(None)).count() == 3
+        finally:
+            db.close()
+
+    def test_bulk_held_limit(self, admitted, monkeypatch):
+        monkeypatch.setattr(settings, "admission_max_held_per_user", 5)
+        monkeypatch.setattr(settings, "admission_bulk_queue_depth", 0)
+        client = admitted["client"]
+        assert client.post("/api/v1/scans/bulk", json={"domains": ["a.com", "b.com", "c.com"]}).status_code == 200
+        response = client.post("/api/v1/scans/bulk", json={"domains": ["d.com", "e.com", "f.com"]})
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) > 0
+
+    def test_bulk_without_admission_dispatches_everything(self, admitted, monkeypatch):
+        monkeypatch.setattr(settings, "admission_control_enabled", False)
+        response = admitted["client"].post("/api/v1/scans/bulk", json={"domains": ["a.com", "b.com"]})
+        assert response.status_code == 200
+        assert response.json()["held"] == 0
+        assert [domain for _, domain, _ in admitted["published"]] == ["a.com", "b.com"]
+
+
+class TestReleaseHeld:
+    def test_round_robin_across_users(self, admitted, monkeypatch):
+        monkeypatch.setattr(settings, "admission_bulk_queue_depth", 6)
+        db = TestingSessionLocal()
+        try:
+            _add_held(db, 1, 10)
+            _add_held(db, 2, 2)
+            _add_held(db, 3, 10)
+            assert admission.release_held(db) == 6
+            owners = [db.query(ScanJob).filter(ScanJob.job_id == job_id).one().owner_id
+                      for job_id, _, _ in admitted["published"]]
+            assert sorted(owners) == [1, 1, 2, 2, 3, 3]
+            # Oldest first within a user
+            assert [job_id for job_id, _, _ in admitted["published"] if job_id.startswith("1-")] == ["1-0", "1-1"]
+            assert HeldScanRepository(db).count_held() == 16
+        finally:
+            db.close()
+
+    def test_budget_follows_queue_depth(self, admitted, monkeypatch):
+        monkeypatch.setattr(settings, "admission_bulk_queue_depth", 5)
+        admitted["depth"] = 4
+        db = TestingSessionLocal()
+        try:
+            _add_held(db, 1, 10)
+            assert admission.release_held(db) == 1
+            assert admission.release_held(db) == 0
+            admitted["depth"] = 0
+            assert admission.release_held(db) == 5
+        finally:
+            db.close()
+
+    def test_user_active_limit(self, admitted, monkeypatch):
+        monkeypatch.setattr(settings, "admission_bulk_queue_depth", 50)
+        monkeypatch.setattr(settings, "admission_max_active_per_user", 3)
+        db = TestingSessionLocal()
+        try:
+            _add_held(db, 1, 10)
+            assert admission.release_held(db) == 3
+            assert admission.release_held(db) == 0
+        finally:
+            db.close()
+
+    def test_stopped_jobs_are_dropped(self, admitted, monkeypatch):
+        db = TestingSessionLocal()
+        try:
+            _add_held(db, 1, 2)
+            ScanJobRepository(db).update_scan_status("1-0", ScanStatus.CANCELLED)
+            assert admission.release_held(db) == 1
+            assert [job_id for job_id, _, _ in admitted["published"]] == ["1-1"]
+            assert HeldScanRepository(db).count_held() == 0
+        finally:
+            db.close()
+
+
+class TestAdmissionWithBroker:
+    """Queue depth from real messages in the (in-memory) broker"""
+
+    @pytest.fixture
+    def broker_client(self, client, fake_broker, monkeypatch):
+        monkeypatch.setattr(settings, "admission_control_enabled", True)
+        client.app.dependency_overrides[require_auth] = lambda: SimpleNamespace(id=1, username="alice")
+        return client
+
+    def _enqueue(self, count):
+        from app.workers.tasks import run_recon_scan
+
+        for i in range(count):
+            run_recon_scan.apply_async((f"queued-{i}", "example.com"))
+
+    def test_full_queue_rejects_interactive_scans(self, broker_client, monkeypatch):
+        monkeypatch.setattr(settings, "admission_max_queue_depth", 3)
+        self._enqueue(2)
+        assert broker_client.post("/api/v1/scans", json={"domain": "a.com"}).status_code == 200
+        response = broker_client.post("/api/v1/scans", json={"domain": "b.com"})
+        assert response.status_code == 429
+        assert "3 waiting scans" in response.json()["detail"]
+
+    def test_release_stops_at_bulk_queue_depth(self, broker_client, monkeypatch):
+        monkeypatch.setattr(settings, "admission_bulk_queue_depth", 5)
+        self._enqueue(2)
+        db = TestingSessionLocal()
+        try:
+            _add_held(db, 1, 10)
+            assert admission.release_held(db) == 3
+            assert admission.queue_depth() == 5
+            # Finished scans trigger the dispatcher again; nothing more goes out until the queue drains
+            assert admission.release_held(db) == 0
+            assert admission.queue_depth() == 5
+            assert HeldScanRepository(db).count_held() == 7
+        finally:
+            db.close()
@@ -1,41 +1,7 @@
 """
 Tests for API endpoints
 """
-import pytest
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-
-from app.main import create_app
-from app.deps import get_db, Base
-
-
-# Test database
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-
-def override_get_db():
-    try:
-        db = TestingSessionLocal()
-        yield db
-    finally:
-        db.close()
-
-
-@pytest.fixture
-def client():
-    """Create test client with test database"""
-    Base.metadata.create_all(bind=engine)
-    
-    app = create_app()
-    app.dependency_overrides[get_db] = override_get_db
-    
-    with TestClient(app) as test_client:
-        yield test_client
-    
-    Base.metadata.drop_all(bind=engine)
+from tests.conftest import TestingSessionLocal
 
 
 class TestScanEndpoints:
@@ -104,6 +70,38 @@ class TestScanEndpoints:
         assert list_response.json()[0]["job_id"] == job_id
 
 
+class TestScanTimings:
+    """Test per-tool telemetry endpoint"""
+
+    def test_timings_not_found(self, client):
+        response = client.get("/api/v1/scans/nonexistent-job-id/timings")
+        assert response.status_code == 404
+
+    def test_timings_aggregates_stages(self, client):
+        from app.storage.repo import ScanJobRepository, StageRunRepository
+
+        db = TestingSessionLocal()
+        try:
+            scan_job = ScanJobRepository(db).create_scan_job("timings-job", "example.com")
+            StageRunRepository(db).bulk_create(scan_job.id, [
+                {"tool": "subfinder", "stage": "enumeration", "wall_time": 2.0, "user_cpu": 0.5, "sys_cpu": 0.1, "max_rss_kb": 1000, "exit_code": 0},
+                {"tool": "amass", "stage": "enumeration", "wall_time": 3.0, "user_cpu": 1.0, "sys_cpu": 0.2, "max_rss_kb": 5000, "exit_code": 0},
+                {"tool": "httpx", "stage": "probe", "wall_time": 4.0, "timed_out": True},
+            ])
+        finally:
+            db.close()
+
+        response = client.get("/api/v1/scans/timings-job/timings")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total_wall_time"] == 9.0
+        assert len(data["runs"]) == 3
+        stages = {s["stage"]: s for s in data["stages"]}
+        assert stages["enumeration"]["runs"] == 2
+        assert stages["enumeration"]["max_rss_kb"] == 5000
+        assert stages["probe"]["wall_time"] == 4.0
+
+
 class TestAPIDocumentation:
     """Test API documentation endpoints"""
     
@@ -0,0 +1,97 @@
+"""
+Tests for artifact references in Celery messages and results
+"""
+import pytest
+
+from app.deps import settings
+from app.services import artifacts
+from app.services.artifact_refs import (
+    PayloadCappedTask, PayloadTooLarge, copy_ref, ensure_size, file_ref, load_ref, resolve, summary_stats, write_ref,
+)
+
+LIVE_HOSTS = [{"url": f"https://host{i}.example.com", "status_code": 200, "title": "Login"} for i in range(500)]
+
+
+@pytest.fixture
+def jobs(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "jobs_directory", str(tmp_path / "jobs"))
+    monkeypatch.setattr(settings, "artifact_store_enabled", False)
+    return tmp_path / "jobs"
+
+
+class TestRefs:
+    """Test writing and loading references"""
+
+    def test_json_roundtrip(self, jobs):
+        ref = write_ref("job-1", "stages/live_hosts.json", LIVE_HOSTS)
+
+        assert ref["count"] == 500 and ref["format"] == "json"
+        assert len(str(ref)) < 300
+        assert load_ref(ref) == LIVE_HOSTS
+        assert resolve(ref) == LIVE_HOSTS
+        assert resolve(LIVE_HOSTS[:2]) == LIVE_HOSTS[:2]
+
+    def test_lines_file(self, jobs):
+        (jobs / "job-1").mkdir(parents=True)
+        (jobs / "job-1" / "subs.txt").write_text("a.example.com\n\nb.example.com\na.example.com\n")
+
+        assert load_ref(file_ref("job-1", "subs.txt")) == ["a.example.com", "b.example.com"]
+
+    def test_each_ref_has_its_own_file(self, jobs):
+        first = write_ref("job-1", "stages/leak_urls.json", ["https://a.example.com"])
+        second = write_ref("job-1", "stages/leak_urls.json", ["https://b.example.com"])
+
+        assert first["key"] != second["key"]
+        assert first["key"].startswith("stages/leak_urls-") and first["key"].endswith(".json")
+        assert load_ref(first) == ["https://a.example.com"]
+        assert load_ref(second) == ["https://b.example.com"]
+
+    def test_copy_survives_rewrite(self, jobs):
+        (jobs / "job-1").mkdir(parents=True)
+        (jobs / "job-1" / "subs.txt").write_text("a.example.com\n")
+        ref = copy_ref("job-1", "subs.txt", "stages/subdomains.txt", count=1)
+        (jobs / "job-1" / "subs.txt").write_text("b.example.com\n")
+
+        assert load_ref(ref) == ["a.example.com"]
+
+    def test_checksum_mismatch(self, jobs):
+        ref = write_ref("job-1", "stages/live_hosts.json", LIVE_HOSTS)
+        (jobs / "job-1" / ref["key"]).write_text("[]")
+
+        with pytest.raises(ValueError):
+            load_ref(ref)
+        with pytest.raises(FileNotFoundError):
+            load_ref({**ref, "key": "stages/missing.json"})
+
+    def test_stale_copy_replaced_from_store(self, jobs, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "artifact_store_enabled", True)
+        monkeypatch.setattr(settings, "artifact_store_path", str(tmp_path / "artifacts"))
+        monkeypatch.setattr(artifacts, "_store", None)
+
+        ref = write_ref("job-1", "stages/live_hosts.json", LIVE_HOSTS)
+        (jobs / "job-1" / ref["key"]).write_text("[]")
+
+        assert load_ref(ref) == LIVE_HOSTS
+
+
+class TestSizeCaps:
+    """Test the message and result caps"""
+
+    def test_ensure_size(self):
+        assert ensure_size({"count": 1}, 100, "result") == {"count": 1}
+        assert ensure_size(LIVE_HOSTS, 0, "result") == LIVE_HOSTS
+        with pytest.raises(PayloadTooLarge):
+            ensure_size(LIVE_HOSTS, 1024, "result")
+
+    def test_summary_stats(self):
+        stats = {"live_hosts": 3, "stage_runs": [{"tool": "httpx"}], "total_subdomains": 9}
+        assert summary_stats(stats) == {"live_hosts": 3, "total_subdomains": 9}
+
+    def test_tasks_reject_large_messages(self, monkeypatch):
+        from app.workers.tasks import run_waf_check
+
+        task = run_waf_check._get_current_object()
+        assert isinstance(task, PayloadCappedTask)
+        monkeypatch.setattr(settings, "celery_max_message_bytes", 1024)
+        with pytest.raises(PayloadTooLarge):
+            task.apply_async(("job-1", "example.com", LIVE_HOSTS))
@@ -0,0 +1,338 @@
+"""
+Tests for the content-addressed artifact store
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.deps import settings
+from app.services import artifacts
+from app.services.artifacts import ArtifactStore, job_path, delete_job_files
+
+
+def _job(jobs_dir, job_id, files):
+    for relpath, content in files.items():
+        path = jobs_dir / job_id / relpath
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+    return jobs_dir / job_id
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "jobs_directory", str(tmp_path / "jobs"))
+    monkeypatch.setattr(settings, "artifact_store_enabled", True)
+    monkeypatch.setattr(settings, "artifact_store_path", str(tmp_path / "artifacts"))
+    monkeypatch.setattr(settings, "artifact_gc_grace_seconds", 0)
+    monkeypatch.setattr(artifacts, "_store", None)
+    return artifacts.get_artifact_store()
+
+
+SUBS = b"".join(f"host{i}.example.com\n".encode() for i in range(2000))
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 8
+
+
+class TestArtifactStore:
+    """Test blobs, manifests and references"""
+
+    def test_identical_files_stored_once(self, store, tmp_path):
+        jobs = tmp_path / "jobs"
+        first = store.commit_job("job-a", _job(jobs, "job-a", {"subs.txt": SUBS, "shots/a.png": PNG}))
+        second = store.commit_job("job-b", _job(jobs, "job-b", {"subs.txt": SUBS, "live.txt": b"x\n"}))
+
+        assert first["files"] == 2 and first["new_blobs"] == 2
+        assert second["new_blobs"] == 1
+        assert first["stored_bytes"] < first["bytes"]
+        assert store.refcount(store.read_manifest("job-a")["subs.txt"]["sha256"]) == 2
+
+    def test_codecs(self, store, tmp_path):
+        store.commit_job("job-a", _job(tmp_path / "jobs", "job-a", {"subs.txt": SUBS, "shots/a.png": PNG}))
+        files = store.read_manifest("job-a")
+
+        assert files["subs.txt"]["codec"] == store.compression
+        assert files["shots/a.png"]["codec"] == "raw"
+        assert store.read_blob(files["subs.txt"]["sha256"]) == SUBS
+        assert store.read_blob(files["shots/a.png"]["sha256"]) == PNG
+
+    def test_unknown_zstd_falls_back_to_zlib(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(artifacts, "zstandard", None)
+        assert ArtifactStore(tmp_path, "zstd").compression == "zlib"
+
+    def test_changed_file_releases_old_blob(self, store, tmp_path):
+        jobs = tmp_path / "jobs"
+        store.commit_job("job-a", _job(jobs, "job-a", {"live.txt": b"old\n"}))
+        old = store.read_manifest("job-a")["live.txt"]["sha256"]
+        store.commit_job("job-a", _job(jobs, "job-a", {"live.txt": b"new\n"}))
+
+        assert store.find_blob(old) is None
+        assert job_path("job-a", "live.txt").read_bytes() == b"new\n"
+
+
+class TestConcurrentCommits:
+    """Test stage tasks of one job committing and fetching at the same time"""
+
+    def test_concurrent_commits_merge(self, store, tmp_path):
+        barrier = threading.Barrier(8)
+
+        def commit(i):
+            job_dir = _job(tmp_path / f"node{i}", "job-a", {f"out{i}.txt": f"{i}\n".encode()})
+            barrier.wait()
+            return store.commit_job("job-a", job_dir)
+
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(commit, range(8)))
+
+        assert sorted(store.read_manifest("job-a")) == [f"out{i}.txt" for i in range(8)]
+
+    def test_lost_manifest_race_is_merged(self, store, tmp_path):
+        read = store._read_manifest_versioned
+        raced = []
+
+        def read_then_race(job_id):
+            result = read(job_id)
+            if not raced:
+                raced.append(True)
+                store.commit_job(job_id, _job(tmp_path / "other-node", job_id, {"live.txt": b"a\n"}))
+            return result
+
+        store._read_manifest_versioned = read_then_race
+        store.commit_job("job-a", _job(tmp_path / "jobs", "job-a", {"subs.txt": SUBS}))
+
+        assert sorted(store.read_manifest("job-a")) == ["live.txt", "subs.txt"]
+
+    def test_conditional_write(self, store):
+        backend = store.backend
+        assert backend.put_bytes_if("manifests/x.json", b"1", None)
+        assert not backend.put_bytes_if("manifests/x.json", b"2", None)
+        data, version = backend.get_versioned("manifests/x.json")
+        assert data == b"1"
+        assert backend.put_bytes_if("manifests/x.json", b"2", version)
+        assert not backend.put_bytes_if("manifests/x.json", b"3", version)
+        assert list(backend.list("manifests/")) == ["manifests/x.json"]
+
+    def test_concurrent_materialize(self, store, tmp_path):
+        store.commit_job("job-a", _job(tmp_path / "jobs", "job-a", {"subs.txt": SUBS}))
+        job_dir = tmp_path / "jobs" / "job-a"
+
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(lambda _: store.materialize("job-a", "subs.txt", job_dir), range(8)))
+
+        assert (job_dir / "subs.txt").read_bytes() == SUBS
+        assert [path.name for path in job_dir.iterdir()] == ["subs.txt"]
+
+
+class TestJobFiles:
+    """Test reading and deleting stored job files"""
+
+    def test_commit_moves_files_and_job_path_fetches_them(self, store, tmp_path):
+        job_dir = _job(tmp_path / "jobs", "job-a", {"live.txt": b"https://a.example.com\n",
+                                                    "responses/ab/cd.json": b"{}"})
+        store.commit_job("job-a", job_dir)
+
+        assert not (job_dir / "live.txt").exists()
+        assert job_path("job-a", "live.txt").read_bytes() == b"https://a.example.com\n"
+        assert (job_path("job-a", "responses") / "ab" / "cd.json").read_bytes() == b"{}"
+        assert job_path("job-a", "missing.txt") is None
+        assert job_path("job-a", "../job-b/live.txt") is None
+
+    def test_delete_keeps_shared_blobs(self, store, tmp_path):
+        jobs = tmp_path / "jobs"
+        store.commit_job("job-a", _job(jobs, "job-a", {"subs.txt": SUBS, "live.txt": b"a\n"}))
+        store.commit_job("job-b", _job(jobs, "job-b", {"subs.txt": SUBS}))
+
+        assert delete_job_files("job-a") == 1
+        assert not (jobs / "job-a").exists()
+        assert job_path("job-b", "subs.txt").read_bytes() == SUBS
+
+    def test_grace_period_and_gc(self, store, tmp_path):
+        store.gc_grace_seconds = 3600
+        store.commit_job("job-a", _job(tmp_path / "jobs", "job-a", {"live.txt": b"a\n"}))
+        digest = store.read_manifest("job-a")["live.txt"]["sha256"]
+
+        assert store.delete_job("job-a") == 0
+        assert store.find_blob(digest) is not None
+        store.gc_grace_seconds = 0
+        assert store.gc() == 1
+        assert store.find_blob(digest) is None
+
+
+class TestLocalCopies:
+    """Test copies kept in job directories after a commit (locality routing)"""
+
+    def _age(self, path, seconds=600):
+        import os
+        import time
+
+        past = time.time() - seconds
+        os.utime(path, (past, past))
+
+    def test_stale_copy_replaced(self, store, tmp_path):
+        owner_dir = _job(tmp_path / "jobs", "job-a", {"live.txt": b"old\n"})
+        store.commit_job("job-a", owner_dir, remove_local=False)
+        self._age(owner_dir / "live.txt")
+        # A fallback stage on another node rewrites live.txt and commits it
+        other_dir = _job(tmp_path / "other-node", "job-a", {"live.txt": b"new\n"})
+        store.commit_job("job-a", other_dir)
+
+        assert job_path("job-a", "live.txt").read_bytes() == b"new\n"
+
+    def test_refresh_local(self, store, tmp_path):
+        owner_dir = _job(tmp_path / "jobs", "job-a", {"live.txt": b"old\n", "subs.txt": SUBS})
+        store.commit_job("job-a", owner_dir, remove_local=False)
+        self._age(owner_dir / "live.txt")
+        self._age(owner_dir / "subs.txt")
+        store.commit_job("job-a", _job(tmp_path / "other-node", "job-a", {"live.txt": b"new\n"}))
+
+        assert store.refresh_local("job-a", owner_dir) == 1
+        assert (owner_dir / "live.txt").read_bytes() == b"new\n"
+        assert (owner_dir / "subs.txt").read_bytes() == SUBS
+        assert store.refresh_local("job-a", owner_dir) == 0
+
+    def test_newer_local_output_kept(self, store, tmp_path):
+        job_dir = _job(tmp_path / "jobs", "job-a", {"live.txt": b"old\n"})
+        store.commit_job("job-a", job_dir, remove_local=False)
+        # Written by a running stage after the last commit
+        (job_dir / "live.txt").write_bytes(b"in progress\n")
+
+        assert job_path("job-a", "live.txt").read_bytes() == b"in progress\n"
+
+    def test_evict_local_jobs(self, store, tmp_path, monkeypatch):
+        from app.services import locality
+
+        jobs = tmp_path / "jobs"
+        store.commit_job("job-a", _job(jobs, "job-a", {"live.txt": b"a\n"}), remove_local=False)
+        _job(jobs, "job-a", {"derived/thumb/a.webp": b"RIFF"})
+        store.commit_job("job-b", _job(jobs, "job-b", {"live.txt": b"b\n"}), remove_local=False)
+        _job(jobs, "job-legacy", {"live.txt": b"c\n"})
+        monkeypatch.setattr(locality, "owner_of", lambda job_id: "celery@node1" if job_id == "job-b" else None)
+
+        assert artifacts.evict_local_jobs("celery@node1") == 2
+        assert not (jobs / "job-a").exists() and not (jobs / "job-legacy").exists()
+        assert (jobs / "job-b" / "live.txt").exists()
+        # Files only this node had are stored before the directory goes
+        assert job_path("job-a", "derived/thumb/a.webp").read_bytes() == b"RIFF"
+        # A job that was never committed (store enabled later, failed commit) is stored, not lost
+        assert job_path("job-legacy", "live.txt").read_bytes() == b"c\n"
+
+    def test_newer_local_output_committed_before_eviction(self, store, tmp_path):
+        job_dir = _job(tmp_path / "jobs", "job-a", {"live.txt": b"old\n"})
+        store.commit_job("job-a", job_dir, remove_local=False)
+        (job_dir / "live.txt").write_bytes(b"new\n")
+
+        assert artifacts.evict_local_jobs("celery@node1") == 1
+        assert job_path("job-a", "live.txt").read_bytes() == b"new\n"
+
+    @pytest.mark.parametrize("error", [OSError("store unavailable"), None])
+    def test_not_evicted_unless_stored(self, store, tmp_path, monkeypatch, error):
+        _job(tmp_path / "jobs", "job-legacy", {"live.txt": b"c\n"})
+
+        def commit_job(*args, **kwargs):
+            if error is not None:
+                raise error
+            return {}
+
+        monkeypatch.setattr(store, "commit_job", commit_job)
+        assert artifacts.evict_local_jobs("celery@node1") == 0
+        assert (tmp_path / "jobs" / "job-legacy" / "live.txt").read_bytes() == b"c\n"
+
+    def test_recently_changed_directory_kept(self, store, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "artifact_gc_grace_seconds", 3600)
+        store.commit_job("job-a", _job(tmp_path / "jobs", "job-a", {"live.txt": b"a\n"}), remove_local=False)
+
+        assert artifacts.evict_local_jobs("celery@node1") == 0
+        assert (tmp_path / "jobs" / "job-a" / "live.txt").exists()
+
+
+class TestJobFilesEndpoint:
+    """Test GET /jobs/{job_id}/{path}"""
+
+    def test_served_from_store(self, client, store, tmp_path):
+        store.commit_job("job-a", _job(tmp_path / "jobs", "job-a", {"shots/a.png": PNG}))
+
+        response = client.get("/jobs/job-a/shots/a.png")
+        assert response.status_code == 200
+        assert response.content == PNG
+        assert client.get("/jobs/job-a/shots/b.png").status_code == 404
+        assert client.get("/jobs/job-a/shots").status_code == 404
+
+    @pytest.mark.parametrize("enabled", [True, False])
+    def test_job_id_outside_jobs_directory(self, client, tmp_path, monkeypatch, enabled):
+        monkeypatch.setattr(settings, "jobs_directory", str(tmp_path / "jobs"))
+        monkeypatch.setattr(settings, "artifact_store_enabled", enabled)
+        monkeypatch.setattr(settings, "artifact_store_path", str(tmp_path / "artifacts"))
+        monkeypatch.setattr(artifacts, "_store", None)
+        _job(tmp_path / "jobs", "job-a", {"live.txt": b"a\n"})
+        (tmp_path / "secret.txt").write_bytes(b"SECRET=1\n")
+
+        assert client.get("/jobs/%2e%2e/secret.txt").status_code == 404
+        assert client.get("/jobs/job-a/%2e%2e/%2e%2e/secret.txt").status_code == 404
+        assert job_path("..", "secret.txt") is None
+        assert job_path(".", "job-a/live.txt") is None
+        assert client.get("/jobs/job-a/live.txt").status_code == 200
+
+
+@pytest.fixture
+def s3_store(tmp_path, monkeypatch):
+    moto = pytest.importorskip("moto")
+    boto3 = pytest.importorskip("boto3")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    with moto.mock_aws():
+        boto3.client("s3").create_bucket(Bucket="recon-artifacts")
+        monkeypatch.setattr(settings, "jobs_directory", str(tmp_path / "jobs"))
+        monkeypatch.setattr(settings, "artifact_store_enabled", True)
+        monkeypatch.setattr(settings, "artifact_backend", "s3")
+        monkeypatch.setattr(settings, "artifact_s3_prefix", "scans")
+        monkeypatch.setattr(settings, "artifact_gc_grace_seconds", 0)
+        monkeypatch.setattr(artifacts, "_store", None)
+        yield artifacts.get_artifact_store()
+
+
+class TestS3Backend:
+    """Test the store on an S3 bucket (moto)"""
+
+    def test_commit_and_fetch(self, s3_store, tmp_path):
+        jobs = tmp_path / "jobs"
+        s3_store.commit_job("job-a", _job(jobs, "job-a", {"subs.txt": SUBS, "shots/a.png": PNG}))
+        stats = s3_store.commit_job("job-b", _job(jobs, "job-b", {"subs.txt": SUBS}))
+
+        assert stats["new_blobs"] == 0
+        keys = set(s3_store.backend.list(""))
+        assert "manifests/job-a.json" in keys
+        assert sum(key.startswith("blobs/") for key in keys) == 2
+        assert not (jobs / "job-a" / "subs.txt").exists()
+        assert job_path("job-a", "subs.txt").read_bytes() == SUBS
+        assert job_path("job-a", "shots/a.png").read_bytes() == PNG
+
+    def test_conditional_write(self, s3_store):
+        backend = s3_store.backend
+        assert backend.put_bytes_if("manifests/x.json", b"1", None)
+        assert not backend.put_bytes_if("manifests/x.json", b"2", None)
+        data, version = backend.get_versioned("manifests/x.json")
+        assert backend.put_bytes_if("manifests/x.json", b"2", version)
+        assert not backend.put_bytes_if("manifests/x.json", b"3", version)
+        assert backend.get_bytes("manifests/x.json") == b"2"
+
+    def test_delete_and_gc(self, s3_store, tmp_path):
+        jobs = tmp_path / "jobs"
+        s3_store.commit_job("job-a", _job(jobs, "job-a", {"subs.txt": SUBS, "live.txt": b"a\n"}))
+        s3_store.commit_job("job-b", _job(jobs, "job-b", {"subs.txt": SUBS}))
+
+        assert delete_job_files("job-a") == 1
+        assert job_path("job-b", "subs.txt").read_bytes() == SUBS
+        assert delete_job_files("job-b") == 1
+        assert s3_store.gc() == 0
+        assert list(s3_store.backend.list("")) == []
+
+    def test_presigned_reads(self, s3_store, client, tmp_path, monkeypatch):
+        s3_store.commit_job("job-a", _job(tmp_path / "jobs", "job-a", {"shots/a.png": PNG, "live.txt": b"a\n"}))
+        monkeypatch.setattr(settings, "artifact_read_mode", "presign")
+
+        response = client.get("/jobs/job-a/shots/a.png", follow_redirects=False)
+        assert response.status_code == 307
+        assert "recon-artifacts" in response.headers["location"]
+        assert "scans/blobs/" in response.headers["location"]
+        # Compressed blobs are proxied
+        assert client.get("/jobs/job-a/live.txt").content == b"a\n"
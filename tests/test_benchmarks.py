@@ -0,0 +1,85 @@
+"""
+Tests for the pipeline benchmark harness and fake tools
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from benchmarks.compare import compare_reports
+from benchmarks.fake_tools import FakeToolConfig, install_fake_tools
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def _run_tool(path, args, config, input=None, cwd=None):
+    env = {**os.environ, **config.to_env()}
+    return subprocess.run([path, *args], input=input, capture_output=True, text=True, env=env, cwd=cwd)
+
+
+class TestFakeTools:
+    """Test stand-in tool output formats"""
+
+    def test_enumerators_cover_all_subdomains(self, tmp_path):
+        tools = install_fake_tools(tmp_path / "bin")
+        config = FakeToolConfig(subdomains=100)
+
+        _run_tool(tools["subfinder"], ["-d", "example.com", "-silent", "-o", "subs.txt"], config, cwd=tmp_path)
+        assetfinder = _run_tool(tools["assetfinder"], ["--subs-only", "example.com"], config)
+        merged = _run_tool(tools["anew"], [str(tmp_path / "subs.txt")], config, input=assetfinder.stdout)
+
+        subs = (tmp_path / "subs.txt").read_text().split()
+        assert len(subs) == 90  # subfinder [0, 60) + assetfinder [70, 100)
+        assert len(merged.stdout.split()) == 30
+        assert all(s.endswith(".example.com") for s in subs)
+
+    def test_httpx_emits_json_lines(self, tmp_path):
+        tools = install_fake_tools(tmp_path / "bin")
+        hosts = "".join(f"host{i}.example.com\n" for i in range(200))
+
+        result = _run_tool(tools["httpx"], ["-silent", "-json"], FakeToolConfig(live_ratio=0.5), input=hosts)
+
+        records = [json.loads(line) for line in result.stdout.splitlines()]
+        assert 50 < len(records) < 150
+        assert {"url", "status_code", "title", "tech", "a"} <= set(records[0])
+
+    def test_failure_rate(self, tmp_path):
+        tools = install_fake_tools(tmp_path / "bin")
+
+        result = _run_tool(tools["assetfinder"], ["--subs-only", "example.com"], FakeToolConfig(failure_rate=1.0))
+
+        assert result.returncode == 1
+        assert "simulated failure" in result.stderr
+
+
+class TestBenchmarkHarness:
+    """Test the end-to-end harness at a small scale"""
+
+    def test_run_pipeline_writes_report(self, tmp_path):
+        output = tmp_path / "report.json"
+        result = subprocess.run(
+            [sys.executable, "-m", "benchmarks.run_pipeline", "--subdomains", "50",
+             "--work-dir", str(tmp_path / "work"), "--output", str(output)],
+            cwd=REPO_ROOT, capture_output=True, text=True, timeout=120
+        )
+        assert result.returncode == 0, result.stderr
+
+        report = json.loads(output.read_text())
+        assert report["status"] == "completed"
+        assert report["counts"]["subdomains"] == 50
+        assert report["counts"]["live_hosts"] > 0
+        assert "stage.enumeration" in report["stages"]
+        assert report["tools"]["httpx"]["runs"] == 1
+        assert report["db"]["queries"] > 0
+        assert report["db"]["rows"] > 0
+
+    def test_compare_flags_regressions(self):
+        baseline = {"wall_time": 10.0, "stages": {"stage.probe": 2.0}, "db": {"rows_per_second": 1000.0}}
+        current = {"wall_time": 10.5, "stages": {"stage.probe": 4.0}, "db": {"rows_per_second": 500.0}}
+
+        rows = {row["metric"]: row for row in compare_reports(baseline, current, threshold=0.10)}
+
+        assert not rows["wall_time"]["regressed"]
+        assert rows["stages.stage.probe"]["regressed"]
+        assert rows["db.rows_per_second"]["regressed"]
@@ -0,0 +1,183 @@
+"""
+Tests for batched bulk scan submission
+"""
+import contextlib
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event
+
+from app.deps import settings
+from app.auth.dependencies import require_auth
+from app.routers import scans
+from app.services import admission
+from app.storage.models import ScanJob, HeldScan, ScanStatus
+from app.storage.repo import ScanJobRepository
+from tests.conftest import TestingSessionLocal, engine
+
+
+@pytest.fixture
+def bulk(client, monkeypatch):
+    """API client as user 1 with admission control off; records what bulk submission publishes"""
+    state = {"published": [], "fail_after": None}
+    client.app.dependency_overrides[require_auth] = lambda: SimpleNamespace(id=1, username="alice")
+
+    def publish(scans_to_publish):
+        for i, item in enumerate(scans_to_publish):
+            if state["fail_after"] is not None and i >= state["fail_after"]:
+                return i
+            state["published"].append(item)
+        return len(scans_to_publish)
+
+    monkeypatch.setattr(settings, "admission_control_enabled", False)
+    monkeypatch.setattr(scans, "publish_scans", publish)
+    state["client"] = client
+    return state
+
+
+@contextlib.contextmanager
+def count_statements():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+class TestBulkSubmission:
+    def test_validates_and_dedupes(self, bulk):
+        domains = ["A.com", "a.com ", "b.com", "invalid", "", "b.com"]
+        response = bulk["client"].post("/api/v1/scans/bulk", json={"domains": domains})
+        assert response.status_code == 200
+        body = response.json()
+        assert body["total_submitted"] == 2
+        assert [job["domain"] for job in body["jobs"]] == ["a.com", "b.com"]
+
+    def test_task_ids_are_stored_with_the_jobs(self, bulk):
+        response = bulk["client"].post("/api/v1/scans/bulk", json={"domains": ["a.com", "b.com", "c.com"]})
+        jobs = response.json()["jobs"]
+        published = {job_id: task_id for job_id, _, _, task_id in bulk["published"]}
+        assert set(published) == {job["job_id"] for job in jobs}
+
+        db = TestingSessionLocal()
+        try:
+            stored = {job.job_id: job.task_id for job in db.query(ScanJob).all()}
+            assert stored == published
+            assert all(job.owner_id == 1 for job in db.query(ScanJob).all())
+        finally:
+            db.close()
+        for job in jobs:
+            assert job["message"] == f"Task ID: {published[job['job_id']]}"
+
+    def test_one_insert_for_all_jobs(self, bulk):
+        domains = [f"d{i}.example.com" for i in range(200)]
+        with count_statements() as statements:
+            response = bulk["client"].post("/api/v1/scans/bulk", json={"domains": domains})
+        assert response.json()["total_submitted"] == 200
+        inserts = [s for s in statements if s.lstrip().upper().startswith("INSERT INTO SCAN_JOBS")]
+        assert len(inserts) == 1
+        assert len([s for s in statements if s.lstrip().upper().startswith("UPDATE")]) == 0
+
+    def test_unpublished_jobs_are_marked_failed(self, bulk):
+        bulk["fail_after"] = 2
+        response = bulk["client"].post("/api/v1/scans/bulk", json={"domains": ["a.com", "b.com", "c.com", "d.com"]})
+        body = response.json()
+        assert body["total_submitted"] == 2
+        assert [job["status"] for job in body["jobs"]] == ["pending", "pending", "failed", "failed"]
+
+        db = TestingSessionLocal()
+        try:
+            failed = db.query(ScanJob).filter(ScanJob.status == ScanStatus.FAILED).all()
+            assert sorted(job.domain for job in failed) == ["c.com", "d.com"]
+        finally:
+            db.close()
+
+    def test_held_rows_in_the_same_insert_batch(self, bulk, monkeypatch):
+        monkeypatch.setattr(settings, "admission_control_enabled", True)
+        monkeypatch.setattr(settings, "admission_bulk_queue_depth", 0)
+        monkeypatch.setattr(admission, "queue_depth", lambda: 0)
+        domains = [f"d{i}.example.com" for i in range(50)]
+        with count_statements() as statements:
+            response = bulk["client"].post("/api/v1/scans/bulk", json={"domains": domains})
+        assert response.json()["held"] == 50
+        assert len([s for s in statements if s.lstrip().upper().startswith("INSERT INTO HELD_SCANS")]) == 1
+
+        db = TestingSessionLocal()
+        try:
+            assert db.query(HeldScan).count() == 50
+            assert db.query(ScanJob).filter(ScanJob.task_id.isnot(None)).count() == 0
+        finally:
+            db.close()
+
+
+class TestRepository:
+    def test_bulk_create_scan_jobs(self, client):
+        db = TestingSessionLocal()
+        try:
+            repo = ScanJobRepository(db)
+            rows = [{"job_id": f"job-{i}", "domain": f"d{i}.com", "owner_id": 7, "task_id": f"task-{i}"}
+                    for i in range(5)]
+            assert repo.bulk_create_scan_jobs(rows) == 5
+            job = repo.get_scan_job("job-3")
+            assert job.task_id == "task-3"
+            assert job.status == ScanStatus.PENDING
+            assert job.created_at is not None
+            assert dict(repo.get_task_ids(["job-0", "job-4"])) == {"job-0": "task-0", "job-4": "task-4"}
+            assert repo.bulk_create_scan_jobs([]) == 0
+        finally:
+            db.close()
+
+
+class TestPublishScans:
+    def test_one_producer_for_all_messages(self, monkeypatch):
+        from app.workers import tasks
+        from app.workers.celery_app import celery_app
+
+        acquired, sent = [], []
+        producer = object()
+
+        @contextlib.contextmanager
+        def producer_or_acquire(producer_arg=None):
+            acquired.append(producer_arg)
+            yield producer
+
+        def apply_async(args=None, kwargs=None, **options):
+            sent.append((args, kwargs, options))
+
+        monkeypatch.setattr(celery_app, "producer_or_acquire", producer_or_acquire)
+        monkeypatch.setattr(tasks.run_recon_scan, "apply_async", apply_async)
+
+        options = {"profile": False}
+        assert admission.publish_scans([("j1", "a.com", options, "t1"), ("j2", "b.com", options, "t2")]) == 2
+        assert len(acquired) == 1
+        assert sent == [
+            (("j1", "a.com"), options, {"task_id": "t1", "producer": producer}),
+            (("j2", "b.com"), options, {"task_id": "t2", "producer": producer}),
+        ]
+
+    def test_stops_at_first_error(self, monkeypatch):
+        from app.workers import tasks
+        from app.workers.celery_app import celery_app
+
+        calls = []
+
+        @contextlib.contextmanager
+        def producer_or_acquire(producer_arg=None):
+            yield object()
+
+        def apply_async(args=None, kwargs=None, **options):
+            calls.append(args)
+            if len(calls) == 2:
+                raise ConnectionError("broker down")
+
+        monkeypatch.setattr(celery_app, "producer_or_acquire", producer_or_acquire)
+        monkeypatch.setattr(tasks.run_recon_scan, "apply_async", apply_async)
+
+        items = [(f"j{i}", f"d{i}.com", {}, f"t{i}") for i in range(4)]
+        assert admission.publish_scans(items) == 1
+        assert len(calls) == 2
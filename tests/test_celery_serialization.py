@@ -0,0 +1,109 @@
+"""
+Tests for Celery message encoding settings and the encoding benchmark
+"""
+import pytest
+from celery import Celery
+from kombu import serialization
+
+from app.deps import settings
+from app.workers import serialization as message_serialization
+from app.workers.serialization import configure_serialization, message_options, task_annotations
+from benchmarks.bench_celery_messages import run_benchmarks
+
+ROUTES = {
+    "app.workers.tasks.run_recon_scan": {"queue": "recon_full"},
+    "app.workers.tasks.run_waf_check": {"queue": "waf_check"},
+}
+
+
+@pytest.fixture
+def msgpack_settings(monkeypatch):
+    pytest.importorskip("msgpack")
+    monkeypatch.setattr(settings, "celery_serializer", "msgpack")
+    monkeypatch.setattr(settings, "celery_compression", "zlib")
+    monkeypatch.setattr(settings, "celery_serialization_queues", ["recon_full"])
+
+
+class TestSettings:
+    """Test resolving the encoding settings"""
+
+    def test_defaults_are_json(self):
+        assert message_options() == {"serializer": "json"}
+        assert task_annotations(ROUTES) == {}
+
+    def test_selected_queues(self, msgpack_settings):
+        assert task_annotations(ROUTES) == {
+            "app.workers.tasks.run_recon_scan": {"serializer": "msgpack", "compression": "zlib"}
+        }
+
+    def test_fallbacks(self, monkeypatch):
+        monkeypatch.setattr(message_serialization, "msgpack", None)
+        monkeypatch.setattr(settings, "celery_serializer", "msgpack")
+        monkeypatch.setattr(settings, "celery_compression", "zstd")
+
+        assert message_serialization.accepted_content() == ["json"]
+        options = message_options()
+        assert options["serializer"] == "json"
+        assert options.get("compression") in ("zstd", "zlib")
+
+        monkeypatch.setattr(settings, "celery_compression", "snappy-ish")
+        with pytest.raises(ValueError):
+            message_options()
+
+
+class TestPublishing:
+    """Test what a configured app publishes and accepts"""
+
+    def _app(self):
+        app = Celery("serialization-test", broker="memory://")
+        app.conf.task_routes = dict(ROUTES)
+        configure_serialization(app)
+
+        @app.task(name="app.workers.tasks.run_recon_scan")
+        def run_recon_scan(job_id, domain):
+            return job_id
+
+        @app.task(name="app.workers.tasks.run_waf_check")
+        def run_waf_check(job_id, domain):
+            return job_id
+
+        sent = []
+        publish = app.amqp.send_task_message
+
+        def spy(producer, name, message, **options):
+            sent.append((name, options.get("serializer"), options.get("compression")))
+            return publish(producer, name, message, **options)
+
+        app.amqp.send_task_message = spy
+        return app, run_recon_scan, run_waf_check, sent
+
+    def test_selected_route_uses_msgpack(self, msgpack_settings):
+        app, run_recon_scan, run_waf_check, sent = self._app()
+        run_recon_scan.delay("job-1", "example.com")
+        run_waf_check.delay("job-1", "example.com")
+
+        assert sent == [
+            ("app.workers.tasks.run_recon_scan", "msgpack", "zlib"),
+            ("app.workers.tasks.run_waf_check", "json", None),
+        ]
+
+    def test_json_messages_still_accepted(self, msgpack_settings):
+        app = self._app()[0]
+        accept = serialization.prepare_accept_content(app.conf.accept_content)
+        content_type, encoding, body = serialization.dumps([["job-1", "example.com"], {}, {}], serializer="json")
+
+        assert serialization.loads(body, content_type, encoding, accept=accept)[0] == ["job-1", "example.com"]
+        assert "application/x-msgpack" in accept
+
+
+class TestBenchmark:
+    """Test the encoding benchmark at a small scale"""
+
+    def test_reports_every_case_and_encoding(self):
+        report = run_benchmarks(hosts=50, iterations=2)
+        cases = {result["case"] for result in report["results"]}
+
+        assert "progress meta" in cases and "run_recon_scan message" in cases
+        by_case = {(r["case"], r["serializer"], r["compression"]): r["bytes"] for r in report["results"]}
+        assert by_case[("run_screenshot_capture message (ref)", "json", "none")] < \
+            by_case[("run_screenshot_capture message (inline)", "json", "none")] / 10
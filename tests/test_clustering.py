@@ -0,0 +1,123 @@
+"""
+Tests for clustering hosts that serve the same page
+"""
+import asyncio
+import types
+
+from app.deps import settings
+from app.services.clustering import cluster_key, assign_clusters, split_representatives, attribute_to_members
+from app.services.parsers import httpx_host_record
+
+BODY = "a" * 64
+
+
+def _host(url, body_hash=BODY, final_url=None, status_code=200, content_length=120):
+    return {'url': url, 'body_hash': body_hash, 'final_url': final_url,
+            'status_code': status_code, 'content_length': content_length}
+
+
+class TestClusterHelpers:
+    """Test cluster keys, representatives and attribution"""
+
+    def test_key_needs_body_hash_or_final_url(self):
+        assert cluster_key(_host("https://a.example.com", body_hash=None)) is None
+        assert cluster_key(_host("https://a.example.com", body_hash=None, final_url="https://sso.example.com/login"))
+        assert cluster_key(_host("https://a.example.com")) != cluster_key(_host("https://a.example.com", status_code=404))
+
+    def test_assign_clusters(self):
+        hosts = [
+            _host("https://a.example.com"),
+            _host("https://b.example.com"),
+            _host("https://c.example.com", body_hash="b" * 64),
+            _host("https://d.example.com", body_hash=None),
+        ]
+        clusters = assign_clusters(hosts)
+
+        assert len(clusters) == 2
+        assert hosts[0]['cluster_id'] == hosts[1]['cluster_id'] != hosts[2]['cluster_id']
+        assert hosts[3]['cluster_id'] is None
+        assert [h['url'] for h in clusters[hosts[0]['cluster_id']]] == ["https://a.example.com", "https://b.example.com"]
+
+    def test_split_and_attribute(self):
+        hosts = [
+            {'url': "https://a.example.com", 'cluster_id': "c1"},
+            {'url': "https://b.example.com:8443/", 'cluster_id': "c1"},
+            {'url': "https://c.example.com", 'cluster_id': None},
+        ]
+        targets, members = split_representatives(hosts)
+        assert [h['url'] for h in targets] == ["https://a.example.com", "https://c.example.com"]
+        assert members == {"https://a.example.com": ["https://b.example.com:8443"]}
+
+        rows = [
+            {'base_url': "https://a.example.com", 'leaked_file_url': "https://a.example.com/.git/config"},
+            {'base_url': "https://c.example.com", 'leaked_file_url': "https://c.example.com/.env"},
+        ]
+        expanded = attribute_to_members(rows, members, 'base_url', ('base_url', 'leaked_file_url'))
+        assert expanded[:2] == rows
+        assert expanded[2] == {'base_url': "https://b.example.com:8443",
+                               'leaked_file_url': "https://b.example.com:8443/.git/config"}
+
+    def test_httpx_record_body_hash(self):
+        record = httpx_host_record({"url": "https://a.example.com", "status_code": 200,
+                                    "hash": {"body_sha256": BODY}})
+        assert record['body_hash'] == BODY
+        assert httpx_host_record({"url": "https://a.example.com"})['body_hash'] is None
+
+
+class TestPipelineClustering:
+    """Test that screenshot and leak stages run once per cluster"""
+
+    def _pipeline(self, tmp_path, monkeypatch, job_id):
+        from app.services.pipeline import ReconPipeline
+
+        monkeypatch.setattr(settings, "jobs_directory", str(tmp_path))
+        pipeline = ReconPipeline(job_id, "example.com")
+        hosts = [
+            _host("https://www.example.com"),
+            _host("https://parked-1.example.com"),
+            _host("https://other.example.com", body_hash="b" * 64),
+        ]
+        asyncio.run(pipeline.cluster_live_hosts(hosts))
+        return pipeline, hosts
+
+    def test_screenshots_captured_once_per_cluster(self, tmp_path, monkeypatch):
+        pipeline, hosts = self._pipeline(tmp_path, monkeypatch, "cluster-shots-job")
+        urls_file = pipeline.job_dir / "urls_for_gowitness.txt"
+        captured = []
+
+        async def fake_gowitness():
+            captured.extend(urls_file.read_text().split())
+            pipeline.shots_dir.mkdir(parents=True, exist_ok=True)
+            for url in captured:
+                name = url.replace("://", "-").replace(".", "-")
+                (pipeline.shots_dir / f"{name}.png").write_bytes(b"png")
+
+        monkeypatch.setattr(pipeline, "_run_gowitness_cli", fake_gowitness)
+        screenshots = asyncio.run(pipeline.capture_screenshots_enhanced(hosts))
+
+        assert captured == ["https://www.example.com", "https://other.example.com"]
+        by_url = {shot['url']: shot['filename'] for shot in screenshots}
+        assert by_url == {
+            "https://www.example.com": "https-www-example-com.png",
+            "https://parked-1.example.com": "https-www-example-com.png",
+            "https://other.example.com": "https-other-example-com.png",
+        }
+
+    def test_leaks_scanned_once_per_cluster(self, tmp_path, monkeypatch):
+        pipeline, hosts = self._pipeline(tmp_path, monkeypatch, "cluster-leaks-job")
+        scanned = []
+
+        def fake_run(cmd, tool, **kwargs):
+            scanned.extend(pipeline.urls_no_waf_file.read_text().split())
+            stdout = "".join(f"[200] 120 0.1s text/plain {url}/.git/config\n" for url in scanned)
+            return types.SimpleNamespace(returncode=0, stdout=stdout, stderr="")
+
+        monkeypatch.setattr(pipeline.tool_runner, "run", fake_run)
+        leaks = asyncio.run(pipeline._run_sourceleakhacker_cli(hosts, []))
+
+        assert scanned == ["https://www.example.com", "https://other.example.com"]
+        assert sorted(leak['leaked_file_url'] for leak in leaks) == [
+            "https://other.example.com/.git/config",
+            "https://parked-1.example.com/.git/config",
+            "https://www.example.com/.git/config",
+        ]
@@ -0,0 +1,185 @@
+"""
+Tests for the DNS resolution stage against a local stub server
+"""
+import asyncio
+import json
+
+import pytest
+
+from app.deps import settings
+from app.services.dns_resolver import (
+    AsyncResolver, DnsError, WildcardDetector, build_query, parse_response, parse_nameserver,
+    TYPE_A, TYPE_AAAA, RCODE_NXDOMAIN
+)
+from benchmarks.fake_dns import FakeDnsServer, FakeZone, build_response
+
+ZONE = FakeZone(
+    records={
+        "www.example.com": ["10.0.0.1", "2001:db8::1"],
+        "api.example.com": ["10.0.0.2"],
+        "edge.cdn.net": ["10.5.5.5"],
+        "real.wild.example.com": ["10.0.0.3"],
+    },
+    wildcards={"wild.example.com": ["10.9.9.9"]},
+    cnames={"shop.example.com": "edge.cdn.net"},
+)
+
+
+def _run_with_server(zone, coro_factory, drop=False):
+    async def main():
+        server = FakeDnsServer(zone)
+        await server.start()
+        server.drop = drop
+        try:
+            return await coro_factory(server)
+        finally:
+            server.close()
+    return asyncio.run(main())
+
+
+class TestWireFormat:
+    """Test query encoding and response decoding"""
+
+    def test_round_trip_with_compression(self):
+        response = parse_response(build_response(build_query(4242, "shop.example.com", TYPE_A), ZONE))
+
+        assert response.query_id == 4242
+        assert response.answers == [
+            ("shop.example.com", 5, 300, "edge.cdn.net"),
+            ("edge.cdn.net", TYPE_A, 300, "10.5.5.5"),
+        ]
+
+    def test_nxdomain(self):
+        response = parse_response(build_response(build_query(1, "nope.example.com", TYPE_A), ZONE))
+        assert response.rcode == RCODE_NXDOMAIN
+        assert response.answers == []
+
+    @pytest.mark.parametrize("value,expected", [
+        ("1.1.1.1", ("1.1.1.1", 53)),
+        ("127.0.0.1:5353", ("127.0.0.1", 5353)),
+        ("[::1]:5300", ("::1", 5300)),
+    ])
+    def test_parse_nameserver(self, value, expected):
+        assert parse_nameserver(value) == expected
+
+
+class TestAsyncResolver:
+    """Test resolution, retries and bounded concurrency"""
+
+    def test_resolve_a_and_aaaa(self):
+        async def run(server):
+            resolver = AsyncResolver([server.address], timeout=1)
+            try:
+                return await resolver.resolve("WWW.example.com."), await resolver.resolve("missing.example.com")
+            finally:
+                resolver.close()
+
+        www, missing = _run_with_server(ZONE, run)
+        assert www.a == ["10.0.0.1"] and www.aaaa == ["2001:db8::1"]
+        assert not missing.resolved and missing.rcode == RCODE_NXDOMAIN
+
+    def test_retries_next_resolver(self):
+        async def run(server):
+            dead = FakeDnsServer(ZONE)
+            await dead.start()
+            dead.drop = True
+            resolver = AsyncResolver([dead.address, server.address], timeout=0.2, retries=2)
+            try:
+                answers = [await resolver.query("api.example.com", TYPE_A) for _ in range(5)]
+            finally:
+                resolver.close()
+                dead.close()
+            return answers
+
+        assert all(answer.addresses == ["10.0.0.2"] for answer in _run_with_server(ZONE, run))
+
+    def test_unreachable_resolvers(self):
+        async def run(server):
+            resolver = AsyncResolver([server.address], timeout=0.1, retries=1)
+            try:
+                with pytest.raises(DnsError):
+                    await resolver.query("www.example.com", TYPE_AAAA)
+                return await resolver.is_reachable("example.com")
+            finally:
+                resolver.close()
+
+        assert _run_with_server(ZONE, run, drop=True) is False
+
+    def test_resolve_many(self):
+        zone = FakeZone(lookup=lambda name: ["10.1.0.1"] if name.startswith("h") else None)
+
+        async def run(server):
+            resolver = AsyncResolver([server.address], timeout=1, concurrency=16)
+            try:
+                return await resolver.resolve_many([f"h{i}.example.com" for i in range(300)] + ["x.example.com"])
+            finally:
+                resolver.close()
+
+        hosts = _run_with_server(zone, run)
+        assert len(hosts) == 301
+        assert sum(host.resolved for host in hosts) == 300
+
+
+class TestWildcardDetection:
+    """Test wildcard zone detection with random labels"""
+
+    def test_wildcard_answers_are_flagged(self):
+        async def run(server):
+            resolver = AsyncResolver([server.address], timeout=1)
+            try:
+                detector = WildcardDetector(resolver, probes=2)
+                await detector.detect(["wild.example.com", "example.com"])
+                hosts = await resolver.resolve_many(["foo.wild.example.com", "real.wild.example.com", "www.example.com"])
+                return {host.name: detector.is_wildcard(host) for host in hosts}
+            finally:
+                resolver.close()
+
+        assert _run_with_server(ZONE, run) == {
+            "foo.wild.example.com": True,
+            "real.wild.example.com": False,
+            "www.example.com": False,
+        }
+
+
+class TestPipelineResolution:
+    """Test the resolution stage in ReconPipeline"""
+
+    def _pipeline(self, tmp_path, monkeypatch, job_id):
+        from app.services.pipeline import ReconPipeline
+
+        monkeypatch.setattr(settings, "jobs_directory", str(tmp_path))
+        monkeypatch.setattr(settings, "dns_timeout", 0.2)
+        monkeypatch.setattr(settings, "dns_retries", 1)
+        monkeypatch.setattr(settings, "dns_cache_backend", "none")
+        return ReconPipeline(job_id, "example.com")
+
+    def test_only_resolved_non_wildcard_names_forwarded(self, tmp_path, monkeypatch):
+        pipeline = self._pipeline(tmp_path, monkeypatch, "dns-job")
+        names = ["www.example.com", "api.example.com", "gone.example.com", "foo.wild.example.com", "real.wild.example.com"]
+
+        async def run(server):
+            monkeypatch.setattr(settings, "dns_resolvers", [server.address])
+            return await pipeline.resolve_subdomains(names)
+
+        targets = _run_with_server(ZONE, run)
+
+        assert targets == ["www.example.com", "api.example.com", "real.wild.example.com"]
+        assert pipeline.resolved_file.read_text().split() == targets
+        assert pipeline.dns_records["www.example.com"]["aaaa"] == ["2001:db8::1"]
+        records = [json.loads(line) for line in pipeline.dns_file.read_text().splitlines()]
+        assert {r["name"]: r["wildcard"] for r in records if r["a"]}["foo.wild.example.com"] is True
+
+        pipeline.live_file.write_text(json.dumps({"url": "https://www.example.com", "status_code": 200}) + "\n")
+        live_hosts = asyncio.run(pipeline._parse_live_results())
+        assert live_hosts[0]["ipv4_addresses"] == ["10.0.0.1"]
+
+    def test_unreachable_resolvers_fall_back_to_all_names(self, tmp_path, monkeypatch):
+        pipeline = self._pipeline(tmp_path, monkeypatch, "dns-fallback-job")
+        names = ["www.example.com", "gone.example.com"]
+
+        async def run(server):
+            monkeypatch.setattr(settings, "dns_resolvers", [server.address])
+            return await pipeline.resolve_subdomains(names)
+
+        assert _run_with_server(ZONE, run, drop=True) == names
+        assert not pipeline.resolved_file.exists()
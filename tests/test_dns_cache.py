@@ -0,0 +1,176 @@
+"""
+Tests for the shared DNS answer cache
+"""
+import asyncio
+import json
+
+from app.services import dns_cache as dns_cache_module
+from app.services.dns_cache import DnsCache
+from app.services.dns_resolver import AsyncResolver, DnsAnswer, TYPE_A, RCODE_NXDOMAIN, RCODE_SERVFAIL
+from benchmarks.fake_dns import FakeDnsServer, FakeZone
+
+
+class FakeAsyncRedis:
+    """Just the GET/SET subset DnsCache uses"""
+
+    def __init__(self, fail=False):
+        self.data = {}
+        self.ttls = {}
+        self.fail = fail
+        self.closed = False
+
+    async def get(self, key):
+        if self.fail:
+            raise ConnectionError("redis down")
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        if self.fail:
+            raise ConnectionError("redis down")
+        self.data[key] = value
+        self.ttls[key] = ex
+
+    async def aclose(self):
+        self.closed = True
+
+
+def _cache(**kwargs):
+    return DnsCache(**kwargs)
+
+
+def _redis_cache(monkeypatch, redis, **kwargs):
+    import redis.asyncio as redis_asyncio
+
+    monkeypatch.setattr(redis_asyncio.Redis, "from_url", lambda *args, **kw: redis)
+    return DnsCache(redis_url="redis://localhost:6379/0", **kwargs)
+
+
+def _answer(name="www.example.com", ttl=300, addresses=("10.0.0.1",), rcode=0):
+    return DnsAnswer(name, TYPE_A, rcode, list(addresses), [], ttl)
+
+
+class TestDnsCacheTtl:
+    """Test TTL handling in the in-process layer"""
+
+    def test_positive_answer_expires_with_record_ttl(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(dns_cache_module.time, "time", lambda: now[0])
+        cache = _cache()
+
+        asyncio.run(cache.set(_answer(ttl=300)))
+        now[0] += 100
+        cached = asyncio.run(cache.get("www.example.com", TYPE_A))
+        assert cached.addresses == ["10.0.0.1"] and cached.ttl == 200
+
+        now[0] += 201
+        assert asyncio.run(cache.get("www.example.com", TYPE_A)) is None
+
+    def test_ttl_cap_and_negative_ttl(self):
+        cache = _cache(negative_ttl=30, max_ttl=600)
+
+        assert cache.ttl_for(_answer(ttl=86400)) == 600
+        assert cache.ttl_for(_answer(ttl=0)) == 1
+        assert cache.ttl_for(_answer(addresses=(), rcode=RCODE_NXDOMAIN)) == 30
+        assert cache.ttl_for(_answer(addresses=(), ttl=3000)) == 30
+
+    def test_errors_not_cached(self):
+        cache = _cache()
+        asyncio.run(cache.set(_answer(addresses=(), rcode=RCODE_SERVFAIL)))
+        assert len(cache) == 0
+
+    def test_lru_eviction(self):
+        cache = _cache(max_entries=2)
+
+        async def run():
+            await cache.set(_answer("a.example.com"))
+            await cache.set(_answer("b.example.com"))
+            await cache.get("a.example.com", TYPE_A)
+            await cache.set(_answer("c.example.com"))
+            return [await cache.get(n, TYPE_A) is not None for n in ("a.example.com", "b.example.com", "c.example.com")]
+
+        assert asyncio.run(run()) == [True, False, True]
+
+
+class TestDnsCacheRedis:
+    """Test the shared Redis layer"""
+
+    def test_answers_shared_between_processes(self, monkeypatch):
+        redis = FakeAsyncRedis()
+        writer, reader = _redis_cache(monkeypatch, redis, negative_ttl=45), _redis_cache(monkeypatch, redis)
+
+        async def run():
+            await writer.set(_answer(ttl=120))
+            await writer.set(_answer("gone.example.com", addresses=(), rcode=RCODE_NXDOMAIN))
+            first = await reader.get("www.example.com", TYPE_A)
+            second = await reader.get("www.example.com", TYPE_A)
+            negative = await reader.get("gone.example.com", TYPE_A)
+            return first, second, negative
+
+        first, second, negative = asyncio.run(run())
+        assert first.addresses == second.addresses == ["10.0.0.1"]
+        assert negative.rcode == RCODE_NXDOMAIN
+        assert reader.stats == {"memory_hits": 1, "redis_hits": 2, "misses": 0, "redis_errors": 0}
+        assert sorted(redis.ttls.values()) == [45, 120]
+        assert "expires_at" in json.loads(redis.data["recon:dns:1:www.example.com"])
+
+    def test_redis_errors_fall_back_to_memory(self, monkeypatch):
+        cache = _redis_cache(monkeypatch, FakeAsyncRedis(fail=True))
+
+        async def run():
+            await cache.set(_answer())
+            hit, miss = await cache.get("www.example.com", TYPE_A), await cache.get("api.example.com", TYPE_A)
+            return hit, miss, cache._client()
+
+        hit, miss, client = asyncio.run(run())
+        assert hit is not None and miss is None
+        assert cache.stats["redis_errors"] == 1
+        assert client is None
+
+
+    def test_one_client_per_run_closed_with_the_run(self, monkeypatch):
+        import redis.asyncio as redis_asyncio
+
+        clients = []
+
+        def from_url(*args, **kwargs):
+            clients.append(FakeAsyncRedis())
+            return clients[-1]
+
+        monkeypatch.setattr(redis_asyncio.Redis, "from_url", from_url)
+        cache = DnsCache(redis_url="redis://localhost:6379/0")
+
+        async def run():
+            await cache.set(_answer())
+            await cache.get("api.example.com", TYPE_A)
+            await cache.aclose()
+
+        asyncio.run(run())
+        asyncio.run(run())
+        assert len(clients) == 2
+        assert all(client.closed for client in clients)
+        assert len(cache._clients) == 0
+
+
+class TestResolverWithCache:
+    """Test that cached answers skip the network"""
+
+    def test_second_resolution_served_from_cache(self):
+        zone = FakeZone(records={"www.example.com": ["10.0.0.1"]})
+
+        async def run():
+            server = FakeDnsServer(zone)
+            await server.start()
+            resolver = AsyncResolver([server.address], timeout=1, cache=DnsCache())
+            try:
+                await resolver.resolve_many(["www.example.com", "gone.example.com"])
+                sent = server.queries
+                hosts = await resolver.resolve_many(["www.example.com", "gone.example.com"])
+                return sent, server.queries, resolver.cache_hits, hosts
+            finally:
+                resolver.close()
+                server.close()
+
+        sent, total, hits, hosts = asyncio.run(run())
+        assert sent == total == 4
+        assert hits == 4
+        assert [host.resolved for host in hosts if host.name == "www.example.com"] == [True]
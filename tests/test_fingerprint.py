@@ -0,0 +1,252 @@
+"""
+Tests for in-process technology fingerprinting
+"""
+import asyncio
+import json
+import os
+import re
+
+import pytest
+
+from app.deps import settings
+from app.services.fingerprint import (
+    FingerprintEngine, LiteralIndex, Signature, required_literal, normalize_headers, captured_response,
+    merge_technologies, fingerprint_responses, fingerprint_records, get_fingerprint_engine, DEFAULT_SIGNATURES_PATH
+)
+from tests.conftest import TestingSessionLocal
+
+CONFIG = {
+    "technologies": {
+        "WordPress": {
+            "cookies": {"wordpress_test_cookie": ""},
+            "meta": {"generator": "^WordPress ?([\\d.]+)?\\;version:\\1"},
+            "html": "<link[^>]+/wp-content/",
+            "implies": "PHP"
+        },
+        "PHP": {"headers": {"X-Powered-By": "^php/?([\\d.]+)?\\;version:\\1"}},
+        "Nginx": {"headers": {"Server": "nginx(?:/([\\d.]+))?\\;version:\\1"}},
+        "OpenResty": {"headers": {"Server": "openresty"}, "excludes": "Nginx", "implies": "Nginx"},
+        "jQuery": {"scriptSrc": "jquery[.-]([\\d.]+)(?:\\.min)?\\.js\\;version:\\1"},
+        "Vue.js": {"html": "<[^>]+\\sdata-v(?:ue)?-"},
+        "Broken": {"html": "(?<=a+)b"},
+    }
+}
+
+
+class TestRequiredLiteral:
+    """Test prefilter literal extraction"""
+
+    @pytest.mark.parametrize("source,expected", [
+        ("<title>Apache Tomcat/([\\d.]+)", "<title>apache tomcat/"),
+        ("cdn\\.shopify\\.com/s/", "cdn.shopify.com/s/"),
+        ("wp-contents?/themes", "wp-content"),
+        ("x{0,3}yz12", "yz12"),
+        ("[abc]defg(hi)jklmn", "jklmn"),
+        ("foo|barbaz", None),
+        ("^a.b\\d", None),
+        ("foo\\x2dbar", "foo"),
+        ("caf\\u00e9 menu", " menu"),
+        ("\\U0001f600smile", "smile"),
+        ("\\N{EM DASH}dash", "dash"),
+        ("a\\012bcd", "bcd"),
+        ("\\u00e9", None),
+    ])
+    def test_literals(self, source, expected):
+        assert required_literal(source) == expected
+
+    @pytest.mark.parametrize("source,text", [
+        ("foo\\x2dbar", "foo-bar"),
+        ("caf\\u00e9 menu", "caf\u00e9 menu"),
+        ("a\\012bcd", "a\nbcd"),
+    ])
+    def test_literal_is_in_every_match(self, source, text):
+        assert re.search(source, text)
+        assert required_literal(source) in text.lower()
+
+    def test_index_only_yields_candidates_present_in_text(self):
+        index = LiteralIndex()
+        wp, shop, any_tag = Signature("WordPress"), Signature("Shopify"), Signature("Any")
+        index.add(wp, "/wp-content/")
+        index.add(shop, "cdn\\.shopify\\.com")
+        index.add(any_tag, "<(?:div|span)")
+        index.finalize()
+
+        assert list(index.candidates("<link href=/wp-content/x.css>", "")) == [wp]
+        assert list(index.candidates("<div>", "<div>")) == [any_tag]
+
+
+class TestFingerprintEngine:
+    """Test matching of each signature kind"""
+
+    def test_headers_cookies_meta_html_scripts(self):
+        engine = FingerprintEngine(CONFIG)
+        headers = normalize_headers({
+            "server": "nginx/1.25.3",
+            "set_cookie": ["wordpress_test_cookie=WP+Cookie; path=/", "other=1"],
+        })
+        body = ('<html><head><meta name="generator" content="WordPress 6.4.2">'
+                '<link rel="stylesheet" href="/wp-content/themes/a.css">'
+                '<script src="/js/jquery-3.7.1.min.js"></script></head><div data-v-1a2b>x</div></html>')
+
+        assert engine.analyze(headers, body) == ["Nginx:1.25.3", "PHP", "Vue.js", "WordPress:6.4.2", "jQuery:3.7.1"]
+
+    def test_versioned_match_wins_and_excludes(self):
+        engine = FingerprintEngine(CONFIG)
+        assert engine.analyze({"x-powered-by": ["PHP/8.2.1"]}, "") == ["PHP:8.2.1"]
+        assert engine.analyze({"server": ["openresty/1.21"]}, "") == ["OpenResty"]
+
+    def test_invalid_patterns_are_skipped(self):
+        assert FingerprintEngine(CONFIG).skipped == 1
+
+    def test_default_signatures_compile(self):
+        engine = FingerprintEngine.from_file(DEFAULT_SIGNATURES_PATH)
+        assert engine.skipped == 0
+        assert "WordPress" in engine.technologies
+
+    def test_engine_reloads_changed_file(self, tmp_path, monkeypatch):
+        signatures = tmp_path / "fingerprints.json"
+        signatures.write_text(json.dumps({"technologies": {"Caddy": {"headers": {"Server": "caddy"}}}}))
+        monkeypatch.setattr(settings, "fingerprint_signatures_path", str(signatures))
+        first = get_fingerprint_engine()
+        assert first.technologies == ["Caddy"]
+
+        signatures.write_text(json.dumps({"technologies": {"Envoy": {"headers": {"Server": "envoy"}}}}))
+        os.utime(signatures, ns=(0, signatures.stat().st_mtime_ns + 10**9))
+
+        assert get_fingerprint_engine().technologies == ["Envoy"]
+        assert get_fingerprint_engine().version != first.version
+
+
+class TestFingerprintResponses:
+    """Test batching, deduplication and the process pool"""
+
+    @pytest.fixture(autouse=True)
+    def signatures(self, tmp_path, monkeypatch):
+        path = tmp_path / "fingerprints.json"
+        path.write_text(json.dumps(CONFIG))
+        monkeypatch.setattr(settings, "fingerprint_signatures_path", str(path))
+
+    def _responses(self, count):
+        return [
+            ({"server": [f"nginx/1.{i % 5}"]}, f'<script src="/jquery-3.{i}.0.js"></script>')
+            for i in range(count)
+        ]
+
+    def test_pool_matches_inline(self):
+        responses = self._responses(80)
+        assert fingerprint_responses(responses, workers=2) == fingerprint_responses(responses, workers=1)
+
+    def test_identical_responses_matched_once(self, monkeypatch):
+        calls = []
+        analyze = FingerprintEngine.analyze
+        monkeypatch.setattr(FingerprintEngine, "analyze", lambda self, h, b: calls.append(b) or analyze(self, h, b))
+
+        parking = ({"server": ["nginx"], "date": ["Mon"]}, "<html>parked</html>")
+        other = ({"server": ["nginx"], "date": ["Tue"]}, "<html>parked</html>")
+        results = fingerprint_responses([parking, other, parking], workers=1)
+
+        assert results == [["Nginx"]] * 3
+        assert len(calls) == 1
+
+    def test_records_merge_httpx_technologies(self):
+        records = [
+            {"url": "https://a.example.com", "tech": ["Nginx", "HSTS"],
+             "header": {"server": "nginx/1.25.3"}, "body": "<html></html>"},
+            {"url": "https://b.example.com", "tech": ["IIS"],
+             "response": "HTTP/1.1 200 OK\r\nServer: x\r\n\r\n<script src=/jquery.3.6.0.js></script>"},
+            {"url": "https://c.example.com", "tech": ["Caddy"]},
+        ]
+        assert fingerprint_records(records) == {
+            "https://a.example.com": ["Nginx:1.25.3", "HSTS"],
+            "https://b.example.com": ["IIS", "jQuery:3.6.0"],
+        }
+
+    def test_captured_response_and_merge(self):
+        assert captured_response({"url": "x"}) is None
+        assert captured_response({"header": {"x_powered_by": ["a", "b"]}, "body": "abcdef"}, max_body=3) == (
+            {"x-powered-by": ["a", "b"]}, "abc"
+        )
+        assert merge_technologies(["Nginx", "PHP:8"], ["nginx:1.2", "PHP"]) == ["nginx:1.2", "PHP:8"]
+
+
+class TestPipelineFingerprinting:
+    """Test the fingerprint step of the probe stage with the native engine"""
+
+    def test_native_probe_captures_and_fingerprints(self, tmp_path, monkeypatch):
+        from app.services.pipeline import ReconPipeline
+        from benchmarks.http_farm import HttpFarm, Site
+
+        monkeypatch.setattr(settings, "jobs_directory", str(tmp_path))
+        monkeypatch.setattr(settings, "fingerprint_enabled", True)
+        farm = HttpFarm([Site("ok", "Home", server="nginx/1.25.3"), Site("closed", "Gone")])
+        farm.start_in_thread()
+        try:
+            pipeline = ReconPipeline("fingerprint-job", "example.com",
+                                     probe_config={"engine": "native", "fast_timeout": 2, "slow_timeout": 5})
+            pipeline.subs_file.write_text("".join(f"{host}\n" for host in farm.hosts))
+            live_hosts = asyncio.run(pipeline.check_live_hosts_enhanced([]))
+        finally:
+            farm.stop()
+
+        assert len(live_hosts) == 1
+        assert live_hosts[0]["technologies"] == ["Nginx:1.25.3"]
+        record = json.loads(pipeline.live_file.read_text().splitlines()[0])
+        assert "body" not in record and "header" not in record
+        stored = pipeline.response_store.get(record["url"])
+        assert stored["header"]["server"] == "nginx/1.25.3"
+        assert stored["body"].startswith("<html><head><title>Home</title>")
+
+    def test_cli_requests_response_capture(self, tmp_path, monkeypatch):
+        from app.services.pipeline import ReconPipeline
+
+        monkeypatch.setattr(settings, "jobs_directory", str(tmp_path))
+        pipeline = ReconPipeline("fingerprint-cli-job", "example.com")
+        assert "-include-response" not in pipeline._httpx_command(5, 0)
+        monkeypatch.setattr(settings, "fingerprint_enabled", True)
+        pipeline = ReconPipeline("fingerprint-cli-job", "example.com")
+        assert "-include-response" in pipeline._httpx_command(5, 0)
+
+
+class TestRefingerprintEndpoint:
+    """Test POST /scans/{job_id}/technologies/refingerprint"""
+
+    def test_not_found(self, client):
+        response = client.post("/api/v1/scans/nonexistent-job-id/technologies/refingerprint")
+        assert response.status_code == 404
+
+    def test_replaces_technologies_from_stored_responses(self, client, tmp_path, monkeypatch):
+        from app.storage.repo import ScanJobRepository, SubdomainRepository, TechnologyRepository
+
+        monkeypatch.setattr(settings, "jobs_directory", str(tmp_path))
+        db = TestingSessionLocal()
+        try:
+            scan_job = ScanJobRepository(db).create_scan_job("refingerprint-job", "example.com")
+            subdomain = SubdomainRepository(db).create_subdomain(scan_job.id, "www.example.com")
+            subdomain_id = subdomain.id
+            TechnologyRepository(db).bulk_create_technologies(subdomain_id, ["Nginx", "Stale"])
+        finally:
+            db.close()
+
+        job_dir = tmp_path / "refingerprint-job"
+        job_dir.mkdir()
+        (job_dir / "live.txt").write_text(json.dumps({
+            "url": "https://www.example.com", "status_code": 200, "tech": ["Nginx"],
+            "header": {"server": "nginx/1.25.3", "x_powered_by": "PHP/8.2"}, "body": "<html></html>"
+        }) + "\n")
+
+        signatures = tmp_path / "fingerprints.json"
+        signatures.write_text(json.dumps(CONFIG))
+        monkeypatch.setattr(settings, "fingerprint_signatures_path", str(signatures))
+
+        response = client.post("/api/v1/scans/refingerprint-job/technologies/refingerprint")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["responses"] == 1 and data["hosts_updated"] == 1
+        assert data["changed"] == 4  # Nginx, Stale removed; Nginx:1.25.3, PHP:8.2 added
+
+        db = TestingSessionLocal()
+        try:
+            names = sorted(t.name for t in TechnologyRepository(db).get_by_subdomain(subdomain_id))
+        finally:
+            db.close()
+        assert names == ["Nginx:1.25.3", "PHP:8.2"]
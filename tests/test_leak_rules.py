@@ -0,0 +1,114 @@
+"""
+Tests for the leak severity rule engine
+"""
+import json
+import os
+
+import pytest
+
+from app.deps import settings
+from app.services.leak_rules import LeakRuleEngine, get_leak_rule_engine, DEFAULT_RULES_PATH
+from tests.conftest import TestingSessionLocal
+
+
+class TestLeakRuleEngine:
+    """Test rule compilation and classification"""
+
+    @pytest.mark.parametrize("url,status,expected", [
+        ("https://a.example.com/robots.txt", 200, "high"),
+        ("https://a.example.com/robots.txt", 403, "medium"),
+        ("https://a.example.com/robots.txt", 301, "low"),
+        ("https://a.example.com/.env", 403, "high"),
+        ("https://a.example.com/DB/Database.sql", 301, "medium"),
+        ("https://a.example.com/site.zip", 301, "medium"),
+        ("https://a.example.com/site.zip", 403, "medium"),
+        ("https://a.example.com/site.zip", 200, "high"),
+    ])
+    def test_default_rules(self, url, status, expected):
+        engine = LeakRuleEngine.from_file(DEFAULT_RULES_PATH)
+        assert engine.classify(url, status) == expected
+
+    def test_extensions_status_and_size_conditions(self):
+        engine = LeakRuleEngine({
+            "status_severity": {"200": "medium"},
+            "rules": [
+                {"name": "big-dumps", "extensions": [".sql"], "min_size": 1000, "severity": "high"},
+                {"name": "ok-only", "contains": ["config"], "status_codes": [200], "raise": 1},
+            ]
+        })
+
+        assert engine.classify("https://x/dump.sql", 301, 5000) == "high"
+        assert engine.classify("https://x/dump.sql", 301, 10) == "low"
+        assert engine.classify("https://x/dump.sql.txt", 301, 5000) == "low"
+        assert engine.classify("https://x/config.php", 200) == "high"
+        assert engine.classify("https://x/config.php", 403) == "low"
+
+    def test_classify_batch(self):
+        engine = LeakRuleEngine.from_file(DEFAULT_RULES_PATH)
+        rows = [
+            {"leaked_file_url": "https://a/.git/config", "http_status": 200},
+            {"leaked_file_url": "https://a/index.html", "http_status": 500},
+        ]
+
+        assert engine.classify_batch(rows) == ["high", "low"]
+
+    def test_unknown_severity_rejected(self):
+        with pytest.raises(ValueError):
+            LeakRuleEngine({"rules": [{"name": "bad", "contains": ["x"], "severity": "critical"}]})
+
+    def test_engine_reloads_changed_file(self, tmp_path, monkeypatch):
+        rules = tmp_path / "rules.json"
+        rules.write_text(json.dumps({"status_severity": {"200": "high"}}))
+        monkeypatch.setattr(settings, "leak_rules_path", str(rules))
+
+        assert get_leak_rule_engine().classify("https://a/x", 200) == "high"
+
+        rules.write_text(json.dumps({"status_severity": {"200": "medium"}}))
+        os.utime(rules, ns=(0, rules.stat().st_mtime_ns + 10**9))
+
+        assert get_leak_rule_engine().classify("https://a/x", 200) == "medium"
+
+
+class TestReclassifyEndpoint:
+    """Test POST /scans/{job_id}/leaks/reclassify"""
+
+    def test_reclassify_not_found(self, client):
+        response = client.post("/api/v1/scans/nonexistent-job-id/leaks/reclassify")
+        assert response.status_code == 404
+
+    def test_reclassify_updates_changed_rows(self, client, tmp_path, monkeypatch):
+        from app.storage.repo import ScanJobRepository, LeakDetectionRepository
+
+        db = TestingSessionLocal()
+        try:
+            scan_job = ScanJobRepository(db).create_scan_job("reclassify-job", "example.com")
+            LeakDetectionRepository(db).bulk_create(scan_job.id, [
+                {"base_url": "https://a", "leaked_file_url": "https://a/.env", "severity": "low", "http_status": 403},
+                {"base_url": "https://a", "leaked_file_url": "https://a/robots.txt", "severity": "high", "http_status": 200},
+                {"base_url": "https://a", "leaked_file_url": "https://a/site.bak", "severity": "low", "http_status": 301},
+            ])
+        finally:
+            db.close()
+
+        response = client.post("/api/v1/scans/reclassify-job/leaks/reclassify?batch_size=2")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] == 3
+        assert data["changed"] == 2
+        assert data["by_severity"] == {"high": 2, "medium": 1}
+
+        # Tighter rules: everything not served with 200 is low
+        rules = tmp_path / "rules.json"
+        rules.write_text(json.dumps({"status_severity": {"200": "high"}}))
+        monkeypatch.setattr(settings, "leak_rules_path", str(rules))
+
+        data = client.post("/api/v1/scans/reclassify-job/leaks/reclassify").json()
+        assert data["changed"] == 2
+        assert data["by_severity"] == {"low": 2, "high": 1}
+
+        db = TestingSessionLocal()
+        try:
+            severities = {leak.leaked_file_url: leak.severity for leak in LeakDetectionRepository(db).get_by_job("reclassify-job")}
+        finally:
+            db.close()
+        assert severities["https://a/.env"] == "low"
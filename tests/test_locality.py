@@ -0,0 +1,144 @@
+"""
+Tests for locality-aware routing of stage tasks
+"""
+import pytest
+
+from app.deps import settings
+from app.services import locality
+from app.services.locality import (
+    dispatch_stage, node_heartbeat, record_owner, stage_route, node_stopped,
+)
+
+
+class FakeRedis:
+    """Just the string/hash subset locality routing uses; expiry is not simulated"""
+
+    def __init__(self, fail=False):
+        self.data = {}
+        self.ttls = {}
+        self.fail = fail
+
+    def _check(self):
+        if self.fail:
+            raise ConnectionError("redis down")
+
+    def set(self, key, value, ex=None):
+        self._check()
+        self.data[key] = value
+        self.ttls[key] = ex
+
+    def get(self, key):
+        self._check()
+        return self.data.get(key)
+
+    def delete(self, key):
+        self._check()
+        self.data.pop(key, None)
+
+    def exists(self, key):
+        self._check()
+        return key in self.data
+
+    def expire(self, key, ttl):
+        self._check()
+        self.ttls[key] = ttl
+
+    def hset(self, key, mapping):
+        self._check()
+        self.data.setdefault(key, {}).update({k: str(v) for k, v in mapping.items()})
+
+    def hgetall(self, key):
+        self._check()
+        return dict(self.data.get(key, {}))
+
+
+class FakeTask:
+    def __init__(self):
+        self.calls = []
+
+    def apply_async(self, args=None, kwargs=None, **options):
+        self.calls.append((args, kwargs, options))
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    import redis as redis_module
+
+    fake = FakeRedis()
+    monkeypatch.setattr(redis_module.Redis, "from_url", lambda *args, **kw: fake)
+    monkeypatch.setattr(settings, "locality_routing_enabled", True)
+    monkeypatch.setattr(locality, "_redis", None)
+    monkeypatch.setattr(locality, "_redis_down_until", 0.0)
+    return fake
+
+
+class TestStageRoute:
+    """Test choosing the owner's direct queue or the shared queue"""
+
+    def test_routes_to_owner(self, redis):
+        node_heartbeat("celery@node1", 2, 0)
+        record_owner("job-1", "celery@node1")
+
+        route = stage_route("job-1")
+        assert route["queue"].name == "celery@node1.dq2"
+        assert redis.ttls["recon:locality:job:job-1"] == settings.locality_owner_ttl
+        assert stage_route("job-2") == {}
+
+    def test_saturated_owner_uses_shared_queue(self, redis):
+        node_heartbeat("celery@node1", 2, 1)
+        record_owner("job-1", "celery@node1")
+        assert stage_route("job-1") != {}
+
+        node_heartbeat("celery@node1", 2, 2)
+        assert stage_route("job-1") == {}
+        # The next beat reports the worker's own count, whatever happened to the tasks in between
+        node_heartbeat("celery@node1", 2, 0)
+        assert stage_route("job-1") != {}
+
+    def test_gone_owner_uses_shared_queue(self, redis):
+        node_heartbeat("celery@node1", 2, 0)
+        record_owner("job-1", "celery@node1")
+        node_stopped("celery@node1")
+
+        assert stage_route("job-1") == {}
+
+    def test_heartbeat_recreates_lost_node_key(self, redis):
+        node_heartbeat("celery@node1", 2, 0)
+        record_owner("job-1", "celery@node1")
+        redis.data.pop("recon:locality:node:celery@node1")
+        assert stage_route("job-1") == {}
+
+        node_heartbeat("celery@node1", 2, 1)
+        assert stage_route("job-1") != {}
+        assert redis.ttls["recon:locality:node:celery@node1"] == settings.locality_node_ttl
+
+    def test_disabled(self, redis, monkeypatch):
+        node_heartbeat("celery@node1", 2, 0)
+        record_owner("job-1", "celery@node1")
+        monkeypatch.setattr(settings, "locality_routing_enabled", False)
+
+        assert stage_route("job-1") == {}
+
+    def test_redis_down(self, redis):
+        redis.fail = True
+        record_owner("job-1", "celery@node1")
+
+        redis.fail = False
+        redis.data["recon:locality:job:job-1"] = "celery@node1"
+        node_heartbeat("celery@node1", 2, 0)
+        # Still within the retry interval after the failure
+        assert stage_route("job-1") == {}
+
+
+class TestDispatch:
+    """Test dispatch_stage"""
+
+    def test_apply_async_options(self, redis):
+        task = FakeTask()
+        dispatch_stage(task, "job-1", "job-1", ["https://a.example.com"], mode="tiny")
+        node_heartbeat("celery@node1", 4, 0)
+        record_owner("job-1", "celery@node1")
+        dispatch_stage(task, "job-1", "job-1", ["https://a.example.com"], mode="tiny")
+
+        assert task.calls[0] == (("job-1", ["https://a.example.com"]), {"mode": "tiny"}, {})
+        assert task.calls[1][2]["queue"].name == "celery@node1.dq2"
@@ -0,0 +1,80 @@
+"""
+Tests for Prometheus metrics
+"""
+import sys
+
+from app.services import metrics
+from app.services.telemetry import ToolRunner
+
+
+class TestMetricsEndpoint:
+    """Test /metrics exposition"""
+
+    def test_metrics_endpoint_exposes_request_latency(self, client):
+        client.get("/api/v1/scans")
+
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert "text/plain" in response.headers["content-type"]
+        assert 'recon_http_request_duration_seconds_count{method="GET",route="/api/v1/scans",status="200"}' in response.text
+        assert "recon_http_db_queries_per_request" in response.text
+
+    def test_db_queries_counted_per_request(self, client):
+        before = metrics.registry.get_sample_value(
+            "recon_http_db_queries_per_request_sum", {"route": "/api/v1/scans"}
+        ) or 0
+
+        client.get("/api/v1/scans")
+
+        after = metrics.registry.get_sample_value(
+            "recon_http_db_queries_per_request_sum", {"route": "/api/v1/scans"}
+        )
+        assert after > before
+
+
+class TestToolMetrics:
+    """Test tool failure / duration metrics from ToolRunner"""
+
+    def test_tool_failure_counted(self):
+        before = metrics.registry.get_sample_value("recon_tool_failures_total", {"tool": "wafw00f"}) or 0
+
+        ToolRunner("metrics-job").run([sys.executable, "-c", "raise SystemExit(1)"], "wafw00f")
+
+        assert metrics.registry.get_sample_value("recon_tool_failures_total", {"tool": "wafw00f"}) == before + 1
+        assert metrics.registry.get_sample_value(
+            "recon_stage_duration_seconds_count", {"stage": "waf", "tool": "wafw00f"}
+        ) >= 1
+
+    def test_cache_lookup_counter(self):
+        metrics.record_cache_lookup("dns", hit=True)
+        metrics.record_cache_lookup("dns", hit=False)
+
+        assert metrics.registry.get_sample_value("recon_cache_requests_total", {"cache": "dns", "result": "hit"}) >= 1
+        assert metrics.registry.get_sample_value("recon_cache_requests_total", {"cache": "dns", "result": "miss"}) >= 1
+
+
+class TestQueueDepth:
+    """Queue depth read from the broker"""
+
+    def test_counts_messages_at_every_priority(self, fake_broker):
+        from app.workers.tasks import run_recon_scan, cleanup_old_jobs
+
+        for i in range(3):
+            run_recon_scan.apply_async((f"job-{i}", "example.com"))
+        run_recon_scan.apply_async(("job-9", "example.com"), priority=9)
+        run_recon_scan.apply_async(("job-0", "example.com"), priority=0)
+        cleanup_old_jobs.apply_async()
+
+        depths = metrics.get_queue_depths()
+        assert depths["recon_full"] == 5
+        assert depths["maintenance"] == 1
+        assert depths["recon_enum"] == 0
+
+    def test_unreachable_broker(self, monkeypatch):
+        import redis
+
+        def unreachable(*args, **kwargs):
+            raise redis.ConnectionError("down")
+
+        monkeypatch.setattr(redis.Redis, "from_url", unreachable)
+        assert metrics.get_queue_depths() == {}
@@ -144,3 +144,93 @@ class TestOutputCombiner:
         assert "www.example.com" in merged
         assert "dead.example.com" not in merged
         assert merged["api.example.com"].status_code == 200
+
+
+class TestStreamingParsers:
+    """Test generator-based parsers"""
+
+    def test_iter_amass_fqdns_graph_and_simple(self):
+        from app.services.parsers import iter_amass_fqdns
+
+        lines = [
+            "API.example.com (FQDN) --> a_record --> 1.2.3.4 (IPAddress)\n",
+            "13335 (ASN) --> announces --> 172.64.0.0/18 (Netblock)\n",
+            "www.example.com\n",
+            "[INFO] enumeration started\n",
+            "\n",
+        ]
+
+        assert list(iter_amass_fqdns(lines)) == ["api.example.com", "www.example.com"]
+
+    def test_iter_amass_fqdns_reads_file_lazily(self, tmp_path):
+        from app.services.parsers import iter_amass_fqdns
+
+        raw = tmp_path / "amass_raw.txt"
+        raw.write_text("a.example.com (FQDN) --> a_record --> 1.1.1.1 (IPAddress)\nb.example.com\n")
+
+        with open(raw) as f:
+            fqdns = iter_amass_fqdns(f)
+            assert next(fqdns) == "a.example.com"
+            assert next(fqdns) == "b.example.com"
+
+    def test_iter_httpx_records_skips_invalid_lines(self):
+        from app.services.parsers import iter_httpx_records, httpx_host_record
+
+        lines = [
+            '{"url": "https://api.example.com", "status_code": 503, "title": " API ", "a": ["1.2.3.4"], "tech": ["Nginx"]}',
+            'not json',
+            '[1, 2]',
+            '{"url": "https://old.example.com", "status_code": 418}',
+        ]
+
+        hosts = [httpx_host_record(data) for data in iter_httpx_records(lines)]
+
+        assert len(hosts) == 2
+        assert hosts[0]["is_live"] is True
+        assert hosts[0]["title"] == "API"
+        assert hosts[0]["ipv4_addresses"] == ["1.2.3.4"]
+        assert hosts[0]["technologies"] == ["Nginx"]
+        assert hosts[1]["is_live"] is False
+
+    def test_stdlib_json_fallback(self, monkeypatch):
+        from app.services import parsers
+
+        monkeypatch.setattr(parsers, "orjson", None)
+        records = list(parsers.iter_httpx_records(['{"url": "https://a.example.com"}', '{broken']))
+
+        assert records == [{"url": "https://a.example.com"}]
+
+    def test_iter_sourceleakhacker_stdout(self):
+        from app.services.parsers import iter_sourceleakhacker_stdout
+
+        lines = [
+            "[200]\t120\t0.05s\ttext/plain\thttps://a.example.com/.env",
+            "[403] 0 0.07s text/html https://a.example.com/.htaccess",
+            "[404] 0 0.07s text/html https://a.example.com/missing.zip",
+            "[301] 10 0.01s text/html https://a.example.com/site.bak",
+            "Scanning 1 URL...",
+        ]
+
+        leaks = list(iter_sourceleakhacker_stdout(lines))
+
+        assert [leak["http_status"] for leak in leaks] == [200, 403, 301]
+        assert leaks[0]["base_url"] == "https://a.example.com"
+        assert leaks[0]["file_size"] == 120
+        assert [leak["severity"] for leak in leaks] == ["high", "medium", "medium"]
+
+    def test_iter_sourceleakhacker_csv(self, tmp_path):
+        from app.services.parsers import iter_sourceleakhacker_csv
+
+        csv_file = tmp_path / "403.csv"
+        csv_file.write_text("Code,Length,Time,Type,URL\n403,0,0.1,text/html,https://b.example.com/db/database.sql\n")
+
+        leaks = list(iter_sourceleakhacker_csv(csv_file))
+
+        assert leaks == [{
+            "base_url": "https://b.example.com",
+            "leaked_file_url": "https://b.example.com/db/database.sql",
+            "file_type": "text/html",
+            "severity": "high",
+            "file_size": 0,
+            "http_status": 403,
+        }]
@@ -0,0 +1,155 @@
+"""
+Tests for screenshot perceptual hashes and near-duplicate clusters
+"""
+import asyncio
+import random
+
+import pytest
+
+from app.deps import settings
+from app.services import perceptual_hash
+from app.services.perceptual_hash import BKTree, dhash, hamming, hash_files, group_near_duplicates
+from tests.conftest import TestingSessionLocal
+
+
+def _page(path, title_width=200, shade=40):
+    """A fake login page: dark header, light form box"""
+    Image = pytest.importorskip("PIL.Image")
+    ImageDraw = pytest.importorskip("PIL.ImageDraw")
+    image = Image.new("RGB", (1280, 800), (245, 245, 245))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, 1280, 120), fill=(shade, shade, shade))
+    draw.rectangle((440, 250, 840, 550), fill=(255, 255, 255), outline=(0, 0, 0))
+    draw.rectangle((40, 40, 40 + title_width, 80), fill=(250, 250, 250))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    image.save(path, "PNG")
+    return path
+
+
+class TestDhash:
+    """Test hashing screenshots"""
+
+    def test_similar_pages_hash_close(self, tmp_path):
+        a = dhash(_page(tmp_path / "a.png"))
+        b = dhash(_page(tmp_path / "b.png", title_width=210))
+        c = dhash(_page(tmp_path / "c.png", shade=230, title_width=900))
+
+        assert len(a) == 16
+        assert hamming(int(a, 16), int(b, 16)) <= 6
+        assert hamming(int(a, 16), int(c, 16)) > 6
+
+    def test_hash_files_skips_unreadable(self, tmp_path):
+        good = _page(tmp_path / "a.png")
+        bad = tmp_path / "b.png"
+        bad.write_bytes(b"not a png")
+        assert list(hash_files([good, bad, good])) == [good]
+
+    def test_without_pillow(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(perceptual_hash, "Image", None)
+        assert dhash(tmp_path / "a.png") is None
+        assert hash_files([tmp_path / "a.png"]) == {}
+
+
+class TestGrouping:
+    """Test the BK-tree and greedy grouping"""
+
+    def test_bktree_matches_brute_force(self):
+        rng = random.Random(7)
+        values = [rng.getrandbits(64) for _ in range(300)]
+        values += [v ^ (1 << rng.randrange(64)) for v in values[:50]]
+        tree = BKTree()
+        for index, value in enumerate(values):
+            tree.add(value, index)
+
+        for query in values[:20]:
+            expected = sorted(i for i, v in enumerate(values) if hamming(query, v) <= 4)
+            assert sorted(item for _, item in tree.search(query, 4)) == expected
+
+    def test_group_near_duplicates(self):
+        items = [
+            ("login-1", "ffff0000ffff0000"),
+            ("error", "0123456789abcdef"),
+            ("login-2", "ffff0000ffff0001"),
+            ("login-3", "ffff0000ffff0003"),
+            ("error-copy", "0123456789abcdef"),
+        ]
+        assert group_near_duplicates(items, 2) == [["login-1", "login-2", "login-3"], ["error", "error-copy"]]
+        assert group_near_duplicates(items, 0) == [["login-1"], ["error", "error-copy"], ["login-2"], ["login-3"]]
+
+
+class TestPipelineHashing:
+    """Test hashing at capture time"""
+
+    def _shots(self, tmp_path, monkeypatch):
+        from app.services.pipeline import ReconPipeline
+
+        monkeypatch.setattr(settings, "jobs_directory", str(tmp_path))
+        pipeline = ReconPipeline("phash-job", "example.com")
+        shots = []
+        for name in ("a", "b"):
+            path = _page(pipeline.shots_dir / f"{name}.png")
+            shots.append({"url": f"https://{name}.example.com", "filename": path.name,
+                          "file_path": f"shots/{path.name}", "file_size": path.stat().st_size})
+        return pipeline, shots
+
+    def test_hashes_set(self, tmp_path, monkeypatch):
+        pipeline, shots = self._shots(tmp_path, monkeypatch)
+        assert asyncio.run(pipeline.hash_screenshots(shots)) == 2
+        assert shots[0]["phash"] == shots[1]["phash"]
+        assert shots[1]["file_path"] == "shots/b.png"
+
+    def test_identical_hashes_stored_once(self, tmp_path, monkeypatch):
+        pipeline, shots = self._shots(tmp_path, monkeypatch)
+        monkeypatch.setattr(settings, "screenshot_store_duplicates_once", True)
+        asyncio.run(pipeline.hash_screenshots(shots))
+
+        assert shots[1]["file_path"] == "shots/a.png"
+        assert not (pipeline.shots_dir / "b.png").exists()
+
+    def test_same_hash_different_page_kept(self, tmp_path, monkeypatch):
+        Image = pytest.importorskip("PIL.Image")
+        pipeline, shots = self._shots(tmp_path, monkeypatch)
+        monkeypatch.setattr(settings, "screenshot_store_duplicates_once", True)
+        # Another hostname in the header: same dHash, different page
+        with Image.open(pipeline.shots_dir / "b.png") as image:
+            image = image.convert("RGB")
+            for x in range(50, 60):
+                image.putpixel((x, 60), (0, 0, 0))
+            image.save(pipeline.shots_dir / "b.png", "PNG")
+        shots[1]["file_size"] = (pipeline.shots_dir / "b.png").stat().st_size
+        asyncio.run(pipeline.hash_screenshots(shots))
+
+        assert shots[0]["phash"] == shots[1]["phash"]
+        assert shots[1]["file_path"] == "shots/b.png"
+        assert (pipeline.shots_dir / "b.png").exists()
+
+
+class TestClustersEndpoint:
+    """Test GET /scans/{job_id}/screenshots/clusters"""
+
+    def test_not_found(self, client):
+        assert client.get("/api/v1/scans/nonexistent-job-id/screenshots/clusters").status_code == 404
+
+    def test_clusters(self, client):
+        from app.storage.repo import ScanJobRepository, ScreenshotRepository
+
+        db = TestingSessionLocal()
+        try:
+            scan_job = ScanJobRepository(db).create_scan_job("clusters-job", "example.com")
+            ScreenshotRepository(db).bulk_create(scan_job.id, [
+                {"url": f"https://{name}.example.com", "filename": f"{name}.png",
+                 "file_path": f"jobs/clusters-job/shots/{name}.png", "phash": phash}
+                for name, phash in [("error", "0123456789abcdef"), ("login-1", "ffff0000ffff0000"),
+                                    ("login-2", "ffff0000ffff0001"), ("login-3", "ffff0000ffff0003"),
+                                    ("unhashed", None)]
+            ])
+        finally:
+            db.close()
+
+        data = client.get("/api/v1/scans/clusters-job/screenshots/clusters?max_distance=2").json()
+        assert data["total_screenshots"] == 5 and data["unhashed"] == 1
+        assert [c["size"] for c in data["clusters"]] == [3, 1, 1]
+        assert data["clusters"][0]["representative"]["url"] == "https://login-1.example.com"
+
+        data = client.get("/api/v1/scans/clusters-job/screenshots/clusters?max_distance=0&limit=1").json()
+        assert data["total_clusters"] == 5 and len(data["clusters"]) == 1
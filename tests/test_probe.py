@@ -0,0 +1,203 @@
+"""
+Tests for two-phase httpx probing
+"""
+import asyncio
+import json
+import time
+
+from app.deps import settings
+from benchmarks.fake_tools import FakeToolConfig, install_fake_tools, _bucket
+
+
+def _pipeline(tmp_path, monkeypatch, probe_config=None):
+    from app.services.pipeline import ReconPipeline
+
+    tools = install_fake_tools(tmp_path / "bin")
+    monkeypatch.setattr(settings, "httpx_path", tools["httpx"])
+    monkeypatch.setattr(settings, "jobs_directory", str(tmp_path / "jobs"))
+    for key, value in FakeToolConfig(live_ratio=0.3, slow_ratio=0.2, timeout_ratio=0.5).to_env().items():
+        monkeypatch.setenv(key, value)
+
+    pipeline = ReconPipeline("probe-job", "example.com", probe_config=probe_config)
+    hosts = [f"host{i}.example.com" for i in range(100)]
+    pipeline.subs_file.write_text("".join(f"{host}\n" for host in hosts))
+
+    phases = []
+    real_phase = pipeline._run_httpx_phase
+
+    def record_phase(phase_hosts, timeout, retries, name, probe=False):
+        phases.append((name, sorted(phase_hosts)))
+        return real_phase(phase_hosts, timeout, retries, name, probe)
+
+    monkeypatch.setattr(pipeline, "_run_httpx_phase", record_phase)
+    return pipeline, hosts, phases
+
+
+def _live_inputs(pipeline):
+    return sorted(json.loads(line)["input"] for line in pipeline.live_file.read_text().splitlines())
+
+
+class TestTwoPhaseProbe:
+    """Test the fast sweep followed by a slow re-probe of hosts that connected but timed out"""
+
+    def test_slow_phase_only_reprobes_connected_timeouts(self, tmp_path, monkeypatch):
+        pipeline, hosts, phases = _pipeline(tmp_path, monkeypatch, {"fast_timeout": 3, "slow_timeout": 20})
+
+        asyncio.run(pipeline._run_httpx_cli())
+
+        # Dead hosts (connect timeout or refused) are not re-probed
+        slow_hosts = [h for h in hosts if 0.3 <= _bucket(h) < 0.5]
+        assert [name for name, _ in phases] == ["fast", "slow"]
+        assert phases[1][1] == sorted(slow_hosts)
+
+        # Hosts that only answer with the longer timeout are recovered, failures are not in live.txt
+        assert _live_inputs(pipeline) == sorted(h for h in hosts if _bucket(h) < 0.5)
+
+        fast, slow = pipeline.tool_runner.runs
+        assert "-timeout 3" in fast.command and "-retries 0" in fast.command and "-probe" in fast.command
+        assert "-timeout 20" in slow.command and "-retries 3" in slow.command and "-probe" not in slow.command
+
+    def test_single_mode(self, tmp_path, monkeypatch):
+        pipeline, hosts, phases = _pipeline(tmp_path, monkeypatch, {"mode": "single", "fast_timeout": None})
+
+        asyncio.run(pipeline._run_httpx_cli())
+
+        assert [name for name, _ in phases] == ["single"]
+        assert pipeline.probe_config["fast_timeout"] == settings.httpx_fast_timeout
+        assert _live_inputs(pipeline) == sorted(h for h in hosts if _bucket(h) < 0.5)
+
+    def test_failed_sweep_falls_back_to_slow_probe_of_all_hosts(self, tmp_path, monkeypatch):
+        pipeline, hosts, phases = _pipeline(tmp_path, monkeypatch)
+        recorded_phase = pipeline._run_httpx_phase
+
+        def failing_sweep(phase_hosts, timeout, retries, name, probe=False):
+            result = recorded_phase(phase_hosts, timeout, retries, name, probe)
+            return None if name == "fast" else result
+
+        monkeypatch.setattr(pipeline, "_run_httpx_phase", failing_sweep)
+        asyncio.run(pipeline._run_httpx_cli())
+
+        assert [(name, len(phase_hosts)) for name, phase_hosts in phases] == [("fast", 100), ("single", 100)]
+        assert _live_inputs(pipeline) == sorted(h for h in hosts if _bucket(h) < 0.5)
+
+
+class TestNativeProbe:
+    """Test the in-process probe engine against a local server farm"""
+
+    def _farm(self):
+        from benchmarks.http_farm import HttpFarm, Site
+
+        farm = HttpFarm([
+            Site("ok", "Home &amp; Away", server="nginx/1.25"),
+            Site("redirect", "Moved", server="Apache/2.4.57"),
+            Site("error", "Oops"),
+            Site("closed", "Gone"),
+        ])
+        farm.start_in_thread()
+        return farm
+
+    def test_title_and_technologies(self):
+        import httpx
+        from app.services.probe import extract_title, detect_technologies
+
+        assert extract_title(b"<html><TITLE lang=en>\n  A &amp;\n B </title>") == "A & B"
+        assert extract_title(b"<title>caf\xe9</title>", "text/html; charset=latin-1") == "café"
+        assert extract_title(b"<html></html>") is None
+        assert detect_technologies(httpx.Headers({"Server": "nginx", "X-Powered-By": "PHP/8.2"})) == ["Nginx", "PHP"]
+
+    def test_records_match_cli_shape(self):
+        from app.services.parsers import httpx_host_record
+        from app.services.probe import NativeProber
+
+        farm = self._farm()
+        try:
+            ok, redirect, error, closed = farm.hosts
+            prober = NativeProber(connect_timeout=2, read_timeout=5, retries=0, concurrency=4)
+            records = {r["input"]: r for r in asyncio.run(prober.probe_many(farm.hosts))}
+        finally:
+            farm.stop()
+
+        assert records[ok]["url"] == f"http://{ok}"
+        assert records[ok]["title"] == "Home & Away"
+        assert records[ok]["webserver"] == "nginx/1.25" and records[ok]["tech"] == ["Nginx"]
+        assert records[ok]["content_type"] == "text/html"
+        assert records[ok]["host"] == "127.0.0.1"
+
+        assert records[redirect]["status_code"] == 301
+        assert records[redirect]["chain_status_codes"] == [301, 200]
+        assert records[redirect]["final_url"] == f"http://{redirect}/home"
+
+        assert records[error]["status_code"] == 500
+        assert records[closed]["failed"] is True
+
+        host = httpx_host_record(records[redirect])
+        assert host["is_live"] and host["title"] == "Moved" and host["technologies"] == ["Apache HTTP Server"]
+
+    def test_per_host_connection_limit(self):
+        from benchmarks.http_farm import HttpFarm, Site
+        from app.services.probe import NativeProber
+
+        farm = HttpFarm([Site("slow", "Slow", delay=0.1)])
+        farm.start_in_thread()
+        try:
+            prober = NativeProber(connect_timeout=2, read_timeout=5, retries=0, concurrency=4, per_host_connections=1)
+            started = time.perf_counter()
+            records = asyncio.run(prober.probe_many(farm.hosts * 4))
+            elapsed = time.perf_counter() - started
+        finally:
+            farm.stop()
+
+        assert all(not r.get("failed") for r in records)
+        assert elapsed >= 0.4
+
+    def test_host_limit_held_until_body_closed(self):
+        import httpx
+        from app.services.probe import _HostLimitedTransport
+
+        events = []
+
+        class Body(httpx.AsyncByteStream):
+            def __init__(self, name):
+                self.name = name
+
+            async def __aiter__(self):
+                await asyncio.sleep(0.05)
+                yield b"body"
+
+            async def aclose(self):
+                events.append(f"{self.name} closed")
+
+        async def handler(request):
+            events.append(f"{request.url.path} headers")
+            return httpx.Response(200, stream=Body(request.url.path))
+
+        async def fetch(client, path):
+            async with client.stream("GET", f"http://a.example.com{path}") as response:
+                await response.aread()
+
+        async def run():
+            transport = _HostLimitedTransport(httpx.MockTransport(handler), per_host=1)
+            async with httpx.AsyncClient(transport=transport) as client:
+                await asyncio.gather(fetch(client, "/1"), fetch(client, "/2"))
+                return transport._semaphores[("a.example.com", None)]
+
+        semaphore = asyncio.run(run())
+        assert events == ["/1 headers", "/1 closed", "/2 headers", "/2 closed"]
+        assert not semaphore.locked()
+
+    def test_pipeline_native_engine(self, tmp_path, monkeypatch):
+        from app.services.pipeline import ReconPipeline
+
+        monkeypatch.setattr(settings, "jobs_directory", str(tmp_path))
+        farm = self._farm()
+        try:
+            pipeline = ReconPipeline("native-probe-job", "example.com",
+                                     probe_config={"engine": "native", "fast_timeout": 2, "slow_timeout": 5})
+            pipeline.subs_file.write_text("".join(f"{host}\n" for host in farm.hosts))
+            live_hosts = asyncio.run(pipeline.check_live_hosts_enhanced([]))
+        finally:
+            farm.stop()
+
+        assert len(live_hosts) == 3
+        assert {host["status_code"] for host in live_hosts} == {200, 301, 500}
+        assert pipeline.tool_runner.runs == []
@@ -0,0 +1,98 @@
+"""
+Tests for opt-in scan profiling
+"""
+import io
+import time
+import zipfile
+
+from app.deps import settings
+from app.services import profiling
+from app.services.profiling import ScanProfiler, should_profile, profile_phase
+from tests.conftest import TestingSessionLocal
+
+
+def _busy(seconds: float):
+    end = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < end:
+        total += sum(range(100))
+    return total
+
+
+class TestScanProfiler:
+    """Test profile output written to the job directory"""
+
+    def test_phase_writes_profile_files(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "jobs_directory", str(tmp_path))
+
+        profiler = ScanProfiler("profile-job", sampling_interval=0.001)
+        with profiler.phase("pipeline"):
+            _busy(0.1)
+
+        output_dir = tmp_path / "profile-job" / "profile"
+        assert (output_dir / "pipeline.pstats").stat().st_size > 0
+        assert "_busy" in (output_dir / "pipeline.txt").read_text()
+
+        collapsed = (output_dir / "pipeline.collapsed").read_text().splitlines()
+        assert collapsed
+        stack, count = collapsed[0].rsplit(" ", 1)
+        assert "_busy" in stack
+        assert int(count) > 0
+
+    def test_profile_phase_noop_without_profiler(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "jobs_directory", str(tmp_path))
+
+        with profile_phase(None, "pipeline"):
+            pass
+
+        assert not any(tmp_path.iterdir())
+
+    def test_should_profile_sample_rate(self, monkeypatch):
+        monkeypatch.setattr(settings, "profile_sample_rate", 0.0)
+        assert should_profile(True)
+        assert not should_profile(False)
+
+        monkeypatch.setattr(settings, "profile_sample_rate", 1.0)
+        assert should_profile(False)
+
+
+class TestProfileEndpoint:
+    """Test profile download endpoint"""
+
+    def test_profile_not_found(self, client):
+        response = client.get("/api/v1/scans/nonexistent-job-id/profile")
+        assert response.status_code == 404
+
+    def test_profile_missing_for_unprofiled_scan(self, client, tmp_path, monkeypatch):
+        from app.storage.repo import ScanJobRepository
+
+        monkeypatch.setattr(settings, "jobs_directory", str(tmp_path))
+        db = TestingSessionLocal()
+        try:
+            ScanJobRepository(db).create_scan_job("unprofiled-job", "example.com")
+        finally:
+            db.close()
+
+        response = client.get("/api/v1/scans/unprofiled-job/profile")
+        assert response.status_code == 404
+
+    def test_profile_download_zip(self, client, tmp_path, monkeypatch):
+        from app.storage.repo import ScanJobRepository
+
+        monkeypatch.setattr(settings, "jobs_directory", str(tmp_path))
+        db = TestingSessionLocal()
+        try:
+            ScanJobRepository(db).create_scan_job("profiled-job", "example.com")
+        finally:
+            db.close()
+
+        with ScanProfiler("profiled-job", sampling_interval=0.001).phase("ingest"):
+            _busy(0.02)
+
+        response = client.get("/api/v1/scans/profiled-job/profile")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/zip"
+
+        names = zipfile.ZipFile(io.BytesIO(response.content)).namelist()
+        assert set(names) == {"ingest.pstats", "ingest.collapsed", "ingest.txt"}
+        assert profiling.profile_dir("profiled-job") == tmp_path / "profiled-job" / "profile"
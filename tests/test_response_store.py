@@ -0,0 +1,148 @@
+"""
+Tests for the per-job response store
+"""
+import json
+
+import pytest
+
+from app.deps import settings
+from app.services import response_store
+from app.services.response_store import ResponseStore
+from tests.conftest import TestingSessionLocal
+
+PARKED = "<html><title>Parked</title>" + "x" * 4000 + "</html>"
+
+
+def _record(host, body=PARKED, **extra):
+    return {"url": f"https://{host}", "input": host, "status_code": 200, "content_type": "text/html",
+            "header": {"server": "nginx"}, "body": body, **extra}
+
+
+class TestResponseStore:
+    """Test deduplication, compression and the URL index"""
+
+    def test_identical_bodies_stored_once(self, tmp_path):
+        records = [_record("a.example.com"), _record("b.example.com"), _record("c.example.com", body="<p>c</p>")]
+        with ResponseStore(tmp_path) as store:
+            entries = [store.add(record) for record in records]
+
+        assert entries[0]["body_sha256"] == entries[1]["body_sha256"] != entries[2]["body_sha256"]
+        assert store.stats["bodies_written"] == 2 and store.stats["duplicate_bodies"] == 1
+        assert store.stats["stored_bytes"] < store.stats["raw_bytes"]
+        assert len(list(store.bodies_dir.rglob("*.*"))) == 2
+        # Capture fields are moved out of the record
+        assert "body" not in records[0] and "header" not in records[0] and records[0]["status_code"] == 200
+
+        reopened = ResponseStore(tmp_path)
+        stored = reopened.get("https://b.example.com")
+        assert stored["body"] == PARKED and stored["header"] == {"server": "nginx"}
+        assert len(reopened.index()) == 3
+        assert reopened.get("https://missing.example.com") is None
+
+    def test_body_prefix_and_truncation(self, tmp_path):
+        with ResponseStore(tmp_path, max_body_bytes=100) as store:
+            entry = store.add(_record("a.example.com"))
+            short = store.add(_record("b.example.com", body="short"))
+        assert entry["truncated"] and entry["body_size"] == 100
+        assert store.get_body(entry["body_sha256"]) == PARKED.encode()[:100]
+        assert not short["truncated"]
+
+    def test_raw_response_without_body_field(self, tmp_path):
+        record = {"url": "https://a.example.com", "response": "HTTP/1.1 200 OK\r\nServer: x\r\n\r\n<p>hi</p>"}
+        with ResponseStore(tmp_path) as store:
+            entry = store.add(record)
+        assert store.get_body(entry["body_sha256"]) == b"<p>hi</p>"
+        assert store.add({"url": "https://b.example.com", "status_code": 200}) is None
+
+    def test_zlib_fallback_without_zstandard(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(response_store, "zstandard", None)
+        with ResponseStore(tmp_path, compression="zstd") as store:
+            entry = store.add(_record("a.example.com"))
+        assert store._find_body(entry["body_sha256"]).suffix == ".zz"
+        assert store.get_body(entry["body_sha256"]) == PARKED.encode()
+
+    def test_zstd_when_installed(self, tmp_path):
+        pytest.importorskip("zstandard")
+        with ResponseStore(tmp_path, compression="zstd") as store:
+            entry = store.add(_record("a.example.com"))
+        assert store._find_body(entry["body_sha256"]).suffix == ".zst"
+        assert store.get_body(entry["body_sha256"]) == PARKED.encode()
+
+    def test_rejects_non_digest_names(self, tmp_path):
+        assert ResponseStore(tmp_path).get_body("../../live.txt") is None
+
+
+class TestPipelineCapture:
+    """Test that the probe stage moves captured responses into the store"""
+
+    def test_httpx_lines_are_stripped(self, tmp_path, monkeypatch):
+        from app.services.pipeline import ReconPipeline
+
+        monkeypatch.setattr(settings, "jobs_directory", str(tmp_path))
+        monkeypatch.setattr(settings, "response_store_enabled", True)
+        pipeline = ReconPipeline("capture-job", "example.com")
+
+        line = pipeline._store_response_line(json.dumps(_record("a.example.com", tech=["Nginx"])))
+        assert json.loads(line) == {"url": "https://a.example.com", "input": "a.example.com", "status_code": 200,
+                                    "content_type": "text/html", "tech": ["Nginx"]}
+        assert pipeline._store_response_line("not json") == "not json"
+        pipeline.response_store.close()
+        assert ResponseStore(pipeline.job_dir).get("https://a.example.com")["body"] == PARKED
+
+
+class TestResponseEndpoints:
+    """Test GET /scans/{job_id}/responses[...]"""
+
+    def _job(self, tmp_path, monkeypatch):
+        from app.storage.repo import ScanJobRepository
+
+        monkeypatch.setattr(settings, "jobs_directory", str(tmp_path))
+        db = TestingSessionLocal()
+        try:
+            ScanJobRepository(db).create_scan_job("responses-job", "example.com")
+        finally:
+            db.close()
+        with ResponseStore(tmp_path / "responses-job") as store:
+            entries = [store.add(_record(host)) for host in ("a.example.com", "b.example.com")]
+            entries.append(store.add(_record("c.example.com", body="<p>c</p>")))
+        return entries
+
+    def test_not_found(self, client):
+        assert client.get("/api/v1/scans/nonexistent-job-id/responses").status_code == 404
+
+    def test_list_entry_and_body(self, client, tmp_path, monkeypatch):
+        entries = self._job(tmp_path, monkeypatch)
+
+        data = client.get("/api/v1/scans/responses-job/responses?limit=2").json()
+        assert data["total"] == 3 and data["unique_bodies"] == 2
+        assert [r["url"] for r in data["responses"]] == ["https://a.example.com", "https://b.example.com"]
+
+        entry = client.get("/api/v1/scans/responses-job/responses/entry", params={"url": "https://c.example.com"})
+        assert entry.status_code == 200
+        assert entry.json()["body"] == "<p>c</p>" and entry.json()["header"] == {"server": "nginx"}
+        assert client.get("/api/v1/scans/responses-job/responses/entry",
+                          params={"url": "https://x.example.com"}).status_code == 404
+
+        body = client.get(f"/api/v1/scans/responses-job/responses/bodies/{entries[0]['body_sha256']}")
+        assert body.status_code == 200 and body.content == PARKED.encode()
+        assert client.get("/api/v1/scans/responses-job/responses/bodies/" + "0" * 64).status_code == 404
+
+    def test_stored_job_fetches_only_what_is_read(self, client, tmp_path, monkeypatch):
+        from app.services import artifacts
+
+        entries = self._job(tmp_path, monkeypatch)
+        monkeypatch.setattr(settings, "artifact_store_enabled", True)
+        monkeypatch.setattr(settings, "artifact_store_path", str(tmp_path / "artifacts"))
+        monkeypatch.setattr(artifacts, "_store", None)
+        artifacts.get_artifact_store().commit_job("responses-job", tmp_path / "responses-job")
+        responses = tmp_path / "responses-job" / "responses"
+        assert not responses.exists()
+
+        entry = client.get("/api/v1/scans/responses-job/responses/entry", params={"url": "https://c.example.com"})
+        assert entry.status_code == 200 and entry.json()["body"] == "<p>c</p>"
+        bodies = sorted(path.name.split(".")[0] for path in (responses / "bodies").rglob("*") if path.is_file())
+        assert (responses / "index.jsonl").exists()
+        assert bodies == [entries[2]["body_sha256"]]
+
+        body = client.get(f"/api/v1/scans/responses-job/responses/bodies/{entries[0]['body_sha256']}")
+        assert body.status_code == 200 and body.content == PARKED.encode()
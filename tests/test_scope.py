@@ -0,0 +1,121 @@
+"""
+Tests for domain scope matching
+"""
+import asyncio
+
+import pytest
+
+from app.deps import settings
+from app.services.scope import DomainScope, ScopeTrie
+from tests.conftest import TestingSessionLocal
+
+
+class TestScopeTrie:
+    """Test reversed-label trie matching"""
+
+    @pytest.mark.parametrize("name,expected", [
+        ("example.com", True),
+        ("api.example.com", True),
+        ("a.b.c.example.com", True),
+        ("evilexample.com", False),
+        ("example.com.evil.net", False),
+        ("com", False),
+    ])
+    def test_root_domain(self, name, expected):
+        assert ScopeTrie(["example.com"]).match(name) is expected
+
+    def test_subtree_only_wildcard(self):
+        trie = ScopeTrie(["*.example.org"])
+
+        assert trie.match("www.example.org")
+        assert not trie.match("example.org")
+
+    def test_inner_wildcard_matches_one_label(self):
+        trie = ScopeTrie(["api.*.example.net"])
+
+        assert trie.match("api.eu.example.net")
+        assert trie.match("v2.api.eu.example.net")
+        assert not trie.match("api.example.net")
+        assert not trie.match("api.a.b.example.net")
+
+    def test_literal_and_wildcard_branches(self):
+        trie = ScopeTrie(["api.*.example.net", "*.us.example.net"])
+
+        assert trie.match("api.eu.example.net")
+        assert trie.match("web.us.example.net")
+        assert trie.match("api.us.example.net")
+
+
+class TestDomainScope:
+    """Test include/exclude handling"""
+
+    def test_include_and_exclude(self):
+        scope = DomainScope("example.com", include=["*.example-cdn.net"], exclude=["admin.example.com"])
+
+        assert "www.example.com" in scope
+        assert "img.example-cdn.net" in scope
+        assert "admin.example.com" not in scope
+        assert "x.admin.example.com" not in scope
+        assert "example-cdn.net" not in scope
+
+    def test_filter_normalizes_tool_output(self):
+        scope = DomainScope("example.com")
+        lines = ["API.Example.com.\n", "*.dev.example.com", "evilexample.com", "", "bad name.example.com"]
+
+        assert list(scope.filter(lines)) == ["api.example.com", "dev.example.com"]
+
+    def test_save_and_load(self, tmp_path):
+        DomainScope("example.com", exclude=["*.internal.example.com"]).save(tmp_path / "scope.json")
+
+        scope = DomainScope.load(tmp_path / "scope.json", "example.com")
+        assert "db.internal.example.com" not in scope
+        assert DomainScope.load(tmp_path / "missing.json", "example.com").exclude == []
+
+
+class TestPipelineScope:
+    """Test scope filtering before names are merged into subs.txt"""
+
+    def test_out_of_scope_names_not_merged(self, tmp_path, monkeypatch):
+        from benchmarks.fake_tools import install_fake_tools
+        from app.services.pipeline import ReconPipeline
+
+        tools = install_fake_tools(tmp_path / "bin")
+        monkeypatch.setattr(settings, "anew_path", tools["anew"])
+        monkeypatch.setattr(settings, "jobs_directory", str(tmp_path / "jobs"))
+
+        pipeline = ReconPipeline("scope-job", "example.com", scope_config={"exclude": ["admin.example.com"]})
+        raw = pipeline.job_dir / "amass_raw.txt"
+        raw.write_text(
+            "www.example.com (FQDN) --> a_record --> 1.2.3.4 (IPAddress)\n"
+            "www.evilexample.com (FQDN) --> a_record --> 1.2.3.5 (IPAddress)\n"
+            "admin.example.com (FQDN) --> a_record --> 1.2.3.6 (IPAddress)\n"
+        )
+
+        asyncio.run(pipeline._filter_amass_output(raw))
+        asyncio.run(pipeline._merge_in_scope(["api.example.com", "example.com.attacker.net"], pipeline.subs_file, "assetfinder"))
+
+        assert pipeline.amass_file.read_text().split() == ["www.example.com"]
+        assert pipeline.subs_file.read_text().split() == ["api.example.com"]
+
+        # Follow-up pipelines for the same job reuse the saved scope
+        assert "admin.example.com" not in ReconPipeline("scope-job", "example.com").scope
+
+
+class TestAddSubdomainScope:
+    """Test manual subdomain scope validation"""
+
+    def test_lookalike_domain_rejected(self, client, tmp_path, monkeypatch):
+        from app.storage.repo import ScanJobRepository
+
+        monkeypatch.setattr(settings, "jobs_directory", str(tmp_path))
+        db = TestingSessionLocal()
+        try:
+            ScanJobRepository(db).create_scan_job("scope-add-job", "example.com")
+        finally:
+            db.close()
+
+        response = client.post("/api/v1/scans/scope-add-job/subdomains", json={"subdomain": "evilexample.com"})
+        assert response.status_code == 400
+
+        response = client.post("/api/v1/scans/scope-add-job/subdomains", json={"subdomain": "https://api.example.com/login"})
+        assert response.status_code == 200
@@ -0,0 +1,105 @@
+"""
+Tests for the gowitness screenshot manifest and screenshot ingestion
+"""
+import asyncio
+import io
+import json
+
+from app.deps import settings
+from app.services.parsers import iter_gowitness_jsonl
+from tests.conftest import TestingSessionLocal
+
+URLS = ["https://my-app.example.com", "https://my.app.example.com", "http://api.example.com:8080"]
+
+
+def _manifest_line(url, filename, failed=False):
+    return json.dumps({"url": url, "final_url": url, "response_code": 200, "title": "t",
+                       "file_name": filename, "failed": failed}) + "\n"
+
+
+class TestGowitnessManifest:
+    """Test parsing the --write-jsonl manifest"""
+
+    def test_iter_gowitness_jsonl(self):
+        lines = io.StringIO(
+            _manifest_line("https://a.example.com", "https-a-example-com.jpeg")
+            + _manifest_line("https://b.example.com", "", failed=True)
+            + "not json\n"
+        )
+        assert list(iter_gowitness_jsonl(lines)) == [{
+            "url": "https://a.example.com", "final_url": "https://a.example.com", "status_code": 200,
+            "title": "t", "filename": "https-a-example-com.jpeg"
+        }]
+
+    def _pipeline(self, tmp_path, monkeypatch, job_id, urls=URLS):
+        from app.services.pipeline import ReconPipeline
+
+        monkeypatch.setattr(settings, "jobs_directory", str(tmp_path))
+        pipeline = ReconPipeline(job_id, "example.com")
+        asyncio.run(pipeline._prepare_urls_for_gowitness(urls))
+        return pipeline
+
+    def test_manifest_maps_hyphenated_hosts_exactly(self, tmp_path, monkeypatch):
+        pipeline = self._pipeline(tmp_path, monkeypatch, "manifest-job")
+        # gowitness names both hyphen and dot variants alike; only the manifest tells them apart
+        names = ["https---my-app-example-com-443.jpeg", "https---my-app-example-com-443-1.jpeg",
+                 "http---api-example-com-8080.jpeg"]
+        for name in names:
+            (pipeline.shots_dir / name).write_bytes(b"jpeg")
+        pipeline.screenshot_manifest.write_text("".join(_manifest_line(u, n) for u, n in zip(URLS, names)))
+
+        screenshots = asyncio.run(pipeline._parse_screenshot_results())
+
+        assert [(s["url"], s["filename"]) for s in screenshots] == list(zip(URLS, names))
+        assert screenshots[0]["file_path"] == "shots/https---my-app-example-com-443.jpeg"
+
+    def test_manifest_skips_missing_files(self, tmp_path, monkeypatch):
+        pipeline = self._pipeline(tmp_path, monkeypatch, "manifest-missing-job")
+        pipeline.screenshot_manifest.write_text(_manifest_line(URLS[0], "gone.jpeg"))
+        assert asyncio.run(pipeline._parse_screenshot_results()) == []
+
+    def test_file_names_matched_to_requested_urls_without_manifest(self, tmp_path, monkeypatch):
+        pipeline = self._pipeline(tmp_path, monkeypatch, "no-manifest-job", urls=[URLS[0], URLS[2]])
+        (pipeline.shots_dir / "https-my-app-example-com.png").write_bytes(b"png")
+        (pipeline.shots_dir / "http-api-example-com-8080.png").write_bytes(b"png")
+
+        urls = sorted(s["url"] for s in asyncio.run(pipeline._parse_screenshot_results()))
+        assert urls == ["http://api.example.com:8080", "https://my-app.example.com"]
+
+
+class TestScreenshotIngestion:
+    """Test that saved screenshots link to their subdomains in one pass"""
+
+    def test_save_scan_results_links_screenshots(self, client):
+        from app.workers.tasks import _save_scan_results
+        from app.storage.repo import ScanJobRepository, ScreenshotRepository, SubdomainRepository
+
+        results = {
+            "subdomains": ["my-app.example.com", "api.example.com", "old.example.com"],
+            "live_hosts": [
+                {"url": "https://my-app.example.com", "status_code": 200, "is_live": True, "cluster_id": "c1"},
+                {"url": "http://api.example.com:8080", "status_code": 403, "is_live": True},
+            ],
+            "screenshots": [
+                {"url": "https://my-app.example.com", "filename": "a.jpeg", "file_path": "shots/a.jpeg"},
+                {"url": "http://api.example.com:8080", "filename": "b.jpeg", "file_path": "shots/b.jpeg"},
+                {"url": "https://unknown.example.org", "filename": "c.jpeg", "file_path": "shots/c.jpeg"},
+            ],
+        }
+        db = TestingSessionLocal()
+        try:
+            ScanJobRepository(db).create_scan_job("ingest-job", "example.com")
+            _save_scan_results(db, "ingest-job", results, lambda *args: None)
+
+            subdomains = {s.subdomain: s for s in SubdomainRepository(db).get_subdomains_by_job("ingest-job")}
+            shots = {s.url: s for s in ScreenshotRepository(db).get_screenshots_by_job("ingest-job")}
+        finally:
+            db.close()
+
+        assert subdomains["my-app.example.com"].cluster_id == "c1"
+        assert subdomains["api.example.com"].http_status == 403
+        assert subdomains["old.example.com"].url is None
+        assert shots["https://my-app.example.com"].subdomain_id == subdomains["my-app.example.com"].id
+        assert shots["http://api.example.com:8080"].subdomain_id == subdomains["api.example.com"].id
+        assert shots["http://api.example.com:8080"].file_path == "jobs/ingest-job/shots/b.jpeg"
+        assert shots["https://unknown.example.org"].subdomain_id is None
@@ -0,0 +1,54 @@
+"""
+Tests for per-tool telemetry
+"""
+import subprocess
+import sys
+
+import pytest
+
+from app.services.telemetry import ToolRunner
+
+
+class TestToolRunner:
+    """Test ToolRunner resource accounting"""
+
+    def test_records_output_and_usage(self):
+        runner = ToolRunner("test-job")
+        result = runner.run(
+            [sys.executable, "-c", "import sys; [print(l.strip().upper()) for l in sys.stdin]"],
+            "httpx",
+            input="a.example.com\nb.example.com\n"
+        )
+
+        assert result.returncode == 0
+        assert result.stdout == "A.EXAMPLE.COM\nB.EXAMPLE.COM\n"
+
+        run = runner.runs[0]
+        assert run.tool == "httpx"
+        assert run.stage == "probe"
+        assert run.exit_code == 0
+        assert run.lines_in == 2
+        assert run.lines_out == 2
+        assert run.bytes_in == len("a.example.com\nb.example.com\n")
+        assert run.wall_time > 0
+        if sys.platform != "win32":
+            assert run.max_rss_kb > 0
+            assert run.user_cpu is not None
+
+    def test_records_failure_exit_code(self):
+        runner = ToolRunner("test-job")
+        result = runner.run([sys.executable, "-c", "import sys; sys.exit(3)"], "subfinder")
+
+        assert result.returncode == 3
+        assert runner.runs[0].exit_code == 3
+        assert runner.runs[0].stage == "enumeration"
+
+    def test_records_timeout(self):
+        runner = ToolRunner("test-job")
+        with pytest.raises(subprocess.TimeoutExpired):
+            runner.run([sys.executable, "-c", "import time; time.sleep(10)"], "amass", timeout=0.5)
+
+        run = runner.runs[0]
+        assert run.timed_out is True
+        assert run.wall_time < 5
+        assert runner.to_list()[0]["timed_out"] is True
@@ -0,0 +1,140 @@
+"""
+Tests for screenshot WebP derivatives
+"""
+import os
+
+import pytest
+
+from app.deps import settings
+from app.services import thumbnails
+from app.services.thumbnails import derivative_path, ensure_derivative, render_derivatives
+from tests.conftest import TestingSessionLocal
+
+
+def _png(path, size=(1280, 2400), color=(200, 30, 30)):
+    Image = pytest.importorskip("PIL.Image")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new("RGB", size, color).save(path, "PNG")
+    return path
+
+
+class TestDerivatives:
+    """Test rendering and caching of derivatives"""
+
+    def test_thumb_and_full(self, tmp_path):
+        Image = pytest.importorskip("PIL.Image")
+        source = _png(tmp_path / "shots" / "https-a-example-com.png")
+
+        thumb = ensure_derivative(tmp_path, source, "thumb")
+        full = ensure_derivative(tmp_path, source, "full")
+
+        assert thumb == tmp_path / "derived" / "thumb" / "shots" / "https-a-example-com.webp"
+        with Image.open(thumb) as image:
+            assert image.format == "WEBP"
+            assert image.size == (settings.screenshot_thumb_width, 200)
+        with Image.open(full) as image:
+            assert image.size == (1280, 2400)
+        assert thumb.stat().st_size * 10 < source.stat().st_size
+
+    def test_cached_until_source_changes(self, tmp_path):
+        source = _png(tmp_path / "shots" / "a.png")
+        target = ensure_derivative(tmp_path, source, "thumb")
+        mtime = target.stat().st_mtime_ns
+
+        assert ensure_derivative(tmp_path, source, "thumb").stat().st_mtime_ns == mtime
+
+        _png(source, color=(0, 0, 0))
+        os.utime(source, ns=(0, mtime + 10**9))
+        ensure_derivative(tmp_path, source, "thumb")
+        assert target.stat().st_mtime_ns != mtime
+
+    def test_render_derivatives_dedupes_and_survives_bad_files(self, tmp_path):
+        good = _png(tmp_path / "shots" / "a.png", size=(400, 300))
+        bad = tmp_path / "shots" / "b.png"
+        bad.write_bytes(b"not a png")
+
+        stats = render_derivatives(tmp_path, [good, good, bad], workers=2)
+
+        assert stats == {"sources": 2, "rendered": 1, "failed": 1}
+        assert derivative_path(tmp_path, good, "full").exists()
+
+    def test_without_pillow(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(thumbnails, "Image", None)
+        source = tmp_path / "shots" / "a.png"
+        source.parent.mkdir()
+        source.write_bytes(b"png")
+
+        assert ensure_derivative(tmp_path, source, "thumb") is None
+        assert render_derivatives(tmp_path, [source])["rendered"] == 0
+        with pytest.raises(ValueError):
+            ensure_derivative(tmp_path, source, "huge")
+
+
+class TestScreenshotImageEndpoint:
+    """Test GET /scans/{job_id}/screenshots/{id}/image/{size}"""
+
+    def _screenshot(self, tmp_path, monkeypatch, write_png=True):
+        from app.storage.repo import ScanJobRepository, ScreenshotRepository
+
+        monkeypatch.setattr(settings, "jobs_directory", str(tmp_path))
+        source = tmp_path / "image-job" / "shots" / "a.png"
+        if write_png:
+            _png(source, size=(800, 600))
+        else:
+            source.parent.mkdir(parents=True)
+            source.write_bytes(b"png")
+
+        db = TestingSessionLocal()
+        try:
+            scan_job = ScanJobRepository(db).create_scan_job("image-job", "example.com")
+            shot = ScreenshotRepository(db).create_screenshot(
+                scan_job.id, "https://a.example.com", "a.png", "jobs/image-job/shots/a.png"
+            )
+            return shot.id
+        finally:
+            db.close()
+
+    def test_sizes(self, client, tmp_path, monkeypatch):
+        screenshot_id = self._screenshot(tmp_path, monkeypatch)
+        base = f"/api/v1/scans/image-job/screenshots/{screenshot_id}/image"
+
+        thumb = client.get(f"{base}/thumb")
+        assert thumb.status_code == 200
+        assert thumb.headers["content-type"] == "image/webp"
+        assert (tmp_path / "image-job" / "derived" / "thumb" / "shots" / "a.webp").exists()
+        assert client.get(f"{base}/original").headers["content-type"] == "image/png"
+        assert client.get(f"{base}/huge").status_code == 422
+
+        scan = client.get("/api/v1/scans/image-job").json()
+        assert scan["screenshots"][0]["thumb_url"] == f"{base}/thumb"
+
+    def test_committed_derivative_is_fetched(self, client, tmp_path, monkeypatch):
+        from app.services import artifacts
+
+        screenshot_id = self._screenshot(tmp_path, monkeypatch)
+        job_dir = tmp_path / "image-job"
+        thumb = ensure_derivative(job_dir, job_dir / "shots" / "a.png", "thumb").read_bytes()
+        monkeypatch.setattr(settings, "artifact_store_enabled", True)
+        monkeypatch.setattr(settings, "artifact_store_path", str(tmp_path / "artifacts"))
+        monkeypatch.setattr(artifacts, "_store", None)
+        artifacts.get_artifact_store().commit_job("image-job", job_dir)
+        assert not (job_dir / "derived").exists()
+
+        def render(*args, **kwargs):
+            raise AssertionError("committed derivative rendered again")
+
+        monkeypatch.setattr(thumbnails, "render_derivative", render)
+        response = client.get(f"/api/v1/scans/image-job/screenshots/{screenshot_id}/image/thumb")
+        assert response.status_code == 200
+        assert response.content == thumb
+
+    def test_original_served_without_pillow(self, client, tmp_path, monkeypatch):
+        screenshot_id = self._screenshot(tmp_path, monkeypatch, write_png=False)
+        monkeypatch.setattr(thumbnails, "Image", None)
+
+        response = client.get(f"/api/v1/scans/image-job/screenshots/{screenshot_id}/image/full")
+        assert response.status_code == 200
+        assert response.content == b"png"
+
+    def test_not_found(self, client):
+        assert client.get("/api/v1/scans/image-job/screenshots/1/image/thumb").status_code == 404
@@ -0,0 +1,121 @@
+"""
+Tests for span tracing and trace-context propagation
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from app.deps import settings
+from app.services import tracing
+
+
+@pytest.fixture
+def jsonl_tracing(tmp_path, monkeypatch):
+    path = tmp_path / "spans.jsonl"
+    monkeypatch.setattr(settings, "tracing_exporter", "jsonl")
+    monkeypatch.setattr(settings, "tracing_jsonl_path", str(path))
+    return path
+
+
+def read_spans(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+class TestSpans:
+    """Test span nesting and export"""
+
+    def test_disabled_tracing_yields_noop(self, monkeypatch):
+        monkeypatch.setattr(settings, "tracing_exporter", "none")
+        with tracing.start_span("noop") as span:
+            assert span is tracing.NOOP_SPAN
+            span.set_attribute("ignored", 1)
+
+    def test_nested_spans_share_trace(self, jsonl_tracing):
+        with tracing.start_span("root", {"job_id": "j1"}) as root:
+            with tracing.start_span("child"):
+                with tracing.start_span("grandchild"):
+                    pass
+
+        spans = {s["name"]: s for s in read_spans(jsonl_tracing)}
+        assert set(spans) == {"root", "child", "grandchild"}
+        assert {s["trace_id"] for s in spans.values()} == {root.trace_id}
+        assert spans["root"]["parent_id"] is None
+        assert spans["child"]["parent_id"] == spans["root"]["span_id"]
+        assert spans["grandchild"]["parent_id"] == spans["child"]["span_id"]
+        assert spans["root"]["attributes"]["job_id"] == "j1"
+
+    def test_remote_parent_from_traceparent(self, jsonl_tracing):
+        traceparent = "00-" + "a" * 32 + "-" + "b" * 16 + "-01"
+        with tracing.start_span("celery.task", traceparent=traceparent):
+            pass
+
+        span = read_spans(jsonl_tracing)[0]
+        assert span["trace_id"] == "a" * 32
+        assert span["parent_id"] == "b" * 16
+
+    def test_error_status_recorded(self, jsonl_tracing):
+        with pytest.raises(ValueError):
+            with tracing.start_span("failing"):
+                raise ValueError("boom")
+
+        span = read_spans(jsonl_tracing)[0]
+        assert span["status"] == "error"
+        assert "boom" in span["attributes"]["error"]
+
+    def test_traced_async_decorator(self, jsonl_tracing):
+        import asyncio
+
+        @tracing.traced("parse.test")
+        async def parse():
+            return 42
+
+        with tracing.start_span("root"):
+            assert asyncio.run(parse()) == 42
+
+        names = [s["name"] for s in read_spans(jsonl_tracing)]
+        assert "parse.test" in names
+
+    def test_inject_headers(self, jsonl_tracing):
+        headers = {}
+        with tracing.start_span("api") as span:
+            tracing.inject_headers(headers)
+        assert tracing.parse_traceparent(headers["traceparent"]) == (span.trace_id, span.span_id)
+
+
+class TestOtlpExporter:
+    """Test export to an OTLP/HTTP collector stand-in"""
+
+    def test_export_to_collector(self, monkeypatch):
+        received = []
+
+        class Collector(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                received.append((self.path, json.loads(body)))
+                self.send_response(200)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(("127.0.0.1", 0), Collector)
+        thread = threading.Thread(target=server.handle_request, daemon=True)
+        thread.start()
+
+        monkeypatch.setattr(settings, "tracing_exporter", "otlp")
+        monkeypatch.setattr(settings, "tracing_otlp_endpoint", f"http://127.0.0.1:{server.server_port}")
+        with tracing.start_span("root", {"count": 3}):
+            with tracing.start_span("child"):
+                pass
+
+        thread.join(timeout=5)
+        server.server_close()
+
+        path, payload = received[0]
+        assert path == "/v1/traces"
+        spans = payload["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        assert {s["name"] for s in spans} == {"root", "child"}
+        root = next(s for s in spans if s["name"] == "root")
+        assert {"key": "count", "value": {"intValue": "3"}} in root["attributes"]
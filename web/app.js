@@ -637,10 +637,12 @@ function displayScreenshots(screenshots, jobId) {
         return;
     }
     
+    const origin = API_BASE_URL.replace('/api/v1', '');
     gallery.innerHTML = screenshots.map(shot => `
-        <div class="screenshot-card" onclick="openScreenshot('${shot.file_path}')">
-            <img src="${API_BASE_URL.replace('/api/v1', '')}/${shot.file_path}" 
+        <div class="screenshot-card" onclick="openScreenshot('${shot.full_url || shot.file_path}')">
+            <img src="${origin}${shot.thumb_url || '/' + shot.file_path}" 
                  alt="${shot.url}" 
+                 loading="lazy"
                  class="screenshot-img"
                  onerror="this.src='data:image/svg+xml,%3Csvg xmlns=%22http://www.w3.org/2000/svg%22 width=%22300%22 height=%22200%22%3E%3Crect fill=%22%231a1a2e%22 width=%22300%22 height=%22200%22/%3E%3Ctext x=%2250%25%22 y=%2250%25%22 dominant-baseline=%22middle%22 text-anchor=%22middle%22 fill=%22%23a1a1aa%22%3EImage not found%3C/text%3E%3C/svg%3E'">
             <div class="screenshot-info">
@@ -696,8 +698,9 @@ function closeScanDetails() {
 //   Open Screenshot
 // ========================================
 
-function openScreenshot(filePath) {
-    const url = `${API_BASE_URL.replace('/api/v1', '')}/${filePath}`;
+function openScreenshot(path) {
+    // Image endpoint URLs start with '/', legacy file paths are relative to the server root
+    const url = `${API_BASE_URL.replace('/api/v1', '')}${path.startsWith('/') ? '' : '/'}${path}`;
     window.open(url, '_blank');
 }
 